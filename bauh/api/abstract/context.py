@@ -4,6 +4,7 @@ import sys
 from bauh.api.abstract.cache import MemoryCacheFactory
 from bauh.api.abstract.disk import DiskCacheLoaderFactory
 from bauh.api.abstract.download import FileDownloader
+from bauh.api.executor import MetadataFetchExecutor
 from bauh.api.http import HttpClient
 from bauh.view.util.translation import I18n
 
@@ -12,7 +13,8 @@ class ApplicationContext:
 
     def __init__(self, download_icons: bool, http_client: HttpClient, app_root_dir: str, i18n: I18n,
                  cache_factory: MemoryCacheFactory, disk_loader_factory: DiskCacheLoaderFactory,
-                 logger: logging.Logger, file_downloader: FileDownloader, distro: str, app_name: str):
+                 logger: logging.Logger, file_downloader: FileDownloader, distro: str, app_name: str,
+                 metadata_executor: MetadataFetchExecutor = None):
         """
         :param download_icons: if packages icons should be downloaded
         :param http_client: a shared instance of http client
@@ -25,6 +27,7 @@ class ApplicationContext:
         :param distro
         :param app_name
         :param root_password
+        :param metadata_executor: a shared bounded executor to fetch packages metadata
         """
         self.download_icons = download_icons
         self.http_client = http_client
@@ -40,6 +43,7 @@ class ApplicationContext:
                                    'Graphics', 'Network', 'Office', 'Science', 'Settings', 'System', 'Utility')
         self.app_name = app_name
         self.root_password = None
+        self.metadata_executor = metadata_executor if metadata_executor else MetadataFetchExecutor(logger)
 
     def is_system_x86_64(self):
         return self.arch_x86_64
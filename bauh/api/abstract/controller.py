@@ -83,6 +83,13 @@ class SoftwareManager(ABC):
         """
         pass
 
+    def is_substring_search(self) -> bool:
+        """
+        :return: if the search only returns packages whose id, name or description contain all the searched words. In this
+        case, the results of a search can be filtered to answer a query extending it (e.g: 'fire' -> 'firefox')
+        """
+        return False
+
     @abstractmethod
     def read_installed(self, disk_loader: DiskCacheLoader, limit: int, only_apps: bool, pkg_types: Set[Type[SoftwarePackage]], internet_available: bool) -> SearchResult:
         """
@@ -168,6 +175,14 @@ class SoftwareManager(ABC):
         """
         pass
 
+    def get_more_history(self, history: PackageHistory) -> bool:
+        """
+        Loads older entries into the given history (only called if 'history.has_more')
+        :param history:
+        :return: if new entries were loaded
+        """
+        return False
+
     @abstractmethod
     def install(self, pkg: SoftwarePackage, root_password: str, watcher: ProcessWatcher) -> bool:
         """
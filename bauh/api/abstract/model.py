@@ -242,15 +242,17 @@ class PackageUpdate:
 
 class PackageHistory:
 
-    def __init__(self, pkg: SoftwarePackage, history: List[dict], pkg_status_idx: int):
+    def __init__(self, pkg: SoftwarePackage, history: List[dict], pkg_status_idx: int, has_more: bool = False):
         """
         :param pkg
         :param history: a list with the package history.
         :param pkg_status_idx: 'history' index in which the application is current found
+        :param has_more: if there are older entries that can be loaded on demand (see SoftwareManager.get_more_history)
         """
         self.pkg = pkg
         self.history = history
         self.pkg_status_idx = pkg_status_idx
+        self.has_more = has_more
 
 
 class SuggestionPriority(Enum):
@@ -0,0 +1,235 @@
+import heapq
+import logging
+import time
+import traceback
+from collections import OrderedDict
+from threading import Thread, Condition
+from typing import Callable, Optional, Dict, Iterable, List
+
+
+class FetchTask:
+
+    def __init__(self, key: str, fn: Callable[[list], None], priority: int, group: Optional[str],
+                 on_cancel: Optional[Callable[[list], None]] = None):
+        self.key = key
+        self.fn = fn
+        self.on_cancel = on_cancel
+        self.targets = []
+        self.priority = priority
+        self.group = group
+        self.submitted_at = time.time()
+        self.cancelled = False
+
+
+class MetadataFetchExecutor:
+    """
+    Bounded pool of worker threads shared by the gems to fetch packages metadata (e.g: from remote APIs).
+    Pending tasks are executed by priority (lower values first), submissions with a key already pending are merged
+    into the pending task and pending tasks can be cancelled by key or by group (e.g: when a search query is
+    superseded by a new one). The 'on_cancel' callback of a cancelled task receives its targets, so they can be
+    restored (e.g: the packages status). The targets of the last 'max_cancelled' cancelled tasks can be submitted
+    again through 'resume' (e.g: packages of a search displayed again from a cache).
+    """
+
+    def __init__(self, logger: logging.Logger, max_workers: int = 8, max_cancelled: int = 1000):
+        self.logger = logger
+        self.max_workers = max_workers
+        self.max_cancelled = max_cancelled
+        self._cancelled = OrderedDict()  # id(target) -> (target, task)
+        self._queue = []  # heap: (priority, sequence, task)
+        self._pending = {}  # key -> task
+        self._sequence = 0
+        self._workers = []
+        self._running = 0
+        self._cond = Condition()
+        self._metrics = {'submitted': 0, 'deduplicated': 0, 'cancelled': 0, 'completed': 0, 'failed': 0,
+                         'wait_time': 0.0, 'exec_time': 0.0}
+
+    def submit(self, key: str, fn: Callable[[list], None], target: object = None, priority: int = 0, group: str = None,
+               on_cancel: Callable[[list], None] = None) -> bool:
+        """
+        :param key: task identifier used for deduplication and cancellation (e.g: 'flatpak:org.gnome.gedit')
+        :param fn: the callable to be executed. It receives the targets of all the submissions deduplicated.
+        :param target: the object the task fills (e.g: a package instance)
+        :param priority: lower values are executed first (e.g: the row index of the package on the table)
+        :param group: a group the task belongs to (e.g: a search query)
+        :param on_cancel: called with the task targets if it is cancelled before being executed
+        :return: if the task was queued. If there is a pending task for the same key, the target is attached to it
+        and its priority is raised if needed.
+        """
+        with self._cond:
+            pending = self._pending.get(key)
+
+            if pending:
+                self._metrics['deduplicated'] += 1
+
+                if target is not None:
+                    pending.targets.append(target)
+
+                if pending.group != group:  # shared by different groups, so it should not be cancelled by one of them
+                    pending.group = None
+
+                if priority < pending.priority:
+                    self._push(pending, priority)
+
+                return False
+
+            task = FetchTask(key, fn, priority, group, on_cancel)
+
+            if target is not None:
+                task.targets.append(target)
+
+            self._pending[key] = task
+            self._metrics['submitted'] += 1
+            self._push(task, priority)
+
+            if len(self._workers) < self.max_workers and len(self._queue) > len(self._workers) - self._running:
+                worker = Thread(target=self._work, daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+            self._cond.notify()
+            return True
+
+    def _push(self, task: FetchTask, priority: int):
+        task.priority = priority
+        self._sequence += 1
+        heapq.heappush(self._queue, (priority, self._sequence, task))
+
+    def _next(self) -> FetchTask:
+        with self._cond:
+            while True:
+                while self._queue:
+                    priority, _, task = heapq.heappop(self._queue)
+
+                    # ignoring cancelled tasks and stale entries left when a task priority is changed
+                    if not task.cancelled and task.priority == priority and self._pending.get(task.key) is task:
+                        del self._pending[task.key]
+                        self._running += 1
+                        return task
+
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            task = self._next()
+            started_at = time.time()
+
+            try:
+                task.fn(task.targets)
+                failed = False
+            except:
+                self.logger.error("An error occurred while executing the metadata task '{}'".format(task.key))
+                traceback.print_exc()
+                failed = True
+
+            with self._cond:
+                self._running -= 1
+                self._metrics['failed' if failed else 'completed'] += 1
+                self._metrics['wait_time'] += started_at - task.submitted_at
+                self._metrics['exec_time'] += time.time() - started_at
+
+    def reprioritize(self, key: str, priority: int) -> bool:
+        with self._cond:
+            task = self._pending.get(key)
+
+            if task and task.priority != priority:
+                self._push(task, priority)
+                return True
+
+            return False
+
+    def cancel(self, key: str) -> bool:
+        with self._cond:
+            task = self._pending.pop(key, None)
+
+            if task:
+                task.cancelled = True
+                self._metrics['cancelled'] += 1
+                self._keep_cancelled(task)
+
+        if task:
+            self._notify_cancelled(task)
+            return True
+
+        return False
+
+    def _notify_cancelled(self, task: FetchTask):
+        if task.on_cancel:
+            try:
+                task.on_cancel(task.targets)
+            except:
+                self.logger.error("An error occurred while cancelling the metadata task '{}'".format(task.key))
+                traceback.print_exc()
+
+    def cancel_group(self, group: str) -> int:
+        with self._cond:
+            to_cancel = [t for t in self._pending.values() if t.group == group]
+
+            for task in to_cancel:
+                task.cancelled = True
+                del self._pending[task.key]
+                self._keep_cancelled(task)
+
+            self._metrics['cancelled'] += len(to_cancel)
+
+            if to_cancel:
+                self._queue = [e for e in self._queue if not e[2].cancelled]
+                heapq.heapify(self._queue)
+
+        if to_cancel:
+            self.logger.info("{} pending metadata tasks cancelled (group: {})".format(len(to_cancel), group))
+
+            for task in to_cancel:
+                self._notify_cancelled(task)
+
+        return len(to_cancel)
+
+    def _keep_cancelled(self, task: FetchTask):
+        for target in task.targets:
+            self._cancelled[id(target)] = (target, task)
+            self._cancelled.move_to_end(id(target))
+
+        while len(self._cancelled) > self.max_cancelled:
+            self._cancelled.popitem(last=False)
+
+    def resume(self, targets: Iterable[object], on_resume: Callable[[object], None] = None) -> List[object]:
+        """
+        Submits again the cancelled tasks of the given targets (with their order as priority)
+        :param on_resume: called with each target before its task is submitted again (e.g: to change its status)
+        :return: the targets whose tasks were submitted again
+        """
+        to_resume = []
+
+        with self._cond:
+            for priority, target in enumerate(targets):
+                cancelled = self._cancelled.get(id(target))
+
+                if cancelled and cancelled[0] is target:
+                    del self._cancelled[id(target)]
+                    to_resume.append((priority, target, cancelled[1]))
+
+        for priority, target, task in to_resume:
+            if on_resume:
+                on_resume(target)
+
+            self.submit(task.key, task.fn, target, priority=priority, group=task.group, on_cancel=task.on_cancel)
+
+        return [target for _, target, _ in to_resume]
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        :return: the current queue depth, running tasks and the accumulated counters. Latencies are averages in seconds.
+        """
+        with self._cond:
+            finished = self._metrics['completed'] + self._metrics['failed']
+            return {'queue_depth': len(self._pending),
+                    'running': self._running,
+                    'workers': len(self._workers),
+                    'submitted': self._metrics['submitted'],
+                    'deduplicated': self._metrics['deduplicated'],
+                    'cancelled': self._metrics['cancelled'],
+                    'completed': self._metrics['completed'],
+                    'failed': self._metrics['failed'],
+                    'avg_wait_time': self._metrics['wait_time'] / finished if finished else 0.0,
+                    'avg_exec_time': self._metrics['exec_time'] / finished if finished else 0.0}
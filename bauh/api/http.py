@@ -5,7 +5,7 @@ import traceback
 import requests
 import yaml
 
-from bauh.commons import system
+from bauh.commons import system, internet
 
 
 class HttpClient:
@@ -17,7 +17,7 @@ class HttpClient:
         self.sleep = sleep
         self.logger = logger
 
-    def get(self, url: str, params: dict = None, headers: dict = None, allow_redirects: bool = True, ignore_ssl: bool = False, single_call: bool = False, session: bool = True) -> requests.Response:
+    def get(self, url: str, params: dict = None, headers: dict = None, allow_redirects: bool = True, ignore_ssl: bool = False, single_call: bool = False, session: bool = True, stream: bool = False) -> requests.Response:
         cur_attempts = 1
 
         while cur_attempts <= self.max_attempts:
@@ -35,12 +35,18 @@ class HttpClient:
                 if ignore_ssl:
                     args['verify'] = False
 
+                if stream:
+                    args['stream'] = True
+
                 if session:
                     res = self.session.get(url, **args)
                 else:
                     res = requests.get(url, **args)
 
-                if res.status_code == 200:
+                internet.monitor.report_success()
+
+                if res.status_code == 200 or (res.status_code == 304 and headers and
+                                               ('If-None-Match' in headers or 'If-Modified-Since' in headers)):
                     return res
 
                 if single_call:
@@ -51,6 +57,7 @@ class HttpClient:
             except Exception as e:
                 if isinstance(e, requests.exceptions.ConnectionError):
                     self.logger.error('Internet seems to be off')
+                    internet.monitor.report_failure()
                     raise
 
                 self.logger.error("Could not retrieve data from '{}'".format(url))
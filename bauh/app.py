@@ -5,6 +5,7 @@ import urllib3
 from PyQt5.QtCore import QCoreApplication, Qt
 
 from bauh import __app_name__, app_args
+from bauh.commons import internet
 from bauh.view.core import config
 from bauh.view.util import logs
 
@@ -21,6 +22,10 @@ def main(tray: bool = False):
 
     app_config = config.read_config(update_file=True)
 
+    internet.monitor.logger = logger
+    internet.monitor.probe_url = app_config['internet']['probe_url']
+    internet.monitor.start()
+
     if bool(app_config['ui']['auto_scale']):
         os.environ['QT_AUTO_SCREEN_SCALE_FACTOR'] = '1'
         logger.info("Auto screen scale factor activated")
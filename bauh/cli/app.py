@@ -7,6 +7,7 @@ from bauh.api.abstract.context import ApplicationContext
 from bauh.api.http import HttpClient
 from bauh.cli import __app_name__, cli_args
 from bauh.cli.controller import CLIManager
+from bauh.commons import internet
 from bauh.context import generate_i18n, DEFAULT_I18N_KEY
 from bauh.view.core import config, gems
 from bauh.view.core.controller import GenericSoftwareManager
@@ -26,6 +27,8 @@ def main():
     logger = logs.new_logger(__app_name__, False)
 
     app_config = config.read_config(update_file=True)
+    internet.monitor.logger = logger
+    internet.monitor.probe_url = app_config['internet']['probe_url']
     http_client = HttpClient(logger)
 
     i18n = generate_i18n(app_config, resource.get_path('locale'))
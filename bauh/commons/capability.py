@@ -0,0 +1,152 @@
+import os
+import shutil
+import socket
+from threading import Lock
+from typing import Optional, Dict
+
+from bauh.commons.system import gen_env, run_cmd, USE_GLOBAL_INTERPRETER
+
+
+class CapabilityRegistry:
+    """
+    Resolves the binaries and services available to bauh without spawning processes ('which' calls are replaced
+    by PATH lookups). Results are memoized and only resolved again when the PATH (or one of its directories), the
+    binary file or the socket file change. It also counts the subprocess spawns saved.
+    """
+
+    def __init__(self):
+        self._binaries = {}  # (name, PATH) -> (PATH directories state, path)
+        self._versions = {}  # (path, args) -> (binary state, output)
+        self._sockets = {}  # socket path -> (socket file state, available)
+        self._stats = {'lookups': 0, 'spawns': 0, 'saved_spawns': 0}
+        self._lock = Lock()
+
+    @staticmethod
+    def _get_path(global_interpreter: bool = USE_GLOBAL_INTERPRETER) -> str:
+        return gen_env(global_interpreter)['PATH']
+
+    @staticmethod
+    def _read_state(*paths: str) -> tuple:
+        state = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                state.append((stat.st_ino, stat.st_mtime, stat.st_size))
+            except OSError:
+                state.append(None)
+
+        return tuple(state)
+
+    def which(self, name: str) -> Optional[str]:
+        """
+        :return: the binary path (considering the same PATH used by bauh's subprocesses) or None if not found
+        """
+        path = self._get_path()
+        state = self._read_state(*path.split(':')) if not os.path.isabs(name) else self._read_state(name)
+
+        with self._lock:
+            self._stats['lookups'] += 1
+            self._stats['saved_spawns'] += 1  # a 'which' call
+            cached = self._binaries.get((name, path))
+
+            if cached and cached[0] == state:
+                return cached[1]
+
+        bin_path = shutil.which(name, path=path)
+
+        with self._lock:
+            self._binaries[(name, path)] = (state, bin_path)
+
+        return bin_path
+
+    def is_available(self, name: str) -> bool:
+        return bool(self.which(name))
+
+    def get_version(self, name: str, args: str = '--version') -> Optional[str]:
+        """
+        :return: the output of the binary version command. It is only executed again when the binary changes.
+        """
+        bin_path = self.which(name)
+
+        if not bin_path:
+            return
+
+        key, state = (bin_path, args), self._read_state(bin_path)
+
+        with self._lock:
+            cached = self._versions.get(key)
+
+            if cached and cached[0] == state:
+                self._stats['saved_spawns'] += 1
+                return cached[1]
+
+            self._stats['spawns'] += 1
+
+        output = run_cmd('{} {}'.format(bin_path, args), print_error=False)
+        output = output.strip() if output else None
+
+        with self._lock:
+            self._versions[key] = (state, output)
+
+        return output
+
+    def is_socket_available(self, socket_path: str, timeout: float = 1) -> bool:
+        """
+        :return: if a service is accepting connections through the given Unix socket. The connection is only tried
+        again when the socket file changes (e.g: the service was restarted).
+        """
+        state = self._read_state(socket_path)
+
+        if state[0] is None:
+            return False
+
+        with self._lock:
+            cached = self._sockets.get(socket_path)
+
+            if cached and cached[0] == state:
+                self._stats['saved_spawns'] += 1  # a service status check (e.g: systemctl)
+                return cached[1]
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+            available = True
+        except OSError:
+            available = False
+        finally:
+            sock.close()
+
+        with self._lock:
+            self._sockets[socket_path] = (state, available)
+
+        return available
+
+    def invalidate(self):
+        with self._lock:
+            self._binaries.clear()
+            self._versions.clear()
+            self._sockets.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats}
+
+
+registry = CapabilityRegistry()
+
+
+def which(name: str) -> Optional[str]:
+    return registry.which(name)
+
+
+def is_available(name: str) -> bool:
+    return registry.is_available(name)
+
+
+def get_version(name: str, args: str = '--version') -> Optional[str]:
+    return registry.get_version(name, args)
+
+
+def is_socket_available(socket_path: str) -> bool:
+    return registry.is_socket_available(socket_path)
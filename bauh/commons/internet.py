@@ -1,12 +1,248 @@
 import http.client as http_client
+import ipaddress
+import logging
+import select
+import socket
+import time
+import traceback
+from threading import Thread, Lock, Event
+from typing import Callable, Optional
+from urllib.parse import urlparse
 
+DEFAULT_PROBE_URL = 'http://www.google.com'
 
-def is_available() -> bool:
-    conn = http_client.HTTPConnection("www.google.com", timeout=5)
-    try:
-        conn.request("HEAD", "/")
-        conn.close()
+# netlink multicast groups notifying links, addresses and routes changes
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_IFADDR = 0x100
+RTMGRP_IPV6_ROUTE = 0x400
+RTF_UP = 0x1
+
+
+def is_loopback(host: str) -> bool:
+    if host == 'localhost':
         return True
-    except:
-        conn.close()
+
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
         return False
+
+
+def has_default_route(ipv4_routes: str = '/proc/net/route', ipv6_routes: str = '/proc/net/ipv6_route') -> Optional[bool]:
+    """
+    :return: if there is a default route (IPv4 or IPv6) or None if the routes could not be read
+    """
+    readable = False
+
+    try:
+        with open(ipv4_routes) as f:
+            readable = True
+            for line in f.readlines()[1:]:
+                fields = line.split()
+
+                if len(fields) > 3 and fields[1] == '00000000' and int(fields[3], 16) & RTF_UP:
+                    return True
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open(ipv6_routes) as f:
+            readable = True
+            for line in f:
+                fields = line.split()
+
+                if len(fields) == 10 and fields[0] == '0' * 32 and fields[1] == '00' and fields[9] != 'lo' \
+                        and int(fields[8], 16) & RTF_UP:
+                    return True
+    except (OSError, ValueError):
+        pass
+
+    return False if readable else None
+
+
+class ConnectivityMonitor:
+    """
+    Keeps the internet connection state, so checking it is cheap (no request per check). The state is:
+        - probed once (HEAD request to 'probe_url') when it is first required
+        - changed by the successes / failures of the HTTP client (a failure only triggers a new probe)
+        - probed again in background when it is older than 'max_age' (or 'offline_max_age' while offline)
+        - probed again when the network links, addresses or routes change (netlink, see 'start')
+    """
+
+    def __init__(self, probe_url: str = DEFAULT_PROBE_URL, timeout: float = 5, max_age: float = 300,
+                 offline_max_age: float = 15, logger: logging.Logger = None):
+        self.probe_url = probe_url
+        self.timeout = timeout
+        self.max_age = max_age
+        self.offline_max_age = offline_max_age
+        self.logger = logger
+        self._online = None
+        self._checked_at = 0
+        self._listeners = []
+        self._lock = Lock()
+        self._probe_lock = Lock()
+        self._probing = False
+        self._stop = Event()
+        self._watcher = None
+
+    def add_listener(self, listener: Callable[[bool], None]):
+        """
+        :param listener: called with the new state every time it changes
+        """
+        self._listeners.append(listener)
+
+    def _set_online(self, online: bool):
+        with self._lock:
+            changed = self._online is not None and self._online != online
+            self._online = online
+            self._checked_at = time.time()
+
+        if changed:
+            if self.logger:
+                self.logger.info("Internet connection {}".format('available' if online else 'unavailable'))
+
+            for listener in self._listeners:
+                try:
+                    listener(online)
+                except:
+                    traceback.print_exc()
+
+    def probe(self) -> bool:
+        """
+        Checks the connection right now (blocking)
+        """
+        with self._probe_lock:
+            url = urlparse(self.probe_url)
+
+            if not is_loopback(url.hostname) and has_default_route() is False:  # no need to wait for the timeout
+                online = False
+            else:
+                conn_type = http_client.HTTPSConnection if url.scheme == 'https' else http_client.HTTPConnection
+                conn = conn_type(url.hostname, port=url.port, timeout=self.timeout)
+
+                try:
+                    conn.request('HEAD', url.path or '/')
+                    conn.getresponse()
+                    online = True
+                except:
+                    online = False
+                finally:
+                    conn.close()
+
+            self._set_online(online)
+            return online
+
+    def _probe_async(self):
+        with self._lock:
+            if self._probing:
+                return
+
+            self._probing = True
+
+        def _probe():
+            try:
+                self.probe()
+            finally:
+                self._probing = False
+
+        Thread(target=_probe, daemon=True).start()
+
+    def is_online(self) -> bool:
+        with self._lock:
+            online, checked_at = self._online, self._checked_at
+
+        if online is None:
+            return self.probe()
+
+        if time.time() - checked_at > (self.max_age if online else self.offline_max_age):
+            self._probe_async()
+
+        return online
+
+    def report_success(self):
+        """
+        Informs that a request has succeeded
+        """
+        self._set_online(True)
+
+    def report_failure(self):
+        """
+        Informs that a request could not connect. The connection is probed again in background.
+        """
+        if self._online is not False:
+            self._probe_async()
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = 0
+
+    def _open_netlink(self) -> Optional[socket.socket]:
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_IFADDR | RTMGRP_IPV6_ROUTE))
+            return sock
+        except (AttributeError, OSError) as e:
+            if self.logger:
+                self.logger.warning("Could not watch the network changes through netlink: {}. Routes will be polled".format(e))
+
+    def _read_routes(self) -> Optional[str]:
+        try:
+            with open('/proc/net/route') as f:
+                return f.read()
+        except OSError:
+            return
+
+    def _watch(self, poll_interval: float, debounce: float):
+        sock = self._open_netlink()
+
+        try:
+            routes = self._read_routes() if not sock else None
+
+            while not self._stop.is_set():
+                if sock:
+                    changed = bool(select.select([sock], [], [], poll_interval)[0])
+
+                    if changed:  # waiting for the related changes (e.g: address + route) before probing
+                        time.sleep(debounce)
+
+                        while select.select([sock], [], [], 0)[0]:
+                            sock.recv(65535)
+                else:
+                    self._stop.wait(poll_interval)
+                    current_routes = self._read_routes()
+                    changed = current_routes != routes
+                    routes = current_routes
+
+                if changed and not self._stop.is_set():
+                    if self.logger:
+                        self.logger.info("Network changed. Checking the internet connection")
+
+                    self.probe()
+        finally:
+            if sock:
+                sock.close()
+
+    def start(self, poll_interval: float = 5, debounce: float = 1):
+        """
+        Starts watching the network changes in background
+        """
+        if not self._watcher:
+            self._stop.clear()
+            self._watcher = Thread(target=self._watch, args=(poll_interval, debounce), daemon=True)
+            self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+        if self._watcher:
+            self._watcher.join()
+            self._watcher = None
+
+
+monitor = ConnectivityMonitor()
+
+
+def is_available() -> bool:
+    return monitor.is_online()
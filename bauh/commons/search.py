@@ -0,0 +1,248 @@
+import logging
+import time
+import traceback
+from collections import OrderedDict
+from queue import Queue, Empty
+from threading import Event, Thread, Lock
+from typing import Callable, Dict, Generator, Optional, Tuple, FrozenSet, Set, List
+
+from bauh.api.abstract.controller import SearchResult
+from bauh.api.abstract.model import SoftwarePackage
+
+POLL_INTERVAL = 0.1
+
+
+class SearchToken:
+    """
+    Cancellation token of a search. Results arriving after the cancellation are discarded.
+    """
+
+    def __init__(self):
+        self._cancelled = Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+
+class CallMetric:
+    """
+    Metrics of a call made by 'stream_results'
+    """
+
+    def __init__(self, name: str, status: str = 'pending', duration: float = None, total: int = None):
+        """
+        :param status: 'pending', 'ok', 'error', 'timeout' or 'cancelled'
+        :param duration: the seconds the call took (or was waited for)
+        :param total: the number of items returned (filled by the caller)
+        """
+        self.name = name
+        self.status = status
+        self.duration = duration
+        self.total = total
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+    def __repr__(self) -> str:
+        return 'name={} status={} duration={} total={}'.format(self.name, self.status,
+                                                               '{:.2f}'.format(self.duration) if self.duration is not None else None,
+                                                               self.total)
+
+
+def stream_results(calls: Dict[object, Callable[[], object]], token: SearchToken = None, timeout: Optional[float] = None,
+                   logger: logging.Logger = None, metrics: Dict[object, CallMetric] = None) -> Generator[Tuple[object, object], None, None]:
+    """
+    Runs each call in its own thread and yields the results as soon as they arrive (fastest first).
+    :param calls: the calls mapped by a key (e.g: the manager)
+    :param token: stops yielding results when cancelled
+    :param timeout: the seconds each call has to return its result. Late results are discarded.
+    :param metrics: if informed, it is filled with the metrics of each call (by key)
+    :return: a generator of tuples (key, result). Failed calls are not yielded.
+    """
+    if not calls:
+        return
+
+    results = Queue()
+    metrics = metrics if metrics is not None else {}
+
+    def _run(key: object, call: Callable[[], object]):
+        ti = time.time()
+        try:
+            res = call()
+            results.put((key, res, None, time.time() - ti))
+        except Exception as e:
+            if logger:
+                logger.error("Error ({}): {}".format(key.__class__.__name__, e.__class__.__name__))
+
+            traceback.print_exc()
+            results.put((key, None, e, time.time() - ti))
+
+    for key in calls:
+        metrics[key] = CallMetric(name=key.__class__.__name__)
+
+    started_at = time.time()
+    deadline = started_at + timeout if timeout else None
+
+    for key, call in calls.items():
+        Thread(target=_run, args=(key, call), daemon=True).start()
+
+    pending = set(calls.keys())
+
+    def _stop(status: str):
+        for key in pending:
+            metrics[key].status = status
+            metrics[key].duration = time.time() - started_at
+
+    while pending:
+        if token and token.cancelled:
+            _stop('cancelled')
+            return
+
+        wait = POLL_INTERVAL if deadline is None else min(POLL_INTERVAL, deadline - time.time())
+
+        if wait <= 0:
+            if logger:
+                logger.warning("Timed out after {} seconds. Discarding the results of: {}".format(timeout, ', '.join(sorted(k.__class__.__name__ for k in pending))))
+
+            _stop('timeout')
+            return
+
+        try:
+            key, res, error, duration = results.get(timeout=wait)
+        except Empty:
+            continue
+
+        pending.discard(key)
+        metrics[key].status = 'ok' if error is None else 'error'
+        metrics[key].duration = duration
+
+        if error is None and not (token and token.cancelled):
+            yield key, res
+
+
+def normalize_query(words: str) -> str:
+    return ' '.join(words.lower().split())
+
+
+def matches(pkg: SoftwarePackage, terms: List[str]) -> bool:
+    """
+    :return: if all terms are contained by the package id, name or description
+    """
+    text = ' '.join((str(v).lower() for v in (pkg.id, pkg.name, pkg.description) if v))
+    return all((t in text for t in terms))
+
+
+def refine(res: SearchResult, words: str) -> SearchResult:
+    """
+    :return: the results that also match a query extending the one that found them (e.g: 'fire' -> 'firefox')
+    """
+    terms = normalize_query(words).split(' ')
+    installed = [p for p in res.installed if matches(p, terms)]
+    new = [p for p in res.new if matches(p, terms)]
+    return SearchResult(installed, new, len(installed) + len(new))
+
+
+class SearchCache:
+    """
+    Caches the search results of each gem by query and enabled gems. Entries expire after 'ttl' seconds and only the
+    'max_entries' most recently used are kept. The results of gems whose search is substring-based are also reused
+    to answer queries extending a cached one (filtered locally).
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 30):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (query, gems) -> (expiration time, results by gem)
+        self._stats = {'hits': 0, 'refined': 0, 'misses': 0}
+        self._lock = Lock()
+
+    def _get_entry(self, key: tuple) -> Optional[dict]:
+        entry = self._entries.get(key)
+
+        if entry:
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return
+
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _find_extended(self, query: str, gems: FrozenSet[str], gem: object) -> Optional[Tuple[str, SearchResult]]:
+        found = None
+        now = time.time()
+
+        for (cached_query, cached_gems), (expires_at, results) in self._entries.items():
+            if cached_gems == gems and expires_at > now and gem in results and len(cached_query) < len(query) \
+                    and query.startswith(cached_query) and (not found or len(cached_query) > len(found[0])):
+                found = (cached_query, results[gem])
+
+        return found
+
+    def get(self, words: str, gems: FrozenSet[str], substring_gems: Set[object], all_gems: List[object]) -> Dict[object, SearchResult]:
+        """
+        :param gems: the names of the enabled gems
+        :param substring_gems: the gems whose search is substring-based
+        :param all_gems: the gems to look up
+        :return: the cached results for each gem found (gems not returned must be searched)
+        """
+        query = normalize_query(words)
+        res = {}
+
+        with self._lock:
+            cached = self._get_entry((query, gems)) or {}
+
+            for gem in all_gems:
+                if gem in cached:
+                    res[gem] = cached[gem]
+                    self._stats['hits'] += 1
+                elif gem in substring_gems and query:
+                    extended = self._find_extended(query, gems, gem)
+
+                    if extended:
+                        res[gem] = refine(extended[1], query)
+                        self._stats['refined'] += 1
+                    else:
+                        self._stats['misses'] += 1
+                else:
+                    self._stats['misses'] += 1
+
+        for gem in substring_gems:
+            if gem in res and gem not in cached:
+                self.put(query, gems, gem, res[gem])
+
+        return res
+
+    def put(self, words: str, gems: FrozenSet[str], gem: object, res: SearchResult):
+        key = (normalize_query(words), gems)
+
+        with self._lock:
+            results = self._get_entry(key)
+
+            if results is None:
+                results = {}
+                self._entries[key] = (time.time() + self.ttl, results)
+
+            results[gem] = res
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        :return: the fraction of gem lookups answered by the cache (exact or refined)
+        """
+        total = sum(self._stats.values())
+        return (self._stats['hits'] + self._stats['refined']) / total if total else 0
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries), 'hit_rate': self.hit_rate}
@@ -4,7 +4,7 @@ import sys
 import time
 from io import StringIO
 from subprocess import PIPE
-from typing import List, Tuple, Set
+from typing import List, Tuple, Set, Dict
 
 # default environment variables for subprocesses.
 from bauh.api.abstract.handler import ProcessWatcher
@@ -25,7 +25,7 @@ USE_GLOBAL_INTERPRETER = bool(os.getenv('VIRTUAL_ENV'))
 SIZE_MULTIPLIERS = ((0.001, 'Kb'), (0.000001, 'Mb'), (0.000000001, 'Gb'), (0.000000000001, 'Tb'))
 
 
-def gen_env(global_interpreter: bool, lang: str = DEFAULT_LANG, extra_paths: Set[str] = None) -> dict:
+def gen_env(global_interpreter: bool, lang: str = DEFAULT_LANG, extra_paths: Set[str] = None, extra_env: Dict[str, str] = None) -> dict:
     res = {}
 
     if lang:
@@ -39,6 +39,9 @@ def gen_env(global_interpreter: bool, lang: str = DEFAULT_LANG, extra_paths: Set
     if extra_paths:
         res['PATH'] = ':'.join(extra_paths) + ':' + res['PATH']
 
+    if extra_env:
+        res.update(extra_env)
+
     return res
 
 
@@ -65,7 +68,7 @@ class SimpleProcess:
 
     def __init__(self, cmd: List[str], cwd: str = '.', expected_code: int = 0,
                  global_interpreter: bool = USE_GLOBAL_INTERPRETER, lang: str = DEFAULT_LANG, root_password: str = None,
-                 extra_paths: Set[str] = None, error_phrases: Set[str] = None):
+                 extra_paths: Set[str] = None, error_phrases: Set[str] = None, extra_env: Dict[str, str] = None):
         pwdin, final_cmd = None, []
 
         if root_password is not None:
@@ -74,18 +77,34 @@ class SimpleProcess:
 
         final_cmd.extend(cmd)
 
-        self.instance = self._new(final_cmd, cwd, global_interpreter, lang, stdin=pwdin, extra_paths=extra_paths)
+        self.instance = self._new(final_cmd, cwd, global_interpreter, lang, stdin=pwdin, extra_paths=extra_paths, extra_env=extra_env)
         self.expected_code = expected_code
         self.error_phrases = error_phrases
+        self.rusage = None  # resource usage of the process (and its waited descendants) after 'wait'
+
+    def wait(self) -> int:
+        """
+        Waits for the process to finish and keeps its resource usage
+        :return: the process return code
+        """
+        if self.instance.returncode is None:
+            try:
+                _, status, self.rusage = os.wait4(self.instance.pid, 0)
+                self.instance.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            except ChildProcessError:  # already reaped
+                self.instance.wait()
+
+        return self.instance.returncode
 
-    def _new(self, cmd: List[str], cwd: str, global_interpreter: bool, lang: str, stdin = None, extra_paths: Set[str] = None) -> subprocess.Popen:
+    def _new(self, cmd: List[str], cwd: str, global_interpreter: bool, lang: str, stdin = None, extra_paths: Set[str] = None,
+             extra_env: Dict[str, str] = None) -> subprocess.Popen:
 
         args = {
             "stdout": subprocess.PIPE,
             "stderr": subprocess.STDOUT,
             "bufsize": -1,
             "cwd": cwd,
-            "env": gen_env(global_interpreter, lang, extra_paths=extra_paths)
+            "env": gen_env(global_interpreter, lang, extra_paths=extra_paths, extra_env=extra_env)
         }
 
         if stdin:
@@ -176,7 +195,7 @@ class ProcessHandler:
                         
                     self._notify_watcher(line)
 
-        proc.instance.wait()
+        proc.wait()
         output.seek(0)
 
         success = proc.instance.returncode == proc.expected_code
@@ -20,6 +20,8 @@ def size_to_byte(size: float, unit: str) -> int:
         final_size = size * 1000
     elif lower_unit[0] == 'm':
         final_size = size * 1000000
+    elif lower_unit[0] == 'g':
+        final_size = size * 1000000000
     elif lower_unit[0] == 't':
         final_size = size * 1000000000000
     else:
@@ -1,5 +1,4 @@
 import glob
-import json
 import os
 import re
 import shutil
@@ -10,7 +9,6 @@ from datetime import datetime
 from distutils.version import LooseVersion
 from math import floor
 from pathlib import Path
-from threading import Lock
 from typing import Set, Type, List, Tuple
 
 from colorama import Fore
@@ -23,14 +21,17 @@ from bauh.api.abstract.model import SoftwarePackage, PackageHistory, PackageUpda
     SuggestionPriority, CustomSoftwareAction
 from bauh.api.abstract.view import MessageType, ViewComponent, FormComponent, InputOption, SingleSelectComponent, \
     SelectViewType, TextInputComponent, PanelComponent, FileChooserComponent
-from bauh.commons import resource
+from bauh.commons import resource, capability
 from bauh.commons.config import save_config
 from bauh.commons.html import bold
-from bauh.commons.system import SystemProcess, new_subprocess, ProcessHandler, run_cmd, SimpleProcess
-from bauh.gems.appimage import query, INSTALLATION_PATH, LOCAL_PATH, SUGGESTIONS_FILE, CONFIG_FILE, ROOT_DIR, \
+from bauh.commons.system import SystemProcess, new_subprocess, ProcessHandler, SimpleProcess
+from bauh.gems.appimage import query, index, squashfs, INSTALLATION_PATH, LOCAL_PATH, SUGGESTIONS_FILE, CONFIG_FILE, ROOT_DIR, \
     CONFIG_DIR, UPDATES_IGNORED_FILE
 from bauh.gems.appimage.config import read_config
+from bauh.gems.appimage.database import ReadOnlyConnectionPool
+from bauh.gems.appimage.delta import DeltaDownloader
 from bauh.gems.appimage.model import AppImage
+from bauh.gems.appimage.registry import InstalledRegistry, gen_key, find_latest_releases
 from bauh.gems.appimage.worker import DatabaseUpdater
 
 DB_APPS_PATH = '{}/{}'.format(str(Path.home()), '.local/share/bauh/appimage/apps.db')
@@ -54,7 +55,9 @@ class AppImageManager(SoftwareManager):
         self.http_client = context.http_client
         self.logger = context.logger
         self.file_downloader = context.file_downloader
-        self.db_locks = {DB_APPS_PATH: Lock(), DB_RELEASES_PATH: Lock()}
+        self.delta_downloader = DeltaDownloader(http_client=context.http_client, logger=context.logger)
+        self.installed_registry = InstalledRegistry(logger=context.logger)
+        self.db_pools = {DB_APPS_PATH: ReadOnlyConnectionPool(DB_APPS_PATH), DB_RELEASES_PATH: ReadOnlyConnectionPool(DB_RELEASES_PATH)}
         self.custom_actions = [CustomSoftwareAction(i18_label_key='appimage.custom_action.install_file',
                                                     i18n_status_key='appimage.custom_action.install_file.status',
                                                     manager=self,
@@ -142,18 +145,31 @@ class AppImageManager(SoftwareManager):
         return self.upgrade(reqs, root_password=root_password, watcher=watcher)
 
     def _get_db_connection(self, db_path: str) -> sqlite3.Connection:
-        if os.path.exists(db_path):
-            self.db_locks[db_path].acquire()
-            return sqlite3.connect(db_path)
-        else:
+        con = self.db_pools[db_path].acquire()
+
+        if not con:
             self.logger.warning("Could not get a database connection. File '{}' not found".format(db_path))
 
+        return con
+
     def _close_connection(self, db_path: str, con: sqlite3.Connection):
-        con.close()
-        self.db_locks[db_path].release()
+        self.db_pools[db_path].release(con)
+
+    def _to_installed_app(self, data: dict) -> AppImage:
+        app = AppImage(installed=True, i18n=self.i18n, custom_actions=self.custom_app_actions, **data)
+        app.icon_url = app.icon_path
+        return app
+
+    def _fill_updates(self, apps: List[AppImage], connection: sqlite3.Connection):
+        apps_map = {gen_key(app.name, app.github): app for app in apps}
 
-    def _gen_app_key(self, app: AppImage):
-        return '{}{}'.format(app.name.lower(), app.github.lower() if app.github else '')
+        for key, release in find_latest_releases(connection, apps_map.keys()).items():
+            app, latest_version = apps_map[key], release[0]
+            app.update = bool(latest_version) and latest_version != app.version and LooseVersion(latest_version) > LooseVersion(app.version)
+
+            if app.update:
+                app.latest_version = latest_version
+                app.url_download_latest_version = release[1]
 
     def search(self, words: str, disk_loader: DiskCacheLoader, limit: int = -1, is_url: bool = False) -> SearchResult:
         if is_url:
@@ -164,84 +180,55 @@ class AppImageManager(SoftwareManager):
 
         if connection:
             try:
-                cursor = connection.cursor()
-                cursor.execute(query.SEARCH_APPS_BY_NAME_OR_DESCRIPTION.format(words, words))
+                found = index.search(connection, words, limit)
+                installed = self.installed_registry.get_all() if found else None
 
-                found_map = {}
-                idx = 0
-                for l in cursor.fetchall():
+                for l in found:  # keeping the ranking order
                     app = AppImage(*l, i18n=self.i18n, custom_actions=self.custom_app_actions)
-                    res.new.append(app)
-                    found_map[self._gen_app_key(app)] = {'app': app, 'idx': idx}
-                    idx += 1
+                    installed_data = installed.get(gen_key(app.name, app.github)) if installed else None
+
+                    if installed_data:
+                        res.installed.append(self._to_installed_app(installed_data))
+                    else:
+                        res.new.append(app)
 
+                if res.installed:
+                    self._fill_updates(res.installed, connection)
+                    self._mark_ignored_updates(res.installed)
+            except:
+                self.logger.error("Could not search for '{}' in the AppImage database".format(words))
+                traceback.print_exc()
             finally:
                 self._close_connection(DB_APPS_PATH, connection)
 
-            if res.new:
-                installed = self.read_installed(disk_loader, limit, only_apps=False, pkg_types=None, internet_available=True).installed
-
-                if installed:
-                    for iapp in installed:
-                        key = self._gen_app_key(iapp)
-
-                        new_found = found_map.get(key)
-
-                        if new_found:
-                            del res.new[new_found['idx']]
-                            res.installed.append(iapp)
-
         res.total = len(res.installed) + len(res.new)
         return res
 
-    def read_installed(self, disk_loader: DiskCacheLoader, limit: int = -1, only_apps: bool = False,
-                       pkg_types: Set[Type[SoftwarePackage]] = None, internet_available: bool = None, connection: sqlite3.Connection = None) -> SearchResult:
-        res = SearchResult([], [], 0)
-
-        if os.path.exists(INSTALLATION_PATH):
-            installed = run_cmd('ls {}*/data.json'.format(INSTALLATION_PATH), print_error=False)
-
-            if installed:
-                names = set()
-                for path in installed.split('\n'):
-                    if path:
-                        with open(path) as f:
-                            app = AppImage(installed=True, i18n=self.i18n, custom_actions=self.custom_app_actions, **json.loads(f.read()))
-                            app.icon_url = app.icon_path
-
-                        res.installed.append(app)
-                        names.add("'{}'".format(app.name.lower()))
-
-                if res.installed:
-                    con = self._get_db_connection(DB_APPS_PATH) if not connection else connection
+    def _mark_ignored_updates(self, apps: List[AppImage]):
+        ignored_updates = self._read_ignored_updates()
 
-                    if con:
-                        try:
-                            cursor = con.cursor()
-                            cursor.execute(query.FIND_APPS_BY_NAME.format(','.join(names)))
+        if ignored_updates:
+            for app in apps:
+                if app.supports_ignored_updates() and app.name in ignored_updates:
+                    app.updates_ignored = True
 
-                            for tup in cursor.fetchall():
-                                for app in res.installed:
-                                    if app.name.lower() == tup[0].lower() and (not app.github or app.github.lower() == tup[1].lower()):
-                                        app.update = LooseVersion(tup[2]) > LooseVersion(app.version) if tup[2] else False
-
-                                        if app.update:
-                                            app.latest_version = tup[2]
-                                            app.url_download_latest_version = tup[3]
+    def read_installed(self, disk_loader: DiskCacheLoader, limit: int = -1, only_apps: bool = False,
+                       pkg_types: Set[Type[SoftwarePackage]] = None, internet_available: bool = None, connection: sqlite3.Connection = None) -> SearchResult:
+        res = SearchResult([self._to_installed_app(data) for data in self.installed_registry.get_all().values()], [], 0)
 
-                                        break
-                        except:
-                            traceback.print_exc()
-                        finally:
-                            if not connection:
-                                self._close_connection(DB_APPS_PATH, con)
+        if res.installed:
+            con = self._get_db_connection(DB_APPS_PATH) if not connection else connection
 
-                    ignored_updates = self._read_ignored_updates()
+            if con:
+                try:
+                    self._fill_updates(res.installed, con)
+                except:
+                    traceback.print_exc()
+                finally:
+                    if not connection:
+                        self._close_connection(DB_APPS_PATH, con)
 
-                    if ignored_updates:
-                        for app in res.installed:
-                            if app.supports_ignored_updates() and app.name in ignored_updates:
-                                app.updates_ignored = True
+            self._mark_ignored_updates(res.installed)
 
         res.total = len(res.installed)
         return res
@@ -288,6 +275,10 @@ class AppImageManager(SoftwareManager):
         for req in requirements.to_upgrade:
             watcher.change_status("{} {} ({})...".format(self.i18n['manage_window.status.upgrading'], req.pkg.name, req.pkg.version))
 
+            if self._upgrade_delta(req.pkg, watcher):
+                self.cache_to_disk(req.pkg, None, False)
+                continue
+
             if not self.uninstall(req.pkg, root_password, watcher):
                 watcher.show_message(title=self.i18n['error'],
                                      body=self.i18n['appimage.error.uninstall_current_version'],
@@ -304,6 +295,69 @@ class AppImageManager(SoftwareManager):
         watcher.change_substatus('')
         return True
 
+    def _upgrade_delta(self, pkg: AppImage, watcher: ProcessWatcher) -> bool:
+        """
+        Builds the new version from the installed file downloading only the changed blocks (zsync)
+        :return: if the installed file was replaced by the new version. Otherwise the full file must be downloaded.
+        """
+        if pkg.imported or not pkg.install_dir or not pkg.url_download_latest_version:
+            return False
+
+        installed_file = self._find_appimage_file(pkg.install_dir)
+
+        if not installed_file:
+            return False
+
+        new_url = pkg.url_download_latest_version
+        file_name = new_url.split('/')[-1]
+        file_path = '{}/{}'.format(pkg.install_dir, file_name)
+
+        try:
+            control = self.delta_downloader.find_control(installed_file, new_url)
+        except:
+            self.logger.warning("Could not retrieve the zsync file of '{}'".format(new_url))
+            traceback.print_exc()
+            return False
+
+        if not control:
+            return False
+
+        watcher.change_substatus(self.i18n['appimage.upgrade.delta'].format(bold(file_name)))
+        temp_path = file_path + '.part'
+
+        def _progress(downloaded: int, total: int):
+            if total:
+                watcher.change_progress(floor(downloaded / total * 100))
+
+        built = self.delta_downloader.download(installed_file, control, temp_path, _progress)
+        watcher.change_progress(0)
+
+        if not built:
+            self.logger.warning("Could not build '{}' from '{}'. The full file will be downloaded".format(file_name, installed_file))
+
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+            return False
+
+        os.chmod(temp_path, 0o755)
+        os.replace(temp_path, file_path)
+
+        if installed_file != file_path:
+            os.remove(installed_file)
+
+        de_path = self._gen_desktop_entry_path(pkg)
+        if os.path.exists(de_path):
+            with open(de_path) as f:
+                de_content = f.read()
+
+            with open(de_path, 'w+') as f:
+                f.write(RE_DESKTOP_EXEC.sub('Exec={}\n'.format(file_path), de_content))
+
+        pkg.version = pkg.latest_version
+        pkg.url_download = new_url
+        return True
+
     def uninstall(self, pkg: AppImage, root_password: str, watcher: ProcessWatcher) -> bool:
         if os.path.exists(pkg.get_disk_cache_path()):
             handler = ProcessHandler(watcher)
@@ -317,6 +371,7 @@ class AppImageManager(SoftwareManager):
                 os.remove(de_path)
 
             self.revert_ignored_update(pkg)
+            self.installed_registry.invalidate()
 
         return True
 
@@ -397,6 +452,25 @@ class AppImageManager(SoftwareManager):
                 if RE_ICON_ENDS_WITH.match(f):
                     return f
 
+    def _extract_desktop_files(self, file_path: str, extracted_folder: str) -> bool:
+        """
+        Extracts only the desktop entry and icons from the root of the AppImage's squashfs image
+        :return: if a desktop entry was extracted
+        """
+        try:
+            extracted = squashfs.extract_root_files(file_path, extracted_folder, ('.desktop', '.png', '.svg'))
+        except:
+            self.logger.warning("Could not read the squashfs image of '{}'. The whole image will be extracted".format(file_path))
+            traceback.print_exc()
+            extracted = None
+
+        if extracted and [f for f in extracted if f.lower().endswith('.desktop')]:
+            self.logger.info("Files extracted from '{}': {}".format(file_path, ', '.join(extracted)))
+            return True
+
+        shutil.rmtree(extracted_folder, ignore_errors=True)
+        return False
+
     def install(self, pkg: AppImage, root_password: str, watcher: ProcessWatcher) -> bool:
         handler = ProcessHandler(watcher)
 
@@ -448,26 +522,27 @@ class AppImageManager(SoftwareManager):
             if permission_given:
 
                 watcher.change_substatus(self.i18n['appimage.install.extract'].format(bold(file_name)))
+                extracted_folder = '{}/{}'.format(out_dir, 'squashfs-root')
 
-                try:
-                    res, output = handler.handle_simple(SimpleProcess([file_path, '--appimage-extract'], cwd=out_dir))
-
-                    if 'Error: Failed to register AppImage in AppImageLauncherFS' in output:
+                if not self._extract_desktop_files(file_path, extracted_folder):
+                    try:
+                        res, output = handler.handle_simple(SimpleProcess([file_path, '--appimage-extract'], cwd=out_dir))
+
+                        if 'Error: Failed to register AppImage in AppImageLauncherFS' in output:
+                            watcher.show_message(title=self.i18n['error'],
+                                                 body=self.i18n['appimage.install.appimagelauncher.error'].format(appimgl=bold('AppImageLauncher'), app=bold(pkg.name)),
+                                                 type_=MessageType.ERROR)
+                            handler.handle(SystemProcess(new_subprocess(['rm', '-rf', out_dir])))
+                            return False
+                    except:
                         watcher.show_message(title=self.i18n['error'],
-                                             body=self.i18n['appimage.install.appimagelauncher.error'].format(appimgl=bold('AppImageLauncher'), app=bold(pkg.name)),
+                                             body=traceback.format_exc(),
                                              type_=MessageType.ERROR)
+                        traceback.print_exc()
                         handler.handle(SystemProcess(new_subprocess(['rm', '-rf', out_dir])))
                         return False
-                except:
-                    watcher.show_message(title=self.i18n['error'],
-                                         body=traceback.format_exc(),
-                                         type_=MessageType.ERROR)
-                    traceback.print_exc()
-                    handler.handle(SystemProcess(new_subprocess(['rm', '-rf', out_dir])))
-                    return False
 
                 watcher.change_substatus(self.i18n['appimage.install.desktop_entry'])
-                extracted_folder = '{}/{}'.format(out_dir, 'squashfs-root')
 
                 if os.path.exists(extracted_folder):
                     desktop_entry = self._find_desktop_file(extracted_folder)
@@ -514,8 +589,7 @@ class AppImageManager(SoftwareManager):
         self.enabled = enabled
 
     def _is_sqlite3_available(self):
-        res = run_cmd('which sqlite3')
-        return res and not res.strip().startswith('which ')
+        return capability.is_available('sqlite3')
 
     def can_work(self) -> bool:
         return self._is_sqlite3_available() and self.file_downloader.can_work()
@@ -530,7 +604,7 @@ class AppImageManager(SoftwareManager):
         updater = DatabaseUpdater(task_man=task_manager,
                                   i18n=self.context.i18n,
                                   http_client=self.context.http_client, logger=self.context.logger,
-                                  db_locks=self.db_locks, interval=interval)
+                                  interval=interval)
         if local_config['db_updater']['enabled']:
             updater.start()
         elif internet_available:
@@ -567,7 +641,7 @@ class AppImageManager(SoftwareManager):
                     sugs = [l for l in file.text.split('\n') if l]
 
                     if filter_installed:
-                        installed = {i.name.lower() for i in self.read_installed(disk_loader=None, connection=connection).installed}
+                        installed = {key[0] for key in self.installed_registry.get_all()}
                     else:
                         installed = None
 
@@ -614,6 +688,9 @@ class AppImageManager(SoftwareManager):
     def cache_to_disk(self, pkg: SoftwarePackage, icon_bytes: bytes, only_icon: bool):
         self.serialize_to_disk(pkg, icon_bytes, only_icon)
 
+        if not only_icon:
+            self.installed_registry.invalidate()
+
     def get_screenshots(self, pkg: AppImage) -> List[str]:
         if pkg.has_screenshots():
             return [pkg.url_screenshot]
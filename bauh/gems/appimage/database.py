@@ -0,0 +1,80 @@
+import os
+import sqlite3
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+
+class ReadOnlyConnectionPool:
+    """
+    Keeps read-only connections to a SQLite database file that is never modified in place: new versions are renamed
+    over it (see DatabaseUpdater). So the connections are opened as 'immutable' (no file locking) and concurrent
+    readers never block each other. When the file is replaced the connections to the previous version are discarded,
+    and the readers still using them keep reading a consistent (previous) version until they release them.
+    """
+
+    def __init__(self, db_path: str, max_idle: int = 4):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self._idle = []  # (file state, connection)
+        self._in_use = {}  # connection -> file state
+        self._lock = Lock()
+
+    def _read_state(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.db_path)
+            return stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = '{}?mode=ro&immutable=1'.format(Path(self.db_path).absolute().as_uri())
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def acquire(self) -> Optional[sqlite3.Connection]:
+        """
+        :return: a connection to the current version of the database or None if the file does not exist
+        """
+        state = self._read_state()
+
+        if not state:
+            return
+
+        with self._lock:
+            while self._idle:
+                con_state, con = self._idle.pop()
+
+                if con_state == state:
+                    self._in_use[con] = state
+                    return con
+
+                con.close()  # connected to a replaced version
+
+        con = self._connect()
+
+        with self._lock:
+            self._in_use[con] = state
+
+        return con
+
+    def release(self, connection: sqlite3.Connection):
+        state = self._read_state()
+
+        with self._lock:
+            con_state = self._in_use.pop(connection, None)
+
+            if con_state and con_state == state and len(self._idle) < self.max_idle:
+                self._idle.append((con_state, connection))
+                return
+
+        connection.close()
+
+    def close(self):
+        """
+        Closes the idle connections
+        """
+        with self._lock:
+            for _, con in self._idle:
+                con.close()
+
+            self._idle.clear()
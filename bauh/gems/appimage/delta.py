@@ -0,0 +1,478 @@
+import fnmatch
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import traceback
+from itertools import accumulate
+from typing import Optional, List, Dict, Tuple, Callable
+from urllib.parse import urljoin
+
+import requests
+
+from bauh.api.http import HttpClient
+
+UPDATE_INFO_SECTION = b'.upd_info'
+GITHUB_RELEASES_API = 'https://api.github.com/repos/{}/{}/releases/{}'
+SEARCH_STEP_BLOCKS = 32  # blocks skipped when no match is found after rolling through a block (see BlockMatcher)
+MAX_RANGE_GAP_BLOCKS = 4
+M32 = 0xFFFFFFFF
+
+try:
+    hashlib.new('md4')
+    HASHLIB_MD4 = True
+except ValueError:  # OpenSSL 3 without the legacy provider
+    HASHLIB_MD4 = False
+
+MD4_R2 = (0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15)
+MD4_R3 = (0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15)
+MD4_S1, MD4_S2, MD4_S3 = (3, 7, 11, 19), (3, 5, 9, 13), (3, 9, 11, 15)
+
+
+def md4(data: bytes) -> bytes:
+    """
+    MD4 is used by zsync to checksum the blocks
+    """
+    if HASHLIB_MD4:
+        return hashlib.new('md4', data).digest()
+
+    size = len(data)
+    data = data + b'\x80' + bytes((55 - size) % 64) + struct.pack('<Q', size * 8)
+    h0, h1, h2, h3 = 0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476
+
+    for x in struct.iter_unpack('<16I', data):
+        a, b, c, d = h0, h1, h2, h3
+
+        for i in range(16):
+            t = (a + ((b & c) | (~b & d)) + x[i]) & M32
+            s = MD4_S1[i & 3]
+            a, b, c, d = d, ((t << s) | (t >> (32 - s))) & M32, b, c
+
+        for i in range(16):
+            t = (a + ((b & c) | (b & d) | (c & d)) + x[MD4_R2[i]] + 0x5a827999) & M32
+            s = MD4_S2[i & 3]
+            a, b, c, d = d, ((t << s) | (t >> (32 - s))) & M32, b, c
+
+        for i in range(16):
+            t = (a + (b ^ c ^ d) + x[MD4_R3[i]] + 0x6ed9eba1) & M32
+            s = MD4_S3[i & 3]
+            a, b, c, d = d, ((t << s) | (t >> (32 - s))) & M32, b, c
+
+        h0, h1, h2, h3 = (h0 + a) & M32, (h1 + b) & M32, (h2 + c) & M32, (h3 + d) & M32
+
+    return struct.pack('<4I', h0, h1, h2, h3)
+
+
+def rsum(block: bytes) -> Tuple[int, int]:
+    """
+    :return: zsync's rolling checksum (a, b) of the block
+    """
+    return sum(block) & 0xFFFF, sum(accumulate(block)) & 0xFFFF
+
+
+def read_update_info(file_path: str) -> Optional[str]:
+    """
+    :return: the update information embedded in the AppImage '.upd_info' ELF section (e.g: 'zsync|https://...')
+    """
+    with open(file_path, 'rb') as f:
+        ident = f.read(16)
+
+        if len(ident) < 16 or ident[:4] != b'\x7fELF' or ident[4] not in (1, 2):
+            return
+
+        endian = '<' if ident[5] == 1 else '>'
+
+        if ident[4] == 2:
+            f.seek(0x28)
+            shoff = struct.unpack(endian + 'Q', f.read(8))[0]
+            f.seek(0x3A)
+            header, offset_field = struct.Struct(endian + 'IIQQQQIIQQ'), (4, 5)
+        else:
+            f.seek(0x20)
+            shoff = struct.unpack(endian + 'I', f.read(4))[0]
+            f.seek(0x2E)
+            header, offset_field = struct.Struct(endian + 'IIIIIIIIII'), (4, 5)
+
+        shentsize, shnum, shstrndx = struct.unpack(endian + 'HHH', f.read(6))
+
+        if not shnum or shstrndx >= shnum:
+            return
+
+        sections = []
+        for idx in range(shnum):
+            f.seek(shoff + idx * shentsize)
+            fields = header.unpack(f.read(header.size))
+            sections.append((fields[0], fields[offset_field[0]], fields[offset_field[1]]))
+
+        names_offset, names_size = sections[shstrndx][1:]
+        f.seek(names_offset)
+        names = f.read(names_size)
+
+        for name_idx, offset, size in sections:
+            if names[name_idx:name_idx + len(UPDATE_INFO_SECTION) + 1] == UPDATE_INFO_SECTION + b'\x00':
+                f.seek(offset)
+                info = f.read(size).split(b'\x00')[0].decode(errors='ignore').strip()
+                return info if info else None
+
+
+class ZsyncControl:
+
+    def __init__(self, url: str, filename: str, length: int, blocksize: int, seq_matches: int, rsum_bytes: int,
+                 checksum_bytes: int, sha1: str, rsums: List[int], checksums: List[bytes]):
+        """
+        :param url: the target file URL
+        :param rsums: the weak checksum of each block (masked according to rsum_bytes)
+        """
+        self.url = url
+        self.filename = filename
+        self.length = length
+        self.blocksize = blocksize
+        self.seq_matches = seq_matches
+        self.rsum_bytes = rsum_bytes
+        self.checksum_bytes = checksum_bytes
+        self.sha1 = sha1
+        self.rsums = rsums
+        self.checksums = checksums
+
+    def get_rsum_mask(self) -> int:
+        return {2: 0x0000FFFF, 3: 0x00FFFFFF}.get(self.rsum_bytes, M32)
+
+    def count_blocks(self) -> int:
+        return len(self.rsums)
+
+
+def parse_control(content: bytes, control_url: str) -> ZsyncControl:
+    """
+    Parses a zsync control file (headers followed by the blocks checksums)
+    :raises ValueError: if the content is not a valid control file
+    """
+    end_headers = content.find(b'\n\n')
+
+    if end_headers < 0:
+        raise ValueError('zsync headers not found')
+
+    headers = {}
+    for line in content[:end_headers].decode().split('\n'):
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+
+    if 'length' not in headers or 'blocksize' not in headers or 'sha-1' not in headers:
+        raise ValueError('Incomplete zsync headers: {}'.format(headers))
+
+    length, blocksize = int(headers['length']), int(headers['blocksize'])
+    seq_matches, rsum_bytes, checksum_bytes = (int(v) for v in headers.get('hash-lengths', '1,4,16').split(','))
+    blocks = (length + blocksize - 1) // blocksize
+    entry_size = rsum_bytes + checksum_bytes
+    data = content[end_headers + 2:]
+
+    if len(data) < blocks * entry_size:
+        raise ValueError('Expected {} blocks checksums. Found {} bytes'.format(blocks, len(data)))
+
+    mask = {2: 0x0000FFFF, 3: 0x00FFFFFF}.get(rsum_bytes, M32)
+    rsums, checksums = [], []
+    for idx in range(blocks):
+        entry = data[idx * entry_size:(idx + 1) * entry_size]
+        rsums.append(int.from_bytes(entry[:rsum_bytes], 'big') & mask)  # the last bytes of (a << 16 | b)
+        checksums.append(entry[rsum_bytes:])
+
+    return ZsyncControl(url=urljoin(control_url, headers['url']) if headers.get('url') else None,
+                        filename=headers.get('filename'), length=length, blocksize=blocksize, seq_matches=seq_matches,
+                        rsum_bytes=rsum_bytes, checksum_bytes=checksum_bytes, sha1=headers['sha-1'].lower(),
+                        rsums=rsums, checksums=checksums)
+
+
+class BlockMatcher:
+    """
+    Finds the blocks of the target file (described by a zsync control file) available in a local file.
+    The rolling checksum is only computed byte by byte for up to a block length while looking for the start of an
+    unchanged region (then SEARCH_STEP_BLOCKS are skipped). Once a region is found (weak and strong checksums match),
+    the next blocks are expected in sequence and only checked through their weak checksums (a pure Python MD4 is too
+    slow to check every block). The assembled file is verified against the SHA-1 of the control file anyway.
+    """
+
+    def __init__(self, control: ZsyncControl, search_step_blocks: int = SEARCH_STEP_BLOCKS):
+        self.control = control
+        self.search_step = control.blocksize * search_step_blocks
+        self.mask = control.get_rsum_mask()
+        self.seq = 2 if control.seq_matches > 1 and control.count_blocks() > 1 else 1
+        self._index = {}  # weak key -> first block indexes
+
+        rsums = control.rsums
+        for idx in range(control.count_blocks() - self.seq + 1):
+            key = (rsums[idx] << 32 | rsums[idx + 1]) if self.seq == 2 else rsums[idx]
+            self._index.setdefault(key, []).append(idx)
+
+    def _weak(self, a: int, b: int) -> int:
+        return (a << 16 | b) & self.mask
+
+    def _strong(self, block: bytes) -> bytes:
+        size = self.control.blocksize
+
+        if len(block) < size:
+            block += bytes(size - len(block))
+
+        return md4(block)[:self.control.checksum_bytes]
+
+    def _verify(self, data, position: int, idx: int) -> bool:
+        size, checksums = self.control.blocksize, self.control.checksums
+
+        for offset in range(self.seq):
+            if self._strong(data[position + offset * size:position + (offset + 1) * size]) != checksums[idx + offset]:
+                return False
+
+        return True
+
+    def _follow(self, data, position: int, idx: int, found: Dict[int, int]) -> int:
+        """
+        Follows the blocks in sequence after a verified match
+        :return: the position where the sequence ended
+        """
+        size, rsums, blocks = self.control.blocksize, self.control.rsums, self.control.count_blocks()
+
+        while idx < blocks and position + size <= len(data):
+            if idx not in found:
+                if self._weak(*rsum(data[position:position + size])) != rsums[idx]:
+                    break
+
+                found[idx] = position
+
+            position += size
+            idx += 1
+
+        return position
+
+    def _search(self, data, position: int, limit: int) -> Optional[Tuple[int, int]]:
+        """
+        Rolls the checksums byte by byte from the position until the limit
+        :return: the position and the block index of the first verified match
+        """
+        size = self.control.blocksize
+        end = min(limit, len(data) - size * self.seq)
+
+        if position > end:
+            return
+
+        index, mask, seq = self._index, self.mask, self.seq
+        a, b = rsum(data[position:position + size])
+        a2, b2 = rsum(data[position + size:position + 2 * size]) if seq == 2 else (0, 0)
+
+        while True:
+            key = ((a << 16 | b) & mask) << 32 | ((a2 << 16 | b2) & mask) if seq == 2 else (a << 16 | b) & mask
+            candidates = index.get(key)
+
+            if candidates:
+                for idx in candidates:
+                    if self._verify(data, position, idx):
+                        return position, idx
+
+            if position >= end:
+                return
+
+            old, mid = data[position], data[position + size]
+            a = (a - old + mid) & 0xFFFF
+            b = (b - size * old + a) & 0xFFFF
+
+            if seq == 2:
+                new = data[position + 2 * size]
+                a2 = (a2 - mid + new) & 0xFFFF
+                b2 = (b2 - size * mid + a2) & 0xFFFF
+
+            position += 1
+
+    def match(self, file_path: str) -> Dict[int, int]:
+        """
+        :return: the target blocks indexes found in the local file and their positions in it
+        """
+        found = {}
+
+        if not os.path.getsize(file_path):
+            return found
+
+        with open(file_path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            try:
+                position, size = 0, self.control.blocksize
+
+                while position + size <= len(data):
+                    match = self._search(data, position, position + size)
+
+                    if match:
+                        position = self._follow(data, match[0], match[1], found)
+                    else:
+                        position += self.search_step
+            finally:
+                data.close()
+
+        return found
+
+
+def gen_ranges(missing: List[int], blocksize: int, length: int, max_gap: int = MAX_RANGE_GAP_BLOCKS) -> List[Tuple[int, int]]:
+    """
+    :return: the byte ranges (inclusive) of the missing blocks. Close ranges are merged to reduce the requests.
+    """
+    ranges = []
+
+    for idx in sorted(missing):
+        start, end = idx * blocksize, min((idx + 1) * blocksize, length) - 1
+
+        if ranges and start - ranges[-1][1] - 1 <= max_gap * blocksize:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+
+    return ranges
+
+
+class DeltaDownloader:
+    """
+    Builds a new AppImage version from the blocks of the installed file and only downloads the changed blocks
+    (HTTP Range requests) as described by the zsync control file published with the new version.
+    """
+
+    def __init__(self, http_client: HttpClient, logger: logging.Logger):
+        self.http_client = http_client
+        self.logger = logger
+
+    def _get_control(self, url: str) -> Optional[ZsyncControl]:
+        try:
+            res = self.http_client.get(url, session=False, single_call=True)
+        except requests.exceptions.ConnectionError:
+            return
+
+        if res:
+            try:
+                return parse_control(res.content, res.url or url)
+            except ValueError:
+                self.logger.warning("Invalid zsync file '{}'".format(url))
+                traceback.print_exc()
+
+    def _get_github_control_url(self, user: str, repo: str, tag: str, pattern: str) -> Optional[str]:
+        release = self.http_client.get_json(GITHUB_RELEASES_API.format(user, repo, 'latest' if tag == 'latest' else 'tags/' + tag),
+                                            session=False)
+
+        if release:
+            for asset in release.get('assets') or ():
+                if fnmatch.fnmatch(asset.get('name', ''), pattern):
+                    return asset.get('browser_download_url')
+
+    def find_control(self, installed_file: str, new_url: str) -> Optional[ZsyncControl]:
+        """
+        Looks for the zsync file published along with the new version ('<url>.zsync') or referenced by the update
+        information embedded in the installed file
+        :return: the control file only if it describes the new version file
+        """
+        new_name = new_url.split('/')[-1]
+        control = self._get_control(new_url + '.zsync')
+
+        if not control:
+            update_info = read_update_info(installed_file)
+
+            if not update_info:
+                self.logger.info("No update information found in '{}'".format(installed_file))
+                return
+
+            info = update_info.split('|')
+            control_url = None
+
+            if info[0] == 'zsync' and len(info) > 1:
+                control_url = info[1]
+            elif info[0] == 'gh-releases-zsync' and len(info) > 4:
+                control_url = self._get_github_control_url(*info[1:5])
+            else:
+                self.logger.info("Unsupported update information '{}'".format(update_info))
+
+            control = self._get_control(control_url) if control_url else None
+
+        if control:
+            target_name = control.filename or (control.url.split('/')[-1] if control.url else None)
+
+            if target_name != new_name:
+                self.logger.info("zsync file describes '{}' instead of '{}'".format(target_name, new_name))
+                return
+
+            if not control.url:
+                control.url = new_url
+
+            return control
+
+    def _download_ranges(self, url: str, ranges: List[Tuple[int, int]], output, on_progress: Callable[[int], None]) -> bool:
+        session = requests.Session()
+
+        try:
+            for start, end in ranges:
+                res = session.get(url, headers={'Range': 'bytes={}-{}'.format(start, end)}, stream=True,
+                                  timeout=self.http_client.timeout)
+
+                if res.status_code != 206:  # the server does not support ranges
+                    self.logger.warning("Range request not supported by '{}' (status {})".format(url, res.status_code))
+                    res.close()
+                    return False
+
+                output.seek(start)
+                received = 0
+                for chunk in res.iter_content(chunk_size=65536):
+                    output.write(chunk)
+                    received += len(chunk)
+                    on_progress(len(chunk))
+
+                if received != end - start + 1:
+                    self.logger.warning("Incomplete range {}-{} received from '{}'".format(start, end, url))
+                    return False
+
+            return True
+        finally:
+            session.close()
+
+    def download(self, installed_file: str, control: ZsyncControl, output_path: str,
+                 on_progress: Callable[[int, int], None] = None) -> bool:
+        """
+        :param on_progress: receives the bytes downloaded and the total to be downloaded
+        :return: if the new file was built and its SHA-1 matches the control file
+        """
+        found = BlockMatcher(control).match(installed_file)
+        missing = [idx for idx in range(control.count_blocks()) if idx not in found]
+        ranges = gen_ranges(missing, control.blocksize, control.length)
+        to_download = sum(end - start + 1 for start, end in ranges)
+
+        self.logger.info("{}/{} blocks of '{}' reused from '{}'. Downloading {} bytes in {} ranges".format(
+            len(found), control.count_blocks(), control.filename, installed_file, to_download, len(ranges)))
+
+        downloaded = [0]
+
+        def _progress(size: int):
+            downloaded[0] += size
+
+            if on_progress:
+                on_progress(downloaded[0], to_download)
+
+        try:
+            with open(installed_file, 'rb') as local, open(output_path, 'wb+') as output:
+                output.truncate(control.length)
+
+                for idx, position in sorted(found.items()):
+                    local.seek(position)
+                    output.seek(idx * control.blocksize)
+                    output.write(local.read(min(control.blocksize, control.length - idx * control.blocksize)))
+
+                if ranges and not self._download_ranges(control.url, ranges, output, _progress):
+                    return False
+
+                output.flush()
+                output.seek(0)
+                sha1 = hashlib.sha1()
+
+                for chunk in iter(lambda: output.read(1024 * 1024), b''):
+                    sha1.update(chunk)
+
+            if sha1.hexdigest() != control.sha1:
+                self.logger.warning("SHA-1 of the file built from '{}' does not match the zsync file".format(installed_file))
+                return False
+
+            return True
+        except:
+            self.logger.error("Could not build '{}' from '{}'".format(output_path, installed_file))
+            traceback.print_exc()
+            return False
@@ -0,0 +1,100 @@
+import logging
+import re
+import sqlite3
+import time
+import traceback
+from typing import List, Optional
+
+from bauh.gems.appimage import query
+
+INDEX_TABLE = 'apps_search'
+MIN_TRIGRAM_LENGTH = 3
+RE_TERMS = re.compile(r'\S+')
+
+
+def _create_index(connection: sqlite3.Connection, tokenizer: str):
+    connection.execute('DROP TABLE IF EXISTS {}'.format(INDEX_TABLE))
+    connection.execute("CREATE VIRTUAL TABLE {} USING fts5(name, description, categories, content='apps', "
+                       "content_rowid='rowid', tokenize='{}')".format(INDEX_TABLE, tokenizer))
+    connection.execute("INSERT INTO {}({}) VALUES ('rebuild')".format(INDEX_TABLE, INDEX_TABLE))
+
+
+def build(db_path: str, logger: logging.Logger) -> bool:
+    """
+    Builds a full-text search index (FTS5) over the apps name, description and categories. The 'trigram' tokenizer
+    (SQLite >= 3.34) is preferred since it matches substrings (as the previous LIKE search did). Otherwise the words
+    are matched by prefix.
+    :return: if the index was built
+    """
+    ti = time.time()
+    try:
+        connection = sqlite3.connect(db_path)
+    except:
+        logger.error("Could not open the database '{}' to build the search index".format(db_path))
+        traceback.print_exc()
+        return False
+
+    try:
+        for tokenizer in ('trigram', 'unicode61 remove_diacritics 1'):
+            try:
+                _create_index(connection, tokenizer)
+                connection.commit()
+                logger.info("AppImage search index built with the '{}' tokenizer in {:.4f} seconds".format(tokenizer.split(' ')[0], time.time() - ti))
+                return True
+            except sqlite3.OperationalError as e:
+                connection.rollback()
+                logger.warning("Could not build the AppImage search index with the '{}' tokenizer: {}".format(tokenizer, e))
+
+        return False
+    finally:
+        connection.close()
+
+
+def get_tokenizer(connection: sqlite3.Connection) -> Optional[str]:
+    """
+    :return: the tokenizer of the search index or None if there is no index
+    """
+    cursor = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (INDEX_TABLE,))
+    row = cursor.fetchone()
+
+    if row:
+        return 'trigram' if 'trigram' in row[0] else 'unicode61'
+
+
+def _gen_match(terms: List[str], tokenizer: str) -> str:
+    phrases = ['"{}"'.format(t.replace('"', '""')) for t in terms]
+
+    if tokenizer != 'trigram':
+        phrases = ['{}*'.format(p) for p in phrases]
+
+    return ' '.join(phrases)
+
+
+def _escape_like(term: str) -> str:
+    return '%{}%'.format(term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+
+
+def search(connection: sqlite3.Connection, words: str, limit: int = -1, offset: int = 0) -> List[tuple]:
+    """
+    Searches apps by name, description and categories. The results are ranked by relevance (bm25) with exact name
+    matches first. When there is no index (or the terms are too short to be indexed) the LIKE query is used.
+    :param limit: max number of results (-1 means no limit)
+    :return: the apps rows (query.APP_ATTRS columns)
+    """
+    words = words.strip().lower()
+    terms = RE_TERMS.findall(words)
+
+    if not terms:
+        return []
+
+    tokenizer = get_tokenizer(connection)
+
+    if tokenizer and (tokenizer != 'trigram' or all(len(t) >= MIN_TRIGRAM_LENGTH for t in terms)):
+        cursor = connection.execute(query.SEARCH_APPS_INDEXED, (_gen_match(terms, tokenizer), words,
+                                                                limit if limit and limit > 0 else -1, offset))
+    else:
+        term = _escape_like(words)
+        cursor = connection.execute(query.SEARCH_APPS_BY_NAME_OR_DESCRIPTION, (term, term, words,
+                                                                               limit if limit and limit > 0 else -1, offset))
+
+    return cursor.fetchall()
@@ -2,7 +2,10 @@ APP_ATTRS = ('name', 'description', 'github', 'source', 'version', 'url_download
 RELEASE_ATTRS = ('version', 'url_download', 'published_at')
 
 
-SEARCH_APPS_BY_NAME_OR_DESCRIPTION = "SELECT {} FROM apps".format(','.join(APP_ATTRS)) + " WHERE lower(name) LIKE '%{}%' or lower(description) LIKE '%{}%'"
+SEARCH_APPS_BY_NAME_OR_DESCRIPTION = "SELECT {} FROM apps".format(','.join(APP_ATTRS)) + " WHERE lower(name) LIKE ? ESCAPE '\\' or lower(description) LIKE ? ESCAPE '\\' " \
+                                     "ORDER BY lower(name) = ? DESC, lower(name) LIMIT ? OFFSET ?"
+SEARCH_APPS_INDEXED = "SELECT {} FROM apps_search JOIN apps a ON a.rowid = apps_search.rowid".format(','.join('a.' + a for a in APP_ATTRS)) + \
+                      " WHERE apps_search MATCH ? ORDER BY lower(a.name) = ? DESC, bm25(apps_search, 10.0, 1.0, 2.0) LIMIT ? OFFSET ?"
 FIND_APP_ID_BY_NAME_AND_GITHUB = "SELECT id FROM apps WHERE lower(name) = '{}' and lower(github) = '{}'"
 FIND_APPS_BY_NAME = "SELECT name, github, version, url_download FROM apps WHERE lower(name) IN ({})"
 FIND_APPS_BY_NAME_ONLY_NAME = "SELECT name FROM apps WHERE lower(name) IN ({})"
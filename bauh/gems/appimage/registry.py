@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import sqlite3
+import traceback
+from threading import Lock
+from typing import Dict, Tuple, Optional, Iterable
+
+from bauh.gems.appimage import INSTALLATION_PATH, query
+
+
+def gen_key(name: str, github: Optional[str]) -> Tuple[str, str]:
+    return name.lower(), github.lower() if github else ''
+
+
+class InstalledRegistry:
+    """
+    Keeps the data of the installed applications ('<installation dir>/*/data.json') in memory, keyed by (name, github).
+    The files are only read again when the installation directory is modified (an application was installed or removed)
+    or the registry is invalidated (e.g: a data file was rewritten after an upgrade).
+    """
+
+    def __init__(self, logger: logging.Logger, installation_path: str = INSTALLATION_PATH):
+        self.logger = logger
+        self.installation_path = installation_path
+        self._apps = {}
+        self._mtime = None
+        self._lock = Lock()
+
+    def _read_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.installation_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+
+    def _scan(self) -> Dict[Tuple[str, str], dict]:
+        apps = {}
+
+        try:
+            entries = os.scandir(self.installation_path)
+        except FileNotFoundError:
+            return apps
+
+        with entries:
+            for entry in entries:
+                if entry.is_dir():
+                    try:
+                        with open(entry.path + '/data.json') as f:
+                            data = json.loads(f.read())
+                    except FileNotFoundError:
+                        continue
+                    except:
+                        self.logger.warning("Could not read the installed AppImage data from '{}'".format(entry.path))
+                        traceback.print_exc()
+                        continue
+
+                    if data.get('name'):
+                        apps[gen_key(data['name'], data.get('github'))] = data
+
+        return apps
+
+    def get_all(self) -> Dict[Tuple[str, str], dict]:
+        """
+        :return: a copy of the installed applications data by key
+        """
+        with self._lock:
+            mtime = self._read_mtime()
+
+            if self._mtime is None or mtime != self._mtime:
+                self._apps = self._scan() if mtime is not None else {}
+                self._mtime = mtime
+
+            return {k: dict(v) for k, v in self._apps.items()}
+
+    def invalidate(self):
+        with self._lock:
+            self._mtime = None
+
+
+def find_latest_releases(connection: sqlite3.Connection, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Tuple[str, str]]:
+    """
+    Reads the apps with the given names through a single query and joins the rows with the keys: by (name, github) or
+    only by name for keys without github (e.g: applications installed by an older version)
+    :return: the latest version and download URL by key
+    """
+    keys = set(keys)
+
+    if not keys:
+        return {}
+
+    names = sorted({k[0] for k in keys})
+    cursor = connection.execute(query.FIND_APPS_BY_NAME.format(','.join('?' for _ in names)), names)
+    releases = {}
+
+    for name, github, version, url_download in cursor.fetchall():
+        key = gen_key(name, github)
+
+        if key not in keys:
+            key = (key[0], '')
+
+            if key not in keys:
+                continue
+
+        if key not in releases:
+            releases[key] = (version, url_download)
+
+    return releases
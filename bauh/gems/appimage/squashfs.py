@@ -0,0 +1,353 @@
+import lzma
+import os
+import struct
+import zlib
+from typing import Optional, List, Tuple, BinaryIO
+
+try:
+    import zstandard
+except ImportError:  # optional: images compressed with zstd are extracted through '--appimage-extract'
+    zstandard = None
+
+SQUASHFS_MAGIC = b'hsqs'
+METADATA_SIZE = 8192
+FRAGMENT_ENTRIES_PER_BLOCK = METADATA_SIZE // 16
+NO_FRAGMENT = 0xFFFFFFFF
+
+GZIP, LZMA, LZO, XZ, LZ4, ZSTD = 1, 2, 3, 4, 5, 6
+
+BASIC_DIR, BASIC_FILE, BASIC_SYMLINK = 1, 2, 3
+EXTENDED_DIR, EXTENDED_FILE, EXTENDED_SYMLINK = 8, 9, 10
+
+FLAG_COMPRESSOR_OPTIONS = 0x0400
+MAX_SYMLINKS = 16
+
+SUPERBLOCK = struct.Struct('<4sIIIIHHHHHHQQQQQQQQ')
+INODE_HEADER = struct.Struct('<HHHHII')
+
+
+class SquashFSError(Exception):
+    pass
+
+
+class Inode:
+
+    def __init__(self, type_: int, number: int):
+        self.type = type_
+        self.number = number
+        self.dir_block = None
+        self.dir_offset = None
+        self.dir_size = None
+        self.blocks_start = None
+        self.file_size = None
+        self.fragment = NO_FRAGMENT
+        self.fragment_offset = None
+        self.block_sizes = None
+        self.target = None
+
+    def is_dir(self) -> bool:
+        return self.type in (BASIC_DIR, EXTENDED_DIR)
+
+    def is_file(self) -> bool:
+        return self.type in (BASIC_FILE, EXTENDED_FILE)
+
+    def is_symlink(self) -> bool:
+        return self.type in (BASIC_SYMLINK, EXTENDED_SYMLINK)
+
+
+def find_offset(file: BinaryIO) -> Optional[int]:
+    """
+    :return: the position of the squashfs image appended to an ELF executable (AppImage type 2). The image starts
+    right after the ELF section headers table.
+    """
+    file.seek(0)
+    ident = file.read(16)
+
+    if len(ident) < 16 or ident[:4] != b'\x7fELF':
+        return
+
+    endian = '<' if ident[5] == 1 else '>'
+
+    if ident[4] == 2:  # 64 bits
+        file.seek(0x28)
+        shoff = struct.unpack(endian + 'Q', file.read(8))[0]
+        file.seek(0x3A)
+    elif ident[4] == 1:
+        file.seek(0x20)
+        shoff = struct.unpack(endian + 'I', file.read(4))[0]
+        file.seek(0x2E)
+    else:
+        return
+
+    shentsize, shnum = struct.unpack(endian + 'HH', file.read(4))
+    offset = shoff + shentsize * shnum
+
+    file.seek(offset)
+    if file.read(4) == SQUASHFS_MAGIC:
+        return offset
+
+
+class SquashFSReader:
+    """
+    Reads files of a squashfs image (version 4) without extracting it. Only the metadata needed to reach the
+    requested paths is decompressed.
+    """
+
+    def __init__(self, file: BinaryIO, offset: int = 0):
+        self.file = file
+        self.offset = offset
+        self._metadata_cache = {}  # absolute position -> (uncompressed data, next block position)
+
+        file.seek(offset)
+        fields = SUPERBLOCK.unpack(file.read(SUPERBLOCK.size))
+
+        if fields[0] != SQUASHFS_MAGIC:
+            raise SquashFSError('Invalid squashfs magic at {}'.format(offset))
+
+        (_, self.inode_count, _, self.block_size, self.fragment_count, self.compression, _, self.flags, _,
+         major, _, self.root_inode, self.bytes_used, _, _, self.inode_table, self.directory_table,
+         self.fragment_table, _) = fields
+
+        if major != 4:
+            raise SquashFSError('Unsupported squashfs version: {}'.format(major))
+
+        if self.compression not in (GZIP, LZMA, XZ, ZSTD) or (self.compression == ZSTD and not zstandard):
+            raise SquashFSError('Unsupported squashfs compression: {}'.format(self.compression))
+
+        self._fragment_pointers = None
+
+    def _decompress(self, data: bytes) -> bytes:
+        if self.compression == GZIP:
+            return zlib.decompress(data)
+        elif self.compression == XZ:
+            return lzma.decompress(data, format=lzma.FORMAT_XZ)
+        elif self.compression == LZMA:
+            return lzma.decompress(data, format=lzma.FORMAT_ALONE)
+        else:
+            return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    def _read_at(self, position: int, size: int) -> bytes:
+        self.file.seek(self.offset + position)
+        data = self.file.read(size)
+
+        if len(data) != size:
+            raise SquashFSError('Unexpected end of image at {}'.format(position))
+
+        return data
+
+    def _read_metadata_block(self, position: int) -> Tuple[bytes, int]:
+        """
+        :return: the uncompressed block and the position of the next one
+        """
+        cached = self._metadata_cache.get(position)
+
+        if cached:
+            return cached
+
+        header = struct.unpack('<H', self._read_at(position, 2))[0]
+        size = header & 0x7FFF
+        data = self._read_at(position + 2, size)
+
+        if not header & 0x8000:
+            data = self._decompress(data)
+
+        block = (data, position + 2 + size)
+        self._metadata_cache[position] = block
+        return block
+
+    def _read_metadata(self, position: int, offset: int, size: int) -> Tuple[bytes, int, int]:
+        """
+        Reads bytes from a metadata table (they can span several blocks)
+        :return: the bytes and the position / offset right after them
+        """
+        data = b''
+
+        while True:
+            block, next_position = self._read_metadata_block(position)
+            chunk = block[offset:offset + size - len(data)]
+            data += chunk
+            offset += len(chunk)
+
+            if offset >= len(block):
+                position, offset = next_position, 0
+
+            if len(data) == size:
+                return data, position, offset
+
+            if not chunk and offset:
+                raise SquashFSError('Invalid metadata offset {}'.format(offset))
+
+    def _read_inode(self, reference: int) -> Inode:
+        position, offset = self.inode_table + (reference >> 16), reference & 0xFFFF
+        header, position, offset = self._read_metadata(position, offset, INODE_HEADER.size)
+        type_, _, _, _, _, number = INODE_HEADER.unpack(header)
+        inode = Inode(type_, number)
+
+        if type_ == BASIC_DIR:
+            data, _, _ = self._read_metadata(position, offset, 16)
+            inode.dir_block, _, inode.dir_size, inode.dir_offset, _ = struct.unpack('<IIHHI', data)
+        elif type_ == EXTENDED_DIR:
+            data, _, _ = self._read_metadata(position, offset, 24)
+            _, inode.dir_size, inode.dir_block, _, _, inode.dir_offset, _ = struct.unpack('<IIIIHHI', data)
+        elif type_ in (BASIC_FILE, EXTENDED_FILE):
+            if type_ == BASIC_FILE:
+                data, position, offset = self._read_metadata(position, offset, 16)
+                inode.blocks_start, inode.fragment, inode.fragment_offset, inode.file_size = struct.unpack('<IIII', data)
+            else:
+                data, position, offset = self._read_metadata(position, offset, 40)
+                inode.blocks_start, inode.file_size, _, _, inode.fragment, inode.fragment_offset, _ = struct.unpack('<QQQIIII', data)
+
+            blocks = inode.file_size // self.block_size
+
+            if inode.fragment == NO_FRAGMENT and inode.file_size % self.block_size:
+                blocks += 1
+
+            data, _, _ = self._read_metadata(position, offset, blocks * 4)
+            inode.block_sizes = struct.unpack('<{}I'.format(blocks), data)
+        elif type_ in (BASIC_SYMLINK, EXTENDED_SYMLINK):
+            data, position, offset = self._read_metadata(position, offset, 8)
+            target_size = struct.unpack('<II', data)[1]
+            inode.target = self._read_metadata(position, offset, target_size)[0].decode()
+
+        return inode
+
+    def list_dir(self, inode: Inode) -> List[Tuple[str, int]]:
+        """
+        :return: the directory entries names and inode references
+        """
+        if not inode.is_dir():
+            raise SquashFSError('Inode {} is not a directory'.format(inode.number))
+
+        size = inode.dir_size - 3  # '.' and '..' are not stored
+
+        if size <= 0:
+            return []
+
+        data, _, _ = self._read_metadata(self.directory_table + inode.dir_block, inode.dir_offset, size)
+        entries, idx = [], 0
+
+        while idx < len(data):
+            count, start, _ = struct.unpack_from('<III', data, idx)
+            idx += 12
+
+            for _ in range(count + 1):
+                offset, _, _, name_size = struct.unpack_from('<HhHH', data, idx)
+                idx += 8
+                name = data[idx:idx + name_size + 1].decode('utf-8', errors='replace')
+                idx += name_size + 1
+                entries.append((name, (start << 16) | offset))
+
+        return entries
+
+    def get_root(self) -> Inode:
+        return self._read_inode(self.root_inode)
+
+    def lookup(self, path: str) -> Optional[Inode]:
+        """
+        :return: the inode of the given path (symlinks are followed within the image) or None if it does not exist
+        """
+        root = self.get_root()
+        inode, parents, symlinks = root, [], 0
+        parts = [p for p in path.split('/') if p and p != '.']
+
+        while parts:
+            part = parts.pop(0)
+
+            if part == '..':
+                inode = parents.pop() if parents else root
+                continue
+
+            if not inode.is_dir():
+                return
+
+            reference = dict(self.list_dir(inode)).get(part)
+
+            if reference is None:
+                return
+
+            child = self._read_inode(reference)
+
+            if child.is_symlink():
+                symlinks += 1
+
+                if symlinks > MAX_SYMLINKS:
+                    raise SquashFSError('Too many symbolic links resolving {}'.format(path))
+
+                if child.target.startswith('/'):
+                    inode, parents = root, []
+
+                parts = [p for p in child.target.split('/') if p and p != '.'] + parts
+            else:
+                parents.append(inode)
+                inode = child
+
+        return inode
+
+    def _get_fragment(self, index: int) -> Tuple[int, int]:
+        if self._fragment_pointers is None:
+            tables = (self.fragment_count + FRAGMENT_ENTRIES_PER_BLOCK - 1) // FRAGMENT_ENTRIES_PER_BLOCK
+            self._fragment_pointers = struct.unpack('<{}Q'.format(tables), self._read_at(self.fragment_table, tables * 8))
+
+        position = self._fragment_pointers[index // FRAGMENT_ENTRIES_PER_BLOCK]
+        data, _, _ = self._read_metadata(position, (index % FRAGMENT_ENTRIES_PER_BLOCK) * 16, 16)
+        start, size, _ = struct.unpack('<QII', data)
+        return start, size
+
+    def _read_data_block(self, position: int, size_field: int) -> bytes:
+        size = size_field & 0xFFFFFF
+
+        if not size:  # sparse
+            return bytes(self.block_size)
+
+        data = self._read_at(position, size)
+        return data if size_field & (1 << 24) else self._decompress(data)
+
+    def read_file(self, inode: Inode, max_size: int = None) -> bytes:
+        if not inode.is_file():
+            raise SquashFSError('Inode {} is not a regular file'.format(inode.number))
+
+        if max_size is not None and inode.file_size > max_size:
+            raise SquashFSError('File bigger than {} bytes'.format(max_size))
+
+        chunks, position = [], inode.blocks_start
+        for size_field in inode.block_sizes:
+            chunks.append(self._read_data_block(position, size_field))
+            position += size_field & 0xFFFFFF
+
+        if inode.fragment != NO_FRAGMENT:
+            start, size_field = self._get_fragment(inode.fragment)
+            tail = inode.file_size % self.block_size
+            chunks.append(self._read_data_block(start, size_field)[inode.fragment_offset:inode.fragment_offset + tail])
+
+        return b''.join(chunks)[:inode.file_size]
+
+
+def extract_root_files(appimage_path: str, output_dir: str, patterns: Tuple[str, ...], max_size: int = 32 * 1024 * 1024) -> List[str]:
+    """
+    Extracts the files from the root directory of an AppImage (type 2) whose names end with one of the given patterns
+    (symlinks are resolved within the image)
+    :return: the names of the extracted files
+    :raises SquashFSError: if the image cannot be read (e.g: AppImage type 1 or an unsupported compression)
+    """
+    with open(appimage_path, 'rb') as f:
+        offset = find_offset(f)
+
+        if offset is None:
+            raise SquashFSError('No squashfs image found in {}'.format(appimage_path))
+
+        reader = SquashFSReader(f, offset)
+        extracted = []
+
+        for name, _ in reader.list_dir(reader.get_root()):
+            if name.lower().endswith(patterns):
+                inode = reader.lookup(name)
+
+                if inode and inode.is_file():
+                    os.makedirs(output_dir, exist_ok=True)
+
+                    with open('{}/{}'.format(output_dir, name), 'wb+') as out:
+                        out.write(reader.read_file(inode, max_size))
+
+                    extracted.append(name)
+
+        return extracted
@@ -1,34 +1,39 @@
 import glob
+import json
 import logging
 import os
+import shutil
 import tarfile
+import tempfile
 import time
 import traceback
 from pathlib import Path
 from threading import Thread
+from typing import Optional
 
 import requests
 
 from bauh.api.abstract.handler import TaskManager
 from bauh.api.http import HttpClient
 from bauh.commons import internet
-from bauh.gems.appimage import LOCAL_PATH, get_icon_path
+from bauh.gems.appimage import LOCAL_PATH, get_icon_path, index
 from bauh.view.util.translation import I18n
 
 
 class DatabaseUpdater(Thread):
     URL_DB = 'https://raw.githubusercontent.com/vinifmor/bauh-files/master/appimage/dbs.tar.gz'
-    COMPRESS_FILE_PATH = LOCAL_PATH + '/db.tar.gz'
 
-    def __init__(self, task_man: TaskManager, i18n: I18n, http_client: HttpClient, logger: logging.Logger, db_locks: dict, interval: int):
+    def __init__(self, task_man: TaskManager, i18n: I18n, http_client: HttpClient, logger: logging.Logger, interval: int,
+                 db_dir: str = LOCAL_PATH):
         super(DatabaseUpdater, self).__init__(daemon=True)
         self.http_client = http_client
         self.logger = logger
-        self.db_locks = db_locks
         self.sleep = interval
         self.i18n = i18n
         self.task_man = task_man
         self.task_id = 'appim_db'
+        self.db_dir = db_dir
+        self.state_file = db_dir + '/dbs.json'  # validators (ETag / Last-Modified) of the current database files
 
     def _finish_task(self):
         if self.task_man:
@@ -36,6 +41,81 @@ class DatabaseUpdater(Thread):
             self.task_man.finish_task(self.task_id)
             self.task_man = None
 
+    def _read_state(self) -> dict:
+        if os.path.exists(self.state_file) and glob.glob(self.db_dir + '/*.db'):
+            try:
+                with open(self.state_file) as f:
+                    return json.loads(f.read())
+            except:
+                self.logger.warning("Could not read the AppImage databases state file '{}'".format(self.state_file))
+                traceback.print_exc()
+
+        return {}
+
+    def _write_state(self, state: dict):
+        temp_file = self.state_file + '.tmp'
+        try:
+            with open(temp_file, 'w+') as f:
+                f.write(json.dumps(state))
+
+            os.replace(temp_file, self.state_file)
+        except:
+            self.logger.error("Could not write the AppImage databases state file '{}'".format(self.state_file))
+            traceback.print_exc()
+
+    def _gen_conditional_headers(self, state: dict) -> Optional[dict]:
+        headers = {}
+
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+        return headers if headers else None
+
+    def _extract(self, res: requests.Response, staging_dir: str) -> int:
+        """
+        Extracts the database files while the compressed file is downloaded
+        :return: the number of files extracted
+        """
+        res.raw.decode_content = True  # in case a transfer encoding is applied
+        extracted = 0
+
+        with tarfile.open(fileobj=res.raw, mode='r|gz') as tf:
+            for member in tf:
+                if member.isfile() and member.name.endswith('.db'):
+                    with open('{}/{}'.format(staging_dir, os.path.basename(member.name)), 'wb+') as f:
+                        shutil.copyfileobj(tf.extractfile(member), f)
+
+                    extracted += 1
+
+        return extracted
+
+    def _swap_databases(self, staging_dir: str):
+        """
+        Replaces the current database files by the staged ones through renames, so the readers always see complete
+        files (the connections already opened keep reading the previous version)
+        """
+        new_db_files = glob.glob(staging_dir + '/*.db')
+
+        staged_apps = staging_dir + '/apps.db'
+        if os.path.exists(staged_apps):
+            index.build(staged_apps, self.logger)
+
+        new_names = set()
+        for f in new_db_files:
+            name = os.path.basename(f)
+            os.replace(f, '{}/{}'.format(self.db_dir, name))
+            new_names.add(name)
+
+        for f in glob.glob(self.db_dir + '/*.db'):
+            if os.path.basename(f) not in new_names:
+                self.logger.info('Deleting old database file {}'.format(f))
+                os.remove(f)
+
+        self.logger.info('Database files updated')
+
     def download_databases(self):
         if self.task_man:
             self.task_man.register_task(self.task_id, self.i18n['appimage.task.db_update'], get_icon_path())
@@ -51,51 +131,41 @@ class DatabaseUpdater(Thread):
             return
 
         self.logger.info('Retrieving AppImage databases')
+        state = self._read_state()
 
         try:
-            res = self.http_client.get(self.URL_DB, session=False)
+            res = self.http_client.get(self.URL_DB, headers=self._gen_conditional_headers(state), session=False, stream=True)
         except Exception as e:
             self.logger.error("An error ocurred while downloading the AppImage database: {}".format(e.__class__.__name__))
             res = None
 
-        if res:
-            Path(LOCAL_PATH).mkdir(parents=True, exist_ok=True)
-
-            with open(self.COMPRESS_FILE_PATH, 'wb+') as f:
-                f.write(res.content)
-
-            self.logger.info("Database file saved at {}".format(self.COMPRESS_FILE_PATH))
-
-            old_db_files = glob.glob(LOCAL_PATH + '/*.db')
-
-            if old_db_files:
-                self.logger.info('Deleting old database files')
-                for f in old_db_files:
-                    self.db_locks[f].acquire()
-                    try:
-                        os.remove(f)
-                    finally:
-                        self.db_locks[f].release()
-
-                self.logger.info('Old database files deleted')
-
-            self.logger.info('Uncompressing {}'.format(self.COMPRESS_FILE_PATH))
+        if res is not None and res.status_code == 304:
+            self.logger.info('The AppImage databases have not changed')
+            res.close()
+        elif res:
+            Path(self.db_dir).mkdir(parents=True, exist_ok=True)
+            staging_dir = tempfile.mkdtemp(prefix='.staging', dir=self.db_dir)  # same filesystem: atomic renames
 
             try:
-                tf = tarfile.open(self.COMPRESS_FILE_PATH)
-                tf.extractall(LOCAL_PATH)
-                self.logger.info('Successfully uncompressed file {}'.format(self.COMPRESS_FILE_PATH))
+                self.logger.info('Downloading and uncompressing {}'.format(self.URL_DB))
+                extracted = self._extract(res, staging_dir)
+
+                if extracted:
+                    self.logger.info('{} database files uncompressed'.format(extracted))
+                    self._swap_databases(staging_dir)
+                    self._write_state({'etag': res.headers.get('ETag'), 'last_modified': res.headers.get('Last-Modified')})
+                else:
+                    self.logger.warning('No database file found in {}'.format(self.URL_DB))
             except:
-                self.logger.error('Could not extract file {}'.format(self.COMPRESS_FILE_PATH))
+                self.logger.error('Could not download and extract {}'.format(self.URL_DB))
                 traceback.print_exc()
             finally:
-                self.logger.info('Deleting {}'.format(self.COMPRESS_FILE_PATH))
-                os.remove(self.COMPRESS_FILE_PATH)
-                self.logger.info('Successfully removed {}'.format(self.COMPRESS_FILE_PATH))
-            self._finish_task()
+                res.close()
+                shutil.rmtree(staging_dir, ignore_errors=True)
         else:
             self.logger.warning('Could not download the database file {}'.format(self.URL_DB))
-            self._finish_task()
+
+        self._finish_task()
 
     def run(self):
         while True:
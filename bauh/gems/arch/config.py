@@ -11,5 +11,15 @@ def read_config(update_file: bool = False) -> dict:
                 "refresh_mirrors_startup": False,
                 "sync_databases_startup": True,
                 'mirrors_sort_limit': 5,
-                'repositories_mthread_download': True}
+                'repositories_mthread_download': True,
+                'build': {
+                    'performance_governor': True,
+                    'nice': 10,
+                    'ionice_class': 2,
+                    'ionice_level': 7,
+                    'cpu_quota': None,
+                    'memory_max': None,
+                    'tmpfs': True,
+                    'tmpfs_min_free_mem': 4096
+                }}
     return read(CONFIG_FILE, template, update_file=update_file)
@@ -23,20 +23,22 @@ from bauh.api.abstract.model import PackageUpdate, PackageHistory, SoftwarePacka
 from bauh.api.abstract.view import MessageType, FormComponent, InputOption, SingleSelectComponent, SelectViewType, \
     ViewComponent, PanelComponent, MultipleSelectComponent, TextInputComponent, TextComponent
 from bauh.api.constants import TEMP_DIR
-from bauh.commons import user, internet
+from bauh.commons import user, internet, capability
 from bauh.commons.category import CategoriesDownloader
 from bauh.commons.config import save_config
 from bauh.commons.html import bold
 from bauh.commons.system import SystemProcess, ProcessHandler, new_subprocess, run_cmd, SimpleProcess
 from bauh.gems.arch import BUILD_DIR, aur, pacman, makepkg, message, confirmation, disk, git, \
-    gpg, URL_CATEGORIES_FILE, CATEGORIES_FILE_PATH, CUSTOM_MAKEPKG_FILE, SUGGESTIONS_FILE, \
-    CONFIG_FILE, get_icon_path, database, mirrors, sorting, cpu_manager, ARCH_CACHE_PATH, UPDATES_IGNORED_FILE, \
+    URL_CATEGORIES_FILE, CATEGORIES_FILE_PATH, CUSTOM_MAKEPKG_FILE, SUGGESTIONS_FILE, \
+    CONFIG_FILE, get_icon_path, database, mirrors, sorting, ARCH_CACHE_PATH, UPDATES_IGNORED_FILE, \
     CONFIG_DIR
 from bauh.gems.arch.aur import AURClient
 from bauh.gems.arch.config import read_config
 from bauh.gems.arch.dependencies import DependenciesAnalyser
 from bauh.gems.arch.download import MultithreadedDownloadService, ArchDownloadException
 from bauh.gems.arch.exceptions import PackageNotFoundException
+from bauh.gems.arch.governor import BuildGovernor, BuildStats
+from bauh.gems.arch.keyring import UserKeyring, PacmanKeyring
 from bauh.gems.arch.mapper import ArchDataMapper
 from bauh.gems.arch.model import ArchPackage
 from bauh.gems.arch.output import TransactionStatusHandler
@@ -162,6 +164,9 @@ class ArchManager(SoftwareManager):
         self.arch_distro = context.distro == 'arch'
         self.categories = {}
         self.deps_analyser = DependenciesAnalyser(self.aur_client, self.i18n)
+        self.user_keyring = UserKeyring(context.logger)
+        self.pacman_keyring = PacmanKeyring(context.logger)
+        self.build_governor = BuildGovernor(context.logger)
         self.http_client = context.http_client
         self.custom_actions = {
             'sys_up': CustomSoftwareAction(i18_label_key='arch.custom_action.upgrade_system',
@@ -1413,20 +1418,24 @@ class ArchManager(SoftwareManager):
 
         # building main package
         context.watcher.change_substatus(self.i18n['arch.building.package'].format(bold(context.name)))
-        optimize = bool(context.config['optimize']) and cpu_manager.supports_performance_mode() and not cpu_manager.all_in_performance()
-
-        cpu_optimized = False
-        if optimize:
-            self.logger.info("Setting cpus to performance mode")
-            cpu_manager.set_mode('performance', context.root_password)
-            cpu_optimized = True
+        optimize = bool(context.config['optimize'])
+        governors = self.build_governor.switch_to_performance(context.config, context.root_password) if optimize else None
+        build_dir = self.build_governor.gen_build_dir(context.config)
+        stats = BuildStats(build_dir=build_dir, optimized=optimize)
 
+        pkgbuilt = False
         try:
-            pkgbuilt, output = makepkg.make(context.project_dir, optimize=optimize, handler=context.handler)
+            pkgbuilt, output = makepkg.make(context.project_dir, optimize=optimize, handler=context.handler,
+                                            wrapper=self.build_governor.gen_cmd_wrapper(context.config),
+                                            build_dir=build_dir, stats=stats)
         finally:
-            if cpu_optimized:
-                self.logger.info("Setting cpus to powersave mode")
-                cpu_manager.set_mode('powersave', context.root_password)
+            if governors:
+                self.build_governor.restore_governors(governors, context.root_password)
+
+            self.build_governor.register_stats(context.name, stats.finish(pkgbuilt))
+
+            if build_dir and os.path.exists(build_dir):
+                shutil.rmtree(build_dir, ignore_errors=True)
 
         self._update_progress(context, 65)
 
@@ -1523,15 +1532,18 @@ class ArchManager(SoftwareManager):
                                   handler=context.handler)
 
         if check_res:
-            if check_res.get('gpg_key'):
+            if check_res.get('gpg_keys'):
+                keys_str = ', '.join(check_res['gpg_keys'])
                 if context.watcher.request_confirmation(title=self.i18n['arch.install.aur.unknown_key.title'],
-                                                        body=self.i18n['arch.install.aur.unknown_key.body'].format(bold(context.name), bold(check_res['gpg_key']))):
-                    context.watcher.change_substatus(self.i18n['arch.aur.install.unknown_key.status'].format(bold(check_res['gpg_key'])))
-                    self.logger.info("Importing GPG key {}".format(check_res['gpg_key']))
-                    if not context.handler.handle(gpg.receive_key(check_res['gpg_key'])):
-                        self.logger.error("An error occurred while importing the GPG key {}".format(check_res['gpg_key']))
+                                                        body=self.i18n['arch.install.aur.unknown_key.body'].format(bold(context.name), bold(keys_str))):
+                    context.watcher.change_substatus(self.i18n['arch.aur.install.unknown_key.status'].format(bold(keys_str)))
+                    self.logger.info("Importing GPG keys {}".format(keys_str))
+                    not_received = self.user_keyring.receive(check_res['gpg_keys'], context.handler)
+
+                    if not_received:
+                        self.logger.error("An error occurred while importing the GPG keys {}".format(', '.join(not_received)))
                         context.watcher.show_message(title=self.i18n['error'].capitalize(),
-                                                     body=self.i18n['arch.aur.install.unknown_key.receive_error'].format(bold(check_res['gpg_key'])))
+                                                     body=self.i18n['arch.aur.install.unknown_key.receive_error'].format(bold(', '.join(not_received))))
 
                         return False
                 else:
@@ -1770,7 +1782,7 @@ class ArchManager(SoftwareManager):
 
         if srcinfo.get('validpgpkeys'):
             handler.watcher.print(self.i18n['arch.aur.install.verifying_pgp'])
-            keys_to_download = [key for key in srcinfo['validpgpkeys'] if not pacman.verify_pgp_key(key)]
+            keys_to_download = self.pacman_keyring.list_missing(srcinfo['validpgpkeys'])
 
             if keys_to_download:
                 keys_str = ''.join(
@@ -1779,23 +1791,24 @@ class ArchManager(SoftwareManager):
                                                            keys_str, self.i18n['ask.continue'])
 
                 if handler.watcher.request_confirmation(title=self.i18n['arch.aur.install.pgp.title'], body=msg_body):
-                    for key in keys_to_download:
-                        handler.watcher.change_substatus(self.i18n['arch.aur.install.pgp.substatus'].format(bold(key)))
-                        if not handler.handle(pacman.receive_key(key, root_password)):
-                            handler.watcher.show_message(title=self.i18n['error'],
-                                                         body=self.i18n['arch.aur.install.pgp.receive_fail'].format(
-                                                             bold(key)),
-                                                         type_=MessageType.ERROR)
-                            return False
-
-                        if not handler.handle(pacman.sign_key(key, root_password)):
-                            handler.watcher.show_message(title=self.i18n['error'],
-                                                         body=self.i18n['arch.aur.install.pgp.sign_fail'].format(
-                                                             bold(key)),
-                                                         type_=MessageType.ERROR)
-                            return False
-
-                        handler.watcher.change_substatus(self.i18n['arch.aur.install.pgp.success'])
+                    handler.watcher.change_substatus(self.i18n['arch.aur.install.pgp.substatus'].format(bold(', '.join(keys_to_download))))
+                    not_received = self.pacman_keyring.receive(keys_to_download, handler, root_password)
+
+                    if not_received:
+                        handler.watcher.show_message(title=self.i18n['error'],
+                                                     body=self.i18n['arch.aur.install.pgp.receive_fail'].format(
+                                                         bold(', '.join(not_received))),
+                                                     type_=MessageType.ERROR)
+                        return False
+
+                    if not self.pacman_keyring.sign(keys_to_download, handler, root_password):
+                        handler.watcher.show_message(title=self.i18n['error'],
+                                                     body=self.i18n['arch.aur.install.pgp.sign_fail'].format(
+                                                         bold(', '.join(keys_to_download))),
+                                                     type_=MessageType.ERROR)
+                        return False
+
+                    handler.watcher.change_substatus(self.i18n['arch.aur.install.pgp.success'])
                 else:
                     handler.watcher.print(self.i18n['action.cancelled'])
                     return False
@@ -1917,8 +1930,7 @@ class ArchManager(SoftwareManager):
         return res
 
     def _is_wget_available(self):
-        res = run_cmd('which wget')
-        return res and not res.strip().startswith('which ')
+        return capability.is_available('wget')
 
     def is_enabled(self) -> bool:
         return self.enabled
@@ -1933,11 +1945,7 @@ class ArchManager(SoftwareManager):
             return False
 
     def is_downgrade_enabled(self) -> bool:
-        try:
-            new_subprocess(['git', '--version'])
-            return True
-        except FileNotFoundError:
-            return False
+        return git.is_enabled()
 
     def cache_to_disk(self, pkg: ArchPackage, icon_bytes: bytes, only_icon: bool):
         pass
@@ -1,38 +1,60 @@
 import multiprocessing
 import os
+import re
 import traceback
+from typing import Dict
 
 from bauh.commons.system import new_root_subprocess
 
+GOVERNOR_FILE = '/sys/devices/system/cpu/cpu{}/cpufreq/scaling_governor'
+RE_GOVERNOR = re.compile(r'^[\w\-]+$')
+
 
 def supports_performance_mode():
-    return os.path.exists('/sys/devices/system/cpu/cpu0/cpufreq/scaling_governor')
+    return os.path.exists(GOVERNOR_FILE.format(0))
 
 
-def all_in_performance() -> bool:
+def read_governors() -> Dict[int, str]:
+    governors = {}
     for i in range(multiprocessing.cpu_count()):
-        with open('/sys/devices/system/cpu/cpu{}/cpufreq/scaling_governor'.format(i)) as f:
-            if f.read().strip() != 'performance':
-                return False
+        try:
+            with open(GOVERNOR_FILE.format(i)) as f:
+                governors[i] = f.read().strip()
+        except FileNotFoundError:
+            pass
 
-    return False
+    return governors
 
 
-def set_mode(mode: str, root_password: str):
-    new_gov_file = '/tmp/bauh_scaling_governor'
-    with open(new_gov_file, 'w+') as f:
-        f.write(mode)
+def all_in_performance() -> bool:
+    governors = read_governors()
+    return bool(governors) and all((g == 'performance' for g in governors.values()))
 
-    for i in range(multiprocessing.cpu_count()):
-        try:
-            gov_file = '/sys/devices/system/cpu/cpu{}/cpufreq/scaling_governor'.format(i)
-            replace = new_root_subprocess(['cp', new_gov_file, gov_file], root_password=root_password)
-            replace.wait()
-        except:
-            traceback.print_exc()
-
-        if os.path.exists(new_gov_file):
-            try:
-                os.remove(new_gov_file)
-            except:
-                traceback.print_exc()
+
+def set_governors(governors: Dict[int, str], root_password: str) -> bool:
+    """
+    Changes the governors of all given CPUs through a single privileged call
+    :param governors: cpu index -> governor
+    :return: if all governors were changed
+    """
+    script = ['res=0']
+    for cpu, governor in governors.items():
+        if governor and RE_GOVERNOR.match(governor):
+            script.append('echo {} > {} || res=1'.format(governor, GOVERNOR_FILE.format(int(cpu))))
+
+    if len(script) == 1:
+        return False
+
+    script.append('exit $res')
+
+    try:
+        proc = new_root_subprocess(['sh', '-c', '; '.join(script)], root_password=root_password)
+        proc.communicate()
+        return proc.returncode == 0
+    except:
+        traceback.print_exc()
+        return False
+
+
+def set_mode(mode: str, root_password: str) -> bool:
+    return set_governors({cpu: mode for cpu in read_governors()}, root_password)
@@ -1,15 +1,12 @@
 from datetime import datetime
 from typing import List
 
+from bauh.commons import capability
 from bauh.commons.system import new_subprocess
 
 
 def is_enabled() -> bool:
-    try:
-        new_subprocess(['git', '--version'])
-        return True
-    except FileNotFoundError:
-        return False
+    return capability.is_available('git')
 
 
 def list_commits(proj_dir:str) -> List[dict]:
@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import traceback
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional
+
+from bauh.api.constants import TEMP_DIR
+from bauh.gems.arch import cpu_manager, ARCH_CACHE_PATH
+
+BUILD_STATS_FILE = '{}/build_stats.json'.format(ARCH_CACHE_PATH)
+DISK_BUILD_DIR = '{}/makepkg'.format(ARCH_CACHE_PATH)
+MAX_STATS_PER_PACKAGE = 10
+RE_MEMORY_LIMIT = re.compile(r'^\d+[KMGT%]?$')
+
+
+def read_available_memory() -> Optional[int]:
+    """
+    :return: the available memory in bytes
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except:
+        traceback.print_exc()
+
+
+def is_tmpfs(path: str) -> bool:
+    try:
+        with open('/proc/mounts') as f:
+            mounts = [line.split()[1:3] for line in f if line.strip()]
+    except:
+        return False
+
+    real_path, mount_type = os.path.realpath(path), None
+    best_match = -1
+    for mount_point, fs_type in mounts:
+        if (real_path == mount_point or real_path.startswith(mount_point.rstrip('/') + '/')) and len(mount_point) > best_match:
+            best_match = len(mount_point)
+            mount_type = fs_type
+
+    return mount_type == 'tmpfs'
+
+
+class BuildStats:
+    """
+    Statistics of a build. The resource usage is the one of the makepkg process and its descendants ('usage' is filled
+    by makepkg.make), so other processes finished during the build are not counted.
+    """
+
+    def __init__(self, build_dir: Optional[str], optimized: bool):
+        self.build_dir = build_dir
+        self.optimized = optimized
+        self.usage = None
+        self._started = time.time()
+
+    def finish(self, success: bool) -> dict:
+        return {'date': int(self._started),
+                'success': success,
+                'optimized': self.optimized,
+                'build_dir': self.build_dir,
+                'tmpfs': bool(self.build_dir) and is_tmpfs(self.build_dir),
+                'wall_time': round(time.time() - self._started, 2),
+                'cpu_time': round(self.usage.ru_utime + self.usage.ru_stime, 2) if self.usage else None,
+                'max_rss': self.usage.ru_maxrss if self.usage else None}  # Kb
+
+
+class BuildGovernor:
+    """
+    Controls the resources available to makepkg builds: CPU governors (snapshot and restore), process priorities,
+    cgroup limits and the build directory. It also records resource statistics of every build.
+    """
+
+    def __init__(self, logger: logging.Logger, stats_file: str = BUILD_STATS_FILE):
+        self.logger = logger
+        self.stats_file = stats_file
+        self._stats_lock = Lock()
+
+    def switch_to_performance(self, arch_config: dict, root_password: str) -> Optional[Dict[int, str]]:
+        """
+        :return: the governors snapshot before switching or None if nothing was changed
+        """
+        if not arch_config['build']['performance_governor'] or not cpu_manager.supports_performance_mode():
+            return
+
+        governors = cpu_manager.read_governors()
+
+        if not governors or all((g == 'performance' for g in governors.values())):
+            return
+
+        self.logger.info("Setting cpus to performance mode")
+        if cpu_manager.set_governors({cpu: 'performance' for cpu in governors}, root_password):
+            return governors
+
+        self.logger.warning("Could not set all cpus to performance mode. Restoring the previous governors")
+        self.restore_governors(governors, root_password)
+
+    def restore_governors(self, governors: Dict[int, str], root_password: str):
+        if governors:
+            self.logger.info("Restoring cpus governors: {}".format(', '.join(sorted(set(governors.values())))))
+            if not cpu_manager.set_governors(governors, root_password):
+                self.logger.error("Could not restore the cpus governors")
+
+    def gen_cmd_wrapper(self, arch_config: dict) -> List[str]:
+        build_config = arch_config['build']
+        wrapper = []
+
+        limits = []
+        if build_config.get('cpu_quota') and int(build_config['cpu_quota']) > 0:
+            limits.append('CPUQuota={}%'.format(int(build_config['cpu_quota'])))
+
+        if build_config.get('memory_max'):
+            memory_max = str(build_config['memory_max']).strip().upper()
+
+            if RE_MEMORY_LIMIT.match(memory_max):
+                limits.append('MemoryMax={}'.format(memory_max))
+            else:
+                self.logger.warning("Invalid build 'memory_max' defined: {}".format(build_config['memory_max']))
+
+        if limits:
+            if shutil.which('systemd-run'):
+                wrapper.extend(('systemd-run', '--user', '--scope', '--quiet'))
+
+                for limit in limits:
+                    wrapper.extend(('-p', limit))
+            else:
+                self.logger.warning("'systemd-run' is not installed. The build limits will not be applied")
+
+        if build_config.get('nice') and shutil.which('nice'):
+            wrapper.extend(('nice', '-n', str(int(build_config['nice']))))
+
+        if build_config.get('ionice_class') is not None and shutil.which('ionice'):
+            wrapper.extend(('ionice', '-c', str(int(build_config['ionice_class']))))
+
+            if int(build_config['ionice_class']) == 2 and build_config.get('ionice_level') is not None:
+                wrapper.extend(('-n', str(int(build_config['ionice_level']))))
+
+        return wrapper
+
+    def gen_build_dir(self, arch_config: dict) -> Optional[str]:
+        """
+        :return: a tmpfs directory for makepkg's BUILDDIR if there is enough free memory. If there is not,
+        but the default build directory is on tmpfs, a disk directory is returned instead.
+        """
+        build_config = arch_config['build']
+
+        if not build_config['tmpfs']:
+            return
+
+        available_mem = read_available_memory()
+
+        if available_mem is None:
+            return
+
+        dir_name = 'build_{}'.format(int(time.time() * 1000))
+
+        if available_mem >= int(build_config['tmpfs_min_free_mem']) * 1024 * 1024:
+            for tmpfs, sub_dir in ((TEMP_DIR, 'makepkg'), ('/dev/shm', 'bauh_makepkg')):
+                if is_tmpfs(tmpfs):
+                    return '{}/{}/{}'.format(tmpfs, sub_dir, dir_name)
+        elif is_tmpfs(TEMP_DIR):
+            self.logger.info("Not enough free memory to build on tmpfs ({0:.2f} Gb)".format(available_mem / 1024 ** 3))
+            return '{}/{}'.format(DISK_BUILD_DIR, dir_name)
+
+    def register_stats(self, pkgname: str, stats: dict):
+        self.logger.info("Build stats ({}): {}".format(pkgname, stats))
+
+        with self._stats_lock:
+            all_stats = self.read_stats()
+            pkg_stats = all_stats.get(pkgname, [])
+            pkg_stats.append(stats)
+            all_stats[pkgname] = pkg_stats[-MAX_STATS_PER_PACKAGE:]
+
+            try:
+                Path(os.path.dirname(self.stats_file)).mkdir(parents=True, exist_ok=True)
+
+                with open(self.stats_file, 'w+') as f:
+                    f.write(json.dumps(all_stats))
+            except:
+                self.logger.error("Could not write the build stats to '{}'".format(self.stats_file))
+                traceback.print_exc()
+
+    def read_stats(self) -> Dict[str, List[dict]]:
+        if os.path.exists(self.stats_file):
+            try:
+                with open(self.stats_file) as f:
+                    return json.loads(f.read())
+            except:
+                self.logger.warning("Could not read the build stats from '{}'".format(self.stats_file))
+                traceback.print_exc()
+
+        return {}
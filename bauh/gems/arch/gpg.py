@@ -1,5 +1,18 @@
-from bauh.commons.system import SystemProcess, new_subprocess
+from typing import Iterable
 
+from bauh.commons.system import SystemProcess, new_subprocess, run_cmd
 
-def receive_key(key: str) -> SystemProcess:
-    return SystemProcess(new_subprocess(['gpg', '--recv-key', key]), check_error_output=False)
+
+def list_keys() -> str:
+    return run_cmd('gpg --list-keys --with-colons --with-subkey-fingerprint', print_error=False)
+
+
+def receive_keys(keys: Iterable[str], keyserver: str = None) -> SystemProcess:
+    cmd = ['gpg']
+
+    if keyserver:
+        cmd.extend(('--keyserver', keyserver))
+
+    cmd.append('--recv-keys')
+    cmd.extend(keys)
+    return SystemProcess(new_subprocess(cmd), check_error_output=False)
@@ -0,0 +1,195 @@
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from pathlib import Path
+from threading import Thread, Lock
+from typing import Set, Iterable, List, Optional, Tuple
+
+from bauh.commons.system import ProcessHandler, SystemProcess
+from bauh.gems.arch import pacman, gpg
+
+FALLBACK_KEYSERVERS = ('hkps://keyserver.ubuntu.com', 'hkps://keys.openpgp.org', 'hkp://pgp.mit.edu')
+RE_KEY_ID = re.compile(r'\b([0-9A-F]{16,40})\b')
+
+
+def normalize_key(key: str) -> str:
+    final_key = key.strip().replace(' ', '').upper()
+    return final_key[2:] if final_key.startswith('0X') else final_key
+
+
+class Keyring(ABC):
+    """
+    Keeps the keys available in a GPG keyring as a set so they are listed only once. The set is read again only
+    when the keyring files change. Missing keys are received in a single call and, if it fails, from all fallback
+    keyservers in parallel.
+    """
+
+    def __init__(self, home_dir: str, logger: logging.Logger, keyservers: Tuple[str] = FALLBACK_KEYSERVERS):
+        self.home_dir = home_dir
+        self.logger = logger
+        self.keyservers = keyservers
+        self._keys = None
+        self._state = None
+        self._lock = Lock()
+
+    @abstractmethod
+    def _list_keys(self) -> str:
+        """
+        :return: the output listing the keyring keys
+        """
+        pass
+
+    @abstractmethod
+    def _gen_receive_process(self, keys: List[str], root_password: Optional[str], keyserver: Optional[str] = None) -> SystemProcess:
+        """
+        :param keyserver: the keyserver to receive the keys from. If None, the default one is used.
+        :return: the process receiving the given keys
+        """
+        pass
+
+    def _read_state(self) -> tuple:
+        state = []
+        for path in (self.home_dir, '{}/pubring.gpg'.format(self.home_dir), '{}/pubring.kbx'.format(self.home_dir)):
+            try:
+                state.append(os.stat(path).st_mtime)
+            except OSError:
+                state.append(None)
+
+        return tuple(state)
+
+    @staticmethod
+    def _map_keys(output: str) -> Set[str]:
+        keys = set()
+
+        if output:
+            for fingerprint in RE_KEY_ID.findall(output.upper()):
+                keys.add(fingerprint)
+                keys.add(fingerprint[-16:])  # long id
+                keys.add(fingerprint[-8:])  # short id
+
+        return keys
+
+    def get_keys(self, refresh: bool = False) -> Set[str]:
+        with self._lock:
+            state = self._read_state()
+
+            if refresh or self._keys is None or state != self._state:
+                self._keys = self._map_keys(self._list_keys())
+                self._state = state
+                self.logger.info("{} keys mapped from the keyring '{}'".format(len(self._keys), self.home_dir))
+
+            return self._keys
+
+    def list_missing(self, keys: Iterable[str], refresh: bool = False) -> List[str]:
+        available = self.get_keys(refresh)
+        missing = []
+
+        for key in keys:
+            norm_key = normalize_key(key)
+
+            if norm_key and norm_key not in available and norm_key not in missing:
+                missing.append(norm_key)
+
+        return missing
+
+    def receive(self, keys: Iterable[str], handler: ProcessHandler, root_password: Optional[str] = None) -> List[str]:
+        """
+        :return: the keys that could not be received
+        """
+        to_receive = self.list_missing(keys)
+
+        if not to_receive:
+            return to_receive
+
+        proc = self._gen_receive_process(to_receive, root_password)
+        handler.handle(proc)
+        proc.wait()
+        missing = self.list_missing(to_receive, refresh=True)
+
+        if missing and self.keyservers:
+            self._receive_from_keyservers(missing, handler, root_password)
+            missing = self.list_missing(missing, refresh=True)
+
+        if missing:
+            self.logger.warning("Could not receive the keys: {}".format(', '.join(missing)))
+
+        return missing
+
+    def _receive_from_keyservers(self, keys: List[str], handler: ProcessHandler, root_password: Optional[str]):
+        self.logger.info("Trying to receive keys {} from the fallback keyservers".format(', '.join(keys)))
+        outputs = {}
+
+        def _receive_from(keyserver: str):
+            try:
+                proc = self._gen_receive_process(keys, root_password, keyserver)
+                stdout, stderr = proc.subproc.communicate()
+                outputs[keyserver] = '\n'.join((o.decode() for o in (stdout, stderr) if o))
+            except:
+                self.logger.error("Could not receive the keys from '{}'".format(keyserver))
+
+        threads = [Thread(target=_receive_from, args=(server,), daemon=True) for server in self.keyservers]
+
+        for t in threads:
+            t.start()
+
+        for t in threads:
+            t.join()
+
+        if handler.watcher:
+            for server, output in outputs.items():
+                handler.watcher.print('[{}] {}'.format(server, output.strip()))
+
+
+class UserKeyring(Keyring):
+    """
+    The current user's GPG keyring used by makepkg to validate the sources signatures
+    """
+
+    def __init__(self, logger: logging.Logger):
+        super(UserKeyring, self).__init__(home_dir=os.getenv('GNUPGHOME', '{}/.gnupg'.format(str(Path.home()))),
+                                          logger=logger)
+
+    def _list_keys(self) -> str:
+        return gpg.list_keys()
+
+    def _gen_receive_process(self, keys: List[str], root_password: Optional[str], keyserver: Optional[str] = None) -> SystemProcess:
+        return gpg.receive_keys(keys, keyserver=keyserver)
+
+
+class PacmanKeyring(Keyring):
+    """
+    pacman's keyring. It also keeps the keys already locally signed so they are not signed again.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        super(PacmanKeyring, self).__init__(home_dir='/etc/pacman.d/gnupg', logger=logger)
+        self._signed = set()
+
+    def _list_keys(self) -> str:
+        return pacman.list_pgp_keys()
+
+    def _gen_receive_process(self, keys: List[str], root_password: Optional[str], keyserver: Optional[str] = None) -> SystemProcess:
+        return pacman.receive_keys(keys, root_password, keyserver=keyserver)
+
+    def sign(self, keys: Iterable[str], handler: ProcessHandler, root_password: str) -> bool:
+        to_sign = []
+        for key in keys:
+            norm_key = normalize_key(key)
+
+            if norm_key not in self._signed and norm_key not in to_sign:
+                to_sign.append(norm_key)
+
+        if not to_sign:
+            return True
+
+        proc = pacman.sign_keys(to_sign, root_password)
+        handler.handle(proc)
+        proc.wait()
+
+        if proc.subproc.returncode == 0:
+            self._signed.update(to_sign)
+            return True
+
+        self.logger.error("Could not sign the keys: {}".format(', '.join(to_sign)))
+        return False
@@ -1,9 +1,10 @@
 import os
 import re
-from typing import Tuple
+from typing import Tuple, List
 
 from bauh.commons.system import SimpleProcess, ProcessHandler, run_cmd
 from bauh.gems.arch import CUSTOM_MAKEPKG_FILE
+from bauh.gems.arch.governor import BuildStats
 
 RE_DEPS_PATTERN = re.compile(r'\n?\s+->\s(.+)\n')
 RE_UNKNOWN_GPG_KEY = re.compile(r'\(unknown public key (\w+)\)')
@@ -36,7 +37,7 @@ def check(pkgdir: str, optimize: bool, missing_deps: bool, handler: ProcessHandl
     gpg_keys = RE_UNKNOWN_GPG_KEY.findall(output)
 
     if gpg_keys:
-        res['gpg_key'] = gpg_keys[0]
+        res['gpg_keys'] = list(dict.fromkeys(gpg_keys))
 
     if 'One or more files did not pass the validity check' in output:
         res['validity_check'] = True
@@ -44,8 +45,13 @@ def check(pkgdir: str, optimize: bool, missing_deps: bool, handler: ProcessHandl
     return res
 
 
-def make(pkgdir: str, optimize: bool, handler: ProcessHandler) -> Tuple[bool, str]:
-    cmd = ['makepkg', '-ALcsmf', '--skipchecksums']
+def make(pkgdir: str, optimize: bool, handler: ProcessHandler, wrapper: List[str] = None, build_dir: str = None,
+         stats: BuildStats = None) -> Tuple[bool, str]:
+    """
+    :param stats: receives the resource usage of the build
+    """
+    cmd = [*wrapper] if wrapper else []
+    cmd.extend(('makepkg', '-ALcsmf', '--skipchecksums'))
 
     if optimize:
         if os.path.exists(CUSTOM_MAKEPKG_FILE):
@@ -54,4 +60,13 @@ def make(pkgdir: str, optimize: bool, handler: ProcessHandler) -> Tuple[bool, st
         else:
             handler.watcher.print('Custom optimized makepkg.conf ( {} ) not found'.format(CUSTOM_MAKEPKG_FILE))
 
-    return handler.handle_simple(SimpleProcess(cmd, cwd=pkgdir))
+    if build_dir:
+        handler.watcher.print('Using build directory -> {}'.format(build_dir))
+
+    proc = SimpleProcess(cmd, cwd=pkgdir, extra_env={'BUILDDIR': build_dir} if build_dir else None)
+    res = handler.handle_simple(proc)
+
+    if stats:
+        stats.usage = proc.rusage
+
+    return res
@@ -3,7 +3,7 @@ import re
 from threading import Thread
 from typing import List, Set, Tuple, Dict, Iterable
 
-from bauh.commons import system
+from bauh.commons import system, capability
 from bauh.commons.system import run_cmd, new_subprocess, new_root_subprocess, SystemProcess, SimpleProcess, \
     ProcessHandler
 from bauh.commons.util import size_to_byte
@@ -22,8 +22,7 @@ RE_AVAILABLE_MIRRORS = re.compile(r'.+\s+OK\s+.+\s+(\d+:\d+)\s+.+(http.+)')
 
 
 def is_available() -> bool:
-    res = run_cmd('which pacman', print_error=False)
-    return res and not res.strip().startswith('which ')
+    return capability.is_available('pacman')
 
 
 def get_repositories(pkgs: Iterable[str]) -> dict:
@@ -202,24 +201,23 @@ def list_installed_files(pkgname: str) -> List[str]:
     return f_paths
 
 
-def verify_pgp_key(key: str) -> bool:
-    list_key = new_subprocess(['pacman-key', '-l']).stdout
+def list_pgp_keys() -> str:
+    return run_cmd('pacman-key -l', print_error=False)
 
-    for out in new_subprocess(['grep', " " + key], stdin=list_key).stdout:
-        if out:
-            line = out.decode().strip()
-            if line and key in line:
-                return True
 
-    return False
+def receive_keys(keys: Iterable[str], root_password: str, keyserver: str = None) -> SystemProcess:
+    cmd = ['pacman-key']
 
+    if keyserver:
+        cmd.extend(('--keyserver', keyserver))
 
-def receive_key(key: str, root_password: str) -> SystemProcess:
-    return SystemProcess(new_root_subprocess(['pacman-key', '-r', key], root_password=root_password), check_error_output=False)
+    cmd.append('-r')
+    cmd.extend(keys)
+    return SystemProcess(new_root_subprocess(cmd, root_password=root_password), check_error_output=False)
 
 
-def sign_key(key: str, root_password: str) -> SystemProcess:
-    return SystemProcess(new_root_subprocess(['pacman-key', '--lsign-key', key], root_password=root_password), check_error_output=False)
+def sign_keys(keys: Iterable[str], root_password: str) -> SystemProcess:
+    return SystemProcess(new_root_subprocess(['pacman-key', '--lsign-key', *keys], root_password=root_password), check_error_output=False)
 
 
 def list_ignored_packages(config_path: str = '/etc/pacman.conf') -> Set[str]:
@@ -469,8 +467,7 @@ def get_databases() -> Set[str]:
 
 
 def can_refresh_mirrors() -> bool:
-    output = run_cmd('which pacman-mirrors', print_error=False)
-    return True if output else False
+    return capability.is_available('pacman-mirrors')
 
 
 def refresh_mirrors(root_password: str) -> SimpleProcess:
@@ -503,7 +500,7 @@ def get_current_mirror_countries() -> List[str]:
 
 
 def is_mirrors_available() -> bool:
-    return bool(run_cmd('which pacman-mirrors', print_error=False))
+    return capability.is_available('pacman-mirrors')
 
 
 def map_update_sizes(pkgs: List[str]) -> Dict[str, int]:  # bytes:
@@ -11,8 +11,9 @@ import requests
 
 from bauh.api.abstract.context import ApplicationContext
 from bauh.api.abstract.handler import TaskManager
+from bauh.commons import capability
 from bauh.commons.html import bold
-from bauh.commons.system import run_cmd, new_root_subprocess, ProcessHandler
+from bauh.commons.system import new_root_subprocess, ProcessHandler
 from bauh.gems.arch import pacman, disk, CUSTOM_MAKEPKG_FILE, CONFIG_DIR, BUILD_DIR, \
     AUR_INDEX_FILE, get_icon_path, database, mirrors, ARCH_CACHE_PATH
 from bauh.gems.arch.aur import URL_INDEX
@@ -160,7 +161,7 @@ class ArchCompilationOptimizer(Thread):
         self.optimizations = bool(arch_config['optimize'])
 
     def _is_ccache_installed(self) -> bool:
-        return bool(run_cmd('which ccache', print_error=False))
+        return capability.is_available('ccache')
 
     def _update_progress(self, progress: float, substatus: str = None):
         if self.task_man:
@@ -1,9 +1,13 @@
 import os
+from pathlib import Path
 
-from bauh.api.constants import CONFIG_PATH
+from bauh.api.constants import CONFIG_PATH, CACHE_PATH
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 SUGGESTIONS_FILE = 'https://raw.githubusercontent.com/vinifmor/bauh-files/master/flatpak/suggestions.txt'
 CONFIG_FILE = '{}/flatpak.yml'.format(CONFIG_PATH)
 CONFIG_DIR = '{}/flatpak'.format(CONFIG_PATH)
 UPDATES_IGNORED_FILE = '{}/updates_ignored.txt'.format(CONFIG_DIR)
+INSTALLATION_DIRS = {'system': '/var/lib/flatpak', 'user': '{}/.local/share/flatpak'.format(str(Path.home()))}
+CATALOG_DIR = '{}/flatpak/catalog'.format(CACHE_PATH)
+HISTORY_DIR = '{}/flatpak/history'.format(CACHE_PATH)
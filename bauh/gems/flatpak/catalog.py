@@ -0,0 +1,277 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import platform
+import time
+import traceback
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from bauh.gems.flatpak import INSTALLATION_DIRS, CATALOG_DIR
+
+APP_COMPONENT_TYPES = {'desktop', 'desktop-application', 'console-application', 'web-application'}
+ARCH_ALIASES = {'i686': 'i386', 'i586': 'i386', 'armv7l': 'arm', 'arm64': 'aarch64'}
+ICON_SIZES = ('128x128', '64x64')
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+# entry fields
+ID, NAME, SUMMARY, CATEGORIES, ICON, VERSION, BRANCH = range(7)
+
+
+def get_default_arch() -> str:
+    machine = platform.machine()
+    return ARCH_ALIASES.get(machine, machine)
+
+
+def read_appstream_checksum(active_dir: str) -> Optional[str]:
+    """
+    :return: the appstream commit the 'active' link points to. If it is not a link, the appstream file
+    modification time and size are used.
+    """
+    if os.path.islink(active_dir):
+        return os.path.basename(os.readlink(active_dir))
+
+    for file_name in ('appstream.xml.gz', 'appstream.xml'):
+        file_path = '{}/{}'.format(active_dir, file_name)
+
+        if os.path.exists(file_path):
+            stat = os.stat(file_path)
+            return '{}:{}'.format(stat.st_mtime, stat.st_size)
+
+
+def parse_appstream(active_dir: str) -> List[list]:
+    """
+    Streams the appstream file components and maps the applications as compact entries
+    """
+    file_path = '{}/appstream.xml.gz'.format(active_dir)
+
+    if os.path.exists(file_path):
+        file = gzip.open(file_path)
+    else:
+        file_path = '{}/appstream.xml'.format(active_dir)
+
+        if not os.path.exists(file_path):
+            return []
+
+        file = open(file_path, 'rb')
+
+    entries = []
+    try:
+        for _, elem in ElementTree.iterparse(file, events=('end',)):
+            if elem.tag != 'component':
+                continue
+
+            if elem.get('type') in APP_COMPONENT_TYPES:
+                entry = _map_component(elem, active_dir)
+
+                if entry:
+                    entries.append(entry)
+
+            elem.clear()
+    finally:
+        file.close()
+
+    return entries
+
+
+def _map_component(component: ElementTree.Element, active_dir: str) -> Optional[list]:
+    id_ = component.findtext('id')
+
+    if not id_:
+        return
+
+    id_ = id_.strip()
+    if id_.endswith('.desktop'):
+        id_ = id_[0:-8]
+
+    name, summary = None, None
+    for field in component:
+        if field.tag in ('name', 'summary') and not field.get(XML_LANG):
+            if field.tag == 'name':
+                name = field.text.strip() if field.text else None
+            else:
+                summary = field.text.strip() if field.text else None
+
+    categories = [c.text.strip() for c in component.iterfind('categories/category') if c.text]
+
+    icon = None
+    cached_icons = {}
+    for icon_elem in component.iterfind('icon'):
+        if icon_elem.text:
+            if icon_elem.get('type') == 'cached':
+                cached_icons['{}x{}'.format(icon_elem.get('width', '64'), icon_elem.get('height', '64'))] = icon_elem.text.strip()
+            elif icon_elem.get('type') == 'remote' and not icon:
+                icon = icon_elem.text.strip()
+
+    for size in ICON_SIZES:
+        if size in cached_icons:
+            icon_path = '{}/icons/{}/{}'.format(active_dir, size, cached_icons[size])
+
+            if os.path.exists(icon_path):
+                icon = 'file://{}'.format(icon_path)
+                break
+
+    release = component.find('releases/release')
+    version = release.get('version') if release is not None else None
+
+    branch = None
+    bundle = component.findtext('bundle')
+    if bundle:
+        bundle_split = bundle.strip().split('/')
+
+        if len(bundle_split) == 4:
+            branch = bundle_split[3]
+
+    return [id_, name, summary, categories, icon, version, branch]
+
+
+class FlatpakCatalog:
+    """
+    Applications catalog built from the appstream data Flatpak keeps on disk for each remote. Every remote catalog
+    is stored as a compact JSON and only rebuilt when the remote appstream checksum changes.
+    """
+
+    def __init__(self, logger: logging.Logger, catalog_dir: str = CATALOG_DIR, arch: str = None,
+                 installation_dirs: Dict[str, str] = INSTALLATION_DIRS, check_interval: int = 5):
+        self.logger = logger
+        self.catalog_dir = catalog_dir
+        self.arch = arch if arch else get_default_arch()
+        self.installation_dirs = installation_dirs
+        self.check_interval = check_interval
+        self._remotes = {}  # (installation, remote) -> (checksum, {id: entry})
+        self._last_check = None
+        self._lock = Lock()
+
+    def _list_active_dirs(self) -> List[Tuple[str, str, str]]:
+        dirs = []
+        for installation, installation_dir in self.installation_dirs.items():
+            for active_dir in glob.glob('{}/appstream/*/{}/active'.format(installation_dir, self.arch)):
+                remote = active_dir.split('/')[-3]
+                dirs.append((installation, remote, active_dir))
+
+        return dirs
+
+    def _load_remote(self, installation: str, remote: str, active_dir: str) -> Optional[Tuple[str, Dict[str, list]]]:
+        checksum = read_appstream_checksum(active_dir)
+
+        if not checksum:
+            return
+
+        current = self._remotes.get((installation, remote))
+
+        if current and current[0] == checksum:
+            return current
+
+        file_path = '{}/{}_{}_{}.json'.format(self.catalog_dir, installation, remote, self.arch)
+
+        if os.path.exists(file_path):
+            try:
+                with open(file_path) as f:
+                    stored = json.loads(f.read())
+
+                if stored.get('checksum') == checksum:
+                    return checksum, {e[ID]: e for e in stored['apps']}
+            except:
+                self.logger.warning("Could not read the Flatpak catalog file '{}'".format(file_path))
+                traceback.print_exc()
+
+        ti = time.time()
+        try:
+            entries = parse_appstream(active_dir)
+        except:
+            self.logger.error("Could not parse the appstream data from '{}'".format(active_dir))
+            traceback.print_exc()
+            return
+
+        self.logger.info("Flatpak catalog ({} / {}) rebuilt with {} apps in {:.2f} seconds".format(installation, remote, len(entries), time.time() - ti))
+
+        try:
+            Path(self.catalog_dir).mkdir(parents=True, exist_ok=True)
+
+            with open(file_path, 'w+') as f:
+                f.write(json.dumps({'checksum': checksum, 'apps': entries}, separators=(',', ':')))
+        except:
+            self.logger.error("Could not write the Flatpak catalog file '{}'".format(file_path))
+            traceback.print_exc()
+
+        return checksum, {e[ID]: e for e in entries}
+
+    def refresh(self) -> Dict[Tuple[str, str], Dict[str, list]]:
+        """
+        Loads the remotes catalogs that were modified since the last call
+        :return: (installation, remote) -> {app id: entry}
+        """
+        with self._lock:
+            if self._last_check is not None and time.time() - self._last_check < self.check_interval:
+                return {k: v[1] for k, v in self._remotes.items()}
+
+            remotes = {}
+            for installation, remote, active_dir in self._list_active_dirs():
+                loaded = self._load_remote(installation, remote, active_dir)
+
+                if loaded:
+                    remotes[(installation, remote)] = loaded
+
+            self._remotes = remotes
+            self._last_check = time.time()
+            return {k: v[1] for k, v in remotes.items()}
+
+    def is_available(self, installation: str = None) -> bool:
+        return any((apps for (inst, _), apps in self.refresh().items() if not installation or inst == installation))
+
+    def get(self, app_id: str, origin: str = None, installation: str = None) -> Optional[list]:
+        found = self.find(app_id, origin=origin, installation=installation)
+        return found[1] if found else None
+
+    def find(self, app_id: str, origin: str = None, installation: str = None) -> Optional[Tuple[str, list]]:
+        """
+        :return: the remote and the entry of the application
+        """
+        for (inst, remote), apps in self.refresh().items():
+            if (not origin or remote == origin) and (not installation or inst == installation):
+                entry = apps.get(app_id)
+
+                if entry:
+                    return remote, entry
+
+    def search(self, words: str, installation: str = None, limit: int = -1) -> List[Tuple[str, list]]:
+        """
+        :return: a ranked list of (remote, entry) matching all the given words
+        """
+        terms = [w for w in words.lower().strip().split(' ') if w]
+
+        if not terms:
+            return []
+
+        full_term = ' '.join(terms)
+        found = []
+        for (inst, remote), apps in self.refresh().items():
+            if installation and inst != installation:
+                continue
+
+            for entry in apps.values():
+                id_, name = entry[ID].lower(), (entry[NAME] or '').lower()
+                text = ' '.join((id_, name, (entry[SUMMARY] or '').lower()))
+
+                if all((t in text for t in terms)):
+                    if full_term == name or full_term == id_ or id_.endswith('.' + full_term):
+                        rank = 0
+                    elif name.startswith(full_term):
+                        rank = 1
+                    elif full_term in name or full_term in id_:
+                        rank = 2
+                    else:
+                        rank = 3
+
+                    found.append((rank, name, remote, entry))
+
+        found.sort(key=lambda f: (f[0], f[1]))
+
+        if limit > 0:
+            found = found[0:limit]
+
+        return [(f[2], f[3]) for f in found]
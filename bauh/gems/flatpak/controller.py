@@ -1,10 +1,11 @@
 import os
+import time
 import traceback
 from datetime import datetime
 from math import floor
 from pathlib import Path
 from threading import Thread
-from typing import List, Set, Type, Tuple
+from typing import List, Set, Type, Tuple, Optional, Dict
 
 from bauh.api.abstract.controller import SearchResult, SoftwareManager, ApplicationContext, UpgradeRequirements, \
     UpgradeRequirement
@@ -18,13 +19,17 @@ from bauh.commons import user
 from bauh.commons.config import save_config
 from bauh.commons.html import strip_html, bold
 from bauh.commons.system import SystemProcess, ProcessHandler
-from bauh.gems.flatpak import flatpak, SUGGESTIONS_FILE, CONFIG_FILE, UPDATES_IGNORED_FILE, CONFIG_DIR
+from bauh.gems.flatpak import flatpak, catalog, transaction, SUGGESTIONS_FILE, CONFIG_FILE, UPDATES_IGNORED_FILE, CONFIG_DIR
+from bauh.gems.flatpak.catalog import FlatpakCatalog
 from bauh.gems.flatpak.config import read_config
 from bauh.gems.flatpak.constants import FLATHUB_API_URL
+from bauh.gems.flatpak.history import FlatpakHistoryReader
 from bauh.gems.flatpak.model import FlatpakApplication
+from bauh.gems.flatpak.updates import FlatpakUpdatesReader
 from bauh.gems.flatpak.worker import FlatpakAsyncDataLoader, FlatpakUpdateLoader
 
 DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.000Z'
+SEARCH_TASKS_GROUP = 'flatpak.search'
 
 
 class FlatpakManager(SoftwareManager):
@@ -39,11 +44,15 @@ class FlatpakManager(SoftwareManager):
         self.http_client = context.http_client
         self.suggestions_cache = context.cache_factory.new()
         self.logger = context.logger
+        self.updates_reader = FlatpakUpdatesReader(context.logger)
+        self.catalog = FlatpakCatalog(context.logger)
+        self.history_reader = FlatpakHistoryReader(context.logger)
 
     def get_managed_types(self) -> Set["type"]:
         return {FlatpakApplication}
 
-    def _map_to_model(self, app_json: dict, installed: bool, disk_loader: DiskCacheLoader, internet: bool = True) -> FlatpakApplication:
+    def _map_to_model(self, app_json: dict, installed: bool, disk_loader: DiskCacheLoader, internet: bool = True,
+                      priority: int = 0, group: str = None) -> FlatpakApplication:
 
         app = FlatpakApplication(**app_json, i18n=self.i18n)
         app.installed = installed
@@ -56,9 +65,14 @@ class FlatpakManager(SoftwareManager):
                 if disk_loader:
                     disk_loader.fill(app)  # preloading cached disk data
 
-                if internet:
-                    FlatpakAsyncDataLoader(app=app, api_cache=self.api_cache, manager=self,
-                                           context=self.context, category_cache=self.category_cache).start()
+                if self._fill_from_catalog(app):
+                    app.status = PackageStatus.READY
+                elif internet:
+                    app.status = PackageStatus.LOADING_DATA
+                    loader = FlatpakAsyncDataLoader(app=app, api_cache=self.api_cache, manager=self,
+                                                    context=self.context, category_cache=self.category_cache)
+                    self.context.metadata_executor.submit(key='flatpak:{}'.format(app.id), fn=loader.load, target=app,
+                                                          priority=priority, group=group, on_cancel=loader.cancel)
 
         else:
             app.fill_cached_data(api_data)
@@ -66,6 +80,63 @@ class FlatpakManager(SoftwareManager):
 
         return app
 
+    def _fill_from_catalog(self, app: FlatpakApplication) -> bool:
+        entry = self.catalog.get(app.id, origin=app.origin)
+
+        if not entry:
+            return False
+
+        if not app.name:
+            app.name = entry[catalog.NAME]
+
+        if entry[catalog.SUMMARY]:
+            app.description = entry[catalog.SUMMARY]
+
+        if entry[catalog.ICON]:
+            app.icon_url = entry[catalog.ICON]
+
+        app.latest_version = entry[catalog.VERSION] or app.version
+
+        if app.latest_version and (not app.version or not app.update or not app.installed):
+            app.version = app.latest_version
+
+        if entry[catalog.CATEGORIES]:
+            categories = []
+            for c in entry[catalog.CATEGORIES]:
+                cached = self.category_cache.get(c)
+
+                if not cached:
+                    cached = FlatpakAsyncDataLoader.format_category(c)
+                    self.category_cache.add_non_existing(c, cached)
+
+                categories.append(cached)
+
+            app.categories = categories
+
+        self.api_cache.add(app.id, app.get_data_to_cache())
+        return True
+
+    def _map_catalog_entry(self, remote: str, entry: list) -> dict:
+        return {'name': entry[catalog.NAME] or entry[catalog.ID].split('.')[-1],
+                'description': entry[catalog.SUMMARY],
+                'id': entry[catalog.ID],
+                'version': entry[catalog.VERSION],
+                'latest_version': entry[catalog.VERSION],
+                'branch': entry[catalog.BRANCH] or 'stable',
+                'origin': remote,
+                'runtime': False,
+                'arch': self.catalog.arch,
+                'ref': None}
+
+    def _search_catalog(self, words: str, installation: str) -> Optional[List[dict]]:
+        if not self.catalog.is_available(installation):
+            return
+
+        ti = time.time()
+        found = [self._map_catalog_entry(remote, entry) for remote, entry in self.catalog.search(words, installation)]
+        self.logger.info("Flatpak catalog search took {0:.4f} seconds".format(time.time() - ti))
+        return found
+
     def _get_search_remote(self) -> str:
         remotes = flatpak.list_remotes()
 
@@ -79,14 +150,21 @@ class FlatpakManager(SoftwareManager):
 
         return remote_level
 
+    def is_substring_search(self) -> bool:
+        return self.catalog.is_available()  # the fallback search (flatpak search) is not
+
     def search(self, words: str, disk_loader: DiskCacheLoader, limit: int = -1, is_url: bool = False) -> SearchResult:
         if is_url:
             return SearchResult([], [], 0)
 
+        self.context.metadata_executor.cancel_group(SEARCH_TASKS_GROUP)  # the previous search was superseded
         remote_level = self._get_search_remote()
 
         res = SearchResult([], [], 0)
-        apps_found = flatpak.search(flatpak.get_version(), words, remote_level)
+        apps_found = self._search_catalog(words, remote_level)
+
+        if apps_found is None:
+            apps_found = flatpak.search(flatpak.get_version(), words, remote_level)
 
         if apps_found:
             already_read = set()
@@ -102,13 +180,14 @@ class FlatpakManager(SoftwareManager):
             if len(apps_found) > len(already_read):
                 for app_found in apps_found:
                     if app_found['id'] not in already_read:
-                        res.new.append(self._map_to_model(app_found, False, disk_loader))
+                        res.new.append(self._map_to_model(app_found, False, disk_loader,
+                                                          priority=len(res.new), group=SEARCH_TASKS_GROUP))
 
         res.total = len(res.installed) + len(res.new)
         return res
 
     def _add_updates(self, version: str, output: list):
-        output.append(flatpak.list_updates_as_str(version))
+        output.append(self.updates_reader.read(version))
 
     def read_installed(self, disk_loader: DiskCacheLoader, limit: int = -1, only_apps: bool = False, pkg_types: Set[Type[SoftwarePackage]] = None, internet_available: bool = None) -> SearchResult:
         version = flatpak.get_version()
@@ -130,9 +209,9 @@ class FlatpakManager(SoftwareManager):
                 thread_updates.join()
                 update_map = updates[0]
 
-            for app_json in installed:
+            for idx, app_json in enumerate(installed):
                 model = self._map_to_model(app_json=app_json, installed=True,
-                                           disk_loader=disk_loader, internet=internet_available)
+                                           disk_loader=disk_loader, internet=internet_available, priority=idx)
                 model.update = None
                 models.append(model)
 
@@ -190,6 +269,7 @@ class FlatpakManager(SoftwareManager):
                                                success_phrases=['Changes complete.', 'Updates complete.'],
                                                wrong_error_phrase='Warning'))
         watcher.change_progress(100)
+        self.updates_reader.invalidate(pkg.installation)
         return success
 
     def clean_cache_for(self, pkg: FlatpakApplication):
@@ -198,34 +278,58 @@ class FlatpakManager(SoftwareManager):
 
     def upgrade(self, requirements: UpgradeRequirements, root_password: str, watcher: ProcessWatcher) -> bool:
         flatpak_version = flatpak.get_version()
-        for req in requirements.to_upgrade:
-            watcher.change_status("{} {} ({})...".format(self.i18n['manage_window.status.upgrading'], req.pkg.name, req.pkg.version))
-            related, deps = False, False
-            ref = req.pkg.ref
+        transactions = {}  # (installation, related) -> {ref: [packages]}
 
-            if req.pkg.partial and flatpak_version < '1.5':
-                related, deps = True, True
-                ref = req.pkg.base_ref
+        for req in requirements.to_upgrade:
+            related = req.pkg.partial and flatpak_version < '1.5'  # partials are updated through their base refs
+            ref = req.pkg.base_ref if related else req.pkg.ref
+            transactions.setdefault((req.pkg.installation, related), {}).setdefault(ref, []).append(req.pkg)
 
-            try:
-                res = ProcessHandler(watcher).handle(SystemProcess(subproc=flatpak.update(app_ref=ref,
-                                                                                          installation=req.pkg.installation,
-                                                                                          related=related,
-                                                                                          deps=deps)))
-
-                watcher.change_substatus('')
-                if not res:
-                    self.logger.warning("Could not upgrade '{}'".format(req.pkg.id))
+        try:
+            for (installation, related), refs in transactions.items():
+                if not self._upgrade_refs(refs, installation, related, watcher):
                     return False
-            except:
-                watcher.change_substatus('')
-                self.logger.error("An error occurred while upgrading '{}'".format(req.pkg.id))
-                traceback.print_exc()
-                return False
+        finally:
+            watcher.change_substatus('')
+            self.updates_reader.invalidate()
 
-        watcher.change_substatus('')
         return True
 
+    def _upgrade_refs(self, refs: Dict[str, List[FlatpakApplication]], installation: str, related: bool, watcher: ProcessWatcher) -> bool:
+        def _notify_progress(ref: str, status: str, idx: int, total: int):
+            if status == transaction.UPDATING:
+                pkg = refs[ref][0]
+                watcher.change_status("{} {} ({})...".format(self.i18n['manage_window.status.upgrading'], pkg.name, pkg.version))
+                watcher.change_substatus('{}/{}'.format(idx, total) if idx else '')
+
+        progress = transaction.UpdateTransactionProgress(list(refs), _notify_progress)
+
+        first_pkg = next(iter(refs.values()))[0]
+        watcher.change_status("{} {} ({})...".format(self.i18n['manage_window.status.upgrading'], first_pkg.name, first_pkg.version))
+
+        try:
+            res = ProcessHandler(watcher).handle(SystemProcess(subproc=flatpak.update(app_refs=list(refs),
+                                                                                      installation=installation,
+                                                                                      related=related,
+                                                                                      deps=related)),
+                                                 output_handler=progress.handle_line)
+        except:
+            self.logger.error("An error occurred while upgrading the {} refs: {}".format(installation, ', '.join(refs)))
+            traceback.print_exc()
+            return False
+
+        progress.finish(res)
+        upgraded = progress.get_refs(transaction.DONE)
+
+        if upgraded:
+            self.logger.info("{} refs upgraded ({}): {}".format(len(upgraded), installation, ', '.join(upgraded)))
+
+        if not res:
+            not_upgraded = progress.get_refs(transaction.PENDING, transaction.UPDATING, transaction.FAILED)
+            self.logger.warning("Could not upgrade the {} refs: {}".format(installation, ', '.join(not_upgraded)))
+
+        return res
+
     def uninstall(self, pkg: FlatpakApplication, root_password: str, watcher: ProcessWatcher) -> bool:
         uninstalled = ProcessHandler(watcher).handle(SystemProcess(subproc=flatpak.uninstall(pkg.ref, pkg.installation)))
 
@@ -233,6 +337,7 @@ class FlatpakManager(SoftwareManager):
             self.suggestions_cache.delete(pkg.id)
 
         self.revert_ignored_update(pkg)
+        self.updates_reader.invalidate(pkg.installation)
 
         return uninstalled
 
@@ -286,15 +391,28 @@ class FlatpakManager(SoftwareManager):
 
     def get_history(self, pkg: FlatpakApplication) -> PackageHistory:
         pkg.commit = flatpak.get_commit(pkg.id, pkg.branch, pkg.installation)
-        commits = flatpak.get_app_commits_data(pkg.ref, pkg.origin, pkg.installation)
-        status_idx = 0
+        commits, has_more = self.history_reader.read(pkg.ref, pkg.origin, pkg.installation, until_commit=pkg.commit)
+        return PackageHistory(pkg=pkg, history=commits, pkg_status_idx=self._get_history_status_idx(pkg, commits),
+                              has_more=has_more)
+
+    def get_more_history(self, history: PackageHistory) -> bool:
+        pkg = history.pkg
+        commits, history.has_more = self.history_reader.read_more(pkg.ref, pkg.origin, pkg.installation)
 
+        if len(commits) > len(history.history):
+            history.history = commits
+            history.pkg_status_idx = self._get_history_status_idx(pkg, commits)
+            return True
+
+        return False
+
+    @staticmethod
+    def _get_history_status_idx(pkg: FlatpakApplication, commits: List[dict]) -> int:
         for idx, data in enumerate(commits):
             if data['commit'] == pkg.commit:
-                status_idx = idx
-                break
+                return idx
 
-        return PackageHistory(pkg=pkg, history=commits, pkg_status_idx=status_idx)
+        return -1
 
     def install(self, pkg: FlatpakApplication, root_password: str, watcher: ProcessWatcher) -> bool:
 
@@ -354,6 +472,8 @@ class FlatpakManager(SoftwareManager):
             except:
                 traceback.print_exc()
 
+            self.updates_reader.invalidate(pkg.installation)
+
         return res
 
     def is_enabled(self):
@@ -370,6 +490,7 @@ class FlatpakManager(SoftwareManager):
 
     def prepare(self, task_manager: TaskManager, root_password: str, internet_available: bool):
         Thread(target=read_config, args=(True,), daemon=True).start()
+        Thread(target=self.catalog.refresh, daemon=True).start()
 
     def list_updates(self, internet_available: bool) -> List[PackageUpdate]:
         updates = []
@@ -431,7 +552,11 @@ class FlatpakManager(SoftwareManager):
                         if cached_sug:
                             res.append(cached_sug)
                         else:
-                            app_json = flatpak.search(cli_version, appid, remote_level, app_id=True)
+                            found = self.catalog.find(appid, installation=remote_level)
+                            app_json = [self._map_catalog_entry(*found)] if found else None
+
+                            if not app_json:
+                                app_json = flatpak.search(cli_version, appid, remote_level, app_id=True)
 
                             if app_json:
                                 model = PackageSuggestion(self._map_to_model(app_json[0], False, None), priority)
@@ -502,23 +627,13 @@ class FlatpakManager(SoftwareManager):
             return False, [traceback.format_exc()]
 
     def get_upgrade_requirements(self, pkgs: List[FlatpakApplication], root_password: str, watcher: ProcessWatcher) -> UpgradeRequirements:
-        flatpak_version = flatpak.get_version()
-
-        user_pkgs, system_pkgs = [], []
+        sizes = {}  # installation -> update id -> bytes
 
         for pkg in pkgs:
-            if pkg.installation == 'user':
-                user_pkgs.append(pkg)
-            else:
-                system_pkgs.append(pkg)
-
-        for apps_by_install in ((user_pkgs, 'user'), (system_pkgs, 'system')):
-            if apps_by_install[0]:
-                sizes = flatpak.map_update_download_size([str(p.id) for p in apps_by_install[0]], apps_by_install[1], flatpak_version)
+            if pkg.installation not in sizes:
+                sizes[pkg.installation] = self.updates_reader.get_download_sizes(pkg.installation)
 
-                if sizes:
-                    for p in apps_by_install[0]:
-                        p.size = sizes.get(str(p.id))
+            pkg.size = sizes[pkg.installation].get('{}/{}/{}'.format(pkg.id, pkg.branch, pkg.installation))
 
         to_update = [UpgradeRequirement(pkg=p, extra_size=p.size, required_size=p.size) for p in self.sort_update_order(pkgs)]
         return UpgradeRequirements(None, None, to_update, [])
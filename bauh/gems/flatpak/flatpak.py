@@ -1,14 +1,21 @@
+import os
 import re
 import subprocess
 import traceback
 from datetime import datetime
-from typing import List, Dict, Set, Iterable
+from typing import List, Dict, Set, Optional
 
 from bauh.api.exception import NoInternetException
+from bauh.commons import capability
 from bauh.commons.system import new_subprocess, run_cmd, new_root_subprocess, SimpleProcess, ProcessHandler
 from bauh.commons.util import size_to_byte
+from bauh.gems.flatpak import INSTALLATION_DIRS
 
 RE_SEVERAL_SPACES = re.compile(r'\s+')
+RE_UPDATE_LINE = re.compile(r'[0-9]+\.\s+.+')
+RE_COMMIT_FIELDS = re.compile(r'^\s*(Commit|Parent|Subject|Date):\s(.+)$', re.MULTILINE)
+COMMIT_DATE_FORMAT = '%Y-%m-%d %H:%M:%S +0000'
+RE_DOWNLOAD_SIZE = re.compile(r'([0-9]+(?:[.,][0-9]+)?)\s*([kKMGT]?B|bytes)\b')
 
 
 def get_app_info_fields(app_id: str, branch: str, installation: str, fields: List[str] = [], check_runtime: bool = False):
@@ -63,7 +70,7 @@ def is_installed():
 
 
 def get_version():
-    res = run_cmd('{} --version'.format('flatpak'), print_error=False)
+    res = capability.get_version('flatpak')
     return res.split(' ')[1].strip() if res else None
 
 
@@ -150,13 +157,13 @@ def list_installed(version: str) -> List[dict]:
     return apps
 
 
-def update(app_ref: str, installation: str, related: bool = False, deps: bool = False):
+def update(app_refs: List[str], installation: str, related: bool = False, deps: bool = False):
     """
-    Updates the app reference
-    :param app_ref:
+    Updates the given references through a single transaction
+    :param app_refs:
     :return:
     """
-    cmd = ['flatpak', 'update', '-y', app_ref, '--{}'.format(installation)]
+    cmd = ['flatpak', 'update', '-y', *app_refs, '--{}'.format(installation)]
 
     if not related:
         cmd.append('--no-related')
@@ -176,18 +183,23 @@ def uninstall(app_ref: str, installation: str):
     return new_subprocess(['flatpak', 'uninstall', app_ref, '-y', '--{}'.format(installation)])
 
 
-def list_updates_as_str(version: str) -> Dict[str, set]:
-    updates = read_updates(version, 'system')
-    user_updates = read_updates(version, 'user')
-
-    for attr in ('full', 'partial'):
-        updates[attr].update(user_updates[attr])
+def map_download_size(column: str) -> Optional[int]:
+    """
+    :param column: the 'Download' column of the update transaction table (e.g: '< 8.5 MB', '1.2\xa0kB (partial)')
+    :return: the size in bytes
+    """
+    found = RE_DOWNLOAD_SIZE.search(column)
 
-    return updates
+    if found:
+        return size_to_byte(float(found.group(1).replace(',', '.')), found.group(2))
 
 
-def read_updates(version: str, installation: str) -> Dict[str, set]:
-    res = {'partial': set(), 'full': set()}
+def read_updates(version: str, installation: str) -> Dict[str, object]:
+    """
+    :return: the 'full' and 'partial' update ids ('id/branch/installation') and the estimated download 'sizes'
+    (bytes) of the updates displayed by the transaction table
+    """
+    res = {'partial': set(), 'full': set(), 'sizes': {}}
     if version < '1.2':
         try:
             output = run_cmd('{} update --no-related --no-deps --{}'.format('flatpak', installation), ignore_return_code=True)
@@ -199,34 +211,65 @@ def read_updates(version: str, installation: str) -> Dict[str, set]:
         except:
             traceback.print_exc()
     else:
-        updates = new_subprocess(['flatpak', 'update', '--{}'.format(installation)]).stdout
-
-        reg = r'[0-9]+\.\s+.+'
-
         try:
-            for o in new_subprocess(['grep', '-E', reg, '-o', '--color=never'], stdin=updates).stdout:
-                if o:
-                    line_split = o.decode().strip().split('\t')
+            output, _ = new_subprocess(['flatpak', 'update', '--{}'.format(installation)], stdin=subprocess.DEVNULL).communicate()
 
-                    if version >= '1.5.0':
-                        update_id = '{}/{}/{}'.format(line_split[2], line_split[3], installation)
-                    else:
-                        update_id = '{}/{}/{}'.format(line_split[2], line_split[4], installation)
-
-                    if len(line_split) >= 6:
-                        if line_split[4] != 'i':
-                            if '(partial)' in line_split[-1]:
-                                res['partial'].add(update_id)
-                            else:
-                                res['full'].add(update_id)
-                    else:
-                        res['full'].add(update_id)
+            if output:
+                for line in output.decode().split('\n'):
+                    found = RE_UPDATE_LINE.search(line)
+
+                    if found:
+                        line_split = found.group(0).strip().split('\t')
+
+                        if version >= '1.5.0':
+                            update_id = '{}/{}/{}'.format(line_split[2], line_split[3], installation)
+                        else:
+                            update_id = '{}/{}/{}'.format(line_split[2], line_split[4], installation)
+
+                        if len(line_split) >= 6:
+                            if line_split[4] != 'i':
+                                if '(partial)' in line_split[-1]:
+                                    res['partial'].add(update_id)
+                                else:
+                                    res['full'].add(update_id)
+
+                                size = map_download_size(line_split[-1])
+
+                                if size is not None:
+                                    res['sizes'][update_id] = size
+                        else:
+                            res['full'].add(update_id)
         except:
             traceback.print_exc()
 
     return res
 
 
+def read_installation_state(installation: str) -> tuple:
+    """
+    :return: the modification times of the installation files changed when refs are installed, updated or
+    when the remotes metadata is fetched.
+    """
+    installation_dir = INSTALLATION_DIRS[installation]
+    state = []
+
+    for path in ('.changed', 'repo/refs/remotes', 'repo/refs/heads', 'repo/tmp/cache/summaries'):
+        try:
+            state.append(os.stat('{}/{}'.format(installation_dir, path)).st_mtime)
+        except OSError:
+            state.append(None)
+
+    summaries_dir = '{}/repo/tmp/cache/summaries'.format(installation_dir)
+
+    if os.path.isdir(summaries_dir):
+        try:
+            state.extend(sorted((f.name, f.stat().st_mtime) for f in os.scandir(summaries_dir)))
+        except OSError:
+            pass
+
+    return tuple(state)
+
+
 def downgrade(app_ref: str, commit: str, installation: str, root_password: str) -> subprocess.Popen:
     cmd = ['flatpak', 'update', '--no-related', '--no-deps', '--commit={}'.format(commit), app_ref, '-y', '--{}'.format(installation)]
 
@@ -265,7 +308,7 @@ def get_app_commits_data(app_ref: str, origin: str, installation: str) -> List[d
         commit[attr] = data[1].strip()
 
         if attr == 'date':
-            commit[attr] = datetime.strptime(commit[attr], '%Y-%m-%d %H:%M:%S +0000')
+            commit[attr] = datetime.strptime(commit[attr], COMMIT_DATE_FORMAT)
 
         if (idx + 1) % 3 == 0:
             commits.append(commit)
@@ -274,6 +317,45 @@ def get_app_commits_data(app_ref: str, origin: str, installation: str) -> List[d
     return commits
 
 
+def get_app_commit_data(app_ref: str, origin: str, installation: str, commit: str = None) -> Optional[dict]:
+    """
+    Reads a single commit of the remote ref (the latest if no commit is informed)
+    :return: the commit 'commit', 'subject', 'date' and 'parent' (if the commit has a parent and the Flatpak version
+    displays it). None if the commit could not be read.
+    """
+    cmd = ['flatpak', 'remote-info', origin, app_ref, '--{}'.format(installation)]
+
+    if commit:
+        cmd.append('--commit={}'.format(commit))
+
+    try:
+        output, _ = new_subprocess(cmd).communicate()
+    except:
+        traceback.print_exc()
+        return
+
+    if not output:
+        return
+
+    data = {}
+    for attr, val in RE_COMMIT_FIELDS.findall(output.decode()):
+        attr = attr.lower()
+
+        if attr not in data:
+            data[attr] = val.strip()
+
+    if not data.get('commit'):
+        return
+
+    if data.get('date'):
+        try:
+            data['date'] = datetime.strptime(data['date'], COMMIT_DATE_FORMAT)
+        except ValueError:
+            pass
+
+    return data
+
+
 def search(version: str, word: str, installation: str, app_id: bool = False) -> List[dict]:
 
     res = run_cmd('{} search {} --{}'.format('flatpak', word, installation))
@@ -386,28 +468,3 @@ def list_remotes() -> Dict[str, Set[str]]:
 
 def run(app_id: str):
     subprocess.Popen(['flatpak', 'run', app_id])
-
-
-def map_update_download_size(app_ids: Iterable[str], installation: str, version: str) -> Dict[str, int]:
-    success, output = ProcessHandler().handle_simple(SimpleProcess(['flatpak', 'update', '--{}'.format(installation)]))
-    if version >= '1.5':
-        res = {}
-        p = re.compile(r'^\d+.\t')
-        p2 = re.compile(r'\s([0-9.?a-zA-Z]+)\s?')
-        for l in output.split('\n'):
-            if l:
-                line = l.strip()
-
-                if line:
-                    found = p.match(line)
-
-                    if found:
-                        line_split = line.split('\t')
-                        line_id = line_split[2].strip()
-
-                        related_id = [appid for appid in app_ids if appid == line_id]
-
-                        if related_id:
-                            size = p2.findall(line_split[6])[0].split('?')
-                            res[related_id[0].strip()] = size_to_byte(float(size[0]), size[1])
-        return res
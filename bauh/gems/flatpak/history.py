@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import traceback
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import List, Tuple, Optional
+
+from bauh.api.exception import NoInternetException
+from bauh.commons import internet
+from bauh.gems.flatpak import flatpak, HISTORY_DIR
+
+
+class FlatpakHistoryReader:
+    """
+    Reads the commits history of remote refs page by page (following the commits parents) and caches the commits
+    already read on disk per (installation, remote, ref). Reopening a history only reads the commits newer than the
+    cached head. When a given commit is not found after walking 'max_walk' commits, the whole log is read at once.
+    """
+
+    def __init__(self, logger: logging.Logger, cache_dir: str = HISTORY_DIR, page_size: int = 10, max_walk: int = 50):
+        self.logger = logger
+        self.cache_dir = cache_dir
+        self.page_size = page_size
+        self.max_walk = max_walk
+        self._lock = Lock()
+
+    def _get_cache_path(self, ref: str, origin: str, installation: str) -> str:
+        return '{}/{}/{}/{}.json'.format(self.cache_dir, installation, origin, ref.replace('/', '_'))
+
+    def _read_cache(self, ref: str, origin: str, installation: str) -> dict:
+        cache_path = self._get_cache_path(ref, origin, installation)
+
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path) as f:
+                    cached = json.loads(f.read())
+
+                for commit in cached['commits']:
+                    if commit.get('date'):
+                        commit['date'] = datetime.strptime(commit['date'], flatpak.COMMIT_DATE_FORMAT)
+
+                return cached
+            except:
+                self.logger.warning("Could not read the cached history from '{}'".format(cache_path))
+                traceback.print_exc()
+
+        return {'commits': [], 'complete': False}
+
+    def _write_cache(self, ref: str, origin: str, installation: str, history: dict):
+        cache_path = self._get_cache_path(ref, origin, installation)
+
+        to_cache = {'complete': history['complete'], 'commits': []}
+        for commit in history['commits']:
+            commit = {**commit}
+
+            if isinstance(commit.get('date'), datetime):
+                commit['date'] = commit['date'].strftime(flatpak.COMMIT_DATE_FORMAT)
+
+            to_cache['commits'].append(commit)
+
+        try:
+            Path(os.path.dirname(cache_path)).mkdir(parents=True, exist_ok=True)
+
+            with open(cache_path, 'w+') as f:
+                f.write(json.dumps(to_cache))
+        except:
+            self.logger.error("Could not write the history cache file '{}'".format(cache_path))
+            traceback.print_exc()
+
+    def _walk(self, ref: str, origin: str, installation: str, parent: Optional[str], stop_at: set, limit: int,
+              until_commit: str = None) -> Tuple[List[dict], bool]:
+        """
+        Reads the commits following the parents chain from the given parent
+        :param until_commit: keeps reading after the limit until this commit is found (up to 'max_walk' commits)
+        :return: the commits read and if the chain reached its first available commit or a commit from 'stop_at'
+        """
+        commits = []
+        found = not until_commit
+
+        while parent and parent not in stop_at:
+            if len(commits) >= limit and (found or len(commits) >= self.max_walk):
+                return commits, False
+
+            commit = flatpak.get_app_commit_data(ref, origin, installation, parent)
+
+            if not commit:
+                if not internet.is_available():
+                    raise NoInternetException()
+
+                # old commits are usually removed from the remotes
+                self.logger.warning("Could not read the commit '{}' of '{}'. Older commits are not available".format(parent, ref))
+                return commits, True
+
+            commits.append(commit)
+            found = found or commit['commit'] == until_commit
+            parent = commit.get('parent')
+
+        return commits, True
+
+    @staticmethod
+    def _to_history(commits: List[dict]) -> List[dict]:
+        return [{'commit': c['commit'], 'subject': c.get('subject', ''), 'date': c.get('date', '')} for c in commits]
+
+    def read(self, ref: str, origin: str, installation: str, until_commit: str = None) -> Tuple[List[dict], bool]:
+        """
+        :param until_commit: keeps reading pages until this commit is found (e.g: the installed commit)
+        :return: the history commits (newest first) and if there are older commits to be read
+        """
+        with self._lock:
+            cached = self._read_cache(ref, origin, installation)
+            head = flatpak.get_app_commit_data(ref, origin, installation)
+
+            if not head:
+                if cached['commits']:
+                    self.logger.warning("Could not read the latest commit of '{}'. Displaying the cached history".format(ref))
+                    return self._to_history(cached['commits']), not cached['complete']
+
+                if not internet.is_available():
+                    raise NoInternetException()
+
+                self.logger.warning("Could not read the latest commit of '{}'".format(ref))
+                return [], False
+
+            if 'parent' not in head and not cached['commits']:  # Flatpak versions that do not display the commit parent
+                commits = flatpak.get_app_commits_data(ref, origin, installation)
+                self._write_cache(ref, origin, installation, {'commits': commits, 'complete': True})
+                return self._to_history(commits), False
+
+            known = {c['commit']: idx for idx, c in enumerate(cached['commits'])}
+
+            if head['commit'] in known:
+                history = {'commits': cached['commits'][known[head['commit']]:], 'complete': cached['complete']}
+            else:
+                newer, complete = self._walk(ref, origin, installation, head.get('parent'), set(known), self.page_size - 1)
+                newer.insert(0, head)
+
+                if complete and (not newer[-1].get('parent') or newer[-1]['parent'] not in known):  # first commit
+                    history = {'commits': newer, 'complete': True}
+                elif complete:
+                    history = {'commits': newer + cached['commits'][known[newer[-1]['parent']]:], 'complete': cached['complete']}
+                else:  # the cached commits are too old to be linked
+                    history = {'commits': newer, 'complete': False}
+
+                self.logger.info("{} new commits read for '{}'".format(len(newer), ref))
+
+            found = not until_commit or until_commit in {c['commit'] for c in history['commits']}
+
+            if not history['complete'] and (len(history['commits']) < self.page_size or not found):
+                self._read_older(ref, origin, installation, history, self.page_size - len(history['commits']),
+                                 None if found else until_commit)
+
+            self._write_cache(ref, origin, installation, history)
+            return self._to_history(history['commits']), not history['complete']
+
+    def _read_older(self, ref: str, origin: str, installation: str, history: dict, limit: int, until_commit: str = None):
+        older, complete = self._walk(ref, origin, installation, history['commits'][-1].get('parent'), set(),
+                                     max(limit, 0), until_commit)
+        history['commits'].extend(older)
+        history['complete'] = complete
+
+        if until_commit and not complete and until_commit not in {c['commit'] for c in older}:
+            self.logger.info("Commit '{}' not found in the latest {} commits of '{}'. Reading the whole log".format(until_commit, len(history['commits']), ref))
+
+            try:
+                log = flatpak.get_app_commits_data(ref, origin, installation)
+            except NoInternetException:
+                if not internet.is_available():
+                    raise
+
+                self.logger.warning("Could not read the log of '{}'".format(ref))
+                return
+
+            if log:
+                history['commits'] = log
+                history['complete'] = True
+
+    def read_more(self, ref: str, origin: str, installation: str) -> Tuple[List[dict], bool]:
+        """
+        Reads the next page of older commits
+        :return: the history commits (newest first) and if there are older commits to be read
+        """
+        with self._lock:
+            history = self._read_cache(ref, origin, installation)
+
+            if history['commits'] and not history['complete']:
+                self._read_older(ref, origin, installation, history, self.page_size)
+                self._write_cache(ref, origin, installation, history)
+
+            return self._to_history(history['commits']), not history['complete']
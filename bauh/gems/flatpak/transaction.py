@@ -0,0 +1,139 @@
+import re
+from typing import List, Optional, Callable, Tuple
+
+RE_OPERATION = re.compile(r'^(\d+)\.\s+(?:\[(.)\]\s+)?([\w.\-]+)\s+((?:[\w.\-]+\s+){0,2})')
+RE_OPERATION_PROGRESS = re.compile(r'^(?:Installing|Updating)\s+(\d+)/(\d+)')
+RE_REF_PROGRESS = re.compile(r'^(?:Installing|Updating):?\s+((?:app/|runtime/)?[\w.\-]+/[\w.\-/]*)')
+RE_REF_FAILED = re.compile(r'^(?:Warning|Error):\s+Failed to \w+\s+((?:app/|runtime/)?[\w.\-]+/[\w.\-/]*)')
+
+DONE_MARKS = {'✓', 'v'}
+FAILED_MARKS = {'✗', 'x', 'X', '!'}
+
+PENDING, UPDATING, DONE, FAILED = 'pending', 'updating', 'done', 'failed'
+
+
+def get_ref_key(ref: str) -> Tuple[str, Optional[str]]:
+    """
+    :return: the id and the branch of the ref (e.g: 'app/org.gnome.gedit/x86_64/stable' -> ('org.gnome.gedit', 'stable'))
+    """
+    ref_split = ref.split('/')
+
+    if ref_split[0] in ('app', 'runtime') and len(ref_split) > 1:
+        ref_split = ref_split[1:]
+
+    return ref_split[0], ref_split[2] if len(ref_split) > 2 and ref_split[2] else None
+
+
+class UpdateTransactionProgress:
+    """
+    Parses the output of a 'flatpak update' transaction with several refs and keeps the status of each one.
+    Both the operations table format (Flatpak >= 1.2) and the 'Updating: ref' format (older versions) are supported.
+    """
+
+    def __init__(self, refs: List[str], on_change: Optional[Callable[[str, str, int, int], None]] = None):
+        """
+        :param refs: the refs being updated
+        :param on_change: called with (ref, status, operation index, number of operations) every time a ref status changes
+        """
+        self.on_change = on_change
+        self._refs = {}  # (id, branch) -> ref
+        self.status = {}  # ref -> status
+
+        for ref in refs:
+            self._refs[get_ref_key(ref)] = ref
+            self.status[ref] = PENDING
+
+        self._operations = {}  # index -> ref
+        self._current = None
+
+    def _find_ref(self, id_: str, branches: List[str]) -> Optional[str]:
+        """
+        :param branches: the possible branches of the ref (the columns following the id may also be the arch)
+        :return: the ref being updated with the given id and one of the branches. If no branch matches, the only
+        ref with the given id.
+        """
+        for branch in branches:
+            ref = self._refs.get((id_, branch))
+
+            if ref:
+                return ref
+
+        same_id = [ref for (ref_id, _), ref in self._refs.items() if ref_id == id_]
+        return same_id[0] if len(same_id) == 1 else None
+
+    def _change(self, ref: Optional[str], status: str, idx: int = None):
+        if self._current and self._current != ref and status == UPDATING:
+            self._change(self._current, DONE)
+
+        if status == UPDATING:
+            self._current = ref
+        elif self._current == ref:
+            self._current = None
+
+        if ref and self.status[ref] != status and self.status[ref] not in (DONE, FAILED):
+            self.status[ref] = status
+
+            if self.on_change:
+                total = max(len(self._operations), len(self._refs))
+                self.on_change(ref, status, idx if idx else 0, total)
+
+    @staticmethod
+    def _split_ref(ref: str) -> Tuple[str, List[str]]:
+        id_, branch = get_ref_key(ref)
+        return id_, [branch] if branch else []
+
+    def handle_line(self, line: str):
+        line = line.strip()
+
+        if not line:
+            return
+
+        operation = RE_OPERATION.match(line)
+
+        if operation:
+            idx, mark = int(operation.group(1)), operation.group(2)
+            ref = self._find_ref(operation.group(3), operation.group(4).split())
+            self._operations[idx] = ref
+
+            if mark in DONE_MARKS:
+                self._change(ref, DONE, idx)
+            elif mark in FAILED_MARKS:
+                self._change(ref, FAILED, idx)
+
+            return
+
+        progress = RE_OPERATION_PROGRESS.match(line)
+
+        if progress:
+            idx = int(progress.group(1))
+            ref = self._operations.get(idx)
+
+            if ref:
+                self._change(ref, UPDATING, idx)
+
+            return
+
+        failed = RE_REF_FAILED.match(line)
+
+        if failed:
+            self._change(self._find_ref(*self._split_ref(failed.group(1))), FAILED)
+            return
+
+        ref_progress = RE_REF_PROGRESS.match(line)
+
+        if ref_progress:
+            self._change(self._find_ref(*self._split_ref(ref_progress.group(1))), UPDATING)
+
+    def finish(self, success: bool):
+        """
+        Marks the refs without a final status according to the transaction result
+        """
+        if success:
+            for ref, status in self.status.items():
+                if status in (PENDING, UPDATING):
+                    self.status[ref] = DONE
+        elif self._current:
+            self._change(self._current, FAILED)
+
+    def get_refs(self, *status: str) -> List[str]:
+        return [ref for ref, ref_status in self.status.items() if ref_status in status]
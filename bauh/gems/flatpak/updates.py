@@ -0,0 +1,84 @@
+import logging
+import time
+from threading import Thread, Lock
+from typing import Dict, Optional
+
+from bauh.gems.flatpak import flatpak
+
+INSTALLATIONS = ('system', 'user')
+
+
+class FlatpakUpdatesReader:
+    """
+    Discovers the available updates of the system and user installations concurrently. The updates of each
+    installation are cached and only discovered again when its refs / remotes metadata change or when they expire.
+    """
+
+    def __init__(self, logger: logging.Logger, expiration: int = 60 * 30):
+        self.logger = logger
+        self.expiration = expiration
+        self._cache = {}  # installation -> (state, timestamp, updates)
+        self._lock = Lock()
+
+    def _get_cached(self, installation: str, state: tuple) -> Optional[Dict[str, set]]:
+        with self._lock:
+            cached = self._cache.get(installation)
+
+        if cached and cached[0] == state and (self.expiration < 0 or time.time() - cached[1] < self.expiration):
+            return cached[2]
+
+    def _read(self, version: str, installation: str, output: Dict[str, Dict[str, set]]):
+        state = flatpak.read_installation_state(installation)
+        cached = self._get_cached(installation, state)
+
+        if cached is not None:
+            self.logger.info("Flatpak updates ({}) not changed. Using the cached data".format(installation))
+            output[installation] = cached
+        else:
+            ti = time.time()
+            updates = flatpak.read_updates(version, installation)
+            self.logger.info("Took {0:.2f} seconds to read the Flatpak updates ({1})".format(time.time() - ti, installation))
+
+            with self._lock:  # the discovery itself may fetch the remotes metadata
+                self._cache[installation] = (flatpak.read_installation_state(installation), time.time(), updates)
+
+            output[installation] = updates
+
+    def read(self, version: str) -> Dict[str, set]:
+        installation_updates = {}
+        threads = [Thread(target=self._read, args=(version, i, installation_updates), daemon=True) for i in INSTALLATIONS]
+
+        for t in threads:
+            t.start()
+
+        for t in threads:
+            t.join()
+
+        updates = {'partial': set(), 'full': set(), 'sizes': {}}
+        for res in installation_updates.values():
+            for attr in ('full', 'partial', 'sizes'):
+                updates[attr].update(res[attr])
+
+        return updates
+
+    def get_download_sizes(self, installation: str) -> Dict[str, int]:
+        """
+        :return: the download sizes (update id -> bytes) captured by the last discovery if the installation refs /
+        remotes metadata did not change since then (so the updates still point to the same commits).
+        Nothing is executed.
+        """
+        with self._lock:
+            cached = self._cache.get(installation)
+
+        if cached and cached[0] == flatpak.read_installation_state(installation):
+            return cached[2]['sizes']
+
+        return {}
+
+    def invalidate(self, installation: str = None):
+        with self._lock:
+            if installation:
+                if installation in self._cache:
+                    del self._cache[installation]
+            else:
+                self._cache.clear()
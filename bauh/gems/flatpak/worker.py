@@ -1,6 +1,7 @@
 import traceback
 from io import StringIO
 from threading import Thread
+from typing import List
 
 from bauh.api.abstract.cache import MemoryCache
 from bauh.api.abstract.context import ApplicationContext
@@ -11,10 +12,9 @@ from bauh.gems.flatpak.constants import FLATHUB_API_URL, FLATHUB_URL
 from bauh.gems.flatpak.model import FlatpakApplication
 
 
-class FlatpakAsyncDataLoader(Thread):
+class FlatpakAsyncDataLoader:
 
     def __init__(self, app: FlatpakApplication, manager: SoftwareManager, context: ApplicationContext, api_cache: MemoryCache, category_cache: MemoryCache):
-        super(FlatpakAsyncDataLoader, self).__init__(daemon=True)
         self.app = app
         self.manager = manager
         self.http_client = context.http_client
@@ -37,7 +37,27 @@ class FlatpakAsyncDataLoader(Thread):
         word.seek(0)
         return word.read()
 
-    def run(self):
+    def load(self, apps: List[FlatpakApplication]):
+        """
+        Loads the data of the loader app and fills the other given instances of the same app with it
+        """
+        self._load_app()
+
+        data = self.app.get_data_to_cache()
+        for app in apps:
+            if app is not self.app:
+                app.fill_cached_data(data)
+                app.status = PackageStatus.READY
+
+    @staticmethod
+    def cancel(apps: List[FlatpakApplication]):
+        """
+        Restores the given instances whose loading was cancelled
+        """
+        for app in apps:
+            app.status = PackageStatus.READY
+
+    def _load_app(self):
         if self.app:
             self.app.status = PackageStatus.LOADING_DATA
 
@@ -6,6 +6,7 @@ from bauh.commons import resource
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 SNAP_CACHE_PATH = CACHE_PATH + '/snap'
 CATEGORIES_FILE_PATH = SNAP_CACHE_PATH + '/categories.txt'
+METADATA_FILE = SNAP_CACHE_PATH + '/metadata.json'
 URL_CATEGORIES_FILE = 'https://raw.githubusercontent.com/vinifmor/bauh-files/master/snap/categories.txt'
 SUGGESTIONS_FILE = 'https://raw.githubusercontent.com/vinifmor/bauh-files/master/snap/suggestions.txt'
 
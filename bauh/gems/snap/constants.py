@@ -1 +0,0 @@
-SNAP_API_URL = 'https://search.apps.ubuntu.com/api/v1'
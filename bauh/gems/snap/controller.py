@@ -1,26 +1,29 @@
 import re
 import time
+import traceback
 from datetime import datetime
 from threading import Thread
-from typing import List, Set, Type
+from typing import List, Set, Type, Tuple, Dict, Optional
 
 from bauh.api.abstract.controller import SoftwareManager, SearchResult, ApplicationContext, UpgradeRequirements
 from bauh.api.abstract.disk import DiskCacheLoader
 from bauh.api.abstract.handler import ProcessWatcher, TaskManager
 from bauh.api.abstract.model import SoftwarePackage, PackageHistory, PackageUpdate, PackageSuggestion, \
-    SuggestionPriority, CustomSoftwareAction
+    SuggestionPriority, CustomSoftwareAction, PackageStatus
 from bauh.api.abstract.view import SingleSelectComponent, SelectViewType, InputOption
 from bauh.commons import resource
 from bauh.commons.category import CategoriesDownloader
 from bauh.commons.html import bold
-from bauh.commons.system import SystemProcess, ProcessHandler, new_root_subprocess
+from bauh.commons.system import ProcessHandler, SimpleProcess, get_human_size_str
 from bauh.gems.snap import snap, URL_CATEGORIES_FILE, SNAP_CACHE_PATH, CATEGORIES_FILE_PATH, SUGGESTIONS_FILE, \
     get_icon_path
-from bauh.gems.snap.constants import SNAP_API_URL
+from bauh.gems.snap.metadata import SnapMetadataReader
 from bauh.gems.snap.model import SnapApplication
+from bauh.gems.snap.snapd import SnapdClient, SnapdError, Change, SNAPD_ERRORS, Snap
 from bauh.gems.snap.worker import SnapAsyncDataLoader
 
 RE_AVAILABLE_CHANNELS = re.compile(re.compile(r'(\w+)\s+(snap install.+)'))
+SEARCH_TASKS_GROUP = 'snap.search'
 
 
 class SnapManager(SoftwareManager):
@@ -36,7 +39,11 @@ class SnapManager(SoftwareManager):
         self.ubuntu_distro = context.distro == 'ubuntu'
         self.categories = {}
         self.suggestions_cache = context.cache_factory.new()
-        self.info_path = None
+        self.snapd = SnapdClient(context.logger)
+        self.metadata_reader = SnapMetadataReader(context.logger, self.snapd)
+        self.refreshable_ttl = 60 * 5  # seconds the snaps with updates available are kept
+        self._refreshable = None
+        self._refreshable_expires_at = 0
         self.custom_actions = [
             CustomSoftwareAction(i18n_status_key='snap.action.refresh.status',
                                  i18_label_key='snap.action.refresh.label',
@@ -45,13 +52,8 @@ class SnapManager(SoftwareManager):
                                  requires_root=True)
         ]
 
-    def get_info_path(self) -> str:
-        if self.info_path is None:
-            self.info_path = snap.get_app_info_path()
-
-        return self.info_path
-
-    def map_json(self, app_json: dict, installed: bool,  disk_loader: DiskCacheLoader, internet: bool = True) -> SnapApplication:
+    def map_json(self, app_json: dict, installed: bool,  disk_loader: DiskCacheLoader, internet: bool = True,
+                 priority: int = 0, group: str = None) -> SnapApplication:
         app = SnapApplication(publisher=app_json.get('publisher'),
                               rev=app_json.get('rev'),
                               notes=app_json.get('notes'),
@@ -93,7 +95,10 @@ class SnapManager(SoftwareManager):
                 disk_loader.fill(app)
 
             if internet:
-                SnapAsyncDataLoader(app=app, api_cache=self.api_cache, manager=self, context=self.context).start()
+                app.status = PackageStatus.LOADING_DATA
+                loader = SnapAsyncDataLoader(app=app, api_cache=self.api_cache, manager=self, context=self.context)
+                self.context.metadata_executor.submit(key='snap:{}'.format(app.id), fn=loader.load, target=app,
+                                                      priority=priority, group=group, on_cancel=loader.cancel)
         else:
             app.fill_cached_data(api_data)
 
@@ -103,12 +108,23 @@ class SnapManager(SoftwareManager):
         if is_url:
             return SearchResult([], [], 0)
 
-        if snap.is_snapd_running():
+        self.context.metadata_executor.cancel_group(SEARCH_TASKS_GROUP)  # the previous search was superseded
+
+        if self.snapd.is_available():
             installed = self.read_installed(disk_loader).installed
 
             res = SearchResult([], [], 0)
 
-            for app_json in snap.search(words):
+            try:
+                found = self.snapd.find(query=words)
+            except SNAPD_ERRORS:
+                self.logger.error("Could not search for '{}' through snapd".format(words))
+                traceback.print_exc()
+                return res
+
+            self.metadata_reader.update(found)  # the results already carry the store metadata
+
+            for app_json in (s.to_json() for s in found):
 
                 already_installed = None
 
@@ -119,7 +135,8 @@ class SnapManager(SoftwareManager):
                 if already_installed:
                     res.installed.append(already_installed)
                 else:
-                    res.new.append(self.map_json(app_json, installed=False, disk_loader=disk_loader))
+                    res.new.append(self.map_json(app_json, installed=False, disk_loader=disk_loader,
+                                                 priority=len(res.new), group=SEARCH_TASKS_GROUP))
 
             res.total = len(res.installed) + len(res.new)
             return res
@@ -127,22 +144,116 @@ class SnapManager(SoftwareManager):
             return SearchResult([], [], 0)
 
     def read_installed(self, disk_loader: DiskCacheLoader, limit: int = -1, only_apps: bool = False, pkg_types: Set[Type[SoftwarePackage]] = None, internet_available: bool = None) -> SearchResult:
-        info_path = self.get_info_path()
-
-        if snap.is_snapd_running() and info_path:
-            installed = [self.map_json(app_json, installed=True, disk_loader=disk_loader, internet=internet_available) for app_json in snap.read_installed(info_path)]
-            return SearchResult(installed, None, len(installed))
-        else:
+        refreshable = self._get_cached_refreshable() if internet_available else None
+        refreshable_reader = None
+
+        if internet_available and refreshable is None:  # read from the store while the installed snaps are mapped
+            refreshable = {}
+            refreshable_reader = Thread(target=lambda: refreshable.update(self._read_refreshable()), daemon=True)
+            refreshable_reader.start()
+
+        try:
+            snaps = self.snapd.list_snaps()
+        except SNAPD_ERRORS:
+            self.logger.warning("Could not read the installed snaps through snapd")
             return SearchResult([], None, 0)
 
+        installed = [self.map_json(s.to_json(), installed=True, disk_loader=disk_loader, internet=internet_available, priority=idx)
+                     for idx, s in enumerate(snaps)]
+
+        if refreshable_reader:
+            refreshable_reader.join()
+
+        if refreshable and installed:
+            for app in installed:
+                update = refreshable.get(app.name)
+
+                if update:
+                    app.update = True
+                    app.latest_version = update.version
+
+        return SearchResult(installed, None, len(installed))
+
+    def _get_cached_refreshable(self) -> Optional[Dict[str, Snap]]:
+        if self._refreshable is not None and self._refreshable_expires_at > time.time():
+            return self._refreshable
+
+    def _read_refreshable(self) -> Dict[str, Snap]:
+        """
+        :return: the installed snaps with updates available (read through a single store request). They are kept
+        for 'refreshable_ttl' seconds or until a snapd change is made.
+        """
+        try:
+            found = self.snapd.find(select='refresh')
+        except SNAPD_ERRORS:
+            self.logger.warning("Could not read the snaps updates through snapd")
+            traceback.print_exc()
+            return {}
+
+        self.metadata_reader.update(found)  # the results already carry the store metadata
+        self._refreshable = {s.name: s for s in found}
+        self._refreshable_expires_at = time.time() + self.refreshable_ttl
+        return self._refreshable
+
+    def _notify_change(self, change: Change, watcher: ProcessWatcher):
+        task = change.get_current_task()
+
+        if task and task.summary:
+            watcher.change_substatus(task.summary)
+
+        watcher.change_progress(change.get_progress())
+
+    def _abort_change(self, change: Change, root_password: str, watcher: ProcessWatcher) -> bool:
+        success, output = ProcessHandler(watcher).handle_simple(snap.abort(change.id, root_password))
+
+        if not success:
+            self.logger.error("Could not abort the snapd change '{}': {}".format(change.id, output))
+
+        return success
+
+    def _run_change(self, proc: SimpleProcess, root_password: str, watcher: ProcessWatcher) -> Tuple[bool, str]:
+        """
+        Executes a snap command with '--no-wait' and follows the generated change through snapd until it is ready.
+        A change taking too long is aborted through the 'snap' command (snapd only accepts it from root).
+        :return: if the change succeeded and the command output
+        """
+        success, output = ProcessHandler(watcher).handle_simple(proc)
+        change_id = snap.read_change_id(output) if success else None
+
+        if not change_id:
+            return False, output
+
+        try:
+            change = self.snapd.wait_change(change_id, lambda c: self._notify_change(c, watcher),
+                                            on_timeout=lambda c: self._abort_change(c, root_password, watcher))
+        except SNAPD_ERRORS:
+            self.logger.error("Could not follow the snapd change '{}'".format(change_id))
+            traceback.print_exc()
+            return False, output
+        finally:
+            watcher.change_substatus('')
+            self._refreshable = None  # the snaps with updates available may have changed
+
+        if change.err:
+            watcher.print(change.err)
+
+        self.logger.info("snapd change '{}' ({}): {}".format(change.id, change.summary, change.status))
+        return change.is_successful(), output
+
     def downgrade(self, pkg: SnapApplication, root_password: str, watcher: ProcessWatcher) -> bool:
-        return ProcessHandler(watcher).handle(SystemProcess(subproc=snap.downgrade_and_stream(pkg.name, root_password), wrong_error_phrase=None))
+        return self._run_change(snap.downgrade(pkg.name, root_password), root_password, watcher)[0]
+
+    def upgrade(self, requirements: UpgradeRequirements, root_password: str, watcher: ProcessWatcher) -> bool:
+        names = [req.pkg.name for req in requirements.to_upgrade]
+
+        if not names:
+            return True
 
-    def upgrade(self, requirements: UpgradeRequirements, root_password: str, watcher: ProcessWatcher) -> SystemProcess:
-        raise Exception("'update' is not supported by {}".format(pkg.__class__.__name__))
+        self.logger.info("Refreshing {} snaps in a single change: {}".format(len(names), ', '.join(names)))
+        return self._run_change(snap.refresh(names, root_password), root_password, watcher)[0]
 
     def uninstall(self, pkg: SnapApplication, root_password: str, watcher: ProcessWatcher) -> bool:
-        uninstalled = ProcessHandler(watcher).handle(SystemProcess(subproc=snap.uninstall_and_stream(pkg.name, root_password)))
+        uninstalled = self._run_change(snap.uninstall(pkg.name, root_password), root_password, watcher)[0]
 
         if self.suggestions_cache:
             self.suggestions_cache.delete(pkg.name)
@@ -157,30 +268,46 @@ class SnapManager(SoftwareManager):
         self.api_cache.delete(pkg.id)
 
     def get_info(self, pkg: SnapApplication) -> dict:
-        info = snap.get_info(pkg.name, attrs=('license', 'contact', 'commands', 'snap-id', 'tracking', 'installed'))
-        info['description'] = pkg.description
-        info['publisher'] = pkg.publisher
-        info['revision'] = pkg.rev
-        info['name'] = pkg.name
+        info = {'description': pkg.description, 'publisher': pkg.publisher, 'revision': pkg.rev, 'name': pkg.name}
+
+        try:
+            snap_info = self.snapd.get_snap(pkg.name) if pkg.installed else None
+        except SNAPD_ERRORS:
+            self.logger.error("Could not read the snap '{}' information through snapd".format(pkg.name))
+            traceback.print_exc()
+            snap_info = None
+
+        if snap_info:
+            info['snap-id'] = snap_info.id
+            info['tracking'] = snap_info.tracking_channel
+            info['version'] = snap_info.version
+
+            if snap_info.contact:
+                info['contact'] = snap_info.contact
 
-        if info.get('commands'):
-            info['commands'] = ' '.join(info['commands'])
+            if snap_info.apps:
+                info['commands'] = ' '.join(snap_info.apps)
 
-        if info.get('license') and info['license'] == 'unset':
-            del info['license']
+            if snap_info.installed_size:
+                info['size'] = get_human_size_str(snap_info.installed_size)
+
+            if snap_info.license and snap_info.license != 'unset':
+                info['license'] = snap_info.license
 
         return info
 
     def get_history(self, pkg: SnapApplication) -> PackageHistory:
         raise Exception("'get_history' is not supported by {}".format(pkg.__class__.__name__))
 
-    def install(self, pkg: SnapApplication, root_password: str, watcher: ProcessWatcher) -> bool:
-        info_path = self.get_info_path()
-
-        if not info_path:
-            self.logger.warning('Information directory was not found. It will not be possible to determine if the installed application can be launched')
+    def _fill_apps_field(self, pkg: SnapApplication):
+        try:
+            installed = self.snapd.get_snap(pkg.name)
+            pkg.has_apps_field = bool(installed.apps) if installed else None
+        except SNAPD_ERRORS:
+            self.logger.warning("Could not read the '{}' apps through snapd".format(pkg.name))
 
-        res, output = ProcessHandler(watcher).handle_simple(snap.install_and_stream(pkg.name, pkg.confinement, root_password))
+    def install(self, pkg: SnapApplication, root_password: str, watcher: ProcessWatcher) -> bool:
+        res, output = self._run_change(snap.install(pkg.name, pkg.confinement, root_password), root_password, watcher)
 
         if 'error:' in output:
             res = False
@@ -199,17 +326,16 @@ class SnapManager(SoftwareManager):
                                                     confirmation_label=self.i18n['continue'],
                                                     deny_label=self.i18n['cancel']):
                         self.logger.info("Installing '{}' with the custom command '{}'".format(pkg.name, channel_select.value))
-                        res = ProcessHandler(watcher).handle(SystemProcess(new_root_subprocess(channel_select.value.value.split(' '), root_password=root_password)))
+                        res = self._run_change(SimpleProcess([*channel_select.value.value.split(' '), '--no-wait'], root_password=root_password), root_password, watcher)[0]
 
-                        if res and info_path:
-                            pkg.has_apps_field = snap.has_apps_field(pkg.name, info_path)
+                        if res:
+                            self._fill_apps_field(pkg)
 
                         return res
                 else:
                     self.logger.error("Could not find available channels in the installation output: {}".format(output))
-        else:
-            if info_path:
-                pkg.has_apps_field = snap.has_apps_field(pkg.name, info_path)
+        elif res:
+            self._fill_apps_field(pkg)
 
         return res
 
@@ -226,7 +352,7 @@ class SnapManager(SoftwareManager):
         return action not in ('search', 'prepare')
 
     def refresh(self, pkg: SnapApplication, root_password: str, watcher: ProcessWatcher) -> bool:
-        return ProcessHandler(watcher).handle(SystemProcess(subproc=snap.refresh_and_stream(pkg.name, root_password)))
+        return self._run_change(snap.refresh([pkg.name], root_password), root_password, watcher)[0]
 
     def _start_category_task(self, task_man: TaskManager):
         task_man.register_task('snap_cats', self.i18n['task.download_categories'].format('Snap'), get_icon_path())
@@ -244,41 +370,36 @@ class SnapManager(SoftwareManager):
                              after=lambda: self._finish_category_task(task_manager)).start()
 
     def list_updates(self, internet_available: bool) -> List[PackageUpdate]:
-        pass
+        if not internet_available or not self.snapd.is_available():
+            return []
+
+        return [PackageUpdate(pkg_id=s.name, version=s.version, pkg_type='snap', name=s.name)
+                for s in self._read_refreshable().values()]
 
     def list_warnings(self, internet_available: bool) -> List[str]:
         if snap.is_installed():
-            if not snap.is_snapd_running():
+            if not self.snapd.is_available():
                 snap_bold = bold('Snap')
                 return [self.i18n['snap.notification.snapd_unavailable'].format(bold('snapd'), snap_bold),
                         self.i18n['snap.notification.snap.disable'].format(snap_bold, bold('{} > {}'.format(self.i18n['settings'].capitalize(),
                                                                                                             self.i18n['core.config.tab.types'])))]
 
             elif internet_available:
-                available, output = snap.is_api_available()
+                try:
+                    self.snapd.find(name='snapd')
+                    available = True
+                except SnapdError as e:
+                    available = False
+                    output = e.message
 
                 if not available:
                     self.logger.warning('It seems Snap API is not available. Search output: {}'.format(output))
                     return [self.i18n['snap.notifications.api.unavailable'].format(bold('Snaps'), bold('Snap'))]
 
-    def _fill_suggestion(self, pkg_name: str, priority: SuggestionPriority, out: List[PackageSuggestion]):
-        res = self.http_client.get_json(SNAP_API_URL + '/search?q=package_name:{}'.format(pkg_name))
-
-        if res and res['_embedded']['clickindex:package']:
-            pkg = res['_embedded']['clickindex:package'][0]
-            pkg['rev'] = pkg['revision']
-            pkg['name'] = pkg_name
-
-            sug = PackageSuggestion(self.map_json(pkg, installed=False, disk_loader=None), priority)
-            self.suggestions_cache.add(pkg_name, sug)
-            out.append(sug)
-        else:
-            self.logger.warning("Could not retrieve suggestion '{}'".format(pkg_name))
-
     def list_suggestions(self, limit: int, filter_installed: bool) -> List[PackageSuggestion]:
         res = []
 
-        if snap.is_snapd_running():
+        if self.snapd.is_available():
             self.logger.info('Downloading suggestions file {}'.format(SUGGESTIONS_FILE))
             file = self.http_client.get(SUGGESTIONS_FILE)
 
@@ -288,12 +409,12 @@ class SnapManager(SoftwareManager):
             else:
                 self.logger.info('Mapping suggestions')
 
-                suggestions, threads = [], []
+                to_read = {}  # name -> priority
                 installed = {i.name.lower() for i in self.read_installed(disk_loader=None).installed} if filter_installed else None
 
                 for l in file.text.split('\n'):
                     if l:
-                        if limit <= 0 or len(suggestions) < limit:
+                        if limit <= 0 or len(res) + len(to_read) < limit:
                             sug = l.strip().split('=')
                             name = sug[1]
 
@@ -303,15 +424,20 @@ class SnapManager(SoftwareManager):
                                 if cached_sug:
                                     res.append(cached_sug)
                                 else:
-                                    t = Thread(target=self._fill_suggestion, args=(name, SuggestionPriority(int(sug[0])), res))
-                                    t.start()
-                                    threads.append(t)
-                                    time.sleep(0.001)  # to avoid being blocked
+                                    to_read[name] = SuggestionPriority(int(sug[0]))
                         else:
                             break
 
-                for t in threads:
-                    t.join()
+                if to_read:
+                    metadata = self.metadata_reader.read(to_read)
+
+                    for name, priority in to_read.items():
+                        if name in metadata:
+                            sug = PackageSuggestion(self.map_json(metadata[name], installed=False, disk_loader=None), priority)
+                            self.suggestions_cache.add(name, sug)
+                            res.append(sug)
+                        else:
+                            self.logger.warning("Could not retrieve suggestion '{}'".format(name))
 
                 res.sort(key=lambda s: s.priority.value, reverse=True)
         return res
@@ -320,22 +446,23 @@ class SnapManager(SoftwareManager):
         return True
 
     def launch(self, pkg: SnapApplication):
-        snap.run(pkg, self.context.logger)
+        try:
+            installed = self.snapd.get_snap(pkg.name)
+        except SNAPD_ERRORS:
+            self.logger.error("Could not read the '{}' commands through snapd".format(pkg.name))
+            traceback.print_exc()
+            installed = None
 
-    def get_screenshots(self, pkg: SoftwarePackage) -> List[str]:
-        res = self.http_client.get_json('{}/search?q={}'.format(SNAP_API_URL, pkg.name))
+        snap.run(pkg, installed.apps if installed else None, self.context.logger)
 
-        if res:
-            if res.get('_embedded') and res['_embedded'].get('clickindex:package'):
-                snap_data = res['_embedded']['clickindex:package'][0]
+    def get_screenshots(self, pkg: SoftwarePackage) -> List[str]:
+        metadata = self.metadata_reader.read([pkg.name]).get(pkg.name)
 
-                if snap_data.get('screenshot_urls'):
-                    return snap_data['screenshot_urls']
-                else:
-                    self.logger.warning("No 'screenshots_urls' defined for {}".format(pkg))
-            else:
-                self.logger.error('It seems the API is returning a different response: {}'.format(res))
-        else:
+        if not metadata:
             self.logger.warning('Could not retrieve data for {}'.format(pkg))
+            return []
+
+        if not metadata.get('screenshots'):
+            self.logger.warning("No screenshots defined for {}".format(pkg))
 
-        return []
+        return metadata.get('screenshots') or []
@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import time
+import traceback
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, Dict, Optional, Callable
+
+from bauh.commons.search import stream_results
+from bauh.gems.snap import METADATA_FILE
+from bauh.gems.snap.snapd import SnapdClient, Snap, SNAPD_ERRORS
+
+
+class SnapMetadataReader:
+    """
+    Keeps the store metadata (description, confinement, icon, screenshots, ...) of each snap cached on disk for a period.
+    The metadata is taken from the snapd responses that already describe several snaps at once (e.g: searches) and only
+    the snaps missing (or expired) are requested to the store through snapd (concurrently).
+    """
+
+    def __init__(self, logger: logging.Logger, snapd: SnapdClient, cache_file: str = METADATA_FILE,
+                 expiration: int = 60 * 60 * 24, max_requests: int = 8):
+        """
+        :param expiration: seconds the metadata of a snap is kept
+        :param max_requests: maximum number of concurrent store requests
+        """
+        self.logger = logger
+        self.snapd = snapd
+        self.cache_file = cache_file
+        self.expiration = expiration
+        self.max_requests = max_requests
+        self._cache = None  # name -> metadata
+        self._lock = Lock()
+
+    @staticmethod
+    def to_metadata(snap: Snap) -> dict:
+        return {'name': snap.name,
+                'version': snap.version,
+                'rev': snap.revision,
+                'publisher': snap.publisher,
+                'developer_validation': 'verified' if snap.verified_publisher else None,
+                'summary': snap.summary,
+                'description': snap.description,
+                'confinement': snap.confinement,
+                'icon_url': snap.icon_url,
+                'screenshots': snap.screenshots}
+
+    def _load(self):
+        if self._cache is None:
+            self._cache = {}
+
+            if os.path.exists(self.cache_file):
+                try:
+                    with open(self.cache_file) as f:
+                        cached = json.loads(f.read())
+
+                    now = time.time()
+                    self._cache = {name: data for name, data in cached.items() if data.get('expires_at', 0) > now}
+                except:
+                    self.logger.warning("Could not read the cached Snap metadata from '{}'".format(self.cache_file))
+                    traceback.print_exc()
+
+    def _save(self):
+        try:
+            Path(os.path.dirname(self.cache_file)).mkdir(parents=True, exist_ok=True)
+
+            with open(self.cache_file, 'w+') as f:
+                f.write(json.dumps(self._cache))
+        except:
+            self.logger.error("Could not write the Snap metadata cache file '{}'".format(self.cache_file))
+            traceback.print_exc()
+
+    def _add(self, snap: Snap):
+        data = self.to_metadata(snap)
+        data['expires_at'] = time.time() + self.expiration
+        self._cache[snap.name] = data
+
+    def update(self, snaps: Iterable[Snap]):
+        """
+        Caches the metadata of store snaps already read (e.g: search results). The installed snaps returned by
+        '/v2/snaps' should not be given since their data comes from the local snap.yaml (no media).
+        """
+        with self._lock:
+            self._load()
+
+            added = False
+            for snap in snaps:
+                self._add(snap)
+                added = True
+
+            if added:
+                self._save()
+
+    def get(self, name: str) -> Optional[dict]:
+        """
+        :return: the cached metadata (without requesting the store)
+        """
+        with self._lock:
+            self._load()
+            data = self._cache.get(name)
+
+            if data and data['expires_at'] > time.time():
+                return data
+
+    def _gen_find(self, name: str) -> Callable[[], Optional[Snap]]:
+        def _find() -> Optional[Snap]:
+            try:
+                found = self.snapd.find(name=name)
+            except SNAPD_ERRORS:
+                self.logger.warning("Could not read the store metadata of '{}' through snapd".format(name))
+                raise
+
+            return found[0] if found else None
+
+        return _find
+
+    def read(self, names: Iterable[str]) -> Dict[str, dict]:
+        """
+        :return: the metadata of the given snaps. Only those not cached (or expired) are requested to the store.
+        """
+        res, missing = {}, []
+
+        with self._lock:
+            self._load()
+            now = time.time()
+
+            for name in names:
+                data = self._cache.get(name)
+
+                if data and data['expires_at'] > now:
+                    res[name] = data
+                elif name not in missing:
+                    missing.append(name)
+
+        if missing:
+            read = []
+            for idx in range(0, len(missing), self.max_requests):
+                calls = {name: self._gen_find(name) for name in missing[idx:idx + self.max_requests]}
+                found = dict(stream_results(calls))
+
+                for name in calls:
+                    if found.get(name):
+                        read.append(found[name])
+                    elif name in found:
+                        self.logger.warning("No store metadata found for '{}'".format(name))
+
+            if read:
+                with self._lock:
+                    for snap in read:
+                        self._add(snap)
+                        res[snap.name] = self._cache[snap.name]
+
+                    self._save()
+
+            self.logger.info("Snap metadata: {} cached, {} read from the store".format(len(res) - len(read), len(read)))
+
+        return res
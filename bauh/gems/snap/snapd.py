@@ -0,0 +1,353 @@
+import http.client
+import json
+import logging
+import socket
+import time
+from threading import Lock
+from typing import List, Optional, Callable
+from urllib.parse import urlencode, quote
+
+from bauh.commons import capability
+
+SNAPD_SOCKET = '/run/snapd.socket'
+
+
+class SnapdError(Exception):
+
+    def __init__(self, message: str, kind: str = None, status_code: int = None):
+        super(SnapdError, self).__init__(message)
+        self.message = message
+        self.kind = kind
+        self.status_code = status_code
+
+
+SNAPD_ERRORS = (OSError, http.client.HTTPException, SnapdError)  # errors raised when snapd cannot be reached or fails
+
+
+class Snap:
+
+    def __init__(self, id: str, name: str, version: str, revision: str, summary: str = None, description: str = None,
+                 publisher: str = None, verified_publisher: bool = False, confinement: str = None,
+                 type: str = 'app', status: str = None, channel: str = None, tracking_channel: str = None,
+                 apps: List[str] = None, license: str = None, contact: str = None, icon_url: str = None,
+                 screenshots: List[str] = None, installed_size: int = None, download_size: int = None,
+                 devmode: bool = False):
+        self.id = id
+        self.name = name
+        self.version = version
+        self.revision = revision
+        self.summary = summary
+        self.description = description
+        self.publisher = publisher
+        self.verified_publisher = verified_publisher
+        self.confinement = confinement
+        self.type = type
+        self.status = status
+        self.channel = channel
+        self.tracking_channel = tracking_channel
+        self.apps = apps
+        self.license = license
+        self.contact = contact
+        self.icon_url = icon_url
+        self.screenshots = screenshots
+        self.installed_size = installed_size
+        self.download_size = download_size
+        self.devmode = devmode
+
+    def is_installed(self) -> bool:
+        return self.status in ('installed', 'active')
+
+    def get_notes(self) -> Optional[str]:
+        """
+        :return: the same notes displayed by 'snap list'
+        """
+        notes = []
+
+        if self.type in ('base', 'core', 'os', 'snapd', 'gadget', 'kernel'):
+            notes.append('core' if self.type == 'os' else self.type)
+
+        if self.confinement == 'classic':
+            notes.append('classic')
+
+        if self.devmode:
+            notes.append('devmode')
+
+        if self.status == 'installed':  # installed but not active
+            notes.append('disabled')
+
+        return ','.join(notes) if notes else None
+
+    def to_json(self) -> dict:
+        """
+        :return: the snap fields used to map a SnapApplication
+        """
+        return {'name': self.name,
+                'version': self.version,
+                'rev': self.revision,
+                'tracking': self.tracking_channel,
+                'publisher': self.publisher,
+                'developer_validation': 'verified' if self.verified_publisher else None,
+                'notes': self.get_notes(),
+                'summary': self.summary,
+                'type': self.type,
+                'apps_field': bool(self.apps)}
+
+
+class ChangeTask:
+
+    def __init__(self, kind: str, summary: str, status: str, progress_done: int = 0, progress_total: int = 1):
+        self.kind = kind
+        self.summary = summary
+        self.status = status
+        self.progress_done = progress_done
+        self.progress_total = progress_total
+
+
+class Change:
+
+    def __init__(self, id: str, kind: str, summary: str, status: str, ready: bool, err: str = None,
+                 tasks: List[ChangeTask] = None):
+        self.id = id
+        self.kind = kind
+        self.summary = summary
+        self.status = status
+        self.ready = ready
+        self.err = err
+        self.tasks = tasks if tasks else []
+
+    def is_successful(self) -> bool:
+        return self.ready and self.status == 'Done'
+
+    def get_current_task(self) -> Optional[ChangeTask]:
+        for task in self.tasks:
+            if task.status == 'Doing':
+                return task
+
+    def get_progress(self) -> int:
+        """
+        :return: the change progress (0-100) considering the finished tasks and the progress of the running ones
+        """
+        if not self.tasks:
+            return 100 if self.ready else 0
+
+        done = 0.0
+        for task in self.tasks:
+            if task.status in ('Done', 'Undone', 'Hold', 'Error'):
+                done += 1
+            elif task.status == 'Doing' and task.progress_total:
+                done += min(task.progress_done / task.progress_total, 1)
+
+        return int(done / len(self.tasks) * 100)
+
+
+def map_snap(snap_json: dict) -> Snap:
+    publisher = snap_json.get('publisher') or {}
+    icon_url, screenshots = None, []
+
+    for media in snap_json.get('media') or ():
+        if media.get('type') == 'icon' and not icon_url:
+            icon_url = media.get('url')
+        elif media.get('type') == 'screenshot' and media.get('url'):
+            screenshots.append(media['url'])
+
+    if not icon_url and snap_json.get('icon') and snap_json['icon'].startswith('http'):
+        icon_url = snap_json['icon']
+
+    return Snap(id=snap_json.get('id'),
+                name=snap_json['name'],
+                version=snap_json.get('version'),
+                revision=snap_json.get('revision'),
+                summary=snap_json.get('summary'),
+                description=snap_json.get('description'),
+                publisher=publisher.get('username', snap_json.get('developer')),
+                verified_publisher=publisher.get('validation') == 'verified',
+                confinement=snap_json.get('confinement'),
+                type=snap_json.get('type', 'app'),
+                status=snap_json.get('status'),
+                channel=snap_json.get('channel'),
+                tracking_channel=snap_json.get('tracking-channel'),
+                apps=[a['name'] for a in snap_json.get('apps') or () if a.get('name')],
+                license=snap_json.get('license'),
+                contact=snap_json.get('contact'),
+                icon_url=icon_url,
+                screenshots=screenshots,
+                installed_size=snap_json.get('installed-size'),
+                download_size=snap_json.get('download-size'),
+                devmode=bool(snap_json.get('devmode')))
+
+
+def map_change(change_json: dict) -> Change:
+    tasks = []
+    for task in change_json.get('tasks') or ():
+        progress = task.get('progress') or {}
+        tasks.append(ChangeTask(kind=task.get('kind'), summary=task.get('summary'), status=task.get('status'),
+                                progress_done=progress.get('done', 0), progress_total=progress.get('total', 1)))
+
+    return Change(id=change_json['id'], kind=change_json.get('kind'), summary=change_json.get('summary'),
+                  status=change_json.get('status'), ready=bool(change_json.get('ready')),
+                  err=change_json.get('err'), tasks=tasks)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, socket_path: str, timeout: float):
+        super(UnixHTTPConnection, self).__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class SnapdClient:
+    """
+    Client for snapd's REST API (JSON over its Unix socket). The connections are kept open and reused by the next
+    requests, so concurrent requests (e.g: store lookups) do not wait for each other.
+    """
+
+    def __init__(self, logger: logging.Logger, socket_path: str = SNAPD_SOCKET, timeout: float = 30):
+        self.logger = logger
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._idle = []  # idle connections
+        self._lock = Lock()
+
+    def _acquire_connection(self) -> UnixHTTPConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+
+        return UnixHTTPConnection(self.socket_path, self.timeout)
+
+    def _release_connection(self, conn: UnixHTTPConnection):
+        with self._lock:
+            self._idle.append(conn)
+
+    def close(self):
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+
+            self._idle.clear()
+
+    def _request(self, method: str, path: str, params: dict = None, body: dict = None) -> dict:
+        url = '{}?{}'.format(path, urlencode(params)) if params else path
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Accept': 'application/json'}
+
+        if payload is not None:
+            headers['Content-Type'] = 'application/json'
+
+        for attempt in range(2):  # an idle connection may have been closed by snapd
+            conn = self._acquire_connection()
+
+            try:
+                conn.request(method, url, body=payload, headers=headers)
+                res = conn.getresponse()
+                content = res.read()
+            except (http.client.HTTPException, ConnectionError, BrokenPipeError):
+                conn.close()
+
+                if attempt == 1 or method != 'GET':
+                    raise
+
+                continue
+            except:
+                conn.close()
+                raise
+
+            self._release_connection(conn)
+            break
+
+        try:
+            res_json = json.loads(content.decode())
+        except ValueError:
+            raise SnapdError("Unexpected snapd response for '{}': {}".format(url, content), status_code=res.status)
+
+        if res_json.get('type') == 'error':
+            result = res_json.get('result') or {}
+            raise SnapdError(message=result.get('message', ''), kind=result.get('kind'),
+                             status_code=res_json.get('status-code', res.status))
+
+        return res_json
+
+    def is_available(self) -> bool:
+        return capability.is_socket_available(self.socket_path)
+
+    def list_snaps(self) -> List[Snap]:
+        return [map_snap(s) for s in self._request('GET', '/v2/snaps')['result'] or ()]
+
+    def get_snap(self, name: str) -> Optional[Snap]:
+        """
+        :return: the installed snap or None if it is not installed
+        """
+        try:
+            return map_snap(self._request('GET', '/v2/snaps/{}'.format(quote(name)))['result'])
+        except SnapdError as e:
+            if e.status_code == 404:
+                return
+
+            raise
+
+    def find(self, query: str = None, name: str = None, select: str = None) -> List[Snap]:
+        """
+        Searches the store
+        :param query: search terms
+        :param name: an exact snap name
+        :param select: 'refresh' returns the installed snaps with updates available (in a single store request)
+        """
+        if name:
+            params = {'name': name}
+        elif query:
+            params = {'q': query}
+        else:
+            params = {}
+
+        if select:
+            params['select'] = select
+
+        try:
+            return [map_snap(s) for s in self._request('GET', '/v2/find', params=params)['result'] or ()]
+        except SnapdError as e:
+            if e.status_code == 404 or e.kind == 'snap-not-found':
+                return []
+
+            raise
+
+    def get_change(self, change_id: str) -> Change:
+        return map_change(self._request('GET', '/v2/changes/{}'.format(quote(change_id)))['result'])
+
+    def wait_change(self, change_id: str, on_progress: Callable[[Change], None] = None, interval: float = 0.5,
+                    timeout: float = 3600, on_timeout: Callable[[Change], bool] = None) -> Change:
+        """
+        Polls the change until it is ready. If it is not ready after 'timeout' seconds, 'on_timeout' is called to
+        abort it (aborting requires root privileges, so it cannot be done through this client). Without 'on_timeout',
+        it waits until the change is ready.
+        :param on_timeout: aborts the change and returns if it succeeded. If the abort fails, the change is followed
+        for another 'timeout' seconds before trying again.
+        :raises SnapdError: (kind 'change-timeout') once the change is aborted
+        """
+        deadline = time.time() + timeout
+
+        while True:
+            change = self.get_change(change_id)
+
+            if on_progress:
+                on_progress(change)
+
+            if change.ready:
+                return change
+
+            if on_timeout and time.time() >= deadline:
+                self.logger.warning("snapd change '{}' not ready after {} seconds. Aborting it".format(change_id, timeout))
+
+                if on_timeout(change):
+                    raise SnapdError("snapd change '{}' aborted after {} seconds".format(change_id, timeout),
+                                     kind='change-timeout')
+
+                self.logger.error("Could not abort the snapd change '{}'. Still following it".format(change_id))
+                deadline = time.time() + timeout
+
+            time.sleep(interval)
@@ -1,65 +1,66 @@
 import traceback
-from threading import Thread
+from typing import List
 
 from bauh.api.abstract.cache import MemoryCache
 from bauh.api.abstract.context import ApplicationContext
 from bauh.api.abstract.controller import SoftwareManager
 from bauh.api.abstract.model import PackageStatus
-from bauh.gems.snap import snap
-from bauh.gems.snap.constants import SNAP_API_URL
 from bauh.gems.snap.model import SnapApplication
 
 
-class SnapAsyncDataLoader(Thread):
+class SnapAsyncDataLoader:
 
     def __init__(self, app: SnapApplication, manager: SoftwareManager, api_cache: MemoryCache,
                  context: ApplicationContext):
-        super(SnapAsyncDataLoader, self).__init__(daemon=True)
         self.app = app
         self.id_ = '{}#{}'.format(self.__class__.__name__, id(self))
         self.manager = manager
-        self.http_client = context.http_client
         self.api_cache = api_cache
         self.persist = False
         self.download_icons = context.download_icons
         self.logger = context.logger
 
-    def run(self):
-        if self.app:
-            self.app.status = PackageStatus.LOADING_DATA
-
-            try:
-                res = self.http_client.session.get('{}/search?q={}'.format(SNAP_API_URL, self.app.name))
-
-                if res:
-                    try:
-                        snap_list = res.json()['_embedded']['clickindex:package']
-                    except:
-                        self.logger.warning('Snap API response responded differently from expected for app: {}'.format(self.app.name))
-                        return
+    def load(self, apps: List[SnapApplication]):
+        """
+        Loads the data of the loader app and fills the other given instances of the same app with it
+        """
+        self._load_app()
 
-                    if not snap_list:
-                        self.logger.warning("Could not retrieve app data for id '{}'. Server response: {}. Body: {}".format(self.app.id, res.status_code, res.content.decode()))
-                    else:
-                        snap_data = snap_list[0]
+        data = self.app.get_data_to_cache()
+        for app in apps:
+            if app is not self.app:
+                app.fill_cached_data(data)
+                app.status = PackageStatus.READY
 
-                        api_data = {
-                            'confinement': snap_data.get('confinement'),
-                            'description': snap_data.get('description'),
-                            'icon_url': snap_data.get('icon_url') if self.download_icons else None
-                        }
+    @staticmethod
+    def cancel(apps: List[SnapApplication]):
+        """
+        Restores the given instances whose loading was cancelled
+        """
+        for app in apps:
+            app.status = PackageStatus.READY
 
-                        self.api_cache.add(self.app.id, api_data)
-                        self.app.confinement = api_data['confinement']
-                        self.app.icon_url = api_data['icon_url']
+    def _load_app(self):
+        if self.app:
+            self.app.status = PackageStatus.LOADING_DATA
 
-                        if not api_data.get('description'):
-                            api_data['description'] = snap.get_info(self.app.name, ('description',)).get('description')
+            try:
+                metadata = self.manager.metadata_reader.read([self.app.name]).get(self.app.name)
 
-                        self.app.description = api_data['description']
-                        self.persist = self.app.supports_disk_cache()
+                if not metadata:
+                    self.logger.warning("Could not retrieve app data for id '{}'".format(self.app.id))
                 else:
-                    self.logger.warning("Could not retrieve app data for id '{}'. Server response: {}. Body: {}".format(self.app.id, res.status_code, res.content.decode()))
+                    api_data = {
+                        'confinement': metadata.get('confinement'),
+                        'description': metadata.get('description') or metadata.get('summary'),
+                        'icon_url': metadata.get('icon_url') if self.download_icons else None
+                    }
+
+                    self.api_cache.add(self.app.id, api_data)
+                    self.app.confinement = api_data['confinement']
+                    self.app.icon_url = api_data['icon_url']
+                    self.app.description = api_data['description']
+                    self.persist = self.app.supports_disk_cache()
             except:
                 self.logger.error("Could not retrieve app data for id '{}'".format(self.app.id))
                 traceback.print_exc()
@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 
-from bauh.api.constants import DESKTOP_ENTRIES_DIR, CONFIG_PATH, TEMP_DIR
+from bauh.api.constants import DESKTOP_ENTRIES_DIR, CONFIG_PATH, TEMP_DIR, CACHE_PATH
 from bauh.commons import user, resource
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -9,6 +9,7 @@ WEB_PATH = '{}/.local/share/bauh/web'.format(Path.home())
 INSTALLED_PATH = '{}/installed'.format(WEB_PATH)
 ENV_PATH = '{}/env'.format(WEB_PATH)
 FIXES_PATH = '{}/fixes'.format(WEB_PATH)
+RUNTIMES_PATH = '{}/runtimes'.format(WEB_PATH)
 NODE_DIR_PATH = '{}/node'.format(ENV_PATH)
 NODE_PATHS = {NODE_DIR_PATH + '/bin'}
 NODE_BIN_PATH = '{}/bin/node'.format(NODE_DIR_PATH)
@@ -24,8 +25,8 @@ URL_FIX_PATTERN = "https://raw.githubusercontent.com/vinifmor/bauh-files/master/
 URL_SUGGESTIONS = "https://raw.githubusercontent.com/vinifmor/bauh-files/master/web/suggestions.yml"
 UA_CHROME = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/51.0.2704.103 Safari/537.36'
 TEMP_PATH = '{}/web'.format(TEMP_DIR)
-SEARCH_INDEX_FILE = '{}/index.yml'.format(TEMP_PATH)
-SUGGESTIONS_CACHE_FILE = '{}/suggestions.txt'.format(TEMP_PATH)
+SEARCH_INDEX_FILE = '{}/search_index.json'.format(TEMP_PATH)
+PAGES_CACHE_FILE = '{}/web/pages.json'.format(CACHE_PATH)
 CONFIG_FILE = '{}/web.yml'.format(CONFIG_PATH)
 URL_NATIVEFIER = 'https://github.com/jiahaog/nativefier/archive/v{version}.tar.gz'
 
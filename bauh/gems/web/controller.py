@@ -11,10 +11,8 @@ from pathlib import Path
 from threading import Thread
 from typing import List, Type, Set, Tuple
 
-import requests
 import yaml
 from colorama import Fore
-from requests import exceptions, Response
 
 from bauh.api.abstract.context import ApplicationContext
 from bauh.api.abstract.controller import SoftwareManager, SearchResult, UpgradeRequirements
@@ -31,25 +29,15 @@ from bauh.commons.config import save_config
 from bauh.commons.html import bold
 from bauh.commons.system import ProcessHandler, get_dir_size, get_human_size_str, SimpleProcess
 from bauh.gems.web import INSTALLED_PATH, nativefier, DESKTOP_ENTRY_PATH_PATTERN, URL_FIX_PATTERN, ENV_PATH, UA_CHROME, \
-    SEARCH_INDEX_FILE, SUGGESTIONS_CACHE_FILE, ROOT_DIR, CONFIG_FILE, TEMP_PATH, FIXES_PATH, ELECTRON_PATH
+    ROOT_DIR, CONFIG_FILE, TEMP_PATH, FIXES_PATH, ELECTRON_PATH
 from bauh.gems.web.config import read_config
 from bauh.gems.web.environment import EnvironmentUpdater, EnvironmentComponent
 from bauh.gems.web.model import WebApplication
+from bauh.gems.web.page import PageMetadataReader, PageMetadata
+from bauh.gems.web.runtime import RuntimeStore
+from bauh.gems.web.search import SearchIndexReader
 from bauh.gems.web.worker import SuggestionsDownloader, SearchIndexGenerator
 
-try:
-    from bs4 import BeautifulSoup, SoupStrainer
-    BS4_AVAILABLE = True
-except:
-    BS4_AVAILABLE = False
-
-
-try:
-    import lxml
-    LXML_AVAILABLE = True
-except:
-    LXML_AVAILABLE = False
-
 RE_PROTOCOL_STRIP = re.compile(r'[a-zA-Z]+://')
 RE_SEVERAL_SPACES = re.compile(r'\s+')
 RE_SYMBOLS_SPLIT = re.compile(r'[\-|_\s:.]')
@@ -60,8 +48,10 @@ class WebApplicationManager(SoftwareManager):
     def __init__(self, context: ApplicationContext, suggestions_downloader: Thread = None):
         super(WebApplicationManager, self).__init__(context=context)
         self.http_client = context.http_client
+        self.runtime_store = RuntimeStore(logger=context.logger)
         self.env_updater = EnvironmentUpdater(logger=context.logger, http_client=context.http_client,
-                                              file_downloader=context.file_downloader, i18n=context.i18n)
+                                              file_downloader=context.file_downloader, i18n=context.i18n,
+                                              runtime_store=self.runtime_store)
         self.enabled = True
         self.i18n = context.i18n
         self.env_settings = {}
@@ -69,6 +59,9 @@ class WebApplicationManager(SoftwareManager):
         self.env_thread = None
         self.suggestions_downloader = suggestions_downloader
         self.suggestions = {}
+        self.search_index = SearchIndexReader(logger=context.logger)
+        self.page_reader = PageMetadataReader(session=context.http_client.session, logger=context.logger,
+                                              timeout=context.http_client.timeout)
         self.custom_actions = [CustomSoftwareAction(i18_label_key='web.custom_action.clean_env',
                                                     i18n_status_key='web.custom_action.clean_env.status',
                                                     manager=self,
@@ -112,13 +105,11 @@ class WebApplicationManager(SoftwareManager):
 
         return success
 
-    def _get_app_name(self, url_no_protocol: str, soup: "BeautifulSoup") -> str:
-        name_tag = soup.head.find('meta', attrs={'name': 'application-name'})
-        name = name_tag.get('content') if name_tag else None
+    def _get_app_name(self, url_no_protocol: str, page: PageMetadata) -> str:
+        name = page.app_name
 
         if not name:
-            name_tag = soup.head.find('title')
-            name = name_tag.text.strip() if name_tag else None
+            name = page.title
 
         if not name:
             name = url_no_protocol.split('.')[0].strip()
@@ -133,12 +124,9 @@ class WebApplicationManager(SoftwareManager):
 
         return name
 
-    def _get_app_icon_url(self, url: str, soup: "BeautifulSoup") -> str:
-        for rel in ('icon', 'ICON'):
-            icon_tag = soup.head.find('link', attrs={"rel": rel})
-            icon_url = icon_tag.get('href') if icon_tag else None
-
-            if icon_url and not icon_url.startswith('http'):
+    def _get_app_icon_url(self, url: str, page: PageMetadata) -> str:
+        for icon_url in page.icons:
+            if not icon_url.startswith('http'):
                 if icon_url.startswith('//'):
                     icon_url = 'https:{}'.format(icon_url)
                 elif icon_url.startswith('/'):
@@ -146,26 +134,15 @@ class WebApplicationManager(SoftwareManager):
                 else:
                     icon_url = url + '/{}'.format(icon_url)
 
-            if icon_url:
-                return icon_url
-
-        if not icon_url:
-            icon_tag = soup.head.find('meta', attrs={"property": 'og:image'})
-            icon_url = icon_tag.get('content') if icon_tag else None
-
-            if icon_url:
-                return icon_url
+            return icon_url
 
-    def _get_app_description(self, url: str,  soup: "BeautifulSoup") -> str:
-        description = None
-        desc_tag = soup.head.find('meta', attrs={'name': 'description'})
+        return page.og_image
 
-        if desc_tag:
-            description = desc_tag.get('content')
+    def _get_app_description(self, url: str, page: PageMetadata) -> str:
+        description = page.description
 
         if not description:
-            desc_tag = soup.find('title')
-            description = desc_tag.text if desc_tag else url
+            description = page.title if page.title else url
 
         if description:
             try:
@@ -192,17 +169,8 @@ class WebApplicationManager(SoftwareManager):
     def serialize_to_disk(self, pkg: SoftwarePackage, icon_bytes: bytes, only_icon: bool):
         super(WebApplicationManager, self).serialize_to_disk(pkg=pkg, icon_bytes=None, only_icon=False)
 
-    def _request_url(self, url: str) -> Response:
-        headers = {'Accept-language': self._get_lang_header(), 'User-Agent': UA_CHROME}
-
-        try:
-            return self.http_client.get(url, headers=headers, ignore_ssl=True, single_call=True, session=False, allow_redirects=True)
-        except exceptions.ConnectionError as e:
-            self.logger.warning("Could not get {}: {}".format(url, e.__class__.__name__))
-
-    def _map_url(self, url: str) -> Tuple["BeautifulSoup", requests.Response]:
-        url_res = self._request_url(url)
-        return BeautifulSoup(url_res.text, 'lxml', parse_only=SoupStrainer('head')), url_res
+    def _map_url(self, url: str) -> PageMetadata:
+        return self.page_reader.read(url, headers={'Accept-language': self._get_lang_header(), 'User-Agent': UA_CHROME})
 
     def search(self, words: str, disk_loader: DiskCacheLoader, limit: int = -1, is_url: bool = False) -> SearchResult:
         local_config = {}
@@ -223,19 +191,17 @@ class WebApplicationManager(SoftwareManager):
             if installed_matches:
                 res.installed.extend(installed_matches)
             else:
-                soup_map = self._map_url(url)
+                page = self._map_url(url)
 
-                if soup_map:
-                    soup, response = soup_map[0], soup_map[1]
-
-                    final_url = response.url
+                if page:
+                    final_url = page.url
 
                     if final_url.endswith('/'):
                         final_url = final_url[0:-1]
 
-                    name = self._get_app_name(url_no_protocol, soup)
-                    desc = self._get_app_description(final_url, soup)
-                    icon_url = self._get_app_icon_url(final_url, soup)
+                    name = self._get_app_name(url_no_protocol, page)
+                    desc = self._get_app_description(final_url, page)
+                    icon_url = self._get_app_icon_url(final_url, page)
 
                     app = WebApplication(url=final_url, source_url=url, name=name, description=desc, icon_url=icon_url)
 
@@ -248,63 +214,26 @@ class WebApplicationManager(SoftwareManager):
             lower_words = words.lower().strip()
             installed_matches = [app for app in installed if lower_words in app.name.lower()]
 
-            index = self._read_search_index()
-
-            if index:
-                split_words = lower_words.split(' ')
-                singleword = ''.join(lower_words)
+            index = self.search_index.read()
+            matched_suggestions = index.search(lower_words) if index else None
 
-                query_list = [*split_words, singleword]
+            if not matched_suggestions:
+                self.logger.info("Query '{}' was not found in the suggestion's index".format(words))
+                res.installed.extend(installed_matches)
+            elif installed_matches:
+                # checking if any of the installed matches is one of the matched suggestions
+                for sug in matched_suggestions:
+                    sug_url = sug['url'][0:-1] if sug['url'].endswith('/') else sug['url']
 
-                index_match_keys = set()
-                for key in index:
-                    for query in query_list:
-                        if query in key:
-                            index_match_keys.update(index[key])
+                    found = [i for i in installed_matches if sug_url in {i.url, i.get_source_url()}]
 
-                if not index_match_keys:
-                    self.logger.info("Query '{}' was not found in the suggestion's index".format(words))
-                    res.installed.extend(installed_matches)
-                else:
-                    if not os.path.exists(SUGGESTIONS_CACHE_FILE):
-                        # if the suggestions cache was not found, it will not be possible to retrieve the matched apps
-                        # so only the installed matches will be returned
-                        self.logger.warning("Suggestion cached file {} was not found".format(SUGGESTIONS_CACHE_FILE))
-                        res.installed.extend(installed_matches)
+                    if found:
+                        res.installed.extend(found)
                     else:
-                        with open(SUGGESTIONS_CACHE_FILE) as f:
-                            cached_suggestions = yaml.safe_load(f.read())
-
-                        if not cached_suggestions:
-                            # if no suggestion is found, it will not be possible to retrieve the matched apps
-                            # so only the installed matches will be returned
-                            self.logger.warning("No suggestion found in {}".format(SUGGESTIONS_CACHE_FILE))
-                            res.installed.extend(installed_matches)
-                        else:
-                            matched_suggestions = [cached_suggestions[key] for key in index_match_keys if cached_suggestions.get(key)]
-
-                            if not matched_suggestions:
-                                self.logger.warning("No suggestion found for the search index keys: {}".format(index_match_keys))
-                                res.installed.extend(installed_matches)
-                            else:
-                                matched_suggestions.sort(key=lambda s: s.get('priority', 0), reverse=True)
-
-                                if installed_matches:
-                                    # checking if any of the installed matches is one of the matched suggestions
-
-                                    for sug in matched_suggestions:
-                                        sug_url = sug['url'][0:-1] if sug['url'].endswith('/') else sug['url']
-
-                                        found = [i for i in installed_matches if sug_url in {i.url, i.get_source_url()}]
-
-                                        if found:
-                                            res.installed.extend(found)
-                                        else:
-                                            res.new.append(self._map_suggestion(sug).package)
-
-                                else:
-                                    for sug in matched_suggestions:
-                                        res.new.append(self._map_suggestion(sug).package)
+                        res.new.append(self._map_suggestion(sug).package)
+            else:
+                for sug in matched_suggestions:
+                    res.new.append(self._map_suggestion(sug).package)
 
         res.total += len(res.installed)
         res.total += len(res.new)
@@ -319,13 +248,6 @@ class WebApplicationManager(SoftwareManager):
 
         return res
 
-    def _read_search_index(self) -> dict:
-        if os.path.exists(SEARCH_INDEX_FILE):
-            with open(SEARCH_INDEX_FILE) as f:
-                return yaml.safe_load(f.read())
-        else:
-            self.logger.warning("No search index found at {}".format(SEARCH_INDEX_FILE))
-
     def read_installed(self, disk_loader: DiskCacheLoader, limit: int = -1, only_apps: bool = False, pkg_types: Set[Type[SoftwarePackage]] = None, internet_available: bool = True) -> SearchResult:
         res = SearchResult([], [], 0)
 
@@ -362,6 +284,11 @@ class WebApplicationManager(SoftwareManager):
             traceback.print_exc()
             return False
 
+        freed = self.runtime_store.collect_garbage()
+
+        if freed:
+            watcher.print("Electron runtime files no longer used removed ({})".format(get_human_size_str(freed)))
+
         self.logger.info("Checking if {} desktop entry file {} exists".format(pkg.name, pkg.desktop_entry))
         if os.path.exists(pkg.desktop_entry):
             try:
@@ -612,6 +539,12 @@ class WebApplicationManager(SoftwareManager):
                                                                                                          pkg.name))
             traceback.print_exc()
 
+    def _fetch_install_resources(self, pkg: WebApplication, app_dir: str, install_options: List[str], output: dict):
+        output['fix'] = self._get_fix_for(url_no_protocol=self._strip_url_protocol(pkg.url))
+
+        if pkg.icon_url and pkg.save_icon and not {o for o in install_options if o.startswith('--icon')}:
+            output['icon'] = self._download_suggestion_icon(pkg, app_dir)
+
     def install(self, pkg: WebApplication, root_password: str, watcher: ProcessWatcher) -> bool:
 
         continue_install, install_options = self._ask_install_options(pkg, watcher)
@@ -620,6 +553,15 @@ class WebApplicationManager(SoftwareManager):
             watcher.print("Installation aborted by the user")
             return False
 
+        app_id, treated_name = self._gen_app_id(pkg.name)
+        pkg.id = app_id
+        app_dir = '{}/{}'.format(INSTALLED_PATH, app_id)
+
+        # the fix and the custom icon are downloaded while the environment is checked
+        install_resources = {}
+        resources_thread = Thread(target=self._fetch_install_resources, args=(pkg, app_dir, install_options, install_resources), daemon=True)
+        resources_thread.start()
+
         watcher.change_substatus(self.i18n['web.env.checking'])
         handler = ProcessHandler(watcher)
 
@@ -645,12 +587,9 @@ class WebApplicationManager(SoftwareManager):
 
         Path(INSTALLED_PATH).mkdir(parents=True, exist_ok=True)
 
-        app_id, treated_name = self._gen_app_id(pkg.name)
-        pkg.id = app_id
-        app_dir = '{}/{}'.format(INSTALLED_PATH, app_id)
-
         watcher.change_substatus(self.i18n['web.install.substatus.checking_fixes'])
-        fix = self._get_fix_for(url_no_protocol=self._strip_url_protocol(pkg.url))
+        resources_thread.join()
+        fix = install_resources.get('fix')
         fix_path = '{}/{}.js'.format(FIXES_PATH, app_id)
 
         if fix:
@@ -667,7 +606,7 @@ class WebApplicationManager(SoftwareManager):
         # if a custom icon is defined for an app suggestion:
         icon_path, icon_bytes = None, None
         if pkg.icon_url and pkg.save_icon and not {o for o in install_options if o.startswith('--icon')}:
-            download = self._download_suggestion_icon(pkg, app_dir)
+            download = install_resources.get('icon')
 
             if download and download[1]:
                 icon_path, icon_bytes = download[0], download[1]
@@ -684,6 +623,7 @@ class WebApplicationManager(SoftwareManager):
         watcher.change_substatus(self.i18n['web.install.substatus.call_nativefier'].format(bold('nativefier')))
 
         electron_version = str(next((c for c in env_components if c.id == 'electron')).version)
+        runtime_stored = self.runtime_store.prepare(electron_version, 'x64' if self.context.is_system_x86_64() else 'ia32')
         installed = handler.handle_simple(nativefier.install(url=pkg.url, name=app_id, output_dir=app_dir,
                                                              electron_version=electron_version,
                                                              system=bool(local_config['environment']['system']),
@@ -719,6 +659,9 @@ class WebApplicationManager(SoftwareManager):
 
         pkg.installation_dir = app_dir
 
+        if runtime_stored:
+            self._link_runtime(app_dir, watcher)
+
         version_path = '{}/version'.format(app_dir)
 
         if os.path.exists(version_path):
@@ -760,6 +703,17 @@ class WebApplicationManager(SoftwareManager):
 
         return True
 
+    def _link_runtime(self, app_dir: str, watcher: ProcessWatcher):
+        watcher.change_substatus(self.i18n['web.install.substatus.runtime'])
+        linked = self.runtime_store.link(app_dir)
+
+        if linked.files:
+            stored, saved = self.runtime_store.get_usage()
+            msg = "{} Electron files ({}) linked to the shared runtime in {:.2f} seconds. Disk space saved by the shared runtimes: {}".format(
+                linked.files, get_human_size_str(linked.bytes_linked), linked.duration, get_human_size_str(saved))
+            self.logger.info(msg)
+            watcher.print(msg)
+
     def _gen_desktop_entry_content(self, pkg: WebApplication) -> str:
         return """
         [Desktop Entry]
@@ -782,16 +736,13 @@ class WebApplicationManager(SoftwareManager):
         self.enabled = enabled
 
     def can_work(self) -> bool:
-        if BS4_AVAILABLE and LXML_AVAILABLE:
-            config = read_config(update_file=True)
-            use_system_env = config['environment']['system']
+        config = read_config(update_file=True)
+        use_system_env = config['environment']['system']
 
-            if not use_system_env:
-                return True
+        if not use_system_env:
+            return True
 
-            return nativefier.is_available()
-
-        return False
+        return nativefier.is_available()
 
     def requires_root(self, action: str, pkg: SoftwarePackage):
         return False
@@ -822,26 +773,24 @@ class WebApplicationManager(SoftwareManager):
         pass
 
     def _fill_suggestion(self, app: WebApplication):
-        soup_map = self._map_url(app.url)
-
-        if soup_map:
-            soup, res = soup_map[0], soup_map[1]
+        page = self._map_url(app.url)
 
-            app.url = res.url
+        if page:
+            app.url = page.url
 
             if app.url.endswith('/'):
                 app.url = app.url[0:-1]
 
             if not app.name:
-                app.name = self._get_app_name(app.url, soup)
+                app.name = self._get_app_name(app.url, page)
 
             if not app.description:
-                app.description = self._get_app_description(app.url, soup)
+                app.description = self._get_app_description(app.url, page)
 
             find_url = not app.icon_url or (app.icon_url and not self.http_client.exists(app.icon_url, session=False))
 
             if find_url:
-                app.icon_url = self._get_app_icon_url(app.url, soup)
+                app.icon_url = self._get_app_icon_url(app.url, page)
 
         app.status = PackageStatus.READY
 
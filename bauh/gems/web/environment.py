@@ -2,10 +2,11 @@ import logging
 import os
 import shutil
 import tarfile
+import time
 import traceback
 from pathlib import Path
-from threading import Thread
-from typing import Dict, List
+from threading import Thread, Lock
+from typing import Dict, List, Tuple, Callable, Optional
 
 import requests
 import yaml
@@ -21,6 +22,7 @@ from bauh.gems.web import ENV_PATH, NODE_DIR_PATH, NODE_BIN_PATH, NODE_MODULES_P
     ELECTRON_PATH, ELECTRON_DOWNLOAD_URL, ELECTRON_SHA256_URL, URL_ENVIRONMENT_SETTINGS, NPM_BIN_PATH, NODE_PATHS, \
     nativefier, URL_NATIVEFIER, get_icon_path
 from bauh.gems.web.model import WebApplication
+from bauh.gems.web.runtime import RuntimeStore
 from bauh.view.util.translation import I18n
 
 
@@ -35,10 +37,64 @@ class EnvironmentComponent:
         self.update = update
 
 
+class EnvironmentCache:
+    """
+    Caches values read from the environment (e.g: installed versions) until one of the watched paths is modified or
+    the values expire
+    """
+
+    def __init__(self, paths: Tuple[str, ...] = (), ttl: int = 600):
+        self.paths = paths
+        self.ttl = ttl
+        self._values = {}
+        self._state = None
+        self._expires_at = 0
+        self._lock = Lock()
+
+    def _read_state(self) -> tuple:
+        state = []
+        for path in self.paths:
+            try:
+                state.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                state.append(None)
+
+        return tuple(state)
+
+    def get(self, key: str, read: Callable[[], object]):
+        state = self._read_state()
+
+        with self._lock:
+            if state != self._state or time.time() >= self._expires_at:
+                self._values.clear()
+                self._state = state
+                self._expires_at = time.time() + self.ttl
+            elif key in self._values:
+                return self._values[key]
+
+        value = read()
+
+        with self._lock:
+            if self._state == state:
+                self._values[key] = value
+
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._state = None
+
+
 class EnvironmentUpdater:
 
-    def __init__(self, logger: logging.Logger, http_client: HttpClient, file_downloader: FileDownloader, i18n: I18n):
+    def __init__(self, logger: logging.Logger, http_client: HttpClient, file_downloader: FileDownloader, i18n: I18n,
+                 runtime_store: RuntimeStore = None, settings_ttl: int = 300):
         self.logger = logger
+        self.runtime_store = runtime_store
+        self.settings_ttl = settings_ttl
+        self.local_cache = EnvironmentCache(paths=(ENV_PATH, NODE_DIR_PATH, NODE_MODULES_PATH, NODE_MODULES_PATH + '/.bin', ELECTRON_PATH))
+        self.remote_cache = EnvironmentCache(ttl=3600)  # files sizes
+        self._settings = None  # remote settings, ETag and fetch time
         self.file_downloader = file_downloader
         self.i18n = i18n
         self.http_client = http_client
@@ -89,24 +145,31 @@ class EnvironmentUpdater:
                 traceback.print_exc()
                 return False
             finally:
+                self.local_cache.invalidate()
+
                 if os.path.exists(tarf_path):
                     try:
                         os.remove(tarf_path)
                     except:
                         self.logger.error('Could not delete file {}'.format(tarf_path))
 
+    def _read_node_version(self) -> Optional[str]:
+        def _read() -> Optional[str]:
+            version = system.run_cmd('{} --version'.format(NODE_BIN_PATH), print_error=False)
+
+            if version:
+                version = version.strip()
+                return version[1:] if version.startswith('v') else version
+
+        return self.local_cache.get('node_version', _read)
+
     def check_node_installed(self, version: str) -> bool:
         if not os.path.exists(NODE_DIR_PATH):
             return False
         else:
-            installed_version = system.run_cmd('{} --version'.format(NODE_BIN_PATH), print_error=False)
+            installed_version = self._read_node_version()
 
             if installed_version:
-                installed_version = installed_version.strip()
-
-                if installed_version.startswith('v'):
-                    installed_version = installed_version[1:]
-
                 self.logger.info('Node versions: installed ({}), cloud ({})'.format(installed_version, version))
 
                 if version != installed_version:
@@ -125,14 +188,9 @@ class EnvironmentUpdater:
         if not os.path.exists(NODE_DIR_PATH):
             return self._download_and_install(version=version, version_url=version_url, watcher=watcher)
         else:
-            installed_version = system.run_cmd('{} --version'.format(NODE_BIN_PATH), print_error=False)
+            installed_version = self._read_node_version()
 
             if installed_version:
-                installed_version = installed_version.strip()
-
-                if installed_version.startswith('v'):
-                    installed_version = installed_version[1:]
-
                 self.logger.info('Node versions: installed ({}), cloud ({})'.format(installed_version, version))
 
                 if version != installed_version:
@@ -223,7 +281,7 @@ class EnvironmentUpdater:
         if not os.path.exists(ELECTRON_PATH):
             self.logger.info("The Electron folder {} was not found".format(ELECTRON_PATH))
         else:
-            files = os.listdir(ELECTRON_PATH)
+            files = self.local_cache.get('electron_files', lambda: os.listdir(ELECTRON_PATH) if os.path.isdir(ELECTRON_PATH) else None)
 
             if files:
                 file_name = self._get_electron_url(version, is_x86_x64_arch).split('/')[-1]
@@ -234,6 +292,11 @@ class EnvironmentUpdater:
                 else:
                     file_name = ELECTRON_SHA256_URL.split('/')[-1] + '-{}'.format(version)
                     res['sha256'] = bool([f for f in files if f == file_name])
+
+                    if res['sha256'] and self.runtime_store and \
+                            not self.runtime_store.verify(version, 'x64' if is_x86_x64_arch else 'ia32'):
+                        self.logger.warning("Electron {} files are corrupted. They will be downloaded again".format(version))
+                        res['electron'], res['sha256'] = False, False
             else:
                 self.logger.info('No Electron file found in {}'.format(ELECTRON_PATH))
 
@@ -248,29 +311,50 @@ class EnvironmentUpdater:
             task_man.update_progress('web_down_sets', 100, None)
             task_man.finish_task('web_down_sets')
 
+    def _get_size(self, url: str) -> str:
+        return self.remote_cache.get(url, lambda: self.http_client.get_content_length(url))
+
     def read_settings(self, task_man: TaskManager = None) -> dict:
+        """
+        :return: the environment settings. They are only requested again after 'settings_ttl' seconds (as a conditional
+        request when an ETag was received).
+        """
+        cached = self._settings
+
+        if cached and time.time() - cached['fetched_at'] < self.settings_ttl:
+            return cached['settings']
+
         try:
             if task_man:
                 task_man.register_task('web_down_sets', self.i18n['web.task.download_settings'], get_icon_path())
                 task_man.update_progress('web_down_sets', 10, None)
 
-            res = self.http_client.get(URL_ENVIRONMENT_SETTINGS)
+            headers = {'If-None-Match': cached['etag']} if cached and cached.get('etag') else None
+            res = self.http_client.get(URL_ENVIRONMENT_SETTINGS, headers=headers)
 
             if not res:
                 self.logger.warning('Could not retrieve the environments settings from the cloud')
                 self._finish_task_download_settings(task_man)
-                return
+                return cached['settings'] if cached else None
+
+            if res.status_code == 304:
+                self.logger.info('Environment settings not modified')
+                cached['fetched_at'] = time.time()
+                self._finish_task_download_settings(task_man)
+                return cached['settings']
 
             try:
+                settings = yaml.safe_load(res.content)
+                self._settings = {'settings': settings, 'etag': res.headers.get('ETag'), 'fetched_at': time.time()}
                 self._finish_task_download_settings(task_man)
-                return yaml.safe_load(res.content)
+                return settings
             except yaml.YAMLError:
                 self.logger.error('Could not parse environment settings: {}'.format(res.text))
                 self._finish_task_download_settings(task_man)
                 return
         except requests.exceptions.ConnectionError:
             self._finish_task_download_settings(task_man)
-            return
+            return cached['settings'] if cached else None
 
     def _check_and_fill_electron(self, pkg: WebApplication, env: dict, local_config: dict, x86_x64: bool, output: List[EnvironmentComponent]):
         electron_version = env['electron']['version']
@@ -289,7 +373,7 @@ class EnvironmentUpdater:
         output.append(EnvironmentComponent(name=electron_url.split('/')[-1],
                                            version=electron_version,
                                            url=electron_url,
-                                           size=self.http_client.get_content_length(electron_url),
+                                           size=self._get_size(electron_url),
                                            id='electron',
                                            update=not electron_status['electron']))
 
@@ -297,14 +381,14 @@ class EnvironmentUpdater:
         output.append(EnvironmentComponent(name=sha_url.split('/')[-1],
                                            version=electron_version,
                                            url=sha_url,
-                                           size=self.http_client.get_content_length(sha_url),
+                                           size=self._get_size(sha_url),
                                            id='electron_sha256',
                                            update=not electron_status['electron'] or not electron_status['sha256']))
 
     def _check_and_fill_node(self, env: dict, output: List[EnvironmentComponent]):
         node = EnvironmentComponent(name=env['nodejs']['url'].split('/')[-1],
                                     url=env['nodejs']['url'],
-                                    size=self.http_client.get_content_length(env['nodejs']['url']),
+                                    size=self._get_size(env['nodejs']['url']),
                                     version=env['nodejs']['version'],
                                     id='nodejs')
         output.append(node)
@@ -326,7 +410,7 @@ class EnvironmentUpdater:
             if not self._is_nativefier_installed():
                 return False
 
-            installed_version = nativefier.get_version()
+            installed_version = self.local_cache.get('nativefier_version', nativefier.get_version)
 
             if installed_version:
                 installed_version = installed_version.strip()
@@ -344,7 +428,7 @@ class EnvironmentUpdater:
         url = URL_NATIVEFIER.format(version=nativefier_settings['version'])
         return EnvironmentComponent(name='nativefier@{}'.format(nativefier_settings['version']),
                                     url=url,
-                                    size=self.http_client.get_content_length(url),
+                                    size=self._get_size(url),
                                     version=nativefier_settings['version'],
                                     id='nativefier')
 
@@ -375,6 +459,13 @@ class EnvironmentUpdater:
         return components
 
     def update(self, components: List[EnvironmentComponent], handler: ProcessHandler) -> bool:
+        try:
+            return self._update(components, handler)
+        finally:
+            if components:
+                self.local_cache.invalidate()
+
+    def _update(self, components: List[EnvironmentComponent], handler: ProcessHandler) -> bool:
         self.logger.info('Updating  environment')
         Path(ENV_PATH).mkdir(parents=True, exist_ok=True)
 
@@ -1,6 +1,5 @@
-from bauh.commons.system import run_cmd
+from bauh.commons import capability
 
 
 def is_available() -> bool:
-    res = run_cmd('which npm', print_error=False)
-    return res and not res.strip().startswith('which ')
+    return capability.is_available('npm')
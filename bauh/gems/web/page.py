@@ -0,0 +1,243 @@
+import codecs
+import json
+import logging
+import os
+import time
+import traceback
+from html.parser import HTMLParser
+from threading import Lock
+from typing import Optional, List, Dict
+
+import requests
+
+from bauh.gems.web import PAGES_CACHE_FILE
+
+MAX_HEAD_BYTES = 512 * 1024
+CHUNK_SIZE = 8192
+
+
+class HeadParser(HTMLParser):
+    """
+    Incremental parser for the metadata of an HTML page head. It stops when the head is closed or the body starts.
+    """
+
+    def __init__(self):
+        super(HeadParser, self).__init__(convert_charrefs=True)
+        self.finished = False
+        self.title = None
+        self.app_name = None
+        self.description = None
+        self.icons = []
+        self.og_image = None
+        self._in_title = False
+        self._title_parts = []
+
+    def handle_starttag(self, tag: str, attrs: list):
+        if self.finished:
+            return
+
+        if tag == 'body':
+            self._finish()
+            return
+
+        attrs = {k.lower(): v for k, v in attrs if k}
+
+        if tag == 'title':
+            self._in_title = True
+        elif tag == 'meta':
+            name, content = (attrs.get('name') or '').lower(), attrs.get('content')
+
+            if content:
+                if name == 'application-name' and not self.app_name:
+                    self.app_name = content
+                elif name == 'description' and not self.description:
+                    self.description = content
+                elif (attrs.get('property') or '').lower() == 'og:image' and not self.og_image:
+                    self.og_image = content
+        elif tag == 'link' and attrs.get('href') and 'icon' in (attrs.get('rel') or '').lower().split():
+            self.icons.append(attrs['href'])
+
+    def handle_startendtag(self, tag: str, attrs: list):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag: str):
+        if tag == 'title' and self._in_title:
+            self._in_title = False
+
+            if not self.title:
+                self.title = ''.join(self._title_parts).strip()
+        elif tag == 'head':
+            self._finish()
+
+    def handle_data(self, data: str):
+        if self._in_title and not self.finished:
+            self._title_parts.append(data)
+
+    def _finish(self):
+        if self._in_title and not self.title:
+            self.title = ''.join(self._title_parts).strip()
+
+        self.finished = True
+
+
+class PageMetadata:
+
+    def __init__(self, url: str, title: str = None, app_name: str = None, description: str = None, icons: List[str] = None,
+                 og_image: str = None, etag: str = None, last_modified: str = None, fetched_at: float = None):
+        """
+        :param url: the final URL (after redirects)
+        :param icons: the 'href' of the icon links declared
+        """
+        self.url = url
+        self.title = title
+        self.app_name = app_name
+        self.description = description
+        self.icons = icons if icons else []
+        self.og_image = og_image
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+def _get_encoding(res: requests.Response) -> str:
+    if 'charset' in res.headers.get('content-type', '').lower() and res.encoding:
+        try:
+            codecs.lookup(res.encoding)
+            return res.encoding
+        except LookupError:
+            pass
+
+    return 'utf-8'
+
+
+def read_head(res: requests.Response, max_bytes: int = MAX_HEAD_BYTES) -> HeadParser:
+    """
+    Reads the response body only until the page head is closed
+    """
+    parser = HeadParser()
+    decoder = codecs.getincrementaldecoder(_get_encoding(res))(errors='replace')
+    read = 0
+
+    try:
+        for chunk in res.iter_content(chunk_size=CHUNK_SIZE):
+            parser.feed(decoder.decode(chunk))
+            read += len(chunk)
+
+            if parser.finished or read >= max_bytes:
+                break
+
+        if not parser.finished:
+            parser.feed(decoder.decode(b'', final=True))
+            parser.close()
+            parser._finish()
+    finally:
+        res.close()
+
+    return parser
+
+
+class PageMetadataReader:
+    """
+    Reads the metadata of web pages (title, description, icons) through the pooled HTTP session and only downloads the
+    page until its head is closed. The metadata is cached by URL (memory and disk): it is reused as it is for 'max_age'
+    seconds and then revalidated through the 'ETag' / 'Last-Modified' of the page.
+    """
+
+    def __init__(self, session: requests.Session, logger: logging.Logger, timeout: int = 30, max_age: int = 3600,
+                 cache_file: str = PAGES_CACHE_FILE, max_entries: int = 200):
+        self.session = session
+        self.logger = logger
+        self.timeout = timeout
+        self.max_age = max_age
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self._cache = None
+        self._lock = Lock()
+
+    def _load(self) -> Dict[str, dict]:
+        if self._cache is None:
+            self._cache = {}
+
+            if self.cache_file and os.path.exists(self.cache_file):
+                try:
+                    with open(self.cache_file) as f:
+                        self._cache = json.loads(f.read())
+                except:
+                    self.logger.warning("Could not read the pages cache file '{}'".format(self.cache_file))
+                    traceback.print_exc()
+
+        return self._cache
+
+    def _save(self, url: str, metadata: PageMetadata):
+        with self._lock:
+            cache = self._load()
+            cache.pop(url, None)
+            cache[url] = metadata.to_dict()
+
+            while len(cache) > self.max_entries:  # the oldest entries are the first ones
+                del cache[next(iter(cache))]
+
+            if self.cache_file:
+                try:
+                    os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+                    temp_file = self.cache_file + '.tmp'
+
+                    with open(temp_file, 'w+') as f:
+                        f.write(json.dumps(cache))
+
+                    os.replace(temp_file, self.cache_file)
+                except:
+                    self.logger.warning("Could not write the pages cache file '{}'".format(self.cache_file))
+                    traceback.print_exc()
+
+    def get_cached(self, url: str) -> Optional[PageMetadata]:
+        with self._lock:
+            data = self._load().get(url)
+
+        return PageMetadata(**data) if data else None
+
+    def read(self, url: str, headers: dict = None) -> Optional[PageMetadata]:
+        """
+        :return: the page metadata or None if the page could not be requested
+        """
+        cached = self.get_cached(url)
+
+        if cached and cached.fetched_at and time.time() - cached.fetched_at < self.max_age:
+            return cached
+
+        req_headers = dict(headers) if headers else {}
+
+        if cached:
+            if cached.etag:
+                req_headers['If-None-Match'] = cached.etag
+
+            if cached.last_modified:
+                req_headers['If-Modified-Since'] = cached.last_modified
+
+        try:
+            res = self.session.get(url, headers=req_headers, timeout=self.timeout, stream=True, allow_redirects=True,
+                                   verify=False)
+        except requests.exceptions.RequestException as e:
+            self.logger.warning("Could not get {}: {}".format(url, e.__class__.__name__))
+            return cached
+
+        if res.status_code == 304 and cached:
+            res.close()
+            cached.fetched_at = time.time()
+            self._save(url, cached)
+            return cached
+
+        if res.status_code != 200:
+            self.logger.warning("Could not get {}: status {}".format(url, res.status_code))
+            res.close()
+            return cached
+
+        head = read_head(res)
+        metadata = PageMetadata(url=res.url, title=head.title, app_name=head.app_name, description=head.description,
+                                icons=head.icons, og_image=head.og_image, etag=res.headers.get('ETag'),
+                                last_modified=res.headers.get('Last-Modified'), fetched_at=time.time())
+        self._save(url, metadata)
+        return metadata
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import logging
+import os
+import time
+import traceback
+import zipfile
+from threading import Lock
+from typing import Optional, Tuple
+
+from bauh.gems.web import RUNTIMES_PATH, ELECTRON_PATH, ELECTRON_DOWNLOAD_URL, ELECTRON_SHA256_URL
+
+BUFFER_SIZE = 1024 * 1024
+APP_RESOURCES_DIR = 'resources/app'
+
+
+def hash_file(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(BUFFER_SIZE), b''):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+class LinkResult:
+
+    def __init__(self, files: int = 0, bytes_linked: int = 0, duration: float = 0):
+        self.files = files
+        self.bytes_linked = bytes_linked
+        self.duration = duration
+
+
+class RuntimeStore:
+    """
+    Content-addressed store of the files of the Electron runtimes (objects/<sha256>). Each runtime (version / arch) is
+    verified against the published SHA-256 and unpacked only once. The runtime files of the installed applications
+    generated by nativefier are replaced by hard links to the stored objects, so each runtime version is stored only once
+    on the disk. The number of links of an object is its reference count: objects no longer linked by any
+    application are removed (see collect_garbage).
+    """
+
+    def __init__(self, logger: logging.Logger, root: str = RUNTIMES_PATH, electron_path: str = ELECTRON_PATH):
+        self.logger = logger
+        self.root = root
+        self.electron_path = electron_path
+        self.objects_dir = '{}/objects'.format(root)
+        self.index_file = '{}/index.json'.format(root)
+        self._lock = Lock()
+
+    def _read_index(self) -> dict:
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file) as f:
+                    return json.loads(f.read())
+            except:
+                self.logger.warning("Could not read the Electron runtimes index '{}'".format(self.index_file))
+                traceback.print_exc()
+
+        return {}
+
+    def _write_index(self, index: dict):
+        os.makedirs(self.root, exist_ok=True)
+        temp_file = self.index_file + '.tmp'
+
+        with open(temp_file, 'w+') as f:
+            f.write(json.dumps(index))
+
+        os.replace(temp_file, self.index_file)
+
+    def get_zip_path(self, version: str, arch: str) -> str:
+        return '{}/{}'.format(self.electron_path, ELECTRON_DOWNLOAD_URL.format(version=version, arch=arch).split('/')[-1])
+
+    def get_sha256_path(self, version: str) -> str:
+        return '{}/{}-{}'.format(self.electron_path, ELECTRON_SHA256_URL.split('/')[-1], version)
+
+    def _read_expected_sha256(self, version: str, zip_name: str) -> Optional[str]:
+        try:
+            with open(self.get_sha256_path(version)) as f:
+                for line in f:
+                    split_line = line.strip().split(' ')
+
+                    if len(split_line) > 1 and split_line[-1].lstrip('*') == zip_name:
+                        return split_line[0].lower()
+        except FileNotFoundError:
+            return
+
+    def get_object_path(self, sha256: str) -> str:
+        return '{}/{}/{}'.format(self.objects_dir, sha256[0:2], sha256)
+
+    def verify(self, version: str, arch: str) -> Optional[str]:
+        """
+        Verifies the downloaded Electron zip against the published SHA-256. The result is kept while the file does not
+        change, so the file is only hashed once.
+        :return: the zip SHA-256 or None if the zip / checksum is missing or does not match
+        """
+        zip_path = self.get_zip_path(version, arch)
+
+        try:
+            stat = os.stat(zip_path)
+        except FileNotFoundError:
+            return
+
+        key = '{}-{}'.format(version, arch)
+
+        with self._lock:
+            index = self._read_index()
+            entry = index.get(key)
+
+            if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+                return entry['sha256']
+
+            expected = self._read_expected_sha256(version, zip_path.split('/')[-1])
+
+            if not expected:
+                self.logger.warning("No SHA-256 found for '{}'".format(zip_path))
+                return
+
+            sha256 = hash_file(zip_path)
+
+            if sha256 != expected:
+                self.logger.warning("The SHA-256 of '{}' does not match the published one".format(zip_path))
+                return
+
+            index[key] = {'sha256': sha256, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'unpacked': False}
+            self._write_index(index)
+            self.logger.info("Electron {} ({}) verified".format(version, arch))
+            return sha256
+
+    def _store_object(self, source, mode: int) -> Tuple[str, int]:
+        os.makedirs(self.objects_dir, exist_ok=True)
+        temp_path = '{}/.{}-{}.tmp'.format(self.objects_dir, os.getpid(), id(source))
+        sha256, size = hashlib.sha256(), 0
+
+        with open(temp_path, 'wb+') as f:
+            for chunk in iter(lambda: source.read(BUFFER_SIZE), b''):
+                sha256.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+
+        digest = sha256.hexdigest()
+        object_path = self.get_object_path(digest)
+
+        if os.path.exists(object_path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, object_path)
+
+        return digest, size
+
+    def prepare(self, version: str, arch: str) -> bool:
+        """
+        Verifies and unpacks the runtime files into the store (only once per runtime)
+        :return: if the runtime is available in the store
+        """
+        if not self.verify(version, arch):
+            return False
+
+        key = '{}-{}'.format(version, arch)
+
+        with self._lock:
+            index = self._read_index()
+
+            if index.get(key, {}).get('unpacked'):
+                return True
+
+            ti = time.time()
+            try:
+                files, total_size = 0, 0
+                with zipfile.ZipFile(self.get_zip_path(version, arch)) as zf:
+                    for info in zf.infolist():
+                        mode = (info.external_attr >> 16) & 0o777
+
+                        if info.is_dir() or ((info.external_attr >> 16) & 0o170000) == 0o120000:  # dirs and symlinks
+                            continue
+
+                        with zf.open(info) as source:
+                            total_size += self._store_object(source, mode or 0o644)[1]
+                            files += 1
+            except:
+                self.logger.error("Could not unpack Electron {} ({}) into the store".format(version, arch))
+                traceback.print_exc()
+                return False
+
+            index[key]['unpacked'] = True
+            index[key]['files'] = files
+            self._write_index(index)
+            self.logger.info("Electron {} ({}) unpacked into the store: {} files ({} bytes) in {:.2f} seconds".format(version, arch, files, total_size, time.time() - ti))
+            return True
+
+    def link(self, app_dir: str) -> LinkResult:
+        """
+        Replaces the application runtime files (all files but the ones under 'resources/app') stored with the same
+        content and mode by hard links to the stored objects
+        """
+        ti = time.time()
+        res = LinkResult()
+        excluded = os.path.join(app_dir, APP_RESOURCES_DIR)
+
+        for root, dirs, files in os.walk(app_dir):
+            if root == excluded or root.startswith(excluded + os.sep):
+                dirs.clear()
+                continue
+
+            for name in files:
+                file_path = os.path.join(root, name)
+                stat = os.lstat(file_path)
+
+                if not os.path.isfile(file_path) or os.path.islink(file_path):
+                    continue
+
+                object_path = self.get_object_path(hash_file(file_path))
+
+                try:
+                    object_stat = os.stat(object_path)
+                except FileNotFoundError:
+                    continue
+
+                if object_stat.st_ino == stat.st_ino or object_stat.st_size != stat.st_size or \
+                        (object_stat.st_mode & 0o777) != (stat.st_mode & 0o777):
+                    continue
+
+                temp_path = file_path + '.bauh-link'
+                try:
+                    os.link(object_path, temp_path)
+                    os.replace(temp_path, file_path)
+                except OSError as e:  # e.g: different file systems
+                    self.logger.warning("Could not link '{}' to '{}': {}".format(file_path, object_path, e))
+
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+
+                    res.duration = time.time() - ti
+                    return res
+
+                res.files += 1
+                res.bytes_linked += stat.st_size
+
+        res.duration = time.time() - ti
+        return res
+
+    def collect_garbage(self) -> int:
+        """
+        Removes the objects not linked by any application. The runtimes whose objects were removed will be unpacked again
+        when required.
+        :return: the bytes freed
+        """
+        freed = 0
+
+        if not os.path.isdir(self.objects_dir):
+            return freed
+
+        with self._lock:
+            for root, _, files in os.walk(self.objects_dir):
+                for name in files:
+                    object_path = os.path.join(root, name)
+
+                    try:
+                        stat = os.stat(object_path)
+
+                        if stat.st_nlink <= 1:
+                            os.remove(object_path)
+                            freed += stat.st_size
+                    except FileNotFoundError:
+                        continue
+
+            if freed:
+                index = self._read_index()
+
+                for entry in index.values():
+                    entry['unpacked'] = False
+
+                self._write_index(index)
+                self.logger.info("{} bytes of Electron runtime files no longer used were removed".format(freed))
+
+        return freed
+
+    def get_usage(self) -> Tuple[int, int]:
+        """
+        :return: the bytes stored and the bytes saved by the links (the space the linked copies would take)
+        """
+        stored, saved = 0, 0
+
+        if os.path.isdir(self.objects_dir):
+            for root, _, files in os.walk(self.objects_dir):
+                for name in files:
+                    stat = os.stat(os.path.join(root, name))
+                    stored += stat.st_size
+                    saved += stat.st_size * max(0, stat.st_nlink - 2)  # the store itself + the first application
+
+        return stored, saved
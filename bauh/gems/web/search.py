@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import traceback
+from bisect import bisect_left
+from threading import Lock
+from typing import List, Optional, Dict, Tuple
+
+from bauh.gems.web import SEARCH_INDEX_FILE
+
+INDEX_VERSION = 1
+
+
+def _gen_trigrams(word: str) -> set:
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def gen_words(name: str) -> List[str]:
+    """
+    :return: the words of a name and the name without spaces (e.g: 'google drive' -> google, drive, googledrive)
+    """
+    split_name = [w for w in name.lower().strip().split(' ') if w]
+    words = [*split_name, ''.join(split_name)]
+    return [w for i, w in enumerate(words) if w and w not in words[:i]]
+
+
+class SearchIndex:
+    """
+    Suggestions indexed by the words of their names. The words are sorted (prefix lookups through binary search) and
+    mapped by trigrams (substring lookups only test the words sharing all trigrams of the query).
+    """
+
+    def __init__(self, suggestions: Dict[str, dict], words: List[str], words_keys: List[List[str]], trigrams: Dict[str, List[int]]):
+        """
+        :param words: sorted words
+        :param words_keys: the suggestions keys of each word
+        :param trigrams: the positions of the words containing each trigram
+        """
+        self.suggestions = suggestions
+        self.words = words
+        self.words_keys = words_keys
+        self.trigrams = trigrams
+
+    @classmethod
+    def build(cls, suggestions: Dict[str, dict]) -> "SearchIndex":
+        word_keys = {}
+
+        for key, sug in suggestions.items():
+            if sug.get('name'):
+                for word in gen_words(sug['name']):
+                    word_keys.setdefault(word, set()).add(key)
+
+        words = sorted(word_keys)
+        trigrams = {}
+
+        for idx, word in enumerate(words):
+            for trigram in _gen_trigrams(word):
+                trigrams.setdefault(trigram, []).append(idx)
+
+        return cls(suggestions=suggestions, words=words, words_keys=[sorted(word_keys[w]) for w in words], trigrams=trigrams)
+
+    def to_dict(self) -> dict:
+        return {'version': INDEX_VERSION, 'suggestions': self.suggestions, 'words': self.words,
+                'words_keys': self.words_keys, 'trigrams': self.trigrams}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Optional["SearchIndex"]:
+        if data and data.get('version') == INDEX_VERSION:
+            return cls(suggestions=data['suggestions'], words=data['words'], words_keys=data['words_keys'],
+                       trigrams=data['trigrams'])
+
+    def _find_words(self, term: str) -> List[Tuple[int, int]]:
+        """
+        :return: the positions of the words containing the term and the match score (exact: 3, prefix: 2, substring: 1)
+        """
+        found = {}
+
+        start = bisect_left(self.words, term)
+        for idx in range(start, len(self.words)):
+            if not self.words[idx].startswith(term):
+                break
+
+            found[idx] = 3 if self.words[idx] == term else 2
+
+        if len(term) >= 3:
+            positions = None
+            for trigram in _gen_trigrams(term):
+                trigram_positions = self.trigrams.get(trigram)
+
+                if not trigram_positions:
+                    return list(found.items())
+
+                positions = set(trigram_positions) if positions is None else positions.intersection(trigram_positions)
+        else:  # too short to be indexed
+            positions = range(len(self.words))
+
+        for idx in positions:
+            if idx not in found and term in self.words[idx]:
+                found[idx] = 1
+
+        return list(found.items())
+
+    def search(self, words: str, limit: int = -1) -> List[dict]:
+        """
+        :return: the matched suggestions ranked by: exact name, best word match, number of matched terms and priority
+        """
+        lower_words = words.lower().strip()
+        terms = gen_words(lower_words)
+
+        if not terms:
+            return []
+
+        scores = {}  # suggestion key -> [best word match score, matched terms]
+        for term in terms:
+            term_scores = {}
+            for idx, score in self._find_words(term):
+                for key in self.words_keys[idx]:
+                    if term_scores.get(key, 0) < score:
+                        term_scores[key] = score
+
+            for key, score in term_scores.items():
+                key_score = scores.get(key)
+
+                if key_score:
+                    key_score[0] = max(key_score[0], score)
+                    key_score[1] += 1
+                else:
+                    scores[key] = [score, 1]
+
+        matches = []
+        for key, score in scores.items():
+            sug = self.suggestions.get(key)
+
+            if sug:
+                exact = sug.get('name', '').lower().strip() == lower_words
+                matches.append(((exact, score[0], score[1], sug.get('priority', 0)), sug))
+
+        matches.sort(key=lambda m: m[0], reverse=True)
+        return [m[1] for m in (matches[:limit] if limit and limit > 0 else matches)]
+
+
+def write_index(index: SearchIndex, file_path: str = SEARCH_INDEX_FILE):
+    temp_path = file_path + '.tmp'
+
+    with open(temp_path, 'w+') as f:
+        f.write(json.dumps(index.to_dict()))
+
+    os.replace(temp_path, file_path)
+
+
+class SearchIndexReader:
+    """
+    Keeps the search index in memory. It is only read again from the disk when the file is replaced / modified.
+    """
+
+    def __init__(self, logger: logging.Logger, file_path: str = SEARCH_INDEX_FILE):
+        self.logger = logger
+        self.file_path = file_path
+        self._index = None
+        self._state = None
+        self._lock = Lock()
+
+    def _read_state(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.file_path)
+            return stat.st_ino, stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return
+
+    def read(self) -> Optional[SearchIndex]:
+        state = self._read_state()
+
+        if not state:
+            self.logger.warning("No search index found at {}".format(self.file_path))
+            return
+
+        with self._lock:
+            if state != self._state:
+                try:
+                    with open(self.file_path) as f:
+                        self._index = SearchIndex.from_dict(json.loads(f.read()))
+                except:
+                    self.logger.error("Could not read the search index from {}".format(self.file_path))
+                    traceback.print_exc()
+                    self._index = None
+
+                self._state = state
+
+            return self._index
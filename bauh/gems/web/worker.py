@@ -3,11 +3,11 @@ import traceback
 from pathlib import Path
 
 import requests
-import yaml
 
 from bauh.api.abstract.handler import TaskManager
 from bauh.api.http import HttpClient
-from bauh.gems.web import URL_SUGGESTIONS, TEMP_PATH, SEARCH_INDEX_FILE, SUGGESTIONS_CACHE_FILE, get_icon_path
+from bauh.gems.web import URL_SUGGESTIONS, TEMP_PATH, SEARCH_INDEX_FILE, get_icon_path
+from bauh.gems.web.search import SearchIndex, write_index
 from bauh.view.util.translation import I18n
 
 
@@ -54,8 +54,6 @@ class SearchIndexGenerator:
         self.logger = logger
 
     def generate_index(self, suggestions: dict):
-        self.logger.info('Caching {} suggestions to the disk'.format(len(suggestions)))
-
         try:
             Path(TEMP_PATH).mkdir(parents=True, exist_ok=True)
         except:
@@ -63,46 +61,13 @@ class SearchIndexGenerator:
             traceback.print_exc()
             return
 
-        try:
-            with open(SUGGESTIONS_CACHE_FILE, 'w+') as f:
-                f.write(yaml.safe_dump(suggestions))
+        self.logger.info('Indexing {} suggestions'.format(len(suggestions)))
+        index = SearchIndex.build(suggestions)
 
-            self.logger.info('{} successfully cached to the disk as {}'.format(len(suggestions), SUGGESTIONS_CACHE_FILE))
+        try:
+            self.logger.info('Writing {} indexed words as {}'.format(len(index.words), SEARCH_INDEX_FILE))
+            write_index(index, SEARCH_INDEX_FILE)
+            self.logger.info("Search index successfully written at {}".format(SEARCH_INDEX_FILE))
         except:
-            self.logger.error("Could write to {}".format(SUGGESTIONS_CACHE_FILE))
+            self.logger.error("Could not write the search index to {}".format(SEARCH_INDEX_FILE))
             traceback.print_exc()
-            return
-
-        self.logger.info('Indexing suggestions')
-        index = {}
-
-        for key, sug in suggestions.items():
-            name = sug.get('name')
-
-            if name:
-                split_name = name.lower().strip().split(' ')
-                single_name = ''.join(split_name)
-
-                for word in (*split_name, single_name):
-                    mapped = index.get(word)
-
-                    if not mapped:
-                        mapped = set()
-                        index[word] = mapped
-
-                    mapped.add(key)
-
-        if index:
-            self.logger.info('Preparing search index for writing')
-
-            for key in index.keys():
-                index[key] = list(index[key])
-
-            try:
-                self.logger.info('Writing {} indexed keys as {}'.format(len(index), SEARCH_INDEX_FILE))
-                with open(SEARCH_INDEX_FILE, 'w+') as f:
-                    f.write(yaml.safe_dump(index))
-                self.logger.info("Search index successfully written at {}".format(SEARCH_INDEX_FILE))
-            except:
-                self.logger.error("Could not write the seach index to {}".format(SEARCH_INDEX_FILE))
-                traceback.print_exc()
@@ -16,6 +16,12 @@ def read_config(update_file: bool = False) -> dict:
             'data_expiration': 60 * 60,
             'icon_expiration': 60 * 5
         },
+        'installed': {
+            'timeout': 60
+        },
+        'internet': {
+            'probe_url': 'http://www.google.com'
+        },
         'locale': None,
         'updates': {
             'check_interval': 30,
@@ -25,6 +31,9 @@ def read_config(update_file: bool = False) -> dict:
           'notifications': True,
           'single_dependency_checking': False
         },
+        'search': {
+            'timeout': 30
+        },
         'suggestions': {
             'enabled': True,
             'by_type': 10
@@ -2,19 +2,21 @@ import re
 import re
 import time
 import traceback
-from threading import Thread
-from typing import List, Set, Type, Tuple, Dict
+from functools import partial
+from threading import Thread, Lock
+from typing import List, Set, Type, Tuple, Dict, Optional, Generator
 
 from bauh.api.abstract.controller import SoftwareManager, SearchResult, ApplicationContext, UpgradeRequirements, \
     UpgradeRequirement
 from bauh.api.abstract.disk import DiskCacheLoader
 from bauh.api.abstract.handler import ProcessWatcher, TaskManager
 from bauh.api.abstract.model import SoftwarePackage, PackageUpdate, PackageHistory, PackageSuggestion, \
-    CustomSoftwareAction
+    CustomSoftwareAction, PackageStatus
 from bauh.api.abstract.view import ViewComponent, TabGroupComponent
 from bauh.api.exception import NoInternetException
 from bauh.commons import internet
 from bauh.commons.html import bold
+from bauh.commons.search import SearchToken, SearchCache, CallMetric, stream_results
 from bauh.view.core.settings import GenericSettingsManager
 from bauh.view.core.update import check_for_update
 from bauh.view.util import resource
@@ -33,6 +35,28 @@ class GenericUpgradeRequirements(UpgradeRequirements):
         self.sub_requirements = sub_requirements
 
 
+class InstalledResult(SearchResult):
+
+    def __init__(self, installed: List[SoftwarePackage], total: int, metrics: Dict[SoftwareManager, CallMetric]):
+        """
+        :param metrics: the metrics of each manager read
+        """
+        super(InstalledResult, self).__init__(installed=installed, new=None, total=total)
+        self.metrics = metrics
+
+    def get_unavailable(self) -> List[SoftwareManager]:
+        """
+        :return: the managers whose installed packages could not be read (timeout / error). Their packages are missing.
+        """
+        return [man for man, metric in self.metrics.items() if metric.status != 'ok']
+
+    def get_read_types(self) -> Set[Type[SoftwarePackage]]:
+        """
+        :return: the package types successfully read
+        """
+        return {t for man, metric in self.metrics.items() if metric.status == 'ok' for t in man.get_managed_types()}
+
+
 class GenericSoftwareManager(SoftwareManager):
 
     def __init__(self, managers: List[SoftwareManager], context: ApplicationContext, config: dict,
@@ -50,6 +74,9 @@ class GenericSoftwareManager(SoftwareManager):
         self.config = config
         self.settings_manager = settings_manager
         self.http_client = context.http_client
+        self._search_token = None
+        self._search_lock = Lock()
+        self.search_cache = SearchCache()
         self.extra_actions = [CustomSoftwareAction(i18_label_key='action.reset',
                                                    i18n_status_key='action.reset.status',
                                                    manager_method='reset',
@@ -59,6 +86,8 @@ class GenericSoftwareManager(SoftwareManager):
                                                    refresh=False)]
 
     def reset_cache(self):
+        self.search_cache.invalidate()
+
         if self._available_cache is not None:
             self._available_cache = {}
             self.working_managers.clear()
@@ -109,51 +138,98 @@ class GenericSoftwareManager(SoftwareManager):
 
         return available
 
-    def _search(self, word: str, is_url: bool, man: SoftwareManager, disk_loader, res: SearchResult):
+    def _search(self, word: str, is_url: bool, man: SoftwareManager, disk_loader) -> Optional[SearchResult]:
         if self._can_work(man):
             mti = time.time()
             apps_found = man.search(words=word, disk_loader=disk_loader, is_url=is_url)
             mtf = time.time()
             self.logger.info(man.__class__.__name__ + " took {0:.2f} seconds".format(mtf - mti))
-
-            res.installed.extend(apps_found.installed)
-            res.new.extend(apps_found.new)
-
-    def search(self, word: str, disk_loader: DiskCacheLoader = None, limit: int = -1, is_url: bool = False) -> SearchResult:
+            return apps_found
+
+    def search_stream(self, word: str, disk_loader: DiskCacheLoader = None, is_url: bool = False,
+                      token: SearchToken = None, timeout: Optional[float] = None) -> Generator[SearchResult, None, None]:
+        """
+        Searches through all managers and yields the results found so far (sorted) every time a manager returns.
+        A new search cancels the previous one.
+        :param token: cancels the search
+        :param timeout: the seconds each manager has to return its results (default: 'search.timeout' setting). Late
+        results are discarded.
+        """
         ti = time.time()
         self._wait_to_be_ready()
 
-        res = SearchResult([], [], 0)
+        if not internet.is_available():
+            raise NoInternetException()
 
-        if internet.is_available():
-            norm_word = word.strip().lower()
+        token = token if token else SearchToken()
 
-            url_words = RE_IS_URL.match(norm_word)
-            disk_loader = self.disk_loader_factory.new()
-            disk_loader.start()
+        with self._search_lock:
+            if self._search_token:
+                self._search_token.cancel()
 
-            threads = []
+            self._search_token = token
 
-            for man in self.managers:
-                t = Thread(target=self._search, args=(norm_word, url_words, man, disk_loader, res))
-                t.start()
-                threads.append(t)
+        norm_word = word.strip().lower()
+        url_words = RE_IS_URL.match(norm_word)
+        res = SearchResult([], [], 0)
 
-            for t in threads:
-                t.join()
+        def _add(man_res: SearchResult):
+            res.installed = self._sort([*res.installed, *man_res.installed], norm_word)
+            res.new = self._sort([*res.new, *man_res.new], norm_word)
+            res.total = len(res.installed) + len(res.new)
+
+        enabled = [man for man in self.managers if man.is_enabled()]
+        gems = frozenset((man.__class__.__name__ for man in enabled))
+        cached = self.search_cache.get(norm_word, gems, {man for man in enabled if man.is_substring_search()}, enabled)
+
+        for man_res in cached.values():
+            _add(man_res)
 
+            # the data of cached packages may not have been loaded (e.g: the loading was cancelled by a newer search)
+            self.context.metadata_executor.resume([*man_res.installed, *man_res.new], self._set_loading_data)
+
+        disk_loader = None
+        try:
+            if cached:
+                self.logger.info("Search results of {} taken from the cache ({:.0%} hit rate)".format(', '.join(sorted(m.__class__.__name__ for m in cached)), self.search_cache.hit_rate))
+                yield res
+
+            to_search = [man for man in self.managers if man not in cached]
+
+            if to_search:
+                disk_loader = self.disk_loader_factory.new()
+                disk_loader.start()
+                calls = {man: partial(self._search, norm_word, url_words, man, disk_loader) for man in to_search}
+
+                if timeout is None:
+                    timeout = self.config.get('search', {}).get('timeout')
+
+                for man, man_res in stream_results(calls, token=token, timeout=timeout, logger=self.logger):
+                    if man_res:
+                        self.search_cache.put(norm_word, gems, man, man_res)
+                        _add(man_res)
+                        yield res
+        finally:
             if disk_loader:
                 disk_loader.stop_working()
                 disk_loader.join()
 
-            res.installed = self._sort(res.installed, norm_word)
-            res.new = self._sort(res.new, norm_word)
-            res.total = len(res.installed) + len(res.new)
-        else:
-            raise NoInternetException()
+            with self._search_lock:
+                if self._search_token == token:
+                    self._search_token = None
+
+            self.logger.info('Took {0:.2f} seconds'.format(time.time() - ti))
+
+    @staticmethod
+    def _set_loading_data(pkg: SoftwarePackage):
+        pkg.status = PackageStatus.LOADING_DATA
+
+    def search(self, word: str, disk_loader: DiskCacheLoader = None, limit: int = -1, is_url: bool = False) -> SearchResult:
+        res = SearchResult([], [], 0)
+
+        for partial_res in self.search_stream(word=word, disk_loader=disk_loader, is_url=is_url):
+            res = partial_res
 
-        tf = time.time()
-        self.logger.info('Took {0:.2f} seconds'.format(tf - ti))
         return res
 
     def _wait_to_be_ready(self):
@@ -167,52 +243,54 @@ class GenericSoftwareManager(SoftwareManager):
     def can_work(self) -> bool:
         return True
 
-    def read_installed(self, disk_loader: DiskCacheLoader = None, limit: int = -1, only_apps: bool = False, pkg_types: Set[Type[SoftwarePackage]] = None, internet_available: bool = None) -> SearchResult:
+    def _read_installed(self, man: SoftwareManager, disk_loader: DiskCacheLoader, net_available: bool) -> Optional[SearchResult]:
+        if self._can_work(man):
+            return man.read_installed(disk_loader=disk_loader, pkg_types=None, internet_available=net_available)
+
+    def read_installed(self, disk_loader: DiskCacheLoader = None, limit: int = -1, only_apps: bool = False, pkg_types: Set[Type[SoftwarePackage]] = None, internet_available: bool = None) -> "InstalledResult":
+        """
+        Reads the installed packages of all managers (or the managers of 'pkg_types') concurrently. Managers taking
+        longer than the 'installed.timeout' setting are reported as unavailable (see InstalledResult).
+        """
         ti = time.time()
         self._wait_to_be_ready()
 
-        res = SearchResult([], None, 0)
-
-        disk_loader = None
-
-        net_available = internet.is_available()
         if not pkg_types:  # any type
-            for man in self.managers:
-                if self._can_work(man):
-                    if not disk_loader:
-                        disk_loader = self.disk_loader_factory.new()
-                        disk_loader.start()
-
-                    mti = time.time()
-                    man_res = man.read_installed(disk_loader=disk_loader, pkg_types=None, internet_available=net_available)
-                    mtf = time.time()
-                    self.logger.info(man.__class__.__name__ + " took {0:.2f} seconds".format(mtf - mti))
-
-                    res.installed.extend(man_res.installed)
-                    res.total += man_res.total
+            managers = list(self.managers)
         else:
-            man_already_used = []
-
+            managers = []
             for t in pkg_types:
                 man = self.map.get(t)
-                if man and (man not in man_already_used) and self._can_work(man):
+                if man and man not in managers:
+                    managers.append(man)
 
-                    if not disk_loader:
-                        disk_loader = self.disk_loader_factory.new()
-                        disk_loader.start()
+        metrics = {}
+        res = InstalledResult([], 0, metrics)
 
-                    mti = time.time()
-                    man_res = man.read_installed(disk_loader=disk_loader, pkg_types=None, internet_available=net_available)
-                    mtf = time.time()
-                    self.logger.info(man.__class__.__name__ + " took {0:.2f} seconds".format(mtf - mti))
+        if managers:
+            net_available = internet.is_available()
+            disk_loader = self.disk_loader_factory.new()
+            disk_loader.start()
 
-                    res.installed.extend(man_res.installed)
-                    res.total += man_res.total
+            calls = {man: partial(self._read_installed, man, disk_loader, net_available) for man in managers}
+            timeout = self.config.get('installed', {}).get('timeout')
 
-        if disk_loader:
+            read = dict(stream_results(calls, timeout=timeout, logger=self.logger, metrics=metrics))
             disk_loader.stop_working()
             disk_loader.join()
 
+            for man in managers:  # keeping the managers order
+                if man in read:
+                    if read[man]:
+                        metrics[man].total = read[man].total
+                        res.installed.extend(read[man].installed)
+                        res.total += read[man].total
+                    else:
+                        del metrics[man]  # the manager cannot work
+
+            for metric in metrics.values():
+                self.logger.info("read_installed: {}".format(metric))
+
         if res.installed:
             for p in res.installed:
                 if p.is_update_ignored():
@@ -229,6 +307,7 @@ class GenericSoftwareManager(SoftwareManager):
         man = self._get_manager_for(app)
 
         if man and app.can_be_downgraded():
+            self.search_cache.invalidate()
             mti = time.time()
             res = man.downgrade(app, root_password, handler)
             mtf = time.time()
@@ -244,6 +323,8 @@ class GenericSoftwareManager(SoftwareManager):
             return man.clean_cache_for(app)
 
     def upgrade(self, requirements: GenericUpgradeRequirements, root_password: str, handler: ProcessWatcher) -> bool:
+        self.search_cache.invalidate()
+
         for man, man_reqs in requirements.sub_requirements.items():
             res = man.upgrade(man_reqs, root_password, handler)
 
@@ -256,12 +337,14 @@ class GenericSoftwareManager(SoftwareManager):
         man = self._get_manager_for(app)
 
         if man:
+            self.search_cache.invalidate()
             return man.uninstall(app, root_password, handler)
 
     def install(self, app: SoftwarePackage, root_password: str, handler: ProcessWatcher) -> bool:
         man = self._get_manager_for(app)
 
         if man:
+            self.search_cache.invalidate()
             ti = time.time()
             try:
                 self.logger.info('Installing {}'.format(app))
@@ -289,6 +372,14 @@ class GenericSoftwareManager(SoftwareManager):
             self.logger.info(man.__class__.__name__ + " took {0:.2f} seconds".format(mtf - mti))
             return history
 
+    def get_more_history(self, history: PackageHistory) -> bool:
+        man = self._get_manager_for(history.pkg)
+
+        if man:
+            return man.get_more_history(history)
+
+        return False
+
     def get_managed_types(self) -> Set[Type[SoftwarePackage]]:
         pass
 
@@ -404,6 +495,7 @@ class GenericSoftwareManager(SoftwareManager):
         man = action.manager if action.manager else self._get_manager_for(pkg)
 
         if man:
+            self.search_cache.invalidate()  # custom actions can change the installed packages (e.g: system upgrade)
             return eval('man.{}({}root_password=root_password, watcher=watcher)'.format(action.manager_method, 'pkg=pkg, ' if pkg else ''))
 
     def is_default_enabled(self) -> bool:
@@ -2,21 +2,25 @@ import operator
 from functools import reduce
 
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QColor, QIcon
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt5.QtGui import QColor, QIcon, QCursor
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView, QPushButton
 
 from bauh.api.abstract.cache import MemoryCache
+from bauh.api.abstract.controller import SoftwareManager
 from bauh.api.abstract.model import PackageHistory
 from bauh.view.qt.colors import GREEN, ORANGE
+from bauh.view.qt.thread import GetMoreHistory
 from bauh.view.qt.view_model import PackageView
 from bauh.view.util.translation import I18n
 
 
 class HistoryDialog(QDialog):
 
-    def __init__(self, history: PackageHistory, icon_cache: MemoryCache, i18n: I18n):
+    def __init__(self, history: PackageHistory, icon_cache: MemoryCache, i18n: I18n, manager: SoftwareManager = None):
         super(HistoryDialog, self).__init__()
         self.setWindowFlags(self.windowFlags() | Qt.WindowSystemMenuHint | Qt.WindowMinMaxButtonsHint)
+        self.history = history
+        self.i18n = i18n
 
         view = PackageView(model=history.pkg, i18n=i18n)
 
@@ -25,19 +29,48 @@ class HistoryDialog(QDialog):
         layout = QVBoxLayout()
         self.setLayout(layout)
 
-        table_history = QTableWidget()
-        table_history.setFocusPolicy(Qt.NoFocus)
-        table_history.setShowGrid(False)
-        table_history.verticalHeader().setVisible(False)
-        table_history.setAlternatingRowColors(True)
+        self.table_history = QTableWidget()
+        self.table_history.setFocusPolicy(Qt.NoFocus)
+        self.table_history.setShowGrid(False)
+        self.table_history.verticalHeader().setVisible(False)
+        self.table_history.setAlternatingRowColors(True)
 
-        table_history.setColumnCount(len(history.history[0]))
-        table_history.setRowCount(len(history.history))
-        table_history.setHorizontalHeaderLabels([i18n.get(history.pkg.get_type().lower() + '.history.' + key, i18n.get(key, key)).capitalize() for key in sorted(history.history[0].keys())])
+        self.table_history.setColumnCount(len(history.history[0]))
+        self.table_history.setHorizontalHeaderLabels([i18n.get(history.pkg.get_type().lower() + '.history.' + key, i18n.get(key, key)).capitalize() for key in sorted(history.history[0].keys())])
+        self._fill_table()
 
-        for row, data in enumerate(history.history):
+        layout.addWidget(self.table_history)
 
-            current_status = history.pkg_status_idx == row
+        header_horizontal = self.table_history.horizontalHeader()
+        for i in range(0, self.table_history.columnCount()):
+            header_horizontal.setSectionResizeMode(i, QHeaderView.Stretch)
+
+        self.bt_more = None
+        if manager and history.has_more:
+            self.thread_more = GetMoreHistory(manager, history)
+            self.thread_more.signal_finished.connect(self._finish_load_more)
+
+            self.bt_more = QPushButton(i18n['popup.history.load_more'].capitalize())
+            self.bt_more.setCursor(QCursor(Qt.PointingHandCursor))
+            self.bt_more.clicked.connect(self._load_more)
+            layout.addWidget(self.bt_more)
+
+        new_width = reduce(operator.add, [self.table_history.columnWidth(i) for i in range(self.table_history.columnCount())])
+        self.resize(new_width, self.table_history.height())
+
+        # THERE ARE CRASHES WITH SOME RARE ICONS ( like insomnia ). IT CAN BE A QT BUG. IN THE MEANTIME, ONLY THE TYPE ICON WILL BE RENDERED
+        #
+        # icon_data = icon_cache.get(history.pkg.icon_url)
+        # if icon_data and icon_data.get('icon'):
+        #     self.setWindowIcon(icon_data.get('icon'))
+        self.setWindowIcon(QIcon(history.pkg.get_type_icon_path()))
+
+    def _fill_table(self):
+        self.table_history.setRowCount(len(self.history.history))
+
+        for row, data in enumerate(self.history.history):
+
+            current_status = self.history.pkg_status_idx == row
 
             for col, key in enumerate(sorted(data.keys())):
                 item = QTableWidgetItem()
@@ -45,24 +78,19 @@ class HistoryDialog(QDialog):
 
                 if current_status:
                     item.setBackground(QColor(ORANGE if row != 0 else GREEN))
-                    tip = '{}. {}.'.format(i18n['popup.history.selected.tooltip'], i18n['version.{}'.format('updated'if row == 0 else 'outdated')].capitalize())
+                    tip = '{}. {}.'.format(self.i18n['popup.history.selected.tooltip'], self.i18n['version.{}'.format('updated'if row == 0 else 'outdated')].capitalize())
 
                     item.setToolTip(tip)
 
-                table_history.setItem(row, col, item)
+                self.table_history.setItem(row, col, item)
 
-        layout.addWidget(table_history)
+    def _load_more(self):
+        self.bt_more.setEnabled(False)
+        self.thread_more.start()
 
-        header_horizontal = table_history.horizontalHeader()
-        for i in range(0, table_history.columnCount()):
-            header_horizontal.setSectionResizeMode(i, QHeaderView.Stretch)
-
-        new_width = reduce(operator.add, [table_history.columnWidth(i) for i in range(table_history.columnCount())])
-        self.resize(new_width, table_history.height())
+    def _finish_load_more(self, res: dict):
+        if res['loaded']:
+            self._fill_table()
 
-        # THERE ARE CRASHES WITH SOME RARE ICONS ( like insomnia ). IT CAN BE A QT BUG. IN THE MEANTIME, ONLY THE TYPE ICON WILL BE RENDERED
-        #
-        # icon_data = icon_cache.get(history.pkg.icon_url)
-        # if icon_data and icon_data.get('icon'):
-        #     self.setWindowIcon(icon_data.get('icon'))
-        self.setWindowIcon(QIcon(history.pkg.get_type_icon_path()))
+        self.bt_more.setEnabled(self.history.has_more)
+        self.bt_more.setVisible(self.history.has_more)
@@ -14,14 +14,16 @@ from bauh import LOGS_PATH
 from bauh.api.abstract.cache import MemoryCache
 from bauh.api.abstract.controller import SoftwareManager, UpgradeRequirement, UpgradeRequirements
 from bauh.api.abstract.handler import ProcessWatcher
-from bauh.api.abstract.model import PackageStatus, SoftwarePackage, CustomSoftwareAction
+from bauh.api.abstract.model import PackageStatus, SoftwarePackage, CustomSoftwareAction, PackageHistory
 from bauh.api.abstract.view import MessageType, MultipleSelectComponent, InputOption, TextComponent, \
     FormComponent, ViewComponent
 from bauh.api.exception import NoInternetException
 from bauh.commons import user
 from bauh.commons.html import bold
+from bauh.commons.search import SearchToken
 from bauh.commons.system import get_human_size_str, ProcessHandler, SimpleProcess
 from bauh.view.core import timeshift
+from bauh.view.core.controller import GenericSoftwareManager, InstalledResult
 from bauh.view.core.config import read_config
 from bauh.view.qt import commons
 from bauh.view.qt.view_model import PackageView, PackageViewStatus
@@ -498,6 +500,12 @@ class RefreshApps(AsyncAction):
         elif self.pkg_types:
             refreshed_types = self.pkg_types
 
+        if isinstance(res, InstalledResult) and res.get_unavailable():  # the packages previously read are kept
+            refreshed_types = refreshed_types.union(res.get_read_types()) if self.pkg_types else res.get_read_types()
+
+            for man in res.get_unavailable():
+                refreshed_types.difference_update(man.get_managed_types())
+
         self.notify_finished({'installed': res.installed, 'total': res.total, 'types': refreshed_types})
         self.app = None
         self.pkg_types = None
@@ -597,21 +605,57 @@ class GetAppHistory(AsyncAction):
                 self.app = None
 
 
+class GetMoreHistory(AsyncAction):
+
+    def __init__(self, manager: SoftwareManager, history: PackageHistory = None):
+        super(GetMoreHistory, self).__init__()
+        self.history = history
+        self.manager = manager
+
+    def run(self):
+        if self.history:
+            try:
+                self.notify_finished({'loaded': self.manager.get_more_history(self.history)})
+            except (requests.exceptions.ConnectionError, NoInternetException):
+                self.notify_finished({'loaded': False, 'error': True})
+            except:
+                traceback.print_exc()
+                self.notify_finished({'loaded': False, 'error': True})
+
+
 class SearchPackages(AsyncAction):
 
-    def __init__(self, manager: SoftwareManager):
+    signal_partial = pyqtSignal(object)  # the results found so far
+
+    def __init__(self, manager: GenericSoftwareManager):
         super(SearchPackages, self).__init__()
         self.word = None
         self.manager = manager
+        self.token = None
+
+    def search(self, word: str):
+        """
+        Starts searching for the given word in background. The search can be cancelled right after this call.
+        """
+        self.word = word
+        self.token = SearchToken()
+        self.start()
+
+    def cancel(self):
+        if self.token:
+            self.token.cancel()
 
     def run(self):
-        search_res = {'pkgs_found': [], 'error': None}
+        token = self.token
+        search_res = {'pkgs_found': [], 'error': None, 'token': token}
 
         if self.word:
             try:
-                res = self.manager.search(self.word)
-                search_res['pkgs_found'].extend(res.installed)
-                search_res['pkgs_found'].extend(res.new)
+                for res in self.manager.search_stream(self.word, token=token):
+                    search_res['pkgs_found'] = [*res.installed, *res.new]
+
+                    if not token.cancelled:
+                        self.signal_partial.emit({'pkgs_found': search_res['pkgs_found'], 'token': token})
             except NoInternetException:
                 search_res['error'] = 'internet.required'
             finally:
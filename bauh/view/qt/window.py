@@ -298,7 +298,8 @@ class ManageWindow(QWidget):
         self.thread_uninstall = self._bind_async_action(UninstallApp(self.manager, self.icon_cache, self.i18n), finished_call=self._finish_uninstall)
         self.thread_get_info = self._bind_async_action(GetAppInfo(self.manager), finished_call=self._finish_get_info)
         self.thread_get_history = self._bind_async_action(GetAppHistory(self.manager, self.i18n), finished_call=self._finish_get_history)
-        self.thread_search = self._bind_async_action(SearchPackages(self.manager), finished_call=self._finish_search, only_finished=True)
+        self.thread_search = self._new_search_thread()
+        self._cancelled_searches = []  # kept until they finish in background
         self.thread_downgrade = self._bind_async_action(DowngradeApp(self.manager, self.i18n), finished_call=self._finish_downgrade)
         self.thread_suggestions = self._bind_async_action(FindSuggestions(man=self.manager), finished_call=self._finish_search, only_finished=True)
         self.thread_run_app = self._bind_async_action(LaunchApp(self.manager), finished_call=self._finish_run_app, only_finished=False)
@@ -440,6 +441,11 @@ class ManageWindow(QWidget):
         if self.ref_input_name_filter.isVisible():
             self.input_name_filter.setReadOnly(False)
 
+    def _new_search_thread(self) -> SearchPackages:
+        thread = self._bind_async_action(SearchPackages(self.manager), finished_call=self._finish_search, only_finished=True)
+        thread.signal_partial.connect(self._update_search)
+        return thread
+
     def _bind_async_action(self, action: AsyncAction, finished_call, only_finished: bool = False) -> AsyncAction:
         action.signal_finished.connect(finished_call)
 
@@ -1115,7 +1121,7 @@ class ManageWindow(QWidget):
                                 body=self.i18n['action.history.no_history.body'].format(bold(res['history'].pkg.name)),
                                 type_=MessageType.WARNING)
         else:
-            dialog_history = HistoryDialog(res['history'], self.icon_cache, self.i18n)
+            dialog_history = HistoryDialog(res['history'], self.icon_cache, self.i18n, self.manager)
             dialog_history.exec_()
 
     def _begin_search(self, word):
@@ -1123,16 +1129,30 @@ class ManageWindow(QWidget):
         self.ref_checkbox_only_apps.setVisible(False)
         self.ref_checkbox_updates.setVisible(False)
         self.filter_updates = False
-        self._begin_action('{} {}'.format(self.i18n['manage_window.status.searching'], word if word else ''), clear_filters=True)
+        self._begin_action('{} {}'.format(self.i18n['manage_window.status.searching'], word if word else ''), keep_search=bool(word), clear_filters=True)
 
     def search(self):
         word = self.input_search.text().strip()
         if word:
+            self._cancelled_searches = [t for t in self._cancelled_searches if not t.isFinished()]
+
+            if self.thread_search.isRunning():  # the previous search is cancelled and its results discarded
+                self.thread_search.cancel()
+                self._cancelled_searches.append(self.thread_search)
+                self.thread_search = self._new_search_thread()
+
             self._begin_search(word)
-            self.thread_search.word = word
-            self.thread_search.start()
+            self.thread_search.search(word)
+
+    def _update_search(self, res: dict):
+        if not res['token'].cancelled and res['pkgs_found']:
+            self.update_pkgs(res['pkgs_found'], as_installed=False, ignore_updates=True)
+            self.table_apps.setEnabled(False)
 
     def _finish_search(self, res: dict):
+        if res.get('token') and res['token'].cancelled:
+            return
+
         self.finish_action()
         self.search_performed = True
 
@@ -0,0 +1,90 @@
+import logging
+from threading import Event
+from unittest import TestCase
+
+from bauh.api.executor import MetadataFetchExecutor
+
+
+class MetadataFetchExecutorTest(TestCase):
+
+    def setUp(self):
+        self.executor = MetadataFetchExecutor(logging.getLogger(__name__), max_workers=1)
+        self.release = Event()
+        self.executed = []
+        # keeps the only worker busy so the next tasks stay queued
+        self.executor.submit('blocker', lambda targets: self.release.wait(5))
+
+    def _submit(self, key: str, target: object = None, priority: int = 0, group: str = None, on_cancel=None) -> bool:
+        return self.executor.submit(key, lambda targets: self.executed.append((key, targets)), target, priority, group,
+                                    on_cancel)
+
+    def _wait_all(self):
+        done = Event()
+        self.executor.submit('done', lambda targets: done.set(), priority=1000)
+        self.release.set()
+        self.assertTrue(done.wait(5))
+
+    def test_submit__must_execute_by_priority(self):
+        self._submit('c', priority=3)
+        self._submit('a', priority=1)
+        self._submit('b', priority=2)
+        self._wait_all()
+
+        self.assertEqual(['a', 'b', 'c'], [e[0] for e in self.executed])
+
+    def test_submit__must_merge_pending_tasks_with_the_same_key(self):
+        self.assertTrue(self._submit('a', target=1, priority=5))
+        self.assertTrue(self._submit('b', target=2, priority=2))
+        self.assertFalse(self._submit('a', target=3, priority=1))
+        self._wait_all()
+
+        self.assertEqual([('a', [1, 3]), ('b', [2])], self.executed)
+        self.assertEqual(1, self.executor.get_metrics()['deduplicated'])
+
+    def test_cancel_group__must_not_execute_the_cancelled_tasks(self):
+        self._submit('a', group='search')
+        self._submit('b', group='search')
+        self._submit('c')
+
+        self.assertEqual(2, self.executor.cancel_group('search'))
+        self._wait_all()
+
+        self.assertEqual(['c'], [e[0] for e in self.executed])
+        self.assertEqual(2, self.executor.get_metrics()['cancelled'])
+
+    def test_cancel_group__must_not_cancel_tasks_shared_with_other_groups(self):
+        self._submit('a', target=1, group='search')
+        self._submit('a', target=2)
+
+        self.assertEqual(0, self.executor.cancel_group('search'))
+        self._wait_all()
+
+        self.assertEqual([('a', [1, 2])], self.executed)
+
+    def test_cancel_group__must_notify_the_targets_of_the_cancelled_tasks(self):
+        cancelled = []
+        self._submit('a', target=1, group='search', on_cancel=cancelled.extend)
+        self._submit('a', target=2, group='search')
+        self._submit('b', target=3, on_cancel=cancelled.extend)
+
+        self.assertEqual(1, self.executor.cancel_group('search'))
+        self.assertEqual([1, 2], cancelled)
+
+        self.assertTrue(self.executor.cancel('b'))
+        self.assertEqual([1, 2, 3], cancelled)
+        self._wait_all()
+        self.assertEqual([], self.executed)
+
+    def test_resume__must_submit_again_the_cancelled_tasks_of_the_targets(self):
+        targets = [object(), object(), object()]
+        self._submit('a', target=targets[0], group='search')
+        self._submit('b', target=targets[1], group='search')
+        self.executor.cancel_group('search')
+
+        resumed = []
+        self.assertEqual([targets[1]], self.executor.resume([targets[2], targets[1]], resumed.append))
+        self.assertEqual([targets[1]], resumed)
+        self.assertEqual([], self.executor.resume([targets[1]]))  # already resumed
+        self._wait_all()
+
+        self.assertEqual([('b', [targets[1]])], self.executed)
@@ -0,0 +1,56 @@
+import os
+import shutil
+import stat
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from bauh.commons.capability import CapabilityRegistry
+
+
+class CapabilityRegistryTest(TestCase):
+
+    def setUp(self):
+        self.bin_dir = tempfile.mkdtemp()
+        self.registry = CapabilityRegistry()
+        patcher = patch.object(CapabilityRegistry, '_get_path', return_value=self.bin_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.bin_dir)
+
+    def add_binary(self, name: str, version: str) -> str:
+        bin_path = '{}/{}'.format(self.bin_dir, name)
+
+        with open(bin_path, 'w+') as f:
+            f.write('#!/bin/sh\necho "{}"\n'.format(version))
+
+        os.chmod(bin_path, os.stat(bin_path).st_mode | stat.S_IEXEC)
+        return bin_path
+
+    def test_which__must_resolve_again_when_the_path_directories_change(self):
+        self.assertIsNone(self.registry.which('flatpak'))
+
+        bin_path = self.add_binary('flatpak', 'Flatpak 1.6.3')
+        os.utime(self.bin_dir, (0, 1))  # the directory mtime resolution may be lower than the test duration
+
+        self.assertEqual(bin_path, self.registry.which('flatpak'))
+        self.assertTrue(self.registry.is_available('flatpak'))
+        self.assertEqual(3, self.registry.get_stats()['saved_spawns'])
+
+    def test_get_version__must_only_execute_again_when_the_binary_changes(self):
+        bin_path = self.add_binary('flatpak', 'Flatpak 1.6.3')
+
+        self.assertEqual('Flatpak 1.6.3', self.registry.get_version('flatpak'))
+        self.assertEqual('Flatpak 1.6.3', self.registry.get_version('flatpak'))
+        self.assertEqual(1, self.registry.get_stats()['spawns'])
+
+        self.add_binary('flatpak', 'Flatpak 1.8.0')
+        os.utime(bin_path, (0, 1))
+
+        self.assertEqual('Flatpak 1.8.0', self.registry.get_version('flatpak'))
+        self.assertEqual(2, self.registry.get_stats()['spawns'])
+
+    def test_is_socket_available__must_return_false_when_there_is_no_socket(self):
+        self.assertFalse(self.registry.is_socket_available('{}/snapd.socket'.format(self.bin_dir)))
@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from unittest import TestCase
+
+from bauh.commons.internet import ConnectivityMonitor, has_default_route
+
+IPV4_ROUTES = '''Iface	Destination	Gateway 	Flags	RefCnt	Use	Metric	Mask		MTU	Window	IRTT
+eth0	{}	010200C0	0003	0	0	0	00000000	0	0	0
+eth0	000200C0	00000000	0001	0	0	0	00FFFFFF	0	0	0
+'''
+
+
+class ProbeRequestHandler(BaseHTTPRequestHandler):
+
+    def do_HEAD(self):
+        self.server.requests += 1
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ProbeServer(ThreadingHTTPServer):
+
+    def __init__(self, port: int = 0):
+        super(ProbeServer, self).__init__(('127.0.0.1', port), ProbeRequestHandler)
+        self.requests = 0
+        Thread(target=self.serve_forever, daemon=True).start()
+
+    def get_url(self) -> str:
+        return 'http://127.0.0.1:{}/generate_204'.format(self.server_address[1])
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class ConnectivityMonitorTest(TestCase):
+
+    def setUp(self):
+        self.server = ProbeServer()
+        self.monitor = ConnectivityMonitor(probe_url=self.server.get_url(), timeout=1)
+        self.changes = []
+        self.monitor.add_listener(self.changes.append)
+
+    def tearDown(self):
+        if self.server:
+            self.server.stop()
+
+    def go_offline(self):
+        self.server.stop()
+        self.server = None
+
+    def wait_for(self, online: bool):
+        for _ in range(50):
+            if self.monitor.is_online() == online:
+                return
+
+            time.sleep(0.05)
+
+        self.fail("The monitor state did not change to {}".format(online))
+
+    def test_is_online__probed_once(self):
+        self.assertTrue(self.monitor.is_online())
+        self.assertTrue(self.monitor.is_online())
+        self.assertEqual(1, self.server.requests)
+
+    def test_is_online__offline(self):
+        self.go_offline()
+        ti = time.time()
+        self.assertFalse(self.monitor.is_online())
+        self.assertFalse(self.monitor.is_online())
+        self.assertLess(time.time() - ti, 1)
+
+    def test_is_online__expired_state_is_probed_in_background(self):
+        self.assertTrue(self.monitor.is_online())
+        self.go_offline()
+        self.monitor.max_age = 0
+
+        self.assertTrue(self.monitor.is_online())  # the cached state is returned while probing
+        self.wait_for(False)
+        self.assertEqual([False], self.changes)
+
+    def test_report_failure__probes_again(self):
+        self.assertTrue(self.monitor.is_online())
+        self.go_offline()
+
+        self.monitor.report_failure()
+        self.wait_for(False)
+
+        port = int(self.monitor.probe_url.split(':')[-1].split('/')[0])
+        self.server = ProbeServer(port)  # back online
+        self.monitor.report_success()
+        self.assertTrue(self.monitor.is_online())
+        self.assertEqual([False, True], self.changes)
+
+    def test_report_failure__does_not_change_the_state_while_the_probe_succeeds(self):
+        self.assertTrue(self.monitor.is_online())
+        self.monitor.report_failure()
+        time.sleep(0.2)
+
+        self.assertTrue(self.monitor.is_online())
+        self.assertEqual(2, self.server.requests)
+        self.assertEqual([], self.changes)
+
+    def test_start__watches_until_stopped(self):
+        self.monitor.start(poll_interval=0.1, debounce=0)
+        time.sleep(0.2)
+        self.monitor.stop()
+        self.assertIsNone(self.monitor._watcher)
+
+
+class HasDefaultRouteTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ipv4, self.ipv6 = self.temp_dir + '/route', self.temp_dir + '/ipv6_route'
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_routes(self, destination: str):
+        with open(self.ipv4, 'w+') as f:
+            f.write(IPV4_ROUTES.format(destination))
+
+    def test_has_default_route(self):
+        self.write_routes('00000000')
+        self.assertTrue(has_default_route(self.ipv4, self.ipv6))
+
+    def test_has_default_route__no_default_route(self):
+        self.write_routes('000300C0')
+        self.assertFalse(has_default_route(self.ipv4, self.ipv6))
+
+    def test_has_default_route__unreadable(self):
+        self.assertFalse(os.path.exists(self.ipv4))
+        self.assertIsNone(has_default_route(self.ipv4, self.ipv6))
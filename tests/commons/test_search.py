@@ -0,0 +1,182 @@
+import time
+from threading import Event
+from unittest import TestCase
+
+from bauh.api.abstract.controller import SearchResult
+from bauh.commons.search import SearchToken, SearchCache, stream_results, refine
+
+
+def delayed(value: object, seconds: float):
+    def _call():
+        time.sleep(seconds)
+        return value
+
+    return _call
+
+
+def fail():
+    raise Exception('search failed')
+
+
+class StreamResultsTest(TestCase):
+
+    def test_stream_results__fastest_first(self):
+        calls = {'slow': delayed(1, 0.3), 'fast': delayed(2, 0), 'medium': delayed(3, 0.1)}
+        self.assertEqual([('fast', 2), ('medium', 3), ('slow', 1)], list(stream_results(calls)))
+
+    def test_stream_results__failed_calls_are_not_yielded(self):
+        self.assertEqual([('ok', 1)], list(stream_results({'ok': delayed(1, 0), 'error': fail})))
+
+    def test_stream_results__late_results_are_discarded(self):
+        ti = time.time()
+        res = list(stream_results({'fast': delayed(1, 0), 'slow': delayed(2, 5)}, timeout=0.3))
+
+        self.assertEqual([('fast', 1)], res)
+        self.assertLess(time.time() - ti, 1)
+
+    def test_stream_results__cancelled(self):
+        token, released = SearchToken(), Event()
+        calls = {'fast': delayed(1, 0), 'blocked': lambda: released.wait(5)}
+
+        ti = time.time()
+        res = []
+        for key, value in stream_results(calls, token=token):
+            res.append(key)
+            token.cancel()  # e.g: a new search was started
+
+        released.set()
+        self.assertEqual(['fast'], res)
+        self.assertLess(time.time() - ti, 1)
+
+    def test_stream_results__metrics(self):
+        metrics = {}
+        calls = {'fast': delayed(1, 0), 'error': fail, 'slow': delayed(2, 5)}
+        list(stream_results(calls, timeout=0.3, metrics=metrics))
+
+        self.assertEqual({'fast': 'ok', 'error': 'error', 'slow': 'timeout'}, {k: m.status for k, m in metrics.items()})
+        self.assertLess(metrics['fast'].duration, 0.2)
+        self.assertGreaterEqual(metrics['slow'].duration, 0.3)
+        self.assertEqual({'name', 'status', 'duration', 'total'}, set(metrics['fast'].to_dict()))
+
+    def test_stream_results__no_calls(self):
+        self.assertEqual([], list(stream_results({})))
+
+
+class Package:
+
+    def __init__(self, id: str, name: str, description: str = None):
+        self.id = id
+        self.name = name
+        self.description = description
+
+
+PACKAGES = [Package('org.mozilla.firefox', 'Firefox', 'Web browser'),
+            Package('org.mozilla.Thunderbird', 'Thunderbird', 'Email client from the Firefox makers'),
+            Package('org.gimp.GIMP', 'GIMP', 'Image editor'),
+            Package('com.github.fire', 'Fire', 'Campfire sounds'),
+            Package('org.gnome.gitg', 'gitg', 'Git client')]
+
+
+class FakeGem:
+    """
+    Searches the packages containing all words (as the flatpak catalog does) and counts the searches made
+    """
+
+    def __init__(self, substring: bool):
+        self.substring = substring
+        self.searches = 0
+
+    def search(self, words: str) -> SearchResult:
+        self.searches += 1
+        terms = words.lower().split()
+        new = [p for p in PACKAGES if all(t in ' '.join((p.id, p.name, p.description)).lower() for t in terms)]
+        return SearchResult([], new, len(new))
+
+
+def replay(cache: SearchCache, gems: list, queries: list) -> list:
+    """
+    replays a sequence of queries (e.g: typed by the user) through the cache
+    :return: the names found by each query
+    """
+    names = frozenset(str(id(g)) for g in gems)
+    found = []
+
+    for query in queries:
+        cached = cache.get(query, names, {g for g in gems if g.substring}, gems)
+        query_found = set()
+
+        for gem in gems:
+            res = cached.get(gem)
+
+            if res is None:
+                res = gem.search(query)
+                cache.put(query, names, gem, res)
+
+            query_found.update(p.name for p in res.new)
+
+        found.append(sorted(query_found))
+
+    return found
+
+
+class SearchCacheTest(TestCase):
+
+    def test_refine(self):
+        res = refine(SearchResult([PACKAGES[0]], PACKAGES[1:], 5), 'Firefox ')
+        self.assertEqual([PACKAGES[0]], res.installed)
+        self.assertEqual([PACKAGES[1]], res.new)
+        self.assertEqual(2, res.total)
+
+    def test_get__refines_substring_gems_only(self):
+        substring, other = FakeGem(True), FakeGem(False)
+        found = replay(SearchCache(), [substring, other], ['fir', 'fire', 'firef'])
+
+        self.assertEqual([['Fire', 'Firefox', 'Thunderbird'], ['Fire', 'Firefox', 'Thunderbird'], ['Firefox', 'Thunderbird']], found)
+        self.assertEqual(1, substring.searches)
+        self.assertEqual(3, other.searches)
+
+    def test_get__replay_typed_queries(self):
+        gem = FakeGem(True)
+        cache = SearchCache()
+        typed = ['g', 'gi', 'git', 'gitg', 'gi', 'gim', 'gimp', 'fire', 'fire b', 'fire br', 'fire', 'gimp']
+        found = replay(cache, [gem], typed)
+
+        self.assertEqual([sorted(p.name for p in FakeGem(True).search(q).new) for q in typed], found)  # same as searching
+        self.assertEqual(2, gem.searches)  # 'g' and 'fire'
+        self.assertEqual(10, cache.get_stats()['hits'] + cache.get_stats()['refined'])
+        self.assertAlmostEqual(10 / 12, cache.hit_rate)
+
+    def test_get__keyed_by_enabled_gems(self):
+        gem = FakeGem(False)
+        cache = SearchCache()
+        cache.put('fire', frozenset({'a'}), gem, gem.search('fire'))
+
+        self.assertEqual({}, cache.get('fire', frozenset({'a', 'b'}), set(), [gem]))
+        self.assertIn(gem, cache.get(' Fire', frozenset({'a'}), set(), [gem]))
+
+    def test_get__expired(self):
+        gem = FakeGem(True)
+        cache = SearchCache(ttl=0)
+        cache.put('fire', frozenset(), gem, gem.search('fire'))
+
+        self.assertEqual({}, cache.get('fire', frozenset(), {gem}, [gem]))
+        self.assertEqual({}, cache.get('firefox', frozenset(), {gem}, [gem]))
+
+    def test_put__least_recently_used_removed(self):
+        gem = FakeGem(False)
+        cache = SearchCache(max_entries=2)
+        cache.put('a', frozenset(), gem, gem.search('a'))
+        cache.put('b', frozenset(), gem, gem.search('b'))
+        cache.get('a', frozenset(), set(), [gem])
+        cache.put('c', frozenset(), gem, gem.search('c'))
+
+        self.assertIn(gem, cache.get('a', frozenset(), set(), [gem]))
+        self.assertEqual({}, cache.get('b', frozenset(), set(), [gem]))
+
+    def test_invalidate(self):
+        gem = FakeGem(True)
+        cache = SearchCache()
+        cache.put('fire', frozenset(), gem, gem.search('fire'))
+        cache.invalidate()
+
+        self.assertEqual({}, cache.get('firefox', frozenset(), {gem}, [gem]))
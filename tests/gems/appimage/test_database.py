@@ -0,0 +1,77 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from bauh.gems.appimage.database import ReadOnlyConnectionPool
+
+
+class ReadOnlyConnectionPoolTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = '{}/apps.db'.format(self.temp_dir)
+        self.write_db(self.db_path, 'krita')
+        self.pool = ReadOnlyConnectionPool(self.db_path)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.temp_dir)
+
+    def write_db(self, path: str, name: str):
+        con = sqlite3.connect(path)
+        con.execute('CREATE TABLE apps (name TEXT)')
+        con.execute('INSERT INTO apps VALUES (?)', (name,))
+        con.commit()
+        con.close()
+
+    @staticmethod
+    def read_name(con: sqlite3.Connection) -> str:
+        return con.execute('SELECT name FROM apps').fetchone()[0]
+
+    def test_acquire__must_return_concurrent_connections(self):
+        con1, con2 = self.pool.acquire(), self.pool.acquire()
+
+        self.assertIsNot(con1, con2)
+        self.assertEqual('krita', self.read_name(con1))
+        self.assertEqual('krita', self.read_name(con2))
+
+        self.pool.release(con1)
+        self.pool.release(con2)
+
+    def test_acquire__must_reuse_released_connections(self):
+        con = self.pool.acquire()
+        self.pool.release(con)
+        self.assertIs(con, self.pool.acquire())
+
+    def test_acquire__must_return_none_when_the_file_does_not_exist(self):
+        os.remove(self.db_path)
+        self.assertIsNone(self.pool.acquire())
+
+    def test_connections__must_be_read_only(self):
+        con = self.pool.acquire()
+
+        with self.assertRaises(sqlite3.OperationalError):
+            con.execute("INSERT INTO apps VALUES ('gimp')")
+
+        self.pool.release(con)
+
+    def test_acquire__must_connect_to_the_new_file_after_a_swap(self):
+        old_con = self.pool.acquire()
+        idle_con = self.pool.acquire()
+        self.pool.release(idle_con)
+
+        new_path = '{}/new.db'.format(self.temp_dir)
+        self.write_db(new_path, 'gimp')
+        os.replace(new_path, self.db_path)
+
+        self.assertEqual('krita', self.read_name(old_con))  # the reader keeps a consistent version
+
+        new_con = self.pool.acquire()
+        self.assertIsNot(idle_con, new_con)
+        self.assertEqual('gimp', self.read_name(new_con))
+
+        self.pool.release(old_con)
+        self.pool.release(new_con)
+        self.assertIs(new_con, self.pool.acquire())
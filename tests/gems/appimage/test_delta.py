@@ -0,0 +1,242 @@
+import hashlib
+import logging
+import random
+import re
+import shutil
+import struct
+import tempfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from unittest import TestCase
+
+from bauh.api.http import HttpClient
+from bauh.gems.appimage import delta
+
+BLOCKSIZE = 2048
+RE_RANGE = re.compile(r'bytes=(\d+)-(\d+)')
+
+
+def gen_elf(update_info: str, size: int = 4096) -> bytes:
+    """
+    :return: a 64 bits ELF stub with the sections: null, '.upd_info' and '.shstrtab'
+    """
+    names = b'\x00.upd_info\x00.shstrtab\x00'
+    info = update_info.encode().ljust(512, b'\x00')
+    info_offset, names_offset = 64, 64 + len(info)
+    shoff = names_offset + len(names)
+
+    header = b'\x7fELF\x02\x01\x01' + bytes(9)
+    header += struct.pack('<HHIQQQIHHHHHH', 2, 62, 1, 0, 0, shoff, 0, 64, 0, 0, 64, 3, 2)
+    sections = bytes(64)
+    sections += struct.pack('<IIQQQQIIQQ', 1, 7, 0, 0, info_offset, len(info), 0, 0, 1, 0)
+    sections += struct.pack('<IIQQQQIIQQ', 11, 3, 0, 0, names_offset, len(names), 0, 0, 1, 0)
+
+    elf = header + info + names + sections
+    return elf + bytes(size - len(elf))
+
+
+def gen_versions() -> tuple:
+    """
+    :return: two versions of an AppImage. The second one has inserted, replaced and appended data.
+    """
+    rand = random.Random(41)
+    payload = bytes(rand.getrandbits(8) for _ in range(400 * 1024))
+    old = gen_elf('zsync|http://127.0.0.1/App-1.0.AppImage.zsync') + payload
+
+    new = bytearray(gen_elf('zsync|http://127.0.0.1/App-2.0.AppImage.zsync') + payload)
+    new[60 * 1024:60 * 1024] = bytes(rand.getrandbits(8) for _ in range(1000))
+    new[250 * 1024:255 * 1024] = bytes(rand.getrandbits(8) for _ in range(5 * 1024))
+    new += bytes(rand.getrandbits(8) for _ in range(10 * 1000 + 7))
+    return old, bytes(new)
+
+
+def gen_zsync(data: bytes, filename: str, url: str = None, blocksize: int = BLOCKSIZE, rsum_bytes: int = 4,
+              checksum_bytes: int = 16) -> bytes:
+    headers = ['zsync: 0.6.2', 'Filename: {}'.format(filename), 'Blocksize: {}'.format(blocksize),
+               'Length: {}'.format(len(data)), 'Hash-Lengths: 2,{},{}'.format(rsum_bytes, checksum_bytes),
+               'URL: {}'.format(url or filename), 'SHA-1: {}'.format(hashlib.sha1(data).hexdigest())]
+    blocks = []
+    for start in range(0, len(data), blocksize):
+        block = data[start:start + blocksize].ljust(blocksize, b'\x00')
+        a, b = delta.rsum(block)
+        blocks.append(struct.pack('>HH', a, b)[4 - rsum_bytes:] + delta.md4(block)[:checksum_bytes])
+
+    return '\n'.join(headers).encode() + b'\n\n' + b''.join(blocks)
+
+
+class FilesServer(ThreadingHTTPServer):
+
+    def __init__(self):
+        super(FilesServer, self).__init__(('127.0.0.1', 0), FilesRequestHandler)
+        self.files = {}
+        self.ranges = True
+        self.sent = 0
+
+    def get_url(self, path: str) -> str:
+        return 'http://127.0.0.1:{}/{}'.format(self.server_address[1], path)
+
+
+class FilesRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        content = self.server.files.get(self.path.lstrip('/'))
+
+        if content is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        range_match = RE_RANGE.match(self.headers.get('Range', ''))
+
+        if range_match and self.server.ranges:
+            start, end = int(range_match.group(1)), min(int(range_match.group(2)), len(content) - 1)
+            content = content[start:end + 1]
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, end, len(self.server.files[self.path.lstrip('/')])))
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        self.server.sent += len(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MD4Test(TestCase):
+
+    def test_md4__rfc1320_vectors(self):
+        self.assertEqual('31d6cfe0d16ae931b73c59d7e0c089c0', delta.md4(b'').hex())
+        self.assertEqual('bde52cb31de33e46245e05fbdbd6fb24', delta.md4(b'a').hex())
+        self.assertEqual('a448017aaf21d8525fc10ae87aa6729d', delta.md4(b'abc').hex())
+        self.assertEqual('e33b4ddc9c38f2199c3e7b164fcc0536', delta.md4(b'1234567890' * 8).hex())
+
+
+class ReadUpdateInfoTest(TestCase):
+
+    def test_read_update_info__from_upd_info_section(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            file_path = temp_dir + '/App.AppImage'
+            with open(file_path, 'wb+') as f:
+                f.write(gen_elf('gh-releases-zsync|user|app|latest|App-*x86_64.AppImage.zsync') + b'data')
+
+            self.assertEqual('gh-releases-zsync|user|app|latest|App-*x86_64.AppImage.zsync', delta.read_update_info(file_path))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_read_update_info__not_elf(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            file_path = temp_dir + '/App.AppImage'
+            with open(file_path, 'wb+') as f:
+                f.write(b'#!/bin/sh\n')
+
+            self.assertIsNone(delta.read_update_info(file_path))
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class ParseControlTest(TestCase):
+
+    def test_parse_control__truncated_rsums(self):
+        data = bytes(range(256)) * 20
+        control = delta.parse_control(gen_zsync(data, 'App-2.0.AppImage', rsum_bytes=3, checksum_bytes=5),
+                                      'http://localhost/files/App-2.0.AppImage.zsync')
+
+        self.assertEqual('http://localhost/files/App-2.0.AppImage', control.url)
+        self.assertEqual(len(data), control.length)
+        self.assertEqual(3, control.count_blocks())
+        self.assertEqual(5, len(control.checksums[0]))
+
+        a, b = delta.rsum(data[:BLOCKSIZE])
+        self.assertEqual((a << 16 | b) & 0xFFFFFF, control.rsums[0])
+
+    def test_parse_control__missing_checksums(self):
+        content = gen_zsync(bytes(BLOCKSIZE * 2), 'App.AppImage')
+
+        with self.assertRaises(ValueError):
+            delta.parse_control(content[:-1], 'http://localhost/App.AppImage.zsync')
+
+
+class DeltaDownloaderTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.old, cls.new = gen_versions()
+        cls.control = gen_zsync(cls.new, 'App-2.0.AppImage')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.server = FilesServer()
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.installed_file = self.temp_dir + '/App-1.0.AppImage'
+
+        with open(self.installed_file, 'wb+') as f:
+            f.write(self.old)
+
+        self.server.files['App-2.0.AppImage'] = self.new
+        self.server.files['App-2.0.AppImage.zsync'] = self.control
+        self.downloader = delta.DeltaDownloader(HttpClient(logging.getLogger(), max_attempts=1, sleep=0), logging.getLogger())
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_download__only_changed_blocks(self):
+        control = self.downloader.find_control(self.installed_file, self.server.get_url('App-2.0.AppImage'))
+        self.assertIsNotNone(control)
+        self.assertEqual(self.server.get_url('App-2.0.AppImage'), control.url)
+
+        self.server.sent = 0
+        progress = []
+        output = self.temp_dir + '/App-2.0.AppImage'
+        self.assertTrue(self.downloader.download(self.installed_file, control, output, lambda d, t: progress.append((d, t))))
+
+        with open(output, 'rb') as f:
+            self.assertEqual(self.new, f.read())
+
+        self.assertGreater(self.server.sent, 0)
+        self.assertLess(self.server.sent, len(self.new) * 0.2)
+        self.assertEqual(progress[-1][0], progress[-1][1])
+
+    def test_find_control__from_embedded_update_info(self):
+        del self.server.files['App-2.0.AppImage.zsync']
+        self.server.files['releases/App-2.0.AppImage.zsync'] = self.control
+        self.server.files['releases/App-2.0.AppImage'] = self.new
+
+        with open(self.installed_file, 'wb+') as f:
+            f.write(gen_elf('zsync|' + self.server.get_url('releases/App-2.0.AppImage.zsync')) + self.old[4096:])
+
+        control = self.downloader.find_control(self.installed_file, self.server.get_url('App-2.0.AppImage'))
+        self.assertIsNotNone(control)
+        self.assertEqual(self.server.get_url('releases/App-2.0.AppImage'), control.url)
+
+    def test_find_control__other_version(self):
+        self.server.files['App-2.0.AppImage.zsync'] = self.control.replace(b'Filename: App-2.0', b'Filename: App-3.0', 1)
+        self.assertIsNone(self.downloader.find_control(self.installed_file, self.server.get_url('App-2.0.AppImage')))
+
+    def test_download__ranges_not_supported(self):
+        self.server.ranges = False
+        control = self.downloader.find_control(self.installed_file, self.server.get_url('App-2.0.AppImage'))
+        self.assertFalse(self.downloader.download(self.installed_file, control, self.temp_dir + '/App-2.0.AppImage'))
+
+    def test_download__wrong_sha1(self):
+        control = self.downloader.find_control(self.installed_file, self.server.get_url('App-2.0.AppImage'))
+        control.sha1 = hashlib.sha1(b'other').hexdigest()
+        self.assertFalse(self.downloader.download(self.installed_file, control, self.temp_dir + '/App-2.0.AppImage'))
+
+    def test_download__nothing_in_common(self):
+        with open(self.installed_file, 'wb+') as f:
+            f.write(bytes(len(self.old)))
+
+        control = self.downloader.find_control(self.installed_file, self.server.get_url('App-2.0.AppImage'))
+        output = self.temp_dir + '/App-2.0.AppImage'
+        self.assertTrue(self.downloader.download(self.installed_file, control, output))
+
+        with open(output, 'rb') as f:
+            self.assertEqual(self.new, f.read())
@@ -0,0 +1,77 @@
+import logging
+import shutil
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from bauh.gems.appimage import index, query
+
+APPS = (('Krita', 'Digital painting application', 'Graphics,2DGraphics'),
+        ('Kritacolor', 'Color picker', 'Graphics'),
+        ('Inkscape', 'Vector graphics editor. Draw like Krita users', 'Graphics'),
+        ('100%Editor', 'An editor for 100% of the files', 'Utility'),
+        ('Quote', "Tom's \"quoted\" editor", 'Office'))
+
+
+class SearchIndexTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = '{}/apps.db'.format(self.temp_dir)
+
+        con = sqlite3.connect(self.db_path)
+        con.execute('CREATE TABLE apps (id INTEGER PRIMARY KEY, {})'.format(', '.join('{} TEXT'.format(a) for a in query.APP_ATTRS)))
+
+        for name, description, categories in APPS:
+            con.execute('INSERT INTO apps (name, description, categories) VALUES (?, ?, ?)', (name, description, categories))
+
+        con.commit()
+        con.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def search(self, words: str, limit: int = -1, offset: int = 0) -> list:
+        con = sqlite3.connect(self.db_path)
+        try:
+            return [row[0] for row in index.search(con, words, limit, offset)]
+        finally:
+            con.close()
+
+    def test_search__must_rank_the_exact_name_first(self):
+        self.assertTrue(index.build(self.db_path, logging.getLogger(__name__)))
+        found = self.search('krita')
+
+        self.assertEqual('Krita', found[0])
+        self.assertEqual({'Krita', 'Kritacolor', 'Inkscape'}, set(found))
+
+    def test_search__must_honor_limit_and_offset(self):
+        index.build(self.db_path, logging.getLogger(__name__))
+        found = self.search('krita')
+
+        self.assertEqual(found[:1], self.search('krita', limit=1))
+        self.assertEqual(found[1:], self.search('krita', offset=1))
+
+    def test_search__must_match_categories(self):
+        index.build(self.db_path, logging.getLogger(__name__))
+        self.assertEqual(['Krita'], self.search('2dgraphics'))
+
+    def test_search__must_not_break_with_quotes_and_wildcards(self):
+        index.build(self.db_path, logging.getLogger(__name__))
+
+        self.assertEqual(['Quote'], self.search('"quoted"'))
+        self.assertEqual(['Quote'], self.search("tom's"))
+        self.assertEqual(['100%Editor'], self.search('100%'))
+        self.assertEqual([], self.search("x' OR '1'='1"))
+
+    def test_search__must_use_the_like_query_without_index(self):
+        found = self.search('krita')
+
+        self.assertEqual('Krita', found[0])
+        self.assertEqual({'Krita', 'Kritacolor', 'Inkscape'}, set(found))
+        self.assertEqual(['100%Editor'], self.search('100%'))
+        self.assertEqual([], self.search("x' OR '1'='1"))
+
+    def test_search__must_use_the_like_query_for_short_terms(self):
+        index.build(self.db_path, logging.getLogger(__name__))
+        self.assertEqual(['Kritacolor'], self.search('co'))
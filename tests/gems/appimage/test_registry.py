@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from bauh.gems.appimage.registry import InstalledRegistry, find_latest_releases
+
+
+class InstalledRegistryTest(TestCase):
+
+    def setUp(self):
+        self.installation_path = tempfile.mkdtemp()
+        self.registry = InstalledRegistry(logging.getLogger(), self.installation_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.installation_path)
+
+    def write_app(self, folder: str, data: dict):
+        os.makedirs('{}/{}'.format(self.installation_path, folder), exist_ok=True)
+
+        with open('{}/{}/data.json'.format(self.installation_path, folder), 'w+') as f:
+            f.write(json.dumps(data))
+
+    def test_get_all__keyed_by_name_and_github(self):
+        self.write_app('krita', {'name': 'Krita', 'github': 'KDE/krita', 'version': '4.2'})
+        self.write_app('imported', {'name': 'Imported', 'version': '1.0', 'imported': True})
+        os.mkdir(self.installation_path + '/incomplete')
+
+        apps = self.registry.get_all()
+        self.assertEqual({('krita', 'kde/krita'), ('imported', '')}, set(apps.keys()))
+        self.assertEqual('4.2', apps[('krita', 'kde/krita')]['version'])
+
+    def test_get_all__must_reload_only_when_the_directory_changes(self):
+        self.write_app('krita', {'name': 'Krita', 'github': 'KDE/krita', 'version': '4.2'})
+        self.assertEqual(1, len(self.registry.get_all()))
+
+        self.write_app('krita', {'name': 'Krita', 'github': 'KDE/krita', 'version': '4.3'})
+        self.assertEqual('4.2', self.registry.get_all()[('krita', 'kde/krita')]['version'])
+
+        self.write_app('gimp', {'name': 'Gimp', 'github': 'GNOME/gimp', 'version': '2.10'})
+        os.utime(self.installation_path, ns=(0, os.stat(self.installation_path).st_mtime_ns + 1000))
+
+        apps = self.registry.get_all()
+        self.assertEqual(2, len(apps))
+        self.assertEqual('4.3', apps[('krita', 'kde/krita')]['version'])
+
+    def test_invalidate(self):
+        self.write_app('krita', {'name': 'Krita', 'github': 'KDE/krita', 'version': '4.2'})
+        self.registry.get_all()
+
+        self.write_app('krita', {'name': 'Krita', 'github': 'KDE/krita', 'version': '4.3'})
+        self.registry.invalidate()
+        self.assertEqual('4.3', self.registry.get_all()[('krita', 'kde/krita')]['version'])
+
+    def test_get_all__returned_data_must_not_change_the_registry(self):
+        self.write_app('krita', {'name': 'Krita', 'github': 'KDE/krita', 'version': '4.2'})
+        self.registry.get_all()[('krita', 'kde/krita')]['version'] = '5.0'
+        self.assertEqual('4.2', self.registry.get_all()[('krita', 'kde/krita')]['version'])
+
+    def test_get_all__no_installation_dir(self):
+        shutil.rmtree(self.installation_path)
+        self.assertEqual({}, self.registry.get_all())
+        os.mkdir(self.installation_path)
+
+
+class FindLatestReleasesTest(TestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.execute('CREATE TABLE apps (name TEXT, github TEXT, version TEXT, url_download TEXT)')
+        self.connection.executemany('INSERT INTO apps VALUES (?, ?, ?, ?)',
+                                    [('Krita', 'KDE/krita', '4.3', 'http://krita/4.3'),
+                                     ('Krita', 'other/krita', '9.0', 'http://other/9.0'),
+                                     ("O'Brien", 'obrien/app', '1.1', 'http://obrien/1.1'),
+                                     ('Gimp', None, '2.10', 'http://gimp/2.10')])
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_find_latest_releases__joined_by_name_and_github(self):
+        releases = find_latest_releases(self.connection, [('krita', 'kde/krita'), ("o'brien", 'obrien/app'),
+                                                          ('gimp', ''), ('missing', '')])
+
+        self.assertEqual({('krita', 'kde/krita'): ('4.3', 'http://krita/4.3'),
+                          ("o'brien", 'obrien/app'): ('1.1', 'http://obrien/1.1'),
+                          ('gimp', ''): ('2.10', 'http://gimp/2.10')}, releases)
+
+    def test_find_latest_releases__without_github_matches_by_name(self):
+        releases = find_latest_releases(self.connection, [('krita', '')])
+        self.assertEqual(1, len(releases))
+        self.assertIn(releases[('krita', '')][0], ('4.3', '9.0'))
+
+    def test_find_latest_releases__no_keys(self):
+        self.assertEqual({}, find_latest_releases(self.connection, []))
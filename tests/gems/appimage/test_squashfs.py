@@ -0,0 +1,308 @@
+import lzma
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from unittest import TestCase
+
+from bauh.gems.appimage import squashfs
+from bauh.gems.appimage.squashfs import SquashFSReader, SquashFSError
+
+BLOCK_SIZE = 4096
+ELF_HEADER_SIZE = 64
+ELF_SHOFF, ELF_SHENTSIZE, ELF_SHNUM = 256, 64, 3
+
+
+class MetadataWriter:
+    """
+    Writes a metadata table in blocks of 8192 bytes. A reference to the current position is known while writing
+    since the previous blocks are already compressed.
+    """
+
+    def __init__(self, compress):
+        self.compress = compress
+        self.blocks = b''
+        self.buffer = b''
+
+    def position(self) -> tuple:
+        return len(self.blocks), len(self.buffer)
+
+    def write(self, data: bytes):
+        self.buffer += data
+
+        while len(self.buffer) >= squashfs.METADATA_SIZE:
+            self._flush(self.buffer[:squashfs.METADATA_SIZE])
+            self.buffer = self.buffer[squashfs.METADATA_SIZE:]
+
+    def _flush(self, block: bytes):
+        compressed = self.compress(block)
+
+        if len(compressed) < len(block):
+            self.blocks += struct.pack('<H', len(compressed)) + compressed
+        else:
+            self.blocks += struct.pack('<H', len(block) | 0x8000) + block
+
+    def finish(self) -> bytes:
+        if self.buffer:
+            self._flush(self.buffer)
+            self.buffer = b''
+
+        return self.blocks
+
+
+class SquashFSImageWriter:
+    """
+    Generates squashfs (version 4) images to test the reader. The tree is a dict: name -> bytes (file),
+    str (symlink target) or dict (directory).
+    """
+
+    def __init__(self, compression: int = squashfs.GZIP, block_size: int = BLOCK_SIZE):
+        self.compression = compression
+        self.block_size = block_size
+        self.compress = zlib.compress if compression == squashfs.GZIP else lambda d: lzma.compress(d, format=lzma.FORMAT_XZ, check=lzma.CHECK_CRC32)
+
+    def _number(self, tree: dict, path: tuple, numbers: dict):
+        for name, node in sorted(tree.items()):
+            if isinstance(node, dict):
+                self._number(node, path + (name,), numbers)
+
+            numbers[path + (name,)] = len(numbers) + 1
+
+    def _write_block(self, block: bytes) -> int:
+        compressed = self.compress(block)
+
+        if len(compressed) < len(block):
+            self.data += compressed
+            return len(compressed)
+
+        self.data += block
+        return len(block) | (1 << 24)
+
+    def _flush_fragment(self):
+        if self.fragment_buffer:
+            start = squashfs.SUPERBLOCK.size + len(self.data)
+            self.fragments.append((start, self._write_block(self.fragment_buffer)))
+            self.fragment_buffer = b''
+
+    def _write_file(self, content: bytes, number: int) -> tuple:
+        blocks_start = squashfs.SUPERBLOCK.size + len(self.data)
+        full_blocks = len(content) // self.block_size
+        sizes = [self._write_block(content[i * self.block_size:(i + 1) * self.block_size]) for i in range(full_blocks)]
+        tail = content[full_blocks * self.block_size:]
+        fragment, fragment_offset = squashfs.NO_FRAGMENT, 0
+
+        if tail:
+            if len(self.fragment_buffer) + len(tail) > self.block_size:
+                self._flush_fragment()
+
+            fragment, fragment_offset = len(self.fragments), len(self.fragment_buffer)
+            self.fragment_buffer += tail
+
+        position = self.inodes.position()
+
+        if len(content) > 0xFFFFFFFF or blocks_start > 0xFFFFFFFF or number % 2:  # both formats are generated
+            header = struct.pack('<HHHHII', squashfs.EXTENDED_FILE, 0o644, 0, 0, 0, number)
+            body = struct.pack('<QQQIIII', blocks_start, len(content), 0, 1, fragment, fragment_offset, 0xFFFFFFFF)
+        else:
+            header = struct.pack('<HHHHII', squashfs.BASIC_FILE, 0o644, 0, 0, 0, number)
+            body = struct.pack('<IIII', blocks_start, fragment, fragment_offset, len(content))
+
+        self.inodes.write(header + body + struct.pack('<{}I'.format(len(sizes)), *sizes))
+        return position
+
+    def _write_symlink(self, target: str, number: int) -> tuple:
+        position = self.inodes.position()
+        target = target.encode()
+        self.inodes.write(struct.pack('<HHHHII', squashfs.BASIC_SYMLINK, 0o777, 0, 0, 0, number) +
+                          struct.pack('<II', 1, len(target)) + target)
+        return position
+
+    def _write_dir(self, tree: dict, path: tuple, number: int, parent: int, numbers: dict) -> tuple:
+        entries = []
+        for name, node in sorted(tree.items()):
+            child = numbers[path + (name,)]
+
+            if isinstance(node, dict):
+                ref, type_ = self._write_dir(node, path + (name,), child, number, numbers), squashfs.BASIC_DIR
+            elif isinstance(node, bytes):
+                ref, type_ = self._write_file(node, child), squashfs.BASIC_FILE
+            else:
+                ref, type_ = self._write_symlink(node, child), squashfs.BASIC_SYMLINK
+
+            entries.append((name.encode(), ref, type_, child))
+
+        listing_position = self.directories.position()
+        listing, idx = b'', 0
+
+        while idx < len(entries):  # a header per inode block
+            run = [e for e in entries[idx:idx + 256] if e[1][0] == entries[idx][1][0]]
+            listing += struct.pack('<III', len(run) - 1, run[0][1][0], run[0][3])
+
+            for name, ref, type_, child in run:
+                listing += struct.pack('<HhHH', ref[1], child - run[0][3], type_, len(name) - 1) + name
+
+            idx += len(run)
+
+        self.directories.write(listing)
+        position = self.inodes.position()
+        subdirs = len([n for n in tree.values() if isinstance(n, dict)])
+        self.inodes.write(struct.pack('<HHHHII', squashfs.BASIC_DIR, 0o755, 0, 0, 0, number) +
+                          struct.pack('<IIHHI', listing_position[0], 2 + subdirs, len(listing) + 3, listing_position[1], parent))
+        return position
+
+    def write(self, tree: dict) -> bytes:
+        self.data, self.fragment_buffer, self.fragments = bytearray(), b'', []
+        self.inodes, self.directories = MetadataWriter(self.compress), MetadataWriter(self.compress)
+
+        numbers = {}
+        self._number(tree, (), numbers)
+        numbers[()] = len(numbers) + 1
+
+        root = self._write_dir(tree, (), numbers[()], len(numbers) + 1, numbers)
+        self._flush_fragment()
+
+        inode_table = squashfs.SUPERBLOCK.size + len(self.data)
+        inodes = self.inodes.finish()
+        directory_table = inode_table + len(inodes)
+        directories = self.directories.finish()
+
+        fragments = MetadataWriter(self.compress)
+        for start, size in self.fragments:
+            fragments.write(struct.pack('<QII', start, size, 0))
+
+        fragment_blocks = directory_table + len(directories)
+        fragment_metadata = fragments.finish()
+        fragment_pointers, block_position = b'', 0
+
+        while block_position < len(fragment_metadata):
+            fragment_pointers += struct.pack('<Q', fragment_blocks + block_position)
+            header = struct.unpack_from('<H', fragment_metadata, block_position)[0]
+            block_position += 2 + (header & 0x7FFF)
+
+        fragment_table = fragment_blocks + len(fragment_metadata)
+        ids = MetadataWriter(self.compress)
+        ids.write(struct.pack('<I', 0))
+        id_blocks = fragment_table + len(fragment_pointers)
+        id_metadata = ids.finish()
+        id_table = id_blocks + len(id_metadata)
+
+        body = bytes(self.data) + inodes + directories + fragment_metadata + fragment_pointers + id_metadata + struct.pack('<Q', id_blocks)
+        superblock = squashfs.SUPERBLOCK.pack(squashfs.SQUASHFS_MAGIC, len(numbers), 0, self.block_size, len(self.fragments),
+                                              self.compression, self.block_size.bit_length() - 1, 0, 1, 4, 0,
+                                              (root[0] << 16) | root[1], squashfs.SUPERBLOCK.size + len(body),
+                                              id_table, 0xFFFFFFFFFFFFFFFF, inode_table, directory_table, fragment_table,
+                                              0xFFFFFFFFFFFFFFFF)
+        image = superblock + body
+        return image + bytes(-len(image) % 4096)
+
+
+def gen_appimage(tree: dict, compression: int = squashfs.GZIP) -> bytes:
+    elf = bytearray(ELF_SHOFF + ELF_SHENTSIZE * ELF_SHNUM)
+    elf[:7] = b'\x7fELF\x02\x01\x01'
+    struct.pack_into('<Q', elf, 0x28, ELF_SHOFF)
+    struct.pack_into('<HH', elf, 0x3A, ELF_SHENTSIZE, ELF_SHNUM)
+    return bytes(elf) + SquashFSImageWriter(compression).write(tree)
+
+
+DESKTOP_ENTRY = b'[Desktop Entry]\nName=Krita\nExec=krita %F\nIcon=krita\nType=Application\n'
+ICON = bytes(range(256)) * 40  # several blocks + tail
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg"></svg>'
+
+
+def gen_tree() -> dict:
+    return {'krita.desktop': DESKTOP_ENTRY,
+            'krita.png': 'usr/share/icons/hicolor/256x256/apps/krita.png',
+            '.DirIcon': 'krita.png',
+            'krita.svg': '/usr/share/icons/../icons/krita.svg',
+            'AppRun': b'#!/bin/sh\nexec "$APPDIR/usr/bin/krita" "$@"\n',
+            'empty.png': b'',
+            'usr': {'bin': {'krita': os.urandom(BLOCK_SIZE * 3 + 100)},
+                    'share': {'icons': {'krita.svg': SVG,
+                                        'hicolor': {'256x256': {'apps': {'krita.png': ICON}}}},
+                              'applications': {'krita.desktop': DESKTOP_ENTRY}},
+                    'lib': {'lib{}.so'.format(i): os.urandom(50) for i in range(600)}}}  # listing spanning blocks
+
+
+class SquashFSReaderTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tree = gen_tree()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_appimage(self, compression: int = squashfs.GZIP) -> str:
+        path = self.temp_dir + '/Krita.AppImage'
+
+        with open(path, 'wb+') as f:
+            f.write(gen_appimage(self.tree, compression))
+
+        return path
+
+    def test_find_offset__must_return_the_position_after_the_elf_section_headers(self):
+        with open(self.write_appimage(), 'rb') as f:
+            self.assertEqual(ELF_SHOFF + ELF_SHENTSIZE * ELF_SHNUM, squashfs.find_offset(f))
+
+    def test_find_offset__must_return_none_for_files_without_squashfs(self):
+        path = self.temp_dir + '/file'
+
+        with open(path, 'wb+') as f:
+            f.write(b'\x7fELF\x02\x01\x01' + bytes(500))
+
+        with open(path, 'rb') as f:
+            self.assertIsNone(squashfs.find_offset(f))
+
+    def test_reader__must_read_files_directories_and_symlinks(self):
+        for compression in (squashfs.GZIP, squashfs.XZ):
+            with open(self.write_appimage(compression), 'rb') as f:
+                reader = SquashFSReader(f, squashfs.find_offset(f))
+
+                root_names = [name for name, _ in reader.list_dir(reader.get_root())]
+                self.assertEqual(sorted(self.tree), root_names)
+
+                self.assertEqual(DESKTOP_ENTRY, reader.read_file(reader.lookup('krita.desktop')))
+                self.assertEqual(ICON, reader.read_file(reader.lookup('.DirIcon')))
+                self.assertEqual(SVG, reader.read_file(reader.lookup('krita.svg')))
+                self.assertEqual(b'', reader.read_file(reader.lookup('empty.png')))
+                self.assertEqual(self.tree['usr']['bin']['krita'], reader.read_file(reader.lookup('usr/bin/krita')))
+                self.assertEqual(self.tree['usr']['lib']['lib599.so'], reader.read_file(reader.lookup('/usr/lib/lib599.so')))
+                self.assertEqual(600, len(reader.list_dir(reader.lookup('usr/lib'))))
+                self.assertIsNone(reader.lookup('usr/none'))
+
+    def test_read_file__must_respect_the_max_size(self):
+        with open(self.write_appimage(), 'rb') as f:
+            reader = SquashFSReader(f, squashfs.find_offset(f))
+
+            with self.assertRaises(SquashFSError):
+                reader.read_file(reader.lookup('krita.png'), max_size=100)
+
+    def test_lookup__must_fail_for_symlink_loops(self):
+        self.tree['loop'] = 'loop'
+
+        with open(self.write_appimage(), 'rb') as f:
+            reader = SquashFSReader(f, squashfs.find_offset(f))
+
+            with self.assertRaises(SquashFSError):
+                reader.lookup('loop')
+
+    def test_extract_root_files__must_only_extract_the_matching_root_files(self):
+        out_dir = self.temp_dir + '/squashfs-root'
+        extracted = squashfs.extract_root_files(self.write_appimage(), out_dir, ('.desktop', '.png', '.svg'))
+
+        self.assertEqual(['empty.png', 'krita.desktop', 'krita.png', 'krita.svg'], sorted(extracted))
+        self.assertEqual(sorted(extracted), sorted(os.listdir(out_dir)))
+
+        with open(out_dir + '/krita.png', 'rb') as f:
+            self.assertEqual(ICON, f.read())
+
+    def test_extract_root_files__must_fail_for_unsupported_compressions(self):
+        path = self.write_appimage()
+
+        with open(path, 'r+b') as f:
+            f.seek(squashfs.find_offset(f) + 20)
+            f.write(struct.pack('<H', squashfs.LZ4))
+
+        with self.assertRaises(SquashFSError):
+            squashfs.extract_root_files(path, self.temp_dir + '/out', ('.desktop',))
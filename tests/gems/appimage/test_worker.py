@@ -0,0 +1,152 @@
+import io
+import logging
+import os
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from unittest import TestCase
+from unittest.mock import patch
+
+from bauh.api.http import HttpClient
+from bauh.gems.appimage import index
+from bauh.gems.appimage.worker import DatabaseUpdater
+
+
+def gen_databases(app_name: str) -> bytes:
+    temp_dir = tempfile.mkdtemp()
+    try:
+        con = sqlite3.connect(temp_dir + '/apps.db')
+        con.execute('CREATE TABLE apps (id INTEGER PRIMARY KEY, name TEXT, description TEXT, categories TEXT)')
+        con.execute('INSERT INTO apps (name) VALUES (?)', (app_name,))
+        con.commit()
+        con.close()
+
+        con = sqlite3.connect(temp_dir + '/releases.db')
+        con.execute('CREATE TABLE releases (app_id INTEGER, version TEXT)')
+        con.commit()
+        con.close()
+
+        compressed = io.BytesIO()
+        with tarfile.open(fileobj=compressed, mode='w:gz') as tf:
+            for name in ('apps.db', 'releases.db'):
+                tf.add(temp_dir + '/' + name, arcname=name)
+
+        return compressed.getvalue()
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+class DatabasesServer(ThreadingHTTPServer):
+
+    def __init__(self):
+        super(DatabasesServer, self).__init__(('127.0.0.1', 0), DatabasesRequestHandler)
+        self.content, self.etag = None, None
+        self.responses = []
+
+    def publish(self, app_name: str, etag: str):
+        self.content, self.etag = gen_databases(app_name), etag
+
+
+class DatabasesRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == self.server.etag:
+            self.server.responses.append(304)
+            self.send_response(304)
+            self.send_header('ETag', self.server.etag)
+            self.end_headers()
+            return
+
+        self.server.responses.append(200)
+        self.send_response(200)
+        self.send_header('ETag', self.server.etag)
+        self.send_header('Content-Length', str(len(self.server.content)))
+        self.end_headers()
+        self.wfile.write(self.server.content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@patch('bauh.gems.appimage.worker.internet.is_available', return_value=True)
+class DatabaseUpdaterTest(TestCase):
+
+    def setUp(self):
+        self.db_dir = tempfile.mkdtemp()
+        self.server = DatabasesServer()
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+        logger = logging.getLogger(__name__)
+        self.updater = DatabaseUpdater(task_man=None, i18n=None, http_client=HttpClient(logger, sleep=0), logger=logger,
+                                       interval=60, db_dir=self.db_dir)
+        self.updater.URL_DB = 'http://127.0.0.1:{}/dbs.tar.gz'.format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.db_dir)
+
+    def read_app_name(self) -> str:
+        con = sqlite3.connect(self.db_dir + '/apps.db')
+        try:
+            return con.execute('SELECT name FROM apps').fetchone()[0]
+        finally:
+            con.close()
+
+    def test_download_databases__must_extract_and_index_the_databases(self, _):
+        self.server.publish('krita', '"v1"')
+        self.updater.download_databases()
+
+        self.assertEqual({'apps.db', 'releases.db', 'dbs.json'}, set(os.listdir(self.db_dir)))
+        self.assertEqual('krita', self.read_app_name())
+
+        con = sqlite3.connect(self.db_dir + '/apps.db')
+        try:
+            self.assertIsNotNone(index.get_tokenizer(con))
+        finally:
+            con.close()
+
+    def test_download_databases__must_skip_the_update_when_not_modified(self, _):
+        self.server.publish('krita', '"v1"')
+        self.updater.download_databases()
+        inode = os.stat(self.db_dir + '/apps.db').st_ino
+
+        self.updater.download_databases()
+
+        self.assertEqual([200, 304], self.server.responses)
+        self.assertEqual(inode, os.stat(self.db_dir + '/apps.db').st_ino)
+
+    def test_download_databases__must_replace_the_databases_when_modified(self, _):
+        self.server.publish('krita', '"v1"')
+        self.updater.download_databases()
+
+        self.server.publish('gimp', '"v2"')
+        self.updater.download_databases()
+
+        self.assertEqual([200, 200], self.server.responses)
+        self.assertEqual('gimp', self.read_app_name())
+        self.assertEqual({'apps.db', 'releases.db', 'dbs.json'}, set(os.listdir(self.db_dir)))
+
+    def test_download_databases__must_download_again_when_the_files_were_removed(self, _):
+        self.server.publish('krita', '"v1"')
+        self.updater.download_databases()
+        os.remove(self.db_dir + '/apps.db')
+        os.remove(self.db_dir + '/releases.db')
+
+        self.updater.download_databases()
+
+        self.assertEqual([200, 200], self.server.responses)
+        self.assertEqual('krita', self.read_app_name())
+
+    def test_download_databases__must_keep_the_current_files_when_the_download_is_invalid(self, _):
+        self.server.publish('krita', '"v1"')
+        self.updater.download_databases()
+
+        self.server.content, self.server.etag = b'not a tarball', '"v2"'
+        self.updater.download_databases()
+
+        self.assertEqual('krita', self.read_app_name())
+        self.assertEqual({'apps.db', 'releases.db', 'dbs.json'}, set(os.listdir(self.db_dir)))
@@ -0,0 +1,168 @@
+import logging
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from bauh.commons.system import SimpleProcess, ProcessHandler
+from bauh.gems.arch import cpu_manager
+from bauh.gems.arch.governor import BuildGovernor, BuildStats, DISK_BUILD_DIR
+
+
+def gen_config(**build) -> dict:
+    config = {'performance_governor': True, 'nice': None, 'ionice_class': None, 'ionice_level': None,
+              'cpu_quota': None, 'memory_max': None, 'tmpfs': True, 'tmpfs_min_free_mem': 4096}
+    config.update(build)
+    return {'build': config}
+
+
+class SetGovernorsTest(TestCase):
+
+    @patch('bauh.gems.arch.cpu_manager.new_root_subprocess')
+    def test_set_governors__single_privileged_call(self, new_root_subprocess: Mock):
+        new_root_subprocess.return_value.returncode = 0
+
+        self.assertTrue(cpu_manager.set_governors({0: 'performance', 1: 'powersave'}, 'pwd'))
+        new_root_subprocess.assert_called_once()
+
+        cmd = new_root_subprocess.call_args[0][0]
+        self.assertEqual(['sh', '-c'], cmd[0:2])
+        self.assertIn('echo performance > {}'.format(cpu_manager.GOVERNOR_FILE.format(0)), cmd[2])
+        self.assertIn('echo powersave > {}'.format(cpu_manager.GOVERNOR_FILE.format(1)), cmd[2])
+        self.assertEqual('pwd', new_root_subprocess.call_args[1]['root_password'])
+
+    @patch('bauh.gems.arch.cpu_manager.new_root_subprocess')
+    def test_set_governors__failed(self, new_root_subprocess: Mock):
+        new_root_subprocess.return_value.returncode = 1
+        self.assertFalse(cpu_manager.set_governors({0: 'performance'}, 'pwd'))
+
+    @patch('bauh.gems.arch.cpu_manager.new_root_subprocess')
+    def test_set_governors__invalid_governors_are_ignored(self, new_root_subprocess: Mock):
+        self.assertFalse(cpu_manager.set_governors({0: 'performance; rm -rf /', 1: None}, 'pwd'))
+        new_root_subprocess.assert_not_called()
+
+
+@patch('bauh.gems.arch.cpu_manager.supports_performance_mode', return_value=True)
+@patch('bauh.gems.arch.cpu_manager.read_governors', return_value={0: 'powersave', 1: 'schedutil'})
+class GovernorsSwitchTest(TestCase):
+
+    def setUp(self):
+        self.governor = BuildGovernor(logging.getLogger(), stats_file=None)
+
+    @patch('bauh.gems.arch.cpu_manager.set_governors', return_value=True)
+    def test_switch_to_performance__returns_the_previous_governors(self, set_governors: Mock, *_):
+        previous = self.governor.switch_to_performance(gen_config(), 'pwd')
+
+        self.assertEqual({0: 'powersave', 1: 'schedutil'}, previous)
+        set_governors.assert_called_once_with({0: 'performance', 1: 'performance'}, 'pwd')
+
+        self.governor.restore_governors(previous, 'pwd')
+        set_governors.assert_called_with({0: 'powersave', 1: 'schedutil'}, 'pwd')
+
+    @patch('bauh.gems.arch.cpu_manager.set_governors', side_effect=[False, True])
+    def test_switch_to_performance__restored_when_it_fails(self, set_governors: Mock, *_):
+        self.assertIsNone(self.governor.switch_to_performance(gen_config(), 'pwd'))
+        self.assertEqual(2, set_governors.call_count)
+        set_governors.assert_called_with({0: 'powersave', 1: 'schedutil'}, 'pwd')
+
+    @patch('bauh.gems.arch.cpu_manager.set_governors')
+    def test_switch_to_performance__disabled(self, set_governors: Mock, *_):
+        self.assertIsNone(self.governor.switch_to_performance(gen_config(performance_governor=False), 'pwd'))
+        set_governors.assert_not_called()
+
+    @patch('bauh.gems.arch.cpu_manager.set_governors')
+    def test_restore_governors__nothing_to_restore(self, set_governors: Mock, *_):
+        self.governor.restore_governors(None, 'pwd')
+        set_governors.assert_not_called()
+
+
+@patch('bauh.gems.arch.governor.shutil.which', side_effect=lambda cmd: '/usr/bin/' + cmd)
+class GenCmdWrapperTest(TestCase):
+
+    def setUp(self):
+        self.governor = BuildGovernor(logging.getLogger(), stats_file=None)
+
+    def test_gen_cmd_wrapper__no_limits(self, _):
+        self.assertEqual([], self.governor.gen_cmd_wrapper(gen_config()))
+
+    def test_gen_cmd_wrapper__priorities(self, _):
+        self.assertEqual(['nice', '-n', '10', 'ionice', '-c', '2', '-n', '7'],
+                         self.governor.gen_cmd_wrapper(gen_config(nice=10, ionice_class=2, ionice_level=7)))
+
+    def test_gen_cmd_wrapper__ionice_level_only_for_best_effort(self, _):
+        self.assertEqual(['ionice', '-c', '3'], self.governor.gen_cmd_wrapper(gen_config(ionice_class=3, ionice_level=7)))
+
+    def test_gen_cmd_wrapper__cgroup_limits(self, _):
+        self.assertEqual(['systemd-run', '--user', '--scope', '--quiet', '-p', 'CPUQuota=200%', '-p', 'MemoryMax=4G',
+                          'nice', '-n', '5'],
+                         self.governor.gen_cmd_wrapper(gen_config(cpu_quota=200, memory_max='4g', nice=5)))
+
+    def test_gen_cmd_wrapper__invalid_memory_limit(self, _):
+        self.assertEqual([], self.governor.gen_cmd_wrapper(gen_config(memory_max='4 gigabytes')))
+
+    def test_gen_cmd_wrapper__limits_without_systemd_run(self, which: Mock):
+        which.side_effect = lambda cmd: None if cmd == 'systemd-run' else '/usr/bin/' + cmd
+        self.assertEqual([], self.governor.gen_cmd_wrapper(gen_config(cpu_quota=50)))
+
+
+class GenBuildDirTest(TestCase):
+
+    def setUp(self):
+        self.governor = BuildGovernor(logging.getLogger(), stats_file=None)
+
+    @patch('bauh.gems.arch.governor.read_available_memory', return_value=8 * 1024 ** 3)
+    @patch('bauh.gems.arch.governor.is_tmpfs', side_effect=lambda path: path == '/dev/shm')
+    def test_gen_build_dir__tmpfs_when_there_is_enough_memory(self, *_):
+        self.assertTrue(self.governor.gen_build_dir(gen_config()).startswith('/dev/shm/bauh_makepkg/build_'))
+
+    @patch('bauh.gems.arch.governor.read_available_memory', return_value=1024 ** 3)
+    @patch('bauh.gems.arch.governor.is_tmpfs', return_value=True)
+    def test_gen_build_dir__disk_when_the_default_dir_is_tmpfs_and_there_is_not_enough_memory(self, *_):
+        self.assertTrue(self.governor.gen_build_dir(gen_config()).startswith(DISK_BUILD_DIR + '/build_'))
+
+    @patch('bauh.gems.arch.governor.read_available_memory', return_value=1024 ** 3)
+    @patch('bauh.gems.arch.governor.is_tmpfs', return_value=False)
+    def test_gen_build_dir__default_when_there_is_not_enough_memory(self, *_):
+        self.assertIsNone(self.governor.gen_build_dir(gen_config()))
+
+    @patch('bauh.gems.arch.governor.read_available_memory', return_value=8 * 1024 ** 3)
+    def test_gen_build_dir__disabled(self, read_available_memory: Mock):
+        self.assertIsNone(self.governor.gen_build_dir(gen_config(tmpfs=False)))
+        read_available_memory.assert_not_called()
+
+
+class BuildStatsTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_finish__usage_of_the_build_process_only(self):
+        stats = BuildStats(build_dir=None, optimized=False)
+        SimpleProcess(['sh', '-c', 'i=0; while [ $i -lt 20000 ]; do i=$((i+1)); done']).wait()  # not the build
+
+        proc = SimpleProcess(['sh', '-c', 'exit 0'])
+        ProcessHandler().handle_simple(proc)
+        stats.usage = proc.rusage
+
+        res = stats.finish(True)
+        self.assertIsNotNone(proc.rusage)
+        self.assertLess(res['cpu_time'], 0.05)
+        self.assertGreater(res['max_rss'], 0)
+
+    def test_finish__no_usage(self):
+        res = BuildStats(build_dir=None, optimized=True).finish(False)
+        self.assertIsNone(res['cpu_time'])
+        self.assertIsNone(res['max_rss'])
+
+    def test_register_stats__kept_per_package(self):
+        governor = BuildGovernor(logging.getLogger(), stats_file=self.temp_dir + '/stats.json')
+
+        for idx in range(12):
+            governor.register_stats('pkg', {'wall_time': idx})
+
+        stats = governor.read_stats()['pkg']
+        self.assertEqual(10, len(stats))
+        self.assertEqual(11, stats[-1]['wall_time'])
@@ -0,0 +1,54 @@
+import logging
+import tempfile
+from typing import List, Optional
+from unittest import TestCase
+
+from bauh.commons.system import SystemProcess
+from bauh.gems.arch.keyring import Keyring, normalize_key
+
+LIST_OUTPUT = """
+pub:u:4096:1:4AEE18F83AFDEB23:1500000000:::u:::scESC::::::23::0:
+fpr:::::::::ABAF11C65A2970B130ABE3C479BE3E4300411886:
+uid:u::::1500000000::A1B2C3D4::Linus Torvalds <torvalds@kernel.org>::::::::::0:
+sub:u:4096:1:79BE3E4300411886:1500000000::::::e::::::23:
+fpr:::::::::C1D9EB2F3DD1E4A5F8D0E9C1DEADBEEFCAFE0001:
+"""
+
+
+class KeyringStub(Keyring):
+
+    def __init__(self):
+        super(KeyringStub, self).__init__(home_dir=tempfile.mkdtemp(), logger=logging.getLogger(), keyservers=())
+        self.listed = 0
+
+    def _list_keys(self) -> str:
+        self.listed += 1
+        return LIST_OUTPUT
+
+    def _gen_receive_process(self, keys: List[str], root_password: Optional[str], keyserver: Optional[str] = None) -> SystemProcess:
+        raise Exception('keys should not be received by this test')
+
+
+class KeyringTest(TestCase):
+
+    def test_normalize_key(self):
+        self.assertEqual('79BE3E4300411886', normalize_key(' 0x79be3e4300411886 '))
+        self.assertEqual('ABAF11C65A2970B1', normalize_key('ABAF 11C6 5A29 70B1'))
+
+    def test_list_missing__must_match_fingerprints_and_ids(self):
+        keyring = KeyringStub()
+        missing = keyring.list_missing(['ABAF11C65A2970B130ABE3C479BE3E4300411886', '79be3e4300411886', 'CAFE0001',
+                                        '1234567890ABCDEF', '1234567890abcdef'])
+
+        self.assertEqual(['1234567890ABCDEF'], missing)
+
+    def test_list_missing__must_list_the_keyring_once(self):
+        keyring = KeyringStub()
+
+        for _ in range(3):
+            keyring.list_missing(['1234567890ABCDEF'])
+
+        self.assertEqual(1, keyring.listed)
+
+        keyring.list_missing(['1234567890ABCDEF'], refresh=True)
+        self.assertEqual(2, keyring.listed)
@@ -0,0 +1,63 @@
+import logging
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from bauh.gems.flatpak import catalog
+from bauh.gems.flatpak.catalog import FlatpakCatalog
+
+FILE_DIR = os.path.dirname(os.path.abspath(__file__))
+ACTIVE_DIR = '{}/resources/appstream/flathub/x86_64/active'.format(FILE_DIR)
+
+
+class FlatpakCatalogTest(TestCase):
+
+    def setUp(self):
+        self.catalog_dir = tempfile.mkdtemp()
+        self.catalog = FlatpakCatalog(logger=logging.getLogger(), catalog_dir=self.catalog_dir, arch='x86_64',
+                                      installation_dirs={'system': '{}/resources'.format(FILE_DIR)}, check_interval=0)
+
+    def test_parse_appstream__must_only_map_applications(self):
+        entries = catalog.parse_appstream(ACTIVE_DIR)
+
+        self.assertEqual(['org.gnome.gedit', 'com.spotify.Client'], [e[catalog.ID] for e in entries])
+
+        gedit = entries[0]
+        self.assertEqual('gedit', gedit[catalog.NAME])
+        self.assertEqual('Text editor', gedit[catalog.SUMMARY])
+        self.assertEqual(['TextEditor', 'Utility'], gedit[catalog.CATEGORIES])
+        self.assertEqual('file://{}/icons/64x64/org.gnome.gedit.png'.format(ACTIVE_DIR), gedit[catalog.ICON])
+        self.assertEqual('3.36.0', gedit[catalog.VERSION])
+        self.assertEqual('stable', gedit[catalog.BRANCH])
+
+        self.assertEqual('https://dl.flathub.org/media/spotify.png', entries[1][catalog.ICON])
+
+    def test_search__must_rank_name_matches_first(self):
+        found = self.catalog.search('editor')
+        self.assertEqual(1, len(found))
+        self.assertEqual(('flathub', 'org.gnome.gedit'), (found[0][0], found[0][1][catalog.ID]))
+
+        found = self.catalog.search('spotify')
+        self.assertEqual('com.spotify.Client', found[0][1][catalog.ID])
+
+        self.assertEqual([], self.catalog.search('spotify', installation='user'))
+
+    def test_find__must_return_the_remote_and_the_entry(self):
+        remote, entry = self.catalog.find('org.gnome.gedit', installation='system')
+        self.assertEqual(('flathub', 'org.gnome.gedit'), (remote, entry[catalog.ID]))
+
+        self.assertIsNone(self.catalog.find('org.gnome.gedit', installation='user'))
+        self.assertIsNone(self.catalog.find('org.gnome.gedi'))
+
+    def test_refresh__must_store_the_catalog_and_reuse_it_while_the_checksum_does_not_change(self):
+        self.catalog.refresh()
+        stored = os.listdir(self.catalog_dir)
+        self.assertEqual(['system_flathub_x86_64.json'], stored)
+
+        other_instance = FlatpakCatalog(logger=logging.getLogger(), catalog_dir=self.catalog_dir, arch='x86_64',
+                                        installation_dirs={'system': '{}/resources'.format(FILE_DIR)})
+
+        with patch('bauh.gems.flatpak.catalog.parse_appstream', wraps=catalog.parse_appstream) as parse_appstream:
+            self.assertIsNotNone(other_instance.get('org.gnome.gedit', origin='flathub'))
+            parse_appstream.assert_not_called()
@@ -0,0 +1,44 @@
+import os
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from bauh.gems.flatpak import flatpak
+
+FILE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def mock_update_output(file_name: str) -> Mock:
+    with open('{}/resources/{}'.format(FILE_DIR, file_name), 'rb') as f:
+        output = f.read()
+
+    proc = Mock()
+    proc.communicate.return_value = (output, b'')
+    return Mock(return_value=proc)
+
+
+class FlatpakReadUpdatesTest(TestCase):
+
+    def test_read_updates__must_map_full_and_partial_updates(self):
+        with patch('bauh.gems.flatpak.flatpak.new_subprocess', mock_update_output('update_1.6.txt')):
+            updates = flatpak.read_updates('1.6.3', 'system')
+
+        self.assertEqual({'org.freedesktop.Platform.GL.default/19.08/system', 'org.gnome.gedit/stable/system'}, updates['full'])
+        self.assertEqual({'org.gnome.Platform.Locale/3.36/system'}, updates['partial'])
+
+    def test_read_updates__must_map_the_download_sizes(self):
+        with patch('bauh.gems.flatpak.flatpak.new_subprocess', mock_update_output('update_1.6.txt')):
+            updates = flatpak.read_updates('1.6.3', 'system')
+
+        self.assertEqual({'org.freedesktop.Platform.GL.default/19.08/system': 89600000,
+                          'org.gnome.Platform.Locale/3.36/system': 318300000,
+                          'org.gnome.gedit/stable/system': 8500000}, updates['sizes'])
+
+
+class FlatpakMapDownloadSizeTest(TestCase):
+
+    def test_map_download_size__must_accept_non_breaking_spaces(self):
+        self.assertEqual(1200, flatpak.map_download_size('< 1.2\xa0kB (partial)'))
+        self.assertEqual(2500000000, flatpak.map_download_size('2,5\xa0GB'))
+
+    def test_map_download_size__must_return_none_for_unknown_sizes(self):
+        self.assertIsNone(flatpak.map_download_size('?'))
@@ -0,0 +1,143 @@
+import logging
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Optional, List
+from unittest import TestCase
+from unittest.mock import patch
+
+from bauh.api.exception import NoInternetException
+from bauh.gems.flatpak.history import FlatpakHistoryReader
+
+REF = 'app/org.gnome.gedit/x86_64/stable'
+
+
+class RemoteLog:
+
+    def __init__(self, size: int):
+        self.commits = []
+        self.calls = []
+        self.add_commits(size)
+
+    def add_commits(self, number: int):
+        for _ in range(number):
+            idx = len(self.commits)
+            commit = {'commit': 'c{}'.format(idx), 'subject': 'commit {}'.format(idx), 'date': datetime(2020, 1, 1 + idx)}
+
+            if self.commits:
+                commit['parent'] = self.commits[0]['commit']
+
+            self.commits.insert(0, commit)
+
+    def get_app_commit_data(self, app_ref: str, origin: str, installation: str, commit: str = None) -> Optional[dict]:
+        self.calls.append(commit)
+        found = self.commits[0] if not commit else [c for c in self.commits if c['commit'] == commit]
+
+        if found:
+            return {**(found if not commit else found[0])}
+
+    def get_app_commits_data(self, app_ref: str, origin: str, installation: str) -> List[dict]:
+        self.calls.append('log')
+        return [{k: v for k, v in c.items() if k != 'parent'} for c in self.commits]
+
+
+class FlatpakHistoryReaderTest(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.reader = FlatpakHistoryReader(logging.getLogger(__name__), cache_dir=self.cache_dir, page_size=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_read__must_read_only_the_first_page(self):
+        log = RemoteLog(10)
+
+        with patch('bauh.gems.flatpak.flatpak.get_app_commit_data', log.get_app_commit_data):
+            commits, has_more = self.reader.read(REF, 'flathub', 'system')
+
+        self.assertEqual(['c9', 'c8', 'c7'], [c['commit'] for c in commits])
+        self.assertEqual({'commit', 'subject', 'date'}, set(commits[0].keys()))
+        self.assertEqual(datetime(2020, 1, 10), commits[0]['date'])
+        self.assertTrue(has_more)
+
+    def test_read__must_read_pages_until_the_given_commit_is_found(self):
+        log = RemoteLog(10)
+
+        with patch('bauh.gems.flatpak.flatpak.get_app_commit_data', log.get_app_commit_data):
+            commits, has_more = self.reader.read(REF, 'flathub', 'system', until_commit='c5')
+
+        self.assertEqual(['c9', 'c8', 'c7', 'c6', 'c5'], [c['commit'] for c in commits])
+        self.assertTrue(has_more)
+
+    def test_read_more__must_read_the_next_page_until_the_first_commit(self):
+        log = RemoteLog(5)
+
+        with patch('bauh.gems.flatpak.flatpak.get_app_commit_data', log.get_app_commit_data):
+            self.reader.read(REF, 'flathub', 'system')
+            commits, has_more = self.reader.read_more(REF, 'flathub', 'system')
+
+        self.assertEqual(['c4', 'c3', 'c2', 'c1', 'c0'], [c['commit'] for c in commits])
+        self.assertFalse(has_more)
+
+    def test_read__reopen_must_only_read_the_newer_commits(self):
+        log = RemoteLog(5)
+
+        with patch('bauh.gems.flatpak.flatpak.get_app_commit_data', log.get_app_commit_data):
+            self.reader.read(REF, 'flathub', 'system')
+            log.add_commits(2)
+            log.calls.clear()
+            commits, has_more = self.reader.read(REF, 'flathub', 'system')
+
+        self.assertEqual([None, 'c5'], log.calls)
+        self.assertEqual(['c6', 'c5', 'c4', 'c3', 'c2'], [c['commit'] for c in commits])
+        self.assertTrue(has_more)
+
+    def test_read__must_return_the_cached_history_when_offline(self):
+        log = RemoteLog(3)
+
+        with patch('bauh.gems.flatpak.flatpak.get_app_commit_data', log.get_app_commit_data):
+            self.reader.read(REF, 'flathub', 'system')
+
+        with patch('bauh.gems.flatpak.flatpak.get_app_commit_data', return_value=None), \
+                patch('bauh.commons.internet.is_available', return_value=False):
+            commits, has_more = self.reader.read(REF, 'flathub', 'system')
+            self.assertEqual(['c2', 'c1', 'c0'], [c['commit'] for c in commits])
+            self.assertFalse(has_more)
+
+            self.assertRaises(NoInternetException, self.reader.read, REF, 'flathub', 'user')
+
+    def test_read__must_read_the_whole_log_when_the_given_commit_is_too_old(self):
+        log = RemoteLog(20)
+        self.reader.max_walk = 5
+
+        with patch('bauh.gems.flatpak.flatpak.get_app_commit_data', log.get_app_commit_data), \
+                patch('bauh.gems.flatpak.flatpak.get_app_commits_data', log.get_app_commits_data):
+            commits, has_more = self.reader.read(REF, 'flathub', 'system', until_commit='c2')
+
+        self.assertEqual(1 + 2 + 5, len([c for c in log.calls if c != 'log']))  # head + first page + max_walk
+        self.assertEqual('log', log.calls[-1])
+        self.assertEqual(['c{}'.format(i) for i in range(19, -1, -1)], [c['commit'] for c in commits])
+        self.assertFalse(has_more)
+
+    def test_read_more__unavailable_commits_must_end_the_history_when_online(self):
+        log = RemoteLog(5)
+        del log.commits[-2:]  # removed from the remote
+
+        with patch('bauh.gems.flatpak.flatpak.get_app_commit_data', log.get_app_commit_data), \
+                patch('bauh.commons.internet.is_available', return_value=True):
+            self.reader.read(REF, 'flathub', 'system')
+            commits, has_more = self.reader.read_more(REF, 'flathub', 'system')
+
+        self.assertEqual(['c4', 'c3', 'c2'], [c['commit'] for c in commits])
+        self.assertFalse(has_more)
+
+    def test_read_more__must_raise_an_error_when_offline(self):
+        log = RemoteLog(5)
+
+        with patch('bauh.gems.flatpak.flatpak.get_app_commit_data', log.get_app_commit_data):
+            self.reader.read(REF, 'flathub', 'system')
+
+        with patch('bauh.gems.flatpak.flatpak.get_app_commit_data', return_value=None), \
+                patch('bauh.commons.internet.is_available', return_value=False):
+            self.assertRaises(NoInternetException, self.reader.read_more, REF, 'flathub', 'system')
@@ -0,0 +1,68 @@
+from unittest import TestCase
+
+from bauh.gems.flatpak import transaction
+from bauh.gems.flatpak.transaction import UpdateTransactionProgress
+
+
+class UpdateTransactionProgressTest(TestCase):
+
+    def test_handle_line__operations_table(self):
+        changes = []
+        progress = UpdateTransactionProgress(['org.gnome.gedit/x86_64/stable', 'org.videolan.VLC/x86_64/stable'],
+                                             lambda ref, status, idx, total: changes.append((ref, status, idx, total)))
+
+        for line in ('ID                                  Branch    Op  Remote    Download',
+                     ' 1.     org.gnome.Platform          3.36      u   flathub   < 10 MB',
+                     ' 2.     org.gnome.gedit             stable    u   flathub   < 5 MB',
+                     ' 3.     org.videolan.VLC            stable    u   flathub   < 20 MB',
+                     'Updating 1/3…',
+                     'Updating 2/3…',
+                     'Updating 3/3…',
+                     ' 2. [✓] org.gnome.gedit             stable    u   flathub   4.1 MB / 5 MB',
+                     ' 3. [✗] org.videolan.VLC            stable    u   flathub   1.0 MB / 20 MB'):
+            progress.handle_line(line)
+
+        progress.finish(False)
+
+        self.assertEqual(['org.gnome.gedit/x86_64/stable'], progress.get_refs(transaction.DONE))
+        self.assertEqual(['org.videolan.VLC/x86_64/stable'], progress.get_refs(transaction.FAILED))
+        self.assertEqual(('org.gnome.gedit/x86_64/stable', transaction.UPDATING, 2, 3), changes[0])
+
+    def test_handle_line__legacy_format(self):
+        progress = UpdateTransactionProgress(['org.gnome.gedit/x86_64/stable', 'org.gnome.Platform/x86_64/3.36'])
+
+        progress.handle_line('Updating: org.gnome.Platform/x86_64/3.36 from flathub')
+        self.assertEqual(['org.gnome.Platform/x86_64/3.36'], progress.get_refs(transaction.UPDATING))
+
+        progress.handle_line('Updating: app/org.gnome.gedit/x86_64/stable from flathub')
+        self.assertEqual(['org.gnome.Platform/x86_64/3.36'], progress.get_refs(transaction.DONE))
+        self.assertEqual(['org.gnome.gedit/x86_64/stable'], progress.get_refs(transaction.UPDATING))
+
+        progress.finish(True)
+        self.assertEqual(2, len(progress.get_refs(transaction.DONE)))
+
+    def test_handle_line__refs_with_the_same_id_and_different_branches(self):
+        refs = ['org.gnome.Platform/x86_64/3.36', 'org.gnome.Platform/x86_64/3.38']
+        progress = UpdateTransactionProgress(refs)
+
+        for line in ('ID                                  Branch    Op  Remote    Download',
+                     ' 1.     org.gnome.Platform          3.36      u   flathub   < 10 MB',
+                     ' 2.     org.gnome.Platform          3.38      u   flathub   < 10 MB',
+                     'Updating 1/2…',
+                     ' 1. [✓] org.gnome.Platform          3.36      u   flathub   9.2 MB / 10 MB',
+                     'Updating 2/2…',
+                     ' 2. [✗] org.gnome.Platform          3.38      u   flathub   1.0 MB / 10 MB'):
+            progress.handle_line(line)
+
+        self.assertEqual(['org.gnome.Platform/x86_64/3.36'], progress.get_refs(transaction.DONE))
+        self.assertEqual(['org.gnome.Platform/x86_64/3.38'], progress.get_refs(transaction.FAILED))
+
+    def test_handle_line__legacy_format_with_the_same_id_and_different_branches(self):
+        progress = UpdateTransactionProgress(['org.gnome.Platform/x86_64/3.36', 'org.gnome.Platform/x86_64/3.38'])
+
+        progress.handle_line('Updating: runtime/org.gnome.Platform/x86_64/3.38 from flathub')
+        self.assertEqual(['org.gnome.Platform/x86_64/3.38'], progress.get_refs(transaction.UPDATING))
+
+        progress.handle_line('Error: Failed to update runtime/org.gnome.Platform/x86_64/3.38: connection lost')
+        self.assertEqual(['org.gnome.Platform/x86_64/3.38'], progress.get_refs(transaction.FAILED))
+        self.assertEqual(['org.gnome.Platform/x86_64/3.36'], progress.get_refs(transaction.PENDING))
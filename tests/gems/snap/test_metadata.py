@@ -0,0 +1,103 @@
+import json
+import logging
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from bauh.gems.snap.metadata import SnapMetadataReader
+from bauh.gems.snap.snapd import Snap, SnapdError
+
+
+class SnapdMock:
+
+    def __init__(self, snaps: list):
+        self.snaps = {s.name: s for s in snaps}
+        self.requests = []
+        self.delay = 0
+
+    def find(self, query: str = None, name: str = None, select: str = None):
+        self.requests.append(name)
+        time.sleep(self.delay)
+
+        if name == 'broken':
+            raise SnapdError('store unavailable')
+
+        return [self.snaps[name]] if name in self.snaps else []
+
+
+def new_snap(name: str) -> Snap:
+    return Snap(id=name, name=name, version='1.0', revision='10', description='{} description'.format(name),
+                confinement='strict', icon_url='https://snap/{}.png'.format(name), status='available')
+
+
+class SnapMetadataReaderTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_file = '{}/metadata.json'.format(self.temp_dir)
+        self.snapd = SnapdMock([new_snap('vlc'), new_snap('gimp'), new_snap('spotify')])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def new_reader(self, expiration: int = 60) -> SnapMetadataReader:
+        return SnapMetadataReader(logging.getLogger(__name__), self.snapd, cache_file=self.cache_file, expiration=expiration)
+
+    def test_read__must_only_request_the_snaps_not_cached(self):
+        reader = self.new_reader()
+        reader.update([new_snap('vlc')])
+
+        res = reader.read(['vlc', 'gimp', 'gimp', 'unknown'])
+
+        self.assertEqual({'vlc', 'gimp'}, set(res))
+        self.assertEqual('strict', res['gimp']['confinement'])
+        self.assertEqual('https://snap/gimp.png', res['gimp']['icon_url'])
+        self.assertEqual(['gimp', 'unknown'], sorted(self.snapd.requests))
+
+    def test_read__must_use_the_disk_cache_of_a_previous_session(self):
+        self.new_reader().read(['vlc', 'spotify'])
+        self.snapd.requests.clear()
+
+        res = self.new_reader().read(['vlc', 'spotify'])
+
+        self.assertEqual({'vlc', 'spotify'}, set(res))
+        self.assertEqual([], self.snapd.requests)
+
+    def test_read__must_request_the_expired_snaps_again(self):
+        self.new_reader().read(['vlc'])
+
+        with open(self.cache_file) as f:
+            cached = json.loads(f.read())
+
+        cached['vlc']['expires_at'] = time.time() - 1
+
+        with open(self.cache_file, 'w') as f:
+            f.write(json.dumps(cached))
+
+        self.snapd.requests.clear()
+        self.assertIn('vlc', self.new_reader().read(['vlc']))
+        self.assertEqual(['vlc'], self.snapd.requests)
+
+    def test_read__must_request_the_missing_snaps_concurrently(self):
+        self.snapd.delay = 0.2
+        reader = self.new_reader()
+        reader.max_requests = 2
+
+        ti = time.time()
+        res = reader.read(['vlc', 'gimp', 'spotify'])
+
+        self.assertEqual({'vlc', 'gimp', 'spotify'}, set(res))
+        self.assertLess(time.time() - ti, 0.55)  # 2 rounds of requests instead of 3
+
+    def test_read__must_skip_the_snaps_that_could_not_be_read(self):
+        res = self.new_reader().read(['broken', 'vlc'])
+        self.assertEqual({'vlc'}, set(res))
+
+    def test_get__must_not_request_the_store(self):
+        reader = self.new_reader()
+        self.assertIsNone(reader.get('vlc'))
+
+        reader.update([new_snap('vlc')])
+        self.assertEqual('vlc description', reader.get('vlc')['description'])
+        self.assertEqual([], self.snapd.requests)
@@ -0,0 +1,215 @@
+import json
+import logging
+import os
+import shutil
+import socketserver
+import tempfile
+from http.server import BaseHTTPRequestHandler
+from threading import Thread
+from unittest import TestCase
+
+from bauh.gems.snap.snapd import SnapdClient, SnapdError
+
+FILE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class SnapdStandIn(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Replays recorded snapd responses through a Unix socket. A route with several responses returns them in order
+    (the last one is repeated).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, routes: dict):
+        self.routes = {path: list(files) for path, files in routes.items()}
+        self.requests = []
+        self.posts = []
+        self.connections = 0
+        super(SnapdStandIn, self).__init__(socket_path, SnapdRequestHandler)
+
+    def get_response(self, path: str) -> dict:
+        files = self.routes.get(path)
+
+        if not files:
+            return {'type': 'error', 'status-code': 404, 'result': {'message': 'not found', 'kind': 'not-found'}}
+
+        file_name = files.pop(0) if len(files) > 1 else files[0]
+
+        with open('{}/resources/snapd/{}'.format(FILE_DIR, file_name)) as f:
+            return json.loads(f.read())
+
+
+class SnapdRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super(SnapdRequestHandler, self).setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        response = self.server.get_response(self.path)
+        body = json.dumps(response).encode()
+
+        self.send_response(response.get('status-code', 200))
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # write requests are rejected like snapd does for unprivileged clients
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.posts.append((self.path, json.loads(body.decode())))
+        response = json.dumps({'type': 'error', 'status-code': 401,
+                               'result': {'message': 'access denied', 'kind': 'login-required'}}).encode()
+
+        self.send_response(401)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self):
+        return 'snapd'
+
+
+class SnapdClientTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.socket_path = '{}/snapd.socket'.format(self.temp_dir)
+        self.server = None
+
+    def tearDown(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+        shutil.rmtree(self.temp_dir)
+
+    def start_server(self, routes: dict) -> SnapdClient:
+        self.server = SnapdStandIn(self.socket_path, routes)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        client = SnapdClient(logging.getLogger(__name__), socket_path=self.socket_path, timeout=5)
+        self.addCleanup(client.close)
+        return client
+
+    def test_list_snaps__must_map_the_installed_snaps(self):
+        client = self.start_server({'/v2/snaps': ['snaps.json']})
+        snaps = client.list_snaps()
+
+        self.assertEqual(['core', 'vlc'], [s.name for s in snaps])
+
+        core, vlc = snaps
+        self.assertEqual('core', core.get_notes())
+        self.assertEqual([], core.apps)
+        self.assertTrue(core.verified_publisher)
+
+        self.assertEqual('3.0.10', vlc.version)
+        self.assertEqual('1700', vlc.revision)
+        self.assertEqual('latest/stable', vlc.tracking_channel)
+        self.assertEqual(['vlc'], vlc.apps)
+        self.assertEqual('videolan', vlc.publisher)
+        self.assertTrue(vlc.is_installed())
+        self.assertEqual({'name': 'vlc', 'version': '3.0.10', 'rev': '1700', 'tracking': 'latest/stable',
+                          'publisher': 'videolan', 'developer_validation': 'verified', 'notes': None,
+                          'summary': 'The ultimate media player', 'type': 'app', 'apps_field': True}, vlc.to_json())
+
+    def test_find__must_map_the_store_snaps(self):
+        client = self.start_server({'/v2/find?q=vlc': ['find_vlc.json']})
+        found = client.find(query='vlc')
+
+        self.assertEqual(1, len(found))
+        self.assertEqual('https://dashboard.snapcraft.io/site_media/appmedia/2016/07/vlc.png', found[0].icon_url)
+        self.assertEqual(['https://dashboard.snapcraft.io/site_media/appmedia/2016/07/vlc1.png'], found[0].screenshots)
+        self.assertEqual(220483584, found[0].download_size)
+        self.assertFalse(found[0].is_installed())
+
+    def test_find__must_select_the_snaps_to_refresh_in_a_single_request(self):
+        client = self.start_server({'/v2/find?select=refresh': ['find_vlc.json']})
+
+        self.assertEqual(['vlc'], [s.name for s in client.find(select='refresh')])
+        self.assertEqual(['/v2/find?select=refresh'], self.server.requests)
+
+    def test_get_snap__must_return_none_when_not_installed(self):
+        client = self.start_server({'/v2/snaps/gimp': ['snap_not_found.json']})
+        self.assertIsNone(client.get_snap('gimp'))
+
+    def test_requests__must_reuse_the_same_connection(self):
+        client = self.start_server({'/v2/snaps': ['snaps.json']})
+
+        for _ in range(3):
+            client.list_snaps()
+
+        self.assertEqual(3, len(self.server.requests))
+        self.assertEqual(1, self.server.connections)
+
+    def test_is_available__must_return_true_when_snapd_is_listening(self):
+        client = self.start_server({})
+        self.assertTrue(client.is_available())
+
+    def test_is_available__must_return_false_when_there_is_no_socket(self):
+        client = SnapdClient(logging.getLogger(__name__), socket_path=self.socket_path)
+        self.assertFalse(client.is_available())
+
+    def test_wait_change__must_poll_until_the_change_is_ready(self):
+        client = self.start_server({'/v2/changes/42': ['change_doing.json', 'change_doing.json', 'change_done.json']})
+        progress = []
+
+        change = client.wait_change('42', lambda c: progress.append(c.get_progress()), interval=0.01)
+
+        self.assertTrue(change.is_successful())
+        self.assertEqual([37, 37, 100], progress)
+        self.assertEqual(3, len(self.server.requests))
+
+    def test_wait_change__must_abort_the_change_when_it_times_out(self):
+        client = self.start_server({'/v2/changes/42': ['change_doing.json']})
+        aborted = []
+
+        with self.assertRaises(SnapdError) as ctx:
+            client.wait_change('42', interval=0.01, timeout=0.05, on_timeout=lambda c: aborted.append(c.id) or True)
+
+        self.assertEqual('change-timeout', ctx.exception.kind)
+        self.assertEqual(['42'], aborted)
+        self.assertEqual([], self.server.posts)  # aborted through the privileged callback, not the socket
+
+    def test_wait_change__must_keep_following_the_change_when_the_abort_fails(self):
+        client = self.start_server({'/v2/changes/42': ['change_doing.json'] * 8 + ['change_done.json']})
+        aborts = []
+
+        change = client.wait_change('42', interval=0.01, timeout=0.02, on_timeout=lambda c: aborts.append(c.id) and False)
+
+        self.assertTrue(change.is_successful())
+        self.assertGreaterEqual(len(aborts), 1)
+
+    def test_request__must_reject_unprivileged_write_requests(self):
+        client = self.start_server({})
+
+        with self.assertRaises(SnapdError) as ctx:
+            client._request('POST', '/v2/changes/42', body={'action': 'abort'})
+
+        self.assertEqual(401, ctx.exception.status_code)
+
+    def test_get_change__must_map_the_running_task_and_errors(self):
+        client = self.start_server({'/v2/changes/42': ['change_doing.json'], '/v2/changes/43': ['change_error.json']})
+
+        self.assertEqual('Download snap "hello-world" (29) from channel "stable"', client.get_change('42').get_current_task().summary)
+
+        change = client.get_change('43')
+        self.assertTrue(change.ready)
+        self.assertFalse(change.is_successful())
+        self.assertIn('Stop snap "vlc" services', change.err)
+
+    def test_request__must_raise_snapd_errors(self):
+        client = self.start_server({})
+
+        with self.assertRaises(SnapdError) as ctx:
+            client.get_change('1')
+
+        self.assertEqual(404, ctx.exception.status_code)
+        self.assertEqual('not-found', ctx.exception.kind)
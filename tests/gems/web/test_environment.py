@@ -0,0 +1,131 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from unittest import TestCase
+from unittest.mock import patch, Mock
+
+from bauh.api.http import HttpClient
+from bauh.gems.web.environment import EnvironmentCache, EnvironmentUpdater
+
+SETTINGS = b'nodejs:\n  version: 12.16.1\n'
+
+
+class EnvironmentCacheTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = EnvironmentCache(paths=(self.temp_dir,))
+        self.reads = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self) -> int:
+        self.reads += 1
+        return self.reads
+
+    def test_get__cached_while_the_paths_do_not_change(self):
+        self.assertEqual(1, self.cache.get('version', self.read))
+        self.assertEqual(1, self.cache.get('version', self.read))
+
+        os.mkdir(self.temp_dir + '/node')
+        stat = os.stat(self.temp_dir)
+        os.utime(self.temp_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+        self.assertEqual(2, self.cache.get('version', self.read))
+
+    def test_get__missing_path_is_watched(self):
+        cache = EnvironmentCache(paths=(self.temp_dir + '/node',))
+        self.assertEqual(1, cache.get('version', self.read))
+
+        os.mkdir(self.temp_dir + '/node')
+        self.assertEqual(2, cache.get('version', self.read))
+
+    def test_get__expired(self):
+        self.cache.ttl = 0
+        self.cache.get('version', self.read)
+        self.assertEqual(2, self.cache.get('version', self.read))
+
+    def test_invalidate(self):
+        self.cache.get('version', self.read)
+        self.cache.invalidate()
+        self.assertEqual(2, self.cache.get('version', self.read))
+
+
+class SettingsServer(ThreadingHTTPServer):
+
+    def __init__(self):
+        super(SettingsServer, self).__init__(('127.0.0.1', 0), SettingsRequestHandler)
+        self.etag = '"v1"'
+        self.responses = []
+
+    def get_url(self) -> str:
+        return 'http://127.0.0.1:{}/environment.yml'.format(self.server_address[1])
+
+
+class SettingsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == self.server.etag:
+            self.server.responses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.server.responses.append(200)
+        self.send_response(200)
+        self.send_header('ETag', self.server.etag)
+        self.send_header('Content-Length', str(len(SETTINGS)))
+        self.end_headers()
+        self.wfile.write(SETTINGS)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class EnvironmentUpdaterSettingsTest(TestCase):
+
+    def setUp(self):
+        self.server = SettingsServer()
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.http_client = HttpClient(logging.getLogger(), max_attempts=1, timeout=1, sleep=0)
+        self.updater = EnvironmentUpdater(logger=logging.getLogger(), http_client=self.http_client,
+                                          file_downloader=Mock(), i18n=Mock())
+        self.url_patch = patch('bauh.gems.web.environment.URL_ENVIRONMENT_SETTINGS', self.server.get_url())
+        self.url_patch.start()
+
+    def tearDown(self):
+        self.url_patch.stop()
+        self.http_client.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_read_settings__cached_while_fresh(self):
+        self.assertEqual('12.16.1', self.updater.read_settings()['nodejs']['version'])
+        self.assertEqual('12.16.1', self.updater.read_settings()['nodejs']['version'])
+        self.assertEqual([200], self.server.responses)
+
+    def test_read_settings__revalidated_through_etag_when_expired(self):
+        self.updater.settings_ttl = 0
+        self.updater.read_settings()
+        self.assertEqual('12.16.1', self.updater.read_settings()['nodejs']['version'])
+        self.assertEqual([200, 304], self.server.responses)
+
+        self.server.etag = '"v2"'
+        self.updater.read_settings()
+        self.assertEqual([200, 304, 200], self.server.responses)
+
+    def test_read_settings__offline_returns_the_cached_settings(self):
+        self.updater.read_settings()
+        self.server.shutdown()
+        self.server.server_close()
+
+        self.updater.settings_ttl = 0
+        time.sleep(0.01)
+        self.assertEqual('12.16.1', self.updater.read_settings()['nodejs']['version'])
+
+        self.server = SettingsServer()  # to be stopped by tearDown
+        Thread(target=self.server.serve_forever, daemon=True).start()
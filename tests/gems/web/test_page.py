@@ -0,0 +1,188 @@
+import logging
+import shutil
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from unittest import TestCase
+
+import requests
+
+from bauh.gems.web.page import HeadParser, PageMetadataReader, read_head
+
+PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title> Ação &amp; Co </title>
+  <meta name="description" content="Uma descrição">
+  <meta property="og:image" content="https://cdn.test/og.png">
+  <link rel="stylesheet" href="/style.css">
+  <link rel="shortcut icon" href="/favicon.ico">
+  <link rel="ICON" href="/other.png"/>
+</head>
+<body><title>Not the title</title>
+'''.encode() + b'<p>content</p>' * 100000
+
+
+class FakeResponse:
+
+    def __init__(self, content: bytes, content_type: str = 'text/html'):
+        self.content = content
+        self.headers = {'content-type': content_type}
+        self.encoding = 'ISO-8859-1'
+        self.read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size: int):
+        for idx in range(0, len(self.content), chunk_size):
+            chunk = self.content[idx:idx + chunk_size]
+            self.read += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class HeadParserTest(TestCase):
+
+    def test_read_head__stops_after_the_head(self):
+        res = FakeResponse(PAGE)
+        head = read_head(res)
+
+        self.assertTrue(head.finished)
+        self.assertTrue(res.closed)
+        self.assertLess(res.read, 10000)
+        self.assertEqual('Ação & Co', head.title)
+        self.assertEqual('Uma descrição', head.description)
+        self.assertEqual(['/favicon.ico', '/other.png'], head.icons)
+        self.assertEqual('https://cdn.test/og.png', head.og_image)
+        self.assertIsNone(head.app_name)
+
+    def test_read_head__declared_charset(self):
+        res = FakeResponse('<head><title>Ação</title></head>'.encode('iso-8859-1'), 'text/html; charset=ISO-8859-1')
+        self.assertEqual('Ação', read_head(res).title)
+
+    def test_feed__split_tags(self):
+        parser = HeadParser()
+
+        for chunk in ('<html><he', 'ad><meta name="applica', 'tion-name" content="App"><tit', 'le>Ti', 'tle</title>'):
+            parser.feed(chunk)
+
+        self.assertFalse(parser.finished)
+        parser.feed('<body>')
+        self.assertTrue(parser.finished)
+        self.assertEqual('App', parser.app_name)
+        self.assertEqual('Title', parser.title)
+
+
+class PageServer(ThreadingHTTPServer):
+
+    def __init__(self):
+        super(PageServer, self).__init__(('127.0.0.1', 0), PageRequestHandler)
+        self.etag = '"v1"'
+        self.responses = []
+
+    def get_url(self, path: str) -> str:
+        return 'http://127.0.0.1:{}{}'.format(self.server_address[1], path)
+
+
+class PageRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == '/old':
+            self.server.responses.append(301)
+            self.send_response(301)
+            self.send_header('Location', '/app')
+            self.end_headers()
+            return
+
+        if self.headers.get('If-None-Match') == self.server.etag:
+            self.server.responses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.server.responses.append(200)
+        content = PAGE.replace(b'Uma descri', 'Versão {} descri'.format(self.server.etag.strip('"')).encode())
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', self.server.etag)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+
+        try:
+            self.wfile.write(content)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PageMetadataReaderTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.server = PageServer()
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.session = requests.Session()
+        self.reader = PageMetadataReader(self.session, logging.getLogger(), cache_file=self.temp_dir + '/pages.json')
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_read__final_url_and_metadata(self):
+        page = self.reader.read(self.server.get_url('/old'))
+
+        self.assertEqual(self.server.get_url('/app'), page.url)
+        self.assertEqual('Ação & Co', page.title)
+        self.assertEqual('Versão v1 descrição', page.description)
+        self.assertEqual('"v1"', page.etag)
+
+    def test_read__cached_while_fresh(self):
+        url = self.server.get_url('/app')
+        self.reader.read(url)
+        self.reader.read(url)
+        self.assertEqual([200], self.server.responses)
+
+        reader = PageMetadataReader(self.session, logging.getLogger(), cache_file=self.reader.cache_file)
+        self.assertEqual('Ação & Co', reader.read(url).title)
+        self.assertEqual([200], self.server.responses)
+
+    def test_read__revalidated_through_etag_when_expired(self):
+        url = self.server.get_url('/app')
+        self.reader.max_age = 0
+
+        self.reader.read(url)
+        self.assertEqual('Versão v1 descrição', self.reader.read(url).description)
+        self.assertEqual([200, 304], self.server.responses)
+
+        self.server.etag = '"v2"'
+        self.assertEqual('Versão v2 descrição', self.reader.read(url).description)
+        self.assertEqual([200, 304, 200], self.server.responses)
+
+    def test_read__offline_returns_the_cached_metadata(self):
+        url = self.server.get_url('/app')
+        self.reader.read(url)
+        self.server.shutdown()
+        self.server.server_close()
+
+        self.reader.max_age = 0
+        self.reader.timeout = 1
+        self.assertEqual('Ação & Co', self.reader.read(url).title)
+
+        self.server = PageServer()  # to be stopped by tearDown
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def test_read__max_entries(self):
+        self.reader.max_entries = 1
+        self.reader.read(self.server.get_url('/app'))
+        time.sleep(0.01)
+        self.reader.read(self.server.get_url('/old'))
+
+        self.assertIsNone(self.reader.get_cached(self.server.get_url('/app')))
+        self.assertIsNotNone(self.reader.get_cached(self.server.get_url('/old')))
@@ -0,0 +1,137 @@
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import TestCase
+
+from bauh.gems.web.runtime import RuntimeStore
+
+VERSION, ARCH = '9.0.0', 'x64'
+RUNTIME_FILES = {'electron': (os.urandom(64 * 1024), 0o755),
+                 'libffmpeg.so': (os.urandom(32 * 1024), 0o644),
+                 'locales/en-US.pak': (b'en-US' * 100, 0o644),
+                 'resources/default_app.asar': (b'default', 0o644)}
+
+
+def gen_zip() -> bytes:
+    content = io.BytesIO()
+
+    with zipfile.ZipFile(content, 'w') as zf:
+        for path, (data, mode) in RUNTIME_FILES.items():
+            info = zipfile.ZipInfo(path)
+            info.external_attr = (0o100000 | mode) << 16
+            zf.writestr(info, data)
+
+    return content.getvalue()
+
+
+class RuntimeStoreTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.electron_path = self.temp_dir + '/electron'
+        os.makedirs(self.electron_path)
+        self.store = RuntimeStore(logging.getLogger(), root=self.temp_dir + '/runtimes', electron_path=self.electron_path)
+
+        zip_content = gen_zip()
+        with open(self.store.get_zip_path(VERSION, ARCH), 'wb+') as f:
+            f.write(zip_content)
+
+        with open(self.store.get_sha256_path(VERSION), 'w+') as f:
+            f.write('{} *electron-v{}-linux-{}.zip\n'.format(hashlib.sha256(zip_content).hexdigest(), VERSION, ARCH))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def gen_app(self, name: str) -> str:
+        """
+        generates an application directory as nativefier does: the runtime files with the binary renamed + the app
+        """
+        app_dir = '{}/installed/{}'.format(self.temp_dir, name)
+
+        for path, (data, mode) in RUNTIME_FILES.items():
+            file_path = '{}/{}'.format(app_dir, name if path == 'electron' else path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+            with open(file_path, 'wb+') as f:
+                f.write(data)
+
+            os.chmod(file_path, mode)
+
+        os.makedirs(app_dir + '/resources/app')
+        with open(app_dir + '/resources/app/default_app.asar', 'wb+') as f:
+            f.write(b'default')  # same content as a runtime file, but belongs to the app
+
+        return app_dir
+
+    def test_verify__checksum_mismatch(self):
+        with open(self.store.get_zip_path(VERSION, ARCH), 'ab') as f:
+            f.write(b'corrupted')
+
+        self.assertIsNone(self.store.verify(VERSION, ARCH))
+        self.assertFalse(self.store.prepare(VERSION, ARCH))
+
+    def test_verify__missing_checksum(self):
+        os.remove(self.store.get_sha256_path(VERSION))
+        self.assertIsNone(self.store.verify(VERSION, ARCH))
+
+    def test_prepare__verified_and_unpacked_once(self):
+        self.assertTrue(self.store.prepare(VERSION, ARCH))
+
+        for data, mode in RUNTIME_FILES.values():
+            object_path = self.store.get_object_path(hashlib.sha256(data).hexdigest())
+            self.assertTrue(os.path.isfile(object_path))
+            self.assertEqual(mode, os.stat(object_path).st_mode & 0o777)
+
+        os.remove(self.store.get_sha256_path(VERSION))  # no checksum required since the zip has not changed
+        self.assertTrue(self.store.prepare(VERSION, ARCH))
+
+    def test_link__apps_share_the_runtime_files(self):
+        self.assertTrue(self.store.prepare(VERSION, ARCH))
+        app1, app2 = self.gen_app('app1'), self.gen_app('app2')
+
+        res = self.store.link(app1)
+        self.assertEqual(len(RUNTIME_FILES), res.files)
+        self.assertEqual(sum(len(d) for d, _ in RUNTIME_FILES.values()), res.bytes_linked)
+        self.assertEqual(len(RUNTIME_FILES), self.store.link(app2).files)
+
+        self.assertEqual(os.stat(app1 + '/app1').st_ino, os.stat(app2 + '/app2').st_ino)
+        self.assertEqual(3, os.stat(app1 + '/libffmpeg.so').st_nlink)
+        self.assertEqual(1, os.stat(app1 + '/resources/app/default_app.asar').st_nlink)
+
+        with open(app2 + '/app2', 'rb') as f:
+            self.assertEqual(RUNTIME_FILES['electron'][0], f.read())
+
+        stored, saved = self.store.get_usage()
+        self.assertEqual(sum(len(d) for d, _ in RUNTIME_FILES.values()), stored)
+        self.assertEqual(stored, saved)
+
+        self.assertEqual(0, self.store.link(app1).files)  # already linked
+
+    def test_link__different_mode_is_not_linked(self):
+        self.assertTrue(self.store.prepare(VERSION, ARCH))
+        app = self.gen_app('app')
+        os.chmod(app + '/libffmpeg.so', 0o600)
+
+        self.store.link(app)
+        self.assertEqual(1, os.stat(app + '/libffmpeg.so').st_nlink)
+        self.assertEqual(2, os.stat(app + '/app').st_nlink)
+
+    def test_collect_garbage__removes_objects_not_linked(self):
+        self.assertTrue(self.store.prepare(VERSION, ARCH))
+        app1, app2 = self.gen_app('app1'), self.gen_app('app2')
+        self.store.link(app1)
+        self.store.link(app2)
+
+        shutil.rmtree(app1)
+        self.assertEqual(0, self.store.collect_garbage())
+
+        shutil.rmtree(app2)
+        self.assertEqual(sum(len(d) for d, _ in RUNTIME_FILES.values()), self.store.collect_garbage())
+        self.assertEqual((0, 0), self.store.get_usage())
+
+        self.assertTrue(self.store.prepare(VERSION, ARCH))  # unpacked again
+        self.assertEqual(len(RUNTIME_FILES), self.store.link(self.gen_app('app3')).files)
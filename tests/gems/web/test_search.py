@@ -0,0 +1,72 @@
+import logging
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from bauh.gems.web.search import SearchIndex, SearchIndexReader, write_index
+
+SUGGESTIONS = {'gdrive': {'name': 'Google Drive', 'url': 'https://drive.google.com', 'priority': 1},
+               'gcalendar': {'name': 'Google Calendar', 'url': 'https://calendar.google.com', 'priority': 2},
+               'drive': {'name': 'Drive', 'url': 'https://drive.com', 'priority': 0},
+               'whatsapp': {'name': 'WhatsApp Web', 'url': 'https://web.whatsapp.com', 'priority': 3},
+               'noname': {'url': 'https://noname.com'}}
+
+
+class SearchIndexTest(TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex.build(SUGGESTIONS)
+
+    def search_names(self, words: str, limit: int = -1) -> list:
+        return [s['name'] for s in self.index.search(words, limit)]
+
+    def test_build__sorted_words(self):
+        self.assertEqual(sorted(self.index.words), self.index.words)
+        self.assertIn('googledrive', self.index.words)
+        self.assertEqual(['drive', 'gdrive'], self.index.words_keys[self.index.words.index('drive')])
+
+    def test_search__substring(self):
+        self.assertEqual(['WhatsApp Web'], self.search_names('atsap'))
+        self.assertEqual(['WhatsApp Web'], self.search_names('ts'))
+
+    def test_search__exact_name_first(self):
+        self.assertEqual(['Drive', 'Google Drive'], self.search_names('drive'))
+        self.assertEqual(['Google Drive', 'Google Calendar', 'Drive'], self.search_names('google drive'))
+
+    def test_search__prefix_before_substring_then_priority(self):
+        self.assertEqual(['Google Calendar', 'Google Drive'], self.search_names('goo'))
+        self.assertEqual(['Google Drive', 'Drive'], self.search_names('riv'))
+
+    def test_search__joined_words(self):
+        self.assertEqual(['Google Drive'], self.search_names('googledr'))
+
+    def test_search__limit(self):
+        self.assertEqual(['Google Calendar'], self.search_names('google', limit=1))
+
+    def test_search__not_found(self):
+        self.assertEqual([], self.search_names('xyz'))
+        self.assertEqual([], self.search_names('   '))
+
+
+class SearchIndexReaderTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = self.temp_dir + '/search_index.json'
+        self.reader = SearchIndexReader(logging.getLogger(), self.file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_read__kept_in_memory_until_the_file_changes(self):
+        self.assertIsNone(self.reader.read())
+
+        write_index(SearchIndex.build(SUGGESTIONS), self.file_path)
+        index = self.reader.read()
+        self.assertEqual(['Drive', 'Google Drive'], [s['name'] for s in index.search('drive')])
+        self.assertIs(index, self.reader.read())
+
+        write_index(SearchIndex.build({'drive': SUGGESTIONS['drive']}), self.file_path)
+        self.assertEqual(['Drive'], [s['name'] for s in self.reader.read().search('drive')])
+        self.assertFalse(os.path.exists(self.file_path + '.tmp'))